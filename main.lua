@@ -415,6 +415,17 @@ function Protocol.createEventMessage(eventType, eventData)
     }
 end
 
+-- 批量事件消息：events = { {event, data, frame}, ... }
+function Protocol.createEventBatchMessage(events)
+    return {
+        version = Protocol.VERSION,
+        type = Protocol.MessageType.EVENT,
+        timestamp = Isaac.GetTime(),
+        frame = State.frameCounter,
+        events = events
+    }
+end
+
 -- ============================================================================
 -- 收集器注册系统
 -- ============================================================================
@@ -1328,16 +1339,16 @@ local EventSystem = {
 
 function EventSystem.emit(eventType, eventData)
     table.insert(EventSystem.pendingEvents, {
-        type = eventType,
+        event = eventType,
         data = eventData or {},
         frame = State.frameCounter
     })
 end
 
+-- 所有待发送事件合并为一条 EVENT 消息
 function EventSystem.flush()
-    for _, event in ipairs(EventSystem.pendingEvents) do
-        Network.send(Protocol.createEventMessage(event.type, event.data))
-    end
+    if #EventSystem.pendingEvents == 0 then return end
+    Network.send(Protocol.createEventBatchMessage(EventSystem.pendingEvents))
     EventSystem.pendingEvents = {}
 end
 
@@ -1417,6 +1428,18 @@ mod:AddCallback(ModCallbacks.MC_POST_UPDATE, function()
             
             -- 处理输入命令
             InputExecutor.applyCommand(command)
+
+            -- 指令回显：Python 端据此测量指令往返延迟
+            if command.echo ~= nil then
+                Network.send({
+                    version = Protocol.VERSION,
+                    type = Protocol.MessageType.COMMAND,
+                    frame = State.frameCounter,
+                    game_time = Isaac.GetTime(),
+                    echo = command.echo,
+                    applied_frame = State.frameCounter,
+                })
+            end
         end
     end
 end)
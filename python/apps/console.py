@@ -17,12 +17,19 @@ SocketBridge 交互式控制台
 - help - 显示帮助信息
 - status - 显示连接状态
 - clear - 清屏
+- profile start|stop|status - 运行时剖析（帧窗口、换房间触发）
 - quit / exit - 退出
+
+本地控制套接字（可选）:
+    python console.py --control-port 9528
+    echo "profile start 600 next-room label=boss" | nc 127.0.0.1 9528
 """
 
 import sys
 import json
 import cmd
+import shlex
+import argparse
 import threading
 import time
 from datetime import datetime
@@ -34,6 +41,8 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # 导入 IsaacBridge 作为 TCP 服务器
 from isaac_bridge import IsaacBridge, MessageType
+from core.telemetry.control import ControlServer
+from core.telemetry.profiling import ProfilerController
 
 # 颜色配置
 class Colors:
@@ -137,12 +146,23 @@ class IsaacConsole(cmd.Cmd):
         "time": "time - 显示游戏时间",
     }
     
-    def __init__(self):
+    def __init__(self, control_port: Optional[int] = None, profile_dir: str = "profiles"):
         super().__init__()
         
         # 使用 IsaacBridge 作为 TCP 服务器
         self.bridge = IsaacBridge(host="127.0.0.1", port=9527)
         self.bridge.start()
+
+        # 运行时剖析
+        self.profiler = ProfilerController(output_dir=profile_dir)
+        self.profiler.attach(self.bridge)
+
+        # 本地控制套接字（可选）
+        self.control_server: Optional[ControlServer] = None
+        if control_port is not None:
+            self.control_server = ControlServer(port=control_port)
+            self.control_server.register("profile", self.profiler.handle_command)
+            self.control_server.start()
         
         # 状态
         self.command_history: list[CommandRecord] = []
@@ -211,6 +231,10 @@ class IsaacConsole(cmd.Cmd):
   status         - 显示连接状态
   clear          - 清屏
   history        - 显示命令历史
+  profile start [帧数] [sampling|deterministic] [next-room|room=<索引>] [label=<名称>]
+                 - 开始运行时剖析（帧数省略时直到 profile stop）
+  profile stop   - 结束剖析并写出文件
+  profile status - 剖析状态
   quit / exit    - 退出
 
 {Colors.CYAN}常用控制台指令参考:{Colors.RESET}
@@ -264,9 +288,47 @@ class IsaacConsole(cmd.Cmd):
             status = Colors.success("✓") if cmd.success else Colors.error("✗")
             print(f"  {status} {cmd.command}")
     
+    def do_profile(self, arg):
+        """运行时剖析: profile start|stop|status"""
+        try:
+            args = shlex.split(arg)
+        except ValueError as e:
+            print(f"{Colors.error(f'✗ 参数错误: {e}')}")
+            return
+        result = self.profiler.handle_command(args)
+        if not result.get("ok"):
+            print(f"{Colors.error('✗ ' + result.get('error', '失败'))}")
+            return
+
+        run = result.get("run")
+        action = args[0] if args else "status"
+        if action == "start":
+            window = f"{run['frames_window']} 帧" if run["frames_window"] else "直到 profile stop"
+            print(f"{Colors.success('✓ 剖析已布置')} ({run['mode']}, {window})")
+        elif action == "stop":
+            if run.get("path"):
+                print(f"{Colors.success('✓ 剖析已写出:')} {run['path']}")
+                print(f"  帧 {run['start_frame']}-{run['end_frame']}，房间 {run['rooms']}")
+            else:
+                print(f"{Colors.warning('剖析已取消或将在下一帧写出')}")
+        else:
+            current = result.get("run")
+            if current:
+                print(f"{Colors.info('剖析进行中:')} {current['state']} {current['mode']}，"
+                      f"已捕获 {current['frames']} 帧")
+            else:
+                print(f"{Colors.info('没有进行中的剖析')}")
+            last = result.get("last")
+            if last and last.get("path"):
+                print(f"  上次输出: {last['path']}")
+
     def do_quit(self, _):
         """退出"""
         self.running = False
+        if self.profiler.active:
+            self.profiler.stop(timeout=0)
+        if self.control_server:
+            self.control_server.stop()
         self.bridge.stop()
         print(f"{Colors.info('再见!')}")
         return True
@@ -295,7 +357,7 @@ class IsaacConsole(cmd.Cmd):
     
     def completenames(self, text: str, *ignored) -> list[str]:
         """补全命令名"""
-        commands = ['help', 'status', 'clear', 'history', 'quit', 'exit']
+        commands = ['help', 'status', 'clear', 'history', 'profile', 'quit', 'exit']
         commands += list(self.COMMON_COMMANDS.keys())
         
         return [cmd for cmd in commands if cmd.startswith(text.lower())]
@@ -308,14 +370,22 @@ class IsaacConsole(cmd.Cmd):
 def main():
     """主函数"""
     import os
+
+    parser = argparse.ArgumentParser(description="SocketBridge 交互式控制台")
+    parser.add_argument("--control-port", type=int, help="本地控制套接字端口（默认不启动）")
+    parser.add_argument("--profile-dir", default="profiles", help="剖析输出目录 (默认: profiles)")
+    args = parser.parse_args()
+    profile_dir = os.path.abspath(args.profile_dir)
     
     # 确保在正确目录
     os.chdir(os.path.dirname(os.path.abspath(__file__)) or '.')
     
-    console = IsaacConsole()
+    console = IsaacConsole(control_port=args.control_port, profile_dir=profile_dir)
     
     try:
         print(f"{Colors.info('服务器已启动在 127.0.0.1:9527')}")
+        if console.control_server:
+            print(f"{Colors.info(f'控制套接字: 127.0.0.1:{console.control_server.port}')}")
         print(f"{Colors.info('请启动游戏并加载 SocketBridge mod')}\n")
         console.cmdloop()
     except KeyboardInterrupt:
@@ -325,6 +395,8 @@ def main():
         import traceback
         traceback.print_exc()
     finally:
+        if console.control_server:
+            console.control_server.stop()
         console.bridge.stop()
 
 
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+SocketBridge 负载测试工具
+
+合成 v2.1 流量（或放大录制会话），并发运行多个模拟游戏客户端，
+测量桥接器吞吐量、丢失率和端到端延迟。
+
+用法:
+    python apps/load_test.py                          # 默认合成流量，1 个客户端，线速
+    python apps/load_test.py --clients 8 --enemies 50 --burst-every 60
+    python apps/load_test.py --rate 60 --frames 3600  # 每个客户端 60 消息/秒
+    python apps/load_test.py --session <id> --enemy-scale 10
+                                                      # 放大录制会话（敌人 ×10）
+    python apps/load_test.py --port 9527              # 只发送到已运行的桥接器（不统计接收）
+"""
+
+import sys
+import json
+import argparse
+import logging
+from pathlib import Path
+
+# 添加父目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.replay import DataReplayer, ReplayerConfig
+from core.replay.loadgen import (
+    LoadGenerator,
+    LoadProfile,
+    SyntheticSession,
+    run_bridge_load,
+    scale_messages,
+)
+
+logging.basicConfig(level=logging.WARNING, format="%(asctime)s [%(levelname)s] %(message)s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SocketBridge 负载测试")
+    parser.add_argument("--clients", "-n", type=int, default=1, help="并发客户端数 (默认: 1)")
+    parser.add_argument(
+        "--rate", "-r", type=float, default=0.0,
+        help="每个客户端每秒消息数 (默认: 0 = 线速)",
+    )
+    parser.add_argument("--frames", type=int, default=1800, help="合成帧数 (默认: 1800)")
+    parser.add_argument("--enemies", type=int, default=10, help="每帧敌人数 (默认: 10)")
+    parser.add_argument("--projectiles", type=int, default=20, help="每帧敌方投射物数 (默认: 20)")
+    parser.add_argument("--burst-every", type=int, default=0, help="投射物爆发间隔帧数 (默认: 不爆发)")
+    parser.add_argument("--burst-size", type=int, default=200, help="爆发时的投射物数 (默认: 200)")
+    parser.add_argument(
+        "--interval", action="append", default=[], metavar="CHANNEL=FRAMES",
+        help="覆盖通道采集间隔，例如 --interval PLAYER_HEALTH=1（可重复）",
+    )
+    parser.add_argument("--session", "-s", help="使用录制会话代替合成流量")
+    parser.add_argument("--dir", "-d", default="./recordings", help="录制目录 (默认: ./recordings)")
+    parser.add_argument("--enemy-scale", type=int, default=1, help="敌人放大倍数 (默认: 1)")
+    parser.add_argument("--projectile-scale", type=int, default=1, help="投射物放大倍数 (默认: 1)")
+    parser.add_argument("--batch", type=int, default=64, help="线速模式每次写入的消息数 (默认: 64)")
+    parser.add_argument("--host", default="127.0.0.1", help="外部桥接器地址")
+    parser.add_argument("--port", type=int, help="发送到已运行的桥接器（不在进程内启动）")
+    args = parser.parse_args()
+
+    if args.session:
+        replayer = DataReplayer(ReplayerConfig(recordings_dir=args.dir, streaming=True))
+        try:
+            replayer.load_session(args.session)
+        except FileNotFoundError as e:
+            print(f"❌ {e}")
+            return 1
+        session_dir = replayer.current_session.session_dir
+
+        def source_factory(client_id):
+            # 每个客户端独立的流式回放器
+            r = DataReplayer(ReplayerConfig(recordings_dir=str(session_dir.parent), streaming=True))
+            r.load_session(session_dir.name)
+            return scale_messages(
+                r.iter_messages(speed=0), args.enemy_scale, args.projectile_scale
+            )
+    else:
+        profile = LoadProfile(
+            frames=args.frames,
+            enemies=args.enemies,
+            projectiles=args.projectiles,
+            burst_every=args.burst_every,
+            burst_size=args.burst_size,
+        )
+        for item in args.interval:
+            name, _, frames = item.partition("=")
+            profile.channel_intervals[name.upper()] = int(frames)
+
+        def source_factory(client_id):
+            return scale_messages(
+                SyntheticSession(profile).iter_messages(),
+                args.enemy_scale,
+                args.projectile_scale,
+            )
+
+    if args.port:
+        generator = LoadGenerator(source_factory, rate=args.rate, batch_size=args.batch)
+        report = generator.run([(args.host, args.port)] * args.clients)
+        print("⚠ 外部桥接器模式：只统计发送端（IsaacBridge 每个端口只服务一个客户端）")
+    else:
+        report = run_bridge_load(
+            source_factory, clients=args.clients, rate=args.rate, batch_size=args.batch
+        )
+
+    print(report.summary())
+    print(json.dumps(report.to_dict(), indent=2, ensure_ascii=False))
+    return 1 if report.errors or report.dropped else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
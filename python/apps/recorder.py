@@ -24,6 +24,13 @@ SocketBridge 游戏数据录制工具
     # 清理旧录制
     python apps/recorder.py --cleanup --keep 10
 
+    # 与会话目录数据库对账（外部拷贝进来的会话）
+    python apps/recorder.py --reconcile
+
+    # 从已有录制训练 zstd 字典，并使用字典录制
+    python apps/recorder.py --train-dictionary recordings.zdict
+    python apps/recorder.py --compression zstd --dictionary recordings.zdict
+
 快捷键（录制过程中）:
     r - 开始/停止录制
     p - 暂停/恢复录制
@@ -55,7 +62,9 @@ from core.replay import (
     SessionManager,
     list_sessions,
     get_latest_session,
+    train_dictionary,
 )
+from core.replay.codec import DEFAULT_DICTIONARY_SIZE
 
 # 配置日志
 logging.basicConfig(
@@ -116,6 +125,9 @@ class GameRecorder:
         port: int = 9527,
         auto_record: bool = False,
         buffer_size: int = 500,
+        raw: bool = False,
+        compression: str = "gzip",
+        dictionary_path: Optional[str] = None,
     ):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
@@ -123,6 +135,8 @@ class GameRecorder:
         self.host = host
         self.port = port
         self.auto_record = auto_record
+        # 原始透传模式：直接保存线上字节行，不重建消息对象
+        self.raw = raw
 
         # 创建桥接
         self.bridge = IsaacBridge(host, port)
@@ -134,6 +148,8 @@ class GameRecorder:
                 buffer_size=buffer_size,
                 auto_save_interval=30.0,
                 compress=True,
+                compression=compression,
+                dictionary_path=dictionary_path,
                 include_events=True,
             )
         )
@@ -158,6 +174,8 @@ class GameRecorder:
 
         # 设置事件处理
         self._setup_handlers()
+        if self.raw:
+            self.bridge.add_raw_tap(self._handle_raw_line)
 
     def _setup_handlers(self):
         """设置事件处理器"""
@@ -222,8 +240,8 @@ class GameRecorder:
             event_type = event.type
             event_data = event.data
             
-            # 录制事件
-            if self.recorder.is_recording and not self.paused:
+            # 录制事件（原始模式下事件已包含在原始行中）
+            if self.recorder.is_recording and not self.paused and not self.raw:
                 event_msg = RawMessage(
                     msg_type="EVENT",
                     frame=event.frame if event.frame else self.stats["current_frame"],
@@ -243,7 +261,7 @@ class GameRecorder:
             self.stats["frames_received"] = msg.frame
 
         # 录制
-        if self.recorder.is_recording and not self.paused:
+        if self.recorder.is_recording and not self.paused and not self.raw:
             raw_msg = RawMessage(
                 msg_type=msg.msg_type,
                 version=str(msg.version) if hasattr(msg, "version") else "2.0",
@@ -255,6 +273,11 @@ class GameRecorder:
             )
             self.recorder.record_message(raw_msg)
 
+    def _handle_raw_line(self, line: bytes, received_at: float):
+        """原始行录制（在桥接接收线程中调用）"""
+        if self.recorder.is_recording and not self.paused:
+            self.recorder.record_raw_line(line, received_at)
+
     def _start_recording(self, metadata: Optional[Dict[str, Any]] = None):
         """开始录制"""
         if self.recorder.is_recording:
@@ -265,6 +288,8 @@ class GameRecorder:
         meta = metadata or {}
         meta["host"] = self.host
         meta["port"] = self.port
+        if self.raw:
+            meta["format"] = "raw"
 
         session = self.recorder.start_session(session_id, meta)
         print(Colors.success(f"\n● 开始录制: {session.session_id}"))
@@ -436,8 +461,12 @@ def main():
 示例:
   python apps/recorder.py                    # 启动录制器
   python apps/recorder.py --auto             # 自动录制模式
+  python apps/recorder.py --raw              # 原始透传录制（不解码消息）
   python apps/recorder.py --list             # 列出所有录制
   python apps/recorder.py --cleanup --keep 5 # 保留最新5个录制
+  python apps/recorder.py --reconcile        # 重建/对账会话目录数据库
+  python apps/recorder.py --train-dictionary recordings.zdict   # 从已有录制训练字典
+  python apps/recorder.py --compression zstd --dictionary recordings.zdict
         """,
     )
 
@@ -484,6 +513,44 @@ def main():
         default=500,
         help="消息缓冲区大小 (默认: 500)",
     )
+    parser.add_argument(
+        "--reconcile",
+        action="store_true",
+        help="扫描录制目录，重建/对账会话目录数据库 (catalog.sqlite)",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="对账时重新扫描所有会话",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=["gzip", "zstd", "none"],
+        default="gzip",
+        help="块压缩后端 (默认: gzip，zstd 需要安装 zstandard)",
+    )
+    parser.add_argument(
+        "--dictionary",
+        default=None,
+        help="zstd 预训练字典文件",
+    )
+    parser.add_argument(
+        "--train-dictionary",
+        metavar="OUTPUT",
+        default=None,
+        help="从录制目录中的已有会话训练 zstd 字典并写入 OUTPUT",
+    )
+    parser.add_argument(
+        "--dict-size",
+        type=int,
+        default=DEFAULT_DICTIONARY_SIZE,
+        help=f"训练字典大小（字节，默认: {DEFAULT_DICTIONARY_SIZE}）",
+    )
+    parser.add_argument(
+        "--raw",
+        action="store_true",
+        help="原始透传录制：保存线上原始字节行，回放时再校验",
+    )
 
     args = parser.parse_args()
 
@@ -515,6 +582,32 @@ def main():
         print(f"已清理 {deleted} 个旧录制会话")
         return
 
+    # 对账
+    if args.reconcile:
+        manager = SessionManager(args.output)
+        result = manager.reconcile(full=args.full)
+        print(
+            f"会话目录对账完成: 新增 {result['added']}, "
+            f"更新 {result['updated']}, 移除 {result['removed']}"
+        )
+        return
+
+    # 训练字典
+    if args.train_dictionary:
+        manager = SessionManager(args.output)
+        session_dirs = [s.path for s in manager.list_sessions()]
+        try:
+            dictionary = train_dictionary(session_dirs, dict_size=args.dict_size)
+        except (RuntimeError, ValueError) as e:
+            print(Colors.error(f"训练字典失败: {e}"))
+            return
+        Path(args.train_dictionary).write_bytes(dictionary)
+        print(
+            f"已从 {len(session_dirs)} 个会话训练字典: "
+            f"{args.train_dictionary} ({len(dictionary)} 字节)"
+        )
+        return
+
     # 启动录制器
     recorder = GameRecorder(
         output_dir=args.output,
@@ -522,6 +615,9 @@ def main():
         port=args.port,
         auto_record=args.auto,
         buffer_size=args.buffer,
+        raw=args.raw,
+        compression=args.compression,
+        dictionary_path=args.dictionary,
     )
     recorder.run()
 
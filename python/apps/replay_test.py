@@ -6,16 +6,52 @@
     python apps/replay_test.py                    # 测试最新会话
     python apps/replay_test.py --session <id>    # 测试指定会话
     python apps/replay_test.py --count 20        # 显示前20条消息
+    python apps/replay_test.py --batch "recordings/session_*" --workers 8
+                                                 # 并行统计多个会话
+    python apps/replay_test.py --query "enemy_count > 8 and player_health < 2"
+                                                 # 查询匹配的帧区间
+    python apps/replay_test.py --fast-forward    # 以最快速度送入处理管线并报告吞吐量
 """
 
 import sys
+import json
 import argparse
 from pathlib import Path
 
 # 添加父目录到路径
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from core.replay import DataReplayer, ReplayerConfig, list_sessions
+from core.replay import (
+    BatchEngine,
+    ChannelStatsReducer,
+    DataReplayer,
+    QueryError,
+    ReplayerConfig,
+    list_sessions,
+    run_facade,
+)
+
+
+def run_batch(pattern: str, workers: int) -> int:
+    """并行统计多个会话的帧数、消息数与通道分布"""
+    engine = BatchEngine(workers=workers or None)
+
+    def on_result(result):
+        status = f"❌ {result.error}" if result.error else f"{result.frames} 帧"
+        print(f"  {result.shard}: {status} ({result.elapsed:.2f}s)")
+
+    result = engine.run(pattern, ChannelStatsReducer(), on_result=on_result)
+    if not result.sessions:
+        print(f"❌ 没有匹配的会话: {pattern}")
+        return 1
+
+    print("-" * 70)
+    print(
+        f"会话: {result.sessions}  分片: {result.shards}  "
+        f"帧: {result.frames}  耗时: {result.elapsed:.2f}s"
+    )
+    print(json.dumps(result.value["channels"], indent=2, ensure_ascii=False))
+    return 1 if result.errors else 0
 
 
 def main():
@@ -40,8 +76,32 @@ def main():
         action="store_true",
         help="显示所有消息（慎用）",
     )
+    parser.add_argument(
+        "--batch", "-b",
+        metavar="PATTERN",
+        help="批处理模式：并行统计匹配 glob 的所有会话",
+    )
+    parser.add_argument(
+        "--workers", "-w",
+        type=int,
+        default=0,
+        help="批处理工作进程数 (默认: CPU 核数)",
+    )
+    parser.add_argument(
+        "--query", "-q",
+        metavar="EXPR",
+        help='帧级查询，例如 "room_entry and has_boss"',
+    )
+    parser.add_argument(
+        "--fast-forward", "-f",
+        action="store_true",
+        help="虚拟时钟快进：不等待，直接送入 SocketBridgeFacade 并报告吞吐量",
+    )
     args = parser.parse_args()
 
+    if args.batch:
+        return run_batch(args.batch, args.workers)
+
     # 列出会话
     sessions = list_sessions(args.dir)
     if not sessions:
@@ -71,6 +131,26 @@ def main():
         print(f"❌ {e}")
         return 1
 
+    if args.query:
+        try:
+            ranges = replayer.query(args.query)
+        except QueryError as e:
+            print(f"❌ 查询表达式错误: {e}")
+            return 1
+        print(f"\n查询: {args.query}")
+        print("-" * 70)
+        for r in ranges[: None if args.all else args.count]:
+            print(f"  帧 {r.start:6d} - {r.end:6d}  ({r.frames} 帧)")
+        print("-" * 70)
+        print(f"✓ 匹配 {len(ranges)} 个区间, {sum(r.frames for r in ranges)} 帧")
+        return 0
+
+    if args.fast_forward:
+        report = run_facade(replayer)
+        print("\n快进回放:")
+        print(json.dumps(report.to_dict(), indent=2, ensure_ascii=False))
+        return 1 if report.errors else 0
+
     print(f"\n会话信息:")
     print(f"  总消息数: {session.total_messages}")
     print(f"  总帧数: {session.total_frames}")
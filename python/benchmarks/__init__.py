@@ -0,0 +1,52 @@
+"""
+SocketBridge Benchmarks - 性能基准
+
+以录制会话 tests/fixtures/session_20260202_234038 为数据源，测量各处理
+环节的吞吐量与每项耗时，结果保存为 JSON 基线，之后的运行与基线比较，
+超出阈值的退化会被标记（退出码 1）。
+
+用法（在 python/ 目录下）:
+    python -m benchmarks list
+    python -m benchmarks run                         # 运行全部并打印
+    python -m benchmarks run --save                  # 写入 benchmarks/baseline.json
+    python -m benchmarks run -k facade -k processor  # 按名称子串筛选
+    python -m benchmarks compare                     # 运行并与基线比较
+    python -m benchmarks compare --current new.json --threshold 0.1
+
+基线与机器相关，不随仓库提交；在同一台机器上生成和比较。
+"""
+
+from .runner import (
+    BENCHMARKS,
+    BenchCase,
+    BenchResult,
+    Comparison,
+    Workload,
+    benchmark,
+    compare_results,
+    load_baseline,
+    load_cases,
+    run_benchmarks,
+    run_case,
+    save_baseline,
+)
+from .fixture import DEFAULT_SESSION, BenchContext
+
+__all__ = [
+    # Runner
+    "BENCHMARKS",
+    "BenchCase",
+    "BenchResult",
+    "Comparison",
+    "Workload",
+    "benchmark",
+    "compare_results",
+    "load_baseline",
+    "load_cases",
+    "run_benchmarks",
+    "run_case",
+    "save_baseline",
+    # Fixture
+    "DEFAULT_SESSION",
+    "BenchContext",
+]
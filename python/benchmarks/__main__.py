@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+SocketBridge 基准命令行
+
+    python -m benchmarks list
+    python -m benchmarks run [-k NAME] [--repeat N] [--save [PATH]]
+    python -m benchmarks compare [--baseline PATH] [--current PATH] [--threshold 0.15]
+"""
+
+import sys
+import argparse
+import logging
+from pathlib import Path
+
+# 添加 python/ 目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# 关闭日志：fixture 中的通道校验错误会淹没输出并拖慢计时
+logging.disable(logging.ERROR)
+
+from benchmarks import (
+    DEFAULT_SESSION,
+    BenchContext,
+    compare_results,
+    load_baseline,
+    run_benchmarks,
+    save_baseline,
+)
+from benchmarks.runner import load_cases, select
+
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+
+
+def _run(args):
+    cases = select(args.pattern)
+    if not cases:
+        print(f"❌ 没有匹配的基准: {args.pattern}")
+        return None
+    print(f"会话: {args.session}，基准: {len(cases)}，每个 {args.repeat} 轮（另加 1 轮预热）")
+    with BenchContext(args.session) as ctx:
+        return run_benchmarks(
+            ctx, args.pattern, repeat=args.repeat, on_result=lambda r: print(r.summary())
+        )
+
+
+def cmd_list(args) -> int:
+    for name, case in load_cases().items():
+        print(f"{name:<28} {case.description}")
+    return 0
+
+
+def cmd_run(args) -> int:
+    results = _run(args)
+    if results is None:
+        return 1
+    if args.save:
+        save_baseline(args.save, results, fixture=args.session)
+        print(f"✓ 基线已保存: {args.save}")
+    return 0
+
+
+def cmd_compare(args) -> int:
+    if not args.baseline.exists():
+        print(f"❌ 找不到基线: {args.baseline}（先运行 python -m benchmarks run --save）")
+        return 1
+    baseline = load_baseline(args.baseline)
+    if args.current:
+        current = load_baseline(args.current)
+    else:
+        args.pattern = args.pattern or None
+        current = _run(args)
+        if current is None:
+            return 1
+
+    comparisons = compare_results(baseline, current, threshold=args.threshold)
+    print(f"\n对比基线 {args.baseline}（阈值 {args.threshold:.0%}）")
+    for comparison in comparisons:
+        print(comparison.summary())
+    missing = sorted(set(current) - set(baseline))
+    if missing:
+        print(f"基线中没有: {', '.join(missing)}")
+
+    regressions = [c for c in comparisons if c.regressed]
+    if regressions:
+        print(f"\n✗ {len(regressions)} 项退化")
+        return 1
+    print("\n✓ 无退化")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="SocketBridge 性能基准")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_run_options(p):
+        p.add_argument("-k", dest="pattern", action="append", default=[], help="按名称子串筛选（可重复）")
+        p.add_argument("--repeat", "-r", type=int, default=3, help="每个基准的轮数 (默认: 3)")
+        p.add_argument("--session", default=DEFAULT_SESSION, help=f"fixtures 中的会话 (默认: {DEFAULT_SESSION})")
+
+    sub.add_parser("list", help="列出全部基准").set_defaults(func=cmd_list)
+
+    run = sub.add_parser("run", help="运行基准")
+    add_run_options(run)
+    run.add_argument(
+        "--save", nargs="?", type=Path, const=DEFAULT_BASELINE, default=None,
+        help=f"保存为基线 (默认路径: {DEFAULT_BASELINE.name})",
+    )
+    run.set_defaults(func=cmd_run)
+
+    compare = sub.add_parser("compare", help="与基线比较，退化时退出码为 1")
+    add_run_options(compare)
+    compare.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="基线文件")
+    compare.add_argument("--current", type=Path, help="已保存的结果文件（省略时现场运行）")
+    compare.add_argument("--threshold", type=float, default=0.15, help="退化阈值 (默认: 0.15)")
+    compare.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
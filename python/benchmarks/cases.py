@@ -0,0 +1,235 @@
+"""
+Benchmark Cases - 基准用例
+
+==========================  ===============================================
+bridge_framing              IsaacBridge 按行分帧 + JSON 解码 + 状态更新（64KB 数据块）
+processor                   DataProcessor.process_message
+facade_monitoring_on        SocketBridgeFacade.process_message（质量监控开启）
+facade_monitoring_off       SocketBridgeFacade.process_message（质量监控关闭）
+entity_state                GameEntityState 各类实体更新
+environment_update_room     EnvironmentModel.update_room（含布局编译）
+environment_queries         安全判定、安全点、视线、范围查询、危险度批量查询
+recorder_write              DataRecorder.record_message + 停止时写盘
+replay_load                 DataReplayer.load_session（一次性加载）
+replay_stream               流式加载并迭代全部消息
+==========================  ===============================================
+"""
+
+from typing import Any, Dict, List
+
+from environment import EnvironmentModel
+from isaac_bridge import IsaacBridge
+from core.replay import DataRecorder, DataReplayer, RecorderConfig, ReplayerConfig
+from services.entity_state import GameEntityState
+from services.facade import BridgeConfig, SocketBridgeFacade
+from services.processor import DataProcessor
+
+from .fixture import BenchContext, EnvironmentFrame
+from .runner import Workload, benchmark
+
+FRAMING_CHUNK = 65536  # 与 IsaacBridge 的 recv 大小一致
+
+
+@benchmark("bridge_framing", "IsaacBridge line framing, JSON decode and state update")
+def bench_bridge_framing(ctx: BenchContext) -> Workload:
+    stream = b"".join(ctx.lines)
+    chunks = [stream[i:i + FRAMING_CHUNK] for i in range(0, len(stream), FRAMING_CHUNK)]
+    state: Dict[str, Any] = {}
+
+    def reset():
+        state["bridge"] = IsaacBridge(port=0)
+        state["buffer"] = b""
+
+    def run(chunk: bytes):
+        state["buffer"] = state["bridge"]._consume(state["buffer"] + chunk, 0.0)
+
+    return Workload(
+        items=chunks, run=run, reset=reset,
+        units=lambda chunk: chunk.count(b"\n"), item="chunk",
+    )
+
+
+@benchmark("processor", "DataProcessor.process_message")
+def bench_processor(ctx: BenchContext) -> Workload:
+    state: Dict[str, Any] = {}
+
+    def reset():
+        state["processor"] = DataProcessor()
+
+    return Workload(
+        items=ctx.data_messages,
+        run=lambda msg: state["processor"].process_message(msg),
+        reset=reset,
+    )
+
+
+def _facade_workload(ctx: BenchContext, monitoring: bool) -> Workload:
+    state: Dict[str, Any] = {}
+
+    def reset():
+        state["facade"] = SocketBridgeFacade(BridgeConfig(monitoring_enabled=monitoring))
+
+    return Workload(
+        items=ctx.data_messages,
+        run=lambda msg: state["facade"].process_message(msg),
+        reset=reset,
+    )
+
+
+@benchmark("facade_monitoring_on", "SocketBridgeFacade.process_message with quality monitoring")
+def bench_facade_monitoring_on(ctx: BenchContext) -> Workload:
+    return _facade_workload(ctx, monitoring=True)
+
+
+@benchmark("facade_monitoring_off", "SocketBridgeFacade.process_message without quality monitoring")
+def bench_facade_monitoring_off(ctx: BenchContext) -> Workload:
+    return _facade_workload(ctx, monitoring=False)
+
+
+@benchmark("entity_state", "GameEntityState updates from processed channels")
+def bench_entity_state(ctx: BenchContext) -> Workload:
+    # 先用处理器跑一遍，得到每条消息的已处理通道数据
+    processor = DataProcessor()
+    frames: List[Dict[str, Any]] = []
+    for msg in ctx.data_messages:
+        result = processor.process_message(msg)
+        frames.append(
+            {
+                "frame": msg.get("frame", 0),
+                "room": msg.get("room_index", -1),
+                "channels": {name: ch.data for name, ch in result.items()},
+            }
+        )
+    state: Dict[str, Any] = {}
+
+    def reset():
+        state["entities"] = GameEntityState()
+
+    def run(item: Dict[str, Any]):
+        entities: GameEntityState = state["entities"]
+        frame = item["frame"]
+        channels = item["channels"]
+        entities.on_room_change(item["room"])
+        enemies = channels.get("ENEMIES")
+        if isinstance(enemies, list):
+            entities.update_enemies(enemies, frame)
+        projectiles = channels.get("PROJECTILES")
+        if projectiles is not None:
+            entities.update_projectiles(
+                getattr(projectiles, "enemy_projectiles", None) or [],
+                getattr(projectiles, "player_tears", None) or [],
+                getattr(projectiles, "lasers", None) or [],
+                frame,
+            )
+        pickups = channels.get("PICKUPS")
+        if isinstance(pickups, list):
+            entities.update_pickups(pickups, frame)
+        bombs = channels.get("BOMBS")
+        if isinstance(bombs, list):
+            entities.update_bombs(bombs, frame)
+
+    return Workload(items=frames, run=run, reset=reset)
+
+
+def _update_room(env: EnvironmentModel, frame: EnvironmentFrame) -> None:
+    env.update_room(
+        frame.room_info,
+        frame.enemies,
+        frame.projectiles,
+        room_layout=frame.room_layout,
+        player_pos=frame.player_pos,
+    )
+
+
+@benchmark("environment_update_room", "EnvironmentModel.update_room")
+def bench_environment_update_room(ctx: BenchContext) -> Workload:
+    state: Dict[str, Any] = {}
+
+    def reset():
+        state["env"] = EnvironmentModel()
+
+    return Workload(
+        items=ctx.environment_frames,
+        run=lambda frame: _update_room(state["env"], frame),
+        reset=reset,
+        unit="frame",
+        item="frame",
+    )
+
+
+@benchmark("environment_queries", "EnvironmentModel spatial queries per frame")
+def bench_environment_queries(ctx: BenchContext) -> Workload:
+    frames = [f for f in ctx.environment_frames if f.player_pos is not None]
+    state: Dict[str, Any] = {}
+
+    def reset():
+        state["env"] = EnvironmentModel()
+
+    def before(frame: EnvironmentFrame):
+        _update_room(state["env"], frame)
+
+    def run(frame: EnvironmentFrame):
+        env: EnvironmentModel = state["env"]
+        player = frame.player_pos
+        env.is_safe(player)
+        env.get_safe_spot(player)
+        env.spatial_query.get_entities_in_range(player, 200.0, frame.enemies)
+        for enemy in frame.enemies.values():
+            env.spatial_query.find_line_of_sight(player, enemy.position)
+        positions, _ = env.position_scorer.get_candidates()
+        env.game_map.get_danger_levels(positions)
+
+    return Workload(
+        items=frames, run=run, reset=reset, before=before, unit="frame", item="frame",
+    )
+
+
+@benchmark("recorder_write", "DataRecorder.record_message and final flush")
+def bench_recorder_write(ctx: BenchContext) -> Workload:
+    state: Dict[str, Any] = {"round": 0}
+
+    def reset():
+        recorder = state.get("recorder")
+        if recorder and recorder.is_recording:
+            recorder.stop_session()
+        state["round"] += 1
+        output = ctx.scratch_dir("recorder_write")
+        recorder = DataRecorder(RecorderConfig(output_dir=str(output), update_catalog=False))
+        recorder.start_session(session_id=f"bench_{state['round']}")
+        state["recorder"] = recorder
+
+    def finish():
+        state["recorder"].stop_session()
+
+    return Workload(
+        items=ctx.raw_messages,
+        run=lambda msg: state["recorder"].record_message(msg),
+        reset=reset,
+        finish=finish,
+    )
+
+
+@benchmark("replay_load", "DataReplayer.load_session (eager)")
+def bench_replay_load(ctx: BenchContext) -> Workload:
+    count = len(ctx.raw_messages)
+
+    def run(_):
+        replayer = DataReplayer(ReplayerConfig(recordings_dir=str(ctx.recordings_dir)))
+        replayer.load_session(ctx.session)
+
+    return Workload(items=[ctx.session], run=run, units=lambda _: count, item="session")
+
+
+@benchmark("replay_stream", "DataReplayer streaming load and iteration")
+def bench_replay_stream(ctx: BenchContext) -> Workload:
+    count = len(ctx.raw_messages)
+
+    def run(_):
+        replayer = DataReplayer(
+            ReplayerConfig(recordings_dir=str(ctx.recordings_dir), streaming=True)
+        )
+        replayer.load_session(ctx.session)
+        for _ in replayer.iter_messages(speed=0):
+            pass
+
+    return Workload(items=[ctx.session], run=run, units=lambda _: count, item="session")
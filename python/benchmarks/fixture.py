@@ -0,0 +1,187 @@
+"""
+Benchmark Fixture - 基准数据集
+
+以 tests/fixtures 下的录制会话为数据源。会话先复制到临时目录，
+回放基准构建的索引等文件不会写回 fixtures。
+"""
+
+import json
+import shutil
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from core.replay import DataReplayer, ReplayerConfig
+from core.replay.message import RawMessage
+from models.base import Vector2D
+from models.entities import EnemyData, ProjectileData, RoomInfo
+
+FIXTURES_DIR = Path(__file__).resolve().parent.parent / "tests" / "fixtures"
+DEFAULT_SESSION = "session_20260202_234038"
+
+
+def room_info_from_payload(data: Dict[str, Any]) -> RoomInfo:
+    """ROOM_INFO 载荷 -> RoomInfo"""
+    top_left = data.get("top_left") or {}
+    bottom_right = data.get("bottom_right") or {}
+    return RoomInfo(
+        room_index=data.get("room_idx", -1),
+        stage=data.get("stage", 1),
+        stage_type=data.get("stage_type", 0),
+        difficulty=data.get("difficulty", 0),
+        grid_width=data.get("grid_width", 13),
+        grid_height=data.get("grid_height", 7),
+        top_left=(top_left["x"], top_left["y"]) if top_left else None,
+        bottom_right=(bottom_right["x"], bottom_right["y"]) if bottom_right else None,
+        room_shape=data.get("room_shape", 0),
+        is_clear=data.get("is_clear", False),
+        enemy_count=data.get("enemy_count", 0),
+    )
+
+
+def _vec(data: Optional[Dict[str, float]]) -> Vector2D:
+    data = data or {}
+    return Vector2D(data.get("x", 0.0), data.get("y", 0.0))
+
+
+def enemies_from_payload(items: List[Dict[str, Any]]) -> Dict[int, EnemyData]:
+    """ENEMIES 载荷 -> {id: EnemyData}"""
+    enemies = {}
+    for item in items or []:
+        enemy = EnemyData(item["id"], _vec(item.get("pos")), _vec(item.get("vel")))
+        enemy.collision_radius = item.get("collision_radius", 10.0)
+        enemy.enemy_type = item.get("type", 0)
+        enemy.hp = item.get("hp", 10.0)
+        enemy.max_hp = item.get("max_hp", 10.0)
+        enemy.is_boss = item.get("is_boss", False)
+        enemy.is_champion = item.get("is_champion", False)
+        enemies[enemy.id] = enemy
+    return enemies
+
+
+def projectiles_from_payload(data: Optional[Dict[str, Any]]) -> Dict[int, ProjectileData]:
+    """PROJECTILES 载荷 -> {id: ProjectileData}（只取敌方投射物）"""
+    projectiles = {}
+    for item in (data or {}).get("enemy_projectiles") or []:
+        proj = ProjectileData(item["id"], _vec(item.get("pos")), _vec(item.get("vel")))
+        proj.size = item.get("collision_radius", 5.0)
+        proj.collision_radius = proj.size
+        proj.is_enemy = True
+        projectiles[proj.id] = proj
+    return projectiles
+
+
+@dataclass
+class EnvironmentFrame:
+    """EnvironmentModel.update_room 的一帧输入"""
+
+    frame: int
+    room_info: RoomInfo
+    enemies: Dict[int, EnemyData]
+    projectiles: Dict[int, ProjectileData]
+    room_layout: Optional[Dict[str, Any]]  # 只在消息携带 ROOM_LAYOUT 的帧上给出
+    player_pos: Optional[Vector2D]
+
+
+class BenchContext:
+    """基准共享数据（惰性生成并缓存）"""
+
+    def __init__(self, session: str = DEFAULT_SESSION, fixtures_dir: Path = FIXTURES_DIR):
+        self.session = session
+        self._tmp = Path(tempfile.mkdtemp(prefix="socketbridge_bench_"))
+        self.recordings_dir = self._tmp / "recordings"
+        self.recordings_dir.mkdir()
+        shutil.copytree(Path(fixtures_dir) / session, self.recordings_dir / session)
+        self._cache: Dict[str, Any] = {}
+
+    @property
+    def session_dir(self) -> Path:
+        return self.recordings_dir / self.session
+
+    def scratch_dir(self, name: str) -> Path:
+        """基准专用的临时目录（每次调用都清空）"""
+        path = self._tmp / name
+        shutil.rmtree(path, ignore_errors=True)
+        path.mkdir(parents=True)
+        return path
+
+    def close(self) -> None:
+        shutil.rmtree(self._tmp, ignore_errors=True)
+
+    def __enter__(self) -> "BenchContext":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _cached(self, key: str, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    @property
+    def raw_messages(self) -> List[RawMessage]:
+        """会话中的全部消息（按帧排序）"""
+
+        def build():
+            replayer = DataReplayer(ReplayerConfig(recordings_dir=str(self.recordings_dir)))
+            replayer.load_session(self.session)
+            return list(replayer.current_session.messages)
+
+        return self._cached("raw_messages", build)
+
+    @property
+    def messages(self) -> List[Dict[str, Any]]:
+        """协议消息字典（process_message 的输入）"""
+        return self._cached("messages", lambda: [m.to_dict() for m in self.raw_messages])
+
+    @property
+    def data_messages(self) -> List[Dict[str, Any]]:
+        return self._cached(
+            "data_messages",
+            lambda: [m for m in self.messages if m.get("type") in ("DATA", "FULL")],
+        )
+
+    @property
+    def lines(self) -> List[bytes]:
+        """线路上的 JSON 行（含换行符）"""
+        return self._cached(
+            "lines",
+            lambda: [(json.dumps(m) + "\n").encode("utf-8") for m in self.messages],
+        )
+
+    @property
+    def environment_frames(self) -> List[EnvironmentFrame]:
+        """携带实体数据的帧（房间信息与玩家位置向后沿用）"""
+
+        def build():
+            frames = []
+            room_info = None
+            player_pos = None
+            for msg in self.data_messages:
+                payload = msg.get("payload") or {}
+                if "ROOM_INFO" in payload:
+                    room_info = room_info_from_payload(payload["ROOM_INFO"])
+                players = payload.get("PLAYER_POSITION")
+                if isinstance(players, list) and players:
+                    player_pos = _vec(players[0].get("pos"))
+                elif isinstance(players, dict) and players:
+                    player_pos = _vec(next(iter(players.values())).get("pos"))
+                if room_info is None:
+                    continue
+                if not any(k in payload for k in ("ENEMIES", "PROJECTILES", "ROOM_LAYOUT")):
+                    continue
+                frames.append(
+                    EnvironmentFrame(
+                        frame=msg.get("frame", 0),
+                        room_info=room_info,
+                        enemies=enemies_from_payload(payload.get("ENEMIES")),
+                        projectiles=projectiles_from_payload(payload.get("PROJECTILES")),
+                        room_layout=payload.get("ROOM_LAYOUT"),
+                        player_pos=player_pos,
+                    )
+                )
+            return frames
+
+        return self._cached("environment_frames", build)
@@ -0,0 +1,296 @@
+"""
+Benchmark Runner - 基准运行、基线存储与回归比较
+
+每个基准由 @benchmark 注册一个准备函数，准备函数返回 Workload：
+
+- items: 逐个计时的工作项（消息、数据块、帧……）
+- run(item): 被计时的操作
+- reset(): 每轮开始前调用（不计时），用于创建新的处理器/录制会话
+- before(item): 每项计时前调用（不计时），用于准备查询所需的状态
+- finish(): 每轮结束时调用（计时），例如等待写盘完成
+- units(item): 工作项包含的单位数（吞吐量 = 单位数 / 秒）
+
+每个基准运行 repeat 轮，取总耗时最短的一轮作为结果（抗噪声）。
+"""
+
+import gc
+import json
+import platform
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from core.replay.harness import latency_summary
+
+BASELINE_VERSION = 1
+
+# 比较时检查的指标: (字段, 数值越大越好)
+COMPARED_METRICS = (
+    ("throughput", True),
+    ("p50_ms", False),
+)
+
+
+@dataclass
+class Workload:
+    """基准工作负载"""
+
+    items: List[Any]
+    run: Callable[[Any], Any]
+    reset: Optional[Callable[[], None]] = None
+    before: Optional[Callable[[Any], None]] = None
+    finish: Optional[Callable[[], None]] = None
+    units: Callable[[Any], int] = lambda item: 1
+    unit: str = "msg"
+    item: str = "msg"
+
+
+@dataclass
+class BenchCase:
+    """已注册的基准"""
+
+    name: str
+    description: str
+    prepare: Callable[[Any], Workload]
+
+
+@dataclass
+class BenchResult:
+    """单个基准的结果"""
+
+    name: str
+    unit: str
+    item: str
+    units: int
+    items: int
+    seconds: float
+    throughput: float  # 单位/秒
+    repeats: int
+    latency_ms: Dict[str, float] = field(default_factory=dict)  # 每个工作项的耗时分布
+
+    @property
+    def p50_ms(self) -> float:
+        return self.latency_ms.get("p50", 0.0)
+
+    @property
+    def p99_ms(self) -> float:
+        return self.latency_ms.get("p99", 0.0)
+
+    def metric(self, name: str) -> float:
+        return getattr(self, name)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["seconds"] = round(self.seconds, 6)
+        data["throughput"] = round(self.throughput, 2)
+        data["latency_ms"] = {k: round(v, 6) for k, v in self.latency_ms.items()}
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BenchResult":
+        return cls(**{k: data[k] for k in cls.__dataclass_fields__ if k in data})
+
+    def summary(self) -> str:
+        return (
+            f"{self.name:<28} {self.throughput:>12,.0f} {self.unit}/s  "
+            f"p50 {self.p50_ms:8.4f}ms  p99 {self.p99_ms:8.4f}ms  "
+            f"({self.units} {self.unit}, {self.items} {self.item})"
+        )
+
+
+BENCHMARKS: Dict[str, BenchCase] = {}
+
+
+def benchmark(name: str, description: str = ""):
+    """注册基准（装饰准备函数）"""
+
+    def decorator(prepare: Callable[[Any], Workload]) -> Callable[[Any], Workload]:
+        BENCHMARKS[name] = BenchCase(name=name, description=description, prepare=prepare)
+        return prepare
+
+    return decorator
+
+
+def load_cases() -> Dict[str, BenchCase]:
+    """导入内置用例（延迟导入：isaac_bridge 在导入时配置日志）"""
+    from . import cases  # noqa: F401
+
+    return BENCHMARKS
+
+
+def select(patterns: Optional[Iterable[str]] = None) -> List[BenchCase]:
+    """按名称子串筛选基准（None 表示全部）"""
+    load_cases()
+    patterns = list(patterns or [])
+    return [
+        case for name, case in BENCHMARKS.items()
+        if not patterns or any(p in name for p in patterns)
+    ]
+
+
+def run_case(case: BenchCase, context: Any, repeat: int = 3, warmup: bool = True) -> BenchResult:
+    """运行单个基准"""
+    workload = case.prepare(context)
+    items = workload.items
+    units = sum(workload.units(item) for item in items)
+    perf_counter = time.perf_counter
+
+    best_total: Optional[float] = None
+    best_latencies: List[float] = []
+    rounds = repeat + (1 if warmup else 0)
+    for round_index in range(rounds):
+        if workload.reset:
+            workload.reset()
+        latencies = []
+        total = 0.0
+        gc_enabled = gc.isenabled()
+        gc.collect()
+        gc.disable()
+        try:
+            for item in items:
+                if workload.before:
+                    workload.before(item)
+                started = perf_counter()
+                workload.run(item)
+                elapsed = perf_counter() - started
+                total += elapsed
+                latencies.append(elapsed * 1000)
+            if workload.finish:
+                started = perf_counter()
+                workload.finish()
+                total += perf_counter() - started
+        finally:
+            if gc_enabled:
+                gc.enable()
+        if warmup and round_index == 0:
+            continue
+        if best_total is None or total < best_total:
+            best_total = total
+            best_latencies = latencies
+
+    seconds = best_total or 0.0
+    return BenchResult(
+        name=case.name,
+        unit=workload.unit,
+        item=workload.item,
+        units=units,
+        items=len(items),
+        seconds=seconds,
+        throughput=units / seconds if seconds > 0 else 0.0,
+        repeats=repeat,
+        latency_ms=latency_summary(best_latencies),
+    )
+
+
+def run_benchmarks(
+    context: Any,
+    patterns: Optional[Iterable[str]] = None,
+    repeat: int = 3,
+    on_result: Optional[Callable[[BenchResult], None]] = None,
+) -> Dict[str, BenchResult]:
+    """运行匹配的全部基准"""
+    results: Dict[str, BenchResult] = {}
+    for case in select(patterns):
+        result = run_case(case, context, repeat=repeat)
+        results[case.name] = result
+        if on_result:
+            on_result(result)
+    return results
+
+
+# ==================== 基线 ====================
+
+
+def environment_info() -> Dict[str, str]:
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def save_baseline(
+    path: Path, results: Dict[str, BenchResult], fixture: str = ""
+) -> None:
+    """把结果写成 JSON 基线"""
+    data = {
+        "version": BASELINE_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "fixture": fixture,
+        "environment": environment_info(),
+        "results": {name: result.to_dict() for name, result in results.items()},
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+
+def load_baseline(path: Path) -> Dict[str, BenchResult]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != BASELINE_VERSION:
+        raise ValueError(f"不支持的基线版本: {data.get('version')}")
+    return {name: BenchResult.from_dict(item) for name, item in data["results"].items()}
+
+
+# ==================== 比较 ====================
+
+
+@dataclass
+class Comparison:
+    """一个基准一个指标的前后对比"""
+
+    name: str
+    metric: str
+    baseline: float
+    current: float
+    higher_is_better: bool
+    threshold: float
+
+    @property
+    def change(self) -> float:
+        """相对变化（正数表示变好）"""
+        if self.baseline == 0:
+            return 0.0
+        delta = (self.current - self.baseline) / self.baseline
+        return delta if self.higher_is_better else -delta
+
+    @property
+    def regressed(self) -> bool:
+        return self.change < -self.threshold
+
+    def summary(self) -> str:
+        flag = "REGRESSION" if self.regressed else "ok"
+        return (
+            f"{self.name:<28} {self.metric:<10} {self.baseline:>14.4f} -> "
+            f"{self.current:>14.4f}  {self.change:+7.1%}  {flag}"
+        )
+
+
+def compare_results(
+    baseline: Dict[str, BenchResult],
+    current: Dict[str, BenchResult],
+    threshold: float = 0.15,
+) -> List[Comparison]:
+    """对比两组结果；只比较两边都有的基准"""
+    comparisons = []
+    for name, result in current.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS:
+            comparisons.append(
+                Comparison(
+                    name=name,
+                    metric=metric,
+                    baseline=base.metric(metric),
+                    current=result.metric(metric),
+                    higher_is_better=higher_is_better,
+                    threshold=threshold,
+                )
+            )
+    return comparisons
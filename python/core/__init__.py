@@ -6,6 +6,7 @@ Core Module - SocketBridge 重构核心层
 - protocol: 协议模式定义与版本管理
 - validation: 数据验证与已知问题管理
 - replay: 录制与回放系统
+- telemetry: 运行时遥测（延迟追踪）
 """
 
 from .protocol.timing import (
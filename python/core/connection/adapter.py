@@ -17,10 +17,20 @@ _python_root = Path(__file__).parent.parent.parent
 if str(_python_root) not in sys.path:
     sys.path.insert(0, str(_python_root))
 
-from isaac_bridge import IsaacBridge, DataMessage, Event, CollectInterval
+from isaac_bridge import IsaacBridge, DataMessage, Event, CollectInterval, OverflowPolicy
 from services.facade import SocketBridgeFacade, BridgeConfig
 from services.monitor import DataQualityMonitor, QualityIssue
 from services.processor import ProcessedChannel
+from core.telemetry.tracing import STAGE_APPLY_FRAMES, STAGE_CALLBACKS, STAGE_PROCESS, Tracer
+from core.telemetry.control import ControlServer
+from core.telemetry.memory import MemoryBudget
+from core.telemetry.metrics import MetricsDumper, MetricsRegistry, MetricsServer
+from core.telemetry.profiling import MODE_SAMPLING, ProfilerController
+from core.telemetry.watchdog import (
+    FrameBudgetWatchdog,
+    SamplingProfiler,
+    callback_name,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +44,27 @@ class AdapterConfig:
     monitoring_enabled: bool = True
     auto_reconnect: bool = True
     log_messages: bool = False
+    event_queue_size: int = 1024  # 事件队列容量（bridge.get_event / drain_events）
+    event_overflow: str = "drop_oldest"  # 队列满时: drop_oldest / drop_newest / coalesce
+    # 遥测默认全部关闭，按需逐项开启：tracing、看门狗（frame_budget_ms）、metrics、
+    # memory_accounting 每条消息增加若干微秒的打点与直方图/计数器更新开销。
+    # 慢帧采样剖析每 profile_interval 秒抓取一次全部线程栈，开销更大，
+    # 需要时通过控制套接字 "watchdog profile on" 临时开启。
+    tracing: bool = False  # 端到端延迟追踪（开启后指令带 echo 字段，Lua 每条指令回显一条 CMD）
+    tracing_window: float = 60.0  # 延迟直方图滚动窗口（秒）
+    frame_budget_ms: Optional[float] = None  # 每帧处理预算，如 16.7（None 关闭看门狗）
+    profile_slow_frames: bool = False  # 启动时即对慢帧采样剖析（运行时可经控制套接字开关）
+    profile_interval: float = 0.002  # 采样间隔（秒）
+    profile_dir: str = "profiles"  # 运行时剖析输出目录
+    profile_mode: str = MODE_SAMPLING  # 默认剖析模式（sampling / deterministic）
+    control_port: Optional[int] = None  # 本地控制套接字端口（None 不启动）
+    metrics: bool = False  # 统一指标注册表（adapter.metrics；设置 metrics_port/metrics_dump_path 时自动开启）
+    metrics_port: Optional[int] = None  # 本地 Prometheus 端点端口（None 不启动）
+    metrics_dump_path: Optional[str] = None  # 定期 JSON 转储文件（None 不转储）
+    metrics_dump_interval: float = 10.0  # JSON 转储间隔（秒）
+    memory_accounting: bool = False  # 历史存储内存计量（adapter.memory；设置 memory_budget_mb 时自动开启）
+    memory_budget_mb: Optional[float] = None  # 历史存储内存预算（None 只计量不调整深度）
+    memory_check_interval: float = 5.0  # 计量/调整间隔（秒）
 
 
 class BridgeAdapter:
@@ -67,7 +98,12 @@ class BridgeAdapter:
         self.config = config or AdapterConfig()
         
         # 底层网络桥接
-        self.bridge = IsaacBridge(self.config.host, self.config.port)
+        self.bridge = IsaacBridge(
+            self.config.host,
+            self.config.port,
+            event_capacity=self.config.event_queue_size,
+            event_policy=OverflowPolicy(self.config.event_overflow),
+        )
         
         # 新架构服务层
         facade_config = BridgeConfig(
@@ -77,6 +113,44 @@ class BridgeAdapter:
             monitoring_enabled=self.config.monitoring_enabled,
         )
         self.facade = SocketBridgeFacade(facade_config)
+
+        # 延迟追踪
+        self.tracer: Optional[Tracer] = None
+        if self.config.tracing:
+            self.tracer = Tracer(window=self.config.tracing_window)
+            self.bridge.tracer = self.tracer
+
+        # 帧预算看门狗
+        self.watchdog: Optional[FrameBudgetWatchdog] = None
+        if self.config.frame_budget_ms is not None:
+            # 采样线程只在开启剖析时启动
+            self.watchdog = FrameBudgetWatchdog(
+                budget_ms=self.config.frame_budget_ms,
+                profiler=SamplingProfiler(interval=self.config.profile_interval),
+                profile=self.config.profile_slow_frames,
+            )
+
+        # 历史存储内存计量与预算
+        self.memory: Optional[MemoryBudget] = None
+        if self.config.memory_accounting or self.config.memory_budget_mb is not None:
+            budget_mb = self.config.memory_budget_mb
+            self.memory = MemoryBudget(
+                budget_bytes=int(budget_mb * 1e6) if budget_mb else None,
+                check_interval=self.config.memory_check_interval,
+            )
+            self.facade.register_memory(self.memory)
+
+        # 指标
+        self.metrics: Optional[MetricsRegistry] = None
+        self.metrics_server: Optional[MetricsServer] = None
+        self.metrics_dumper: Optional[MetricsDumper] = None
+        self._messages_counter = None
+        if (
+            self.config.metrics
+            or self.config.metrics_port is not None
+            or self.config.metrics_dump_path
+        ):
+            self._setup_metrics()
         
         # 状态
         self._connected = False
@@ -96,7 +170,63 @@ class BridgeAdapter:
         
         # 注册内部处理器
         self._setup_handlers()
-    
+
+        # 运行时剖析（在内部处理器之后挂接，捕获窗口按已处理的消息计数）
+        self.profiler_controller = ProfilerController(
+            output_dir=self.config.profile_dir,
+            mode=self.config.profile_mode,
+            sample_interval=self.config.profile_interval,
+        )
+        self.profiler_controller.attach(self.bridge)
+
+        # 本地控制套接字
+        self.control_server: Optional[ControlServer] = None
+        if self.config.control_port is not None:
+            self.control_server = ControlServer(port=self.config.control_port)
+            self.control_server.register("profile", self.profiler_controller.handle_command)
+            self.control_server.register("stats", lambda args: {"ok": True, **self.get_stats()})
+            if self.watchdog:
+                self.control_server.register("watchdog", self.watchdog.handle_command)
+    
+    def _setup_metrics(self):
+        """创建指标注册表并登记各组件"""
+        self.metrics = MetricsRegistry(histogram_window=self.config.tracing_window)
+        self.bridge.register_metrics(self.metrics)
+        self.facade.register_metrics(self.metrics)
+        self._messages_counter = self.metrics.counter(
+            "messages_processed_total", "DATA/FULL messages processed by the adapter"
+        )
+        if self.tracer:
+            latency = self.metrics.histogram("pipeline_latency_ms", "Pipeline stage latency (ms)")
+            for stage, hist in self.tracer.histograms.items():
+                if stage != STAGE_APPLY_FRAMES:
+                    latency.attach(hist, stage=stage)
+            self.metrics.histogram(
+                "command_apply_frames", "Frames between source data and command application"
+            ).attach(self.tracer.histograms[STAGE_APPLY_FRAMES])
+        if self.watchdog:
+            self.watchdog.register_metrics(self.metrics)
+            self.metrics.register_collector("watchdog", self.watchdog.get_stats)
+        if self.memory:
+            self.memory.register_metrics(self.metrics)
+        self.metrics.register_collector(
+            "adapter",
+            lambda: {
+                "connected": self.connected,
+                "last_frame": self._last_frame,
+                "messages_per_second": self._message_count
+                / max(time.time() - self._start_time, 1),
+            },
+        )
+        if self.config.metrics_port is not None:
+            self.metrics_server = MetricsServer(self.metrics, port=self.config.metrics_port)
+        if self.config.metrics_dump_path:
+            self.metrics_dumper = MetricsDumper(
+                self.metrics,
+                self.config.metrics_dump_path,
+                interval=self.config.metrics_dump_interval,
+            )
+
     def _setup_handlers(self):
         """设置内部消息处理器"""
         
@@ -123,20 +253,34 @@ class BridgeAdapter:
         
         if msg_type in ("DATA", "FULL"):
             # 使用新架构处理
+            watchdog = self.watchdog
+            if watchdog is not None:
+                watchdog.begin(msg.get("frame", 0))
             try:
+                trace = self.tracer.current if self.tracer else None
                 result = self.facade.process_message(msg)
+                if trace is not None:
+                    self.tracer.mark(trace, STAGE_PROCESS)
+                if watchdog is not None:
+                    watchdog.mark(STAGE_PROCESS)
                 
                 frame = msg.get("frame", 0)
                 room = msg.get("room_index", -1)
                 
                 self._message_count += 1
                 self._last_frame = frame
+                if self._messages_counter is not None:
+                    self._messages_counter.inc()
                 
                 # 触发帧回调
                 self._emit("frame", frame, result)
                 
                 # 触发消息回调
                 self._emit("message", msg, result)
+                if trace is not None:
+                    self.tracer.mark(trace, STAGE_CALLBACKS)
+                if watchdog is not None:
+                    watchdog.mark(STAGE_CALLBACKS)
                 
                 # 日志输出（调试用）
                 if self.config.log_messages:
@@ -145,14 +289,28 @@ class BridgeAdapter:
                     
             except Exception as e:
                 logger.error(f"Error processing message: {e}")
+            finally:
+                if watchdog is not None:
+                    watchdog.end()
+            # 计量在处理线程上进行（遍历历史容器），放在帧计时之外
+            if self.memory is not None:
+                self.memory.maybe_check()
     
     def _emit(self, event: str, *args, **kwargs):
-        """触发用户回调"""
+        """触发用户回调（看门狗计时中时按回调归因耗时）"""
+        watchdog = self.watchdog
+        timing = watchdog is not None and watchdog.current is not None
         for cb in self._callbacks.get(event, []):
+            if timing:
+                started = time.perf_counter()
             try:
                 cb(*args, **kwargs)
             except Exception as e:
                 logger.error(f"Callback error for {event}: {e}")
+            if timing:
+                watchdog.add_callback(
+                    f"{event}:{callback_name(cb)}", (time.perf_counter() - started) * 1000
+                )
     
     # ==================== 公共 API ====================
     
@@ -199,11 +357,29 @@ class BridgeAdapter:
         """启动适配器（开始监听连接）"""
         logger.info(f"Starting BridgeAdapter on {self.config.host}:{self.config.port}")
         self.bridge.start()
+        if self.watchdog:
+            self.watchdog.start()
+        if self.control_server:
+            self.control_server.start()
+        if self.metrics_server:
+            self.metrics_server.start()
+        if self.metrics_dumper:
+            self.metrics_dumper.start()
     
     def stop(self):
         """停止适配器"""
         logger.info("Stopping BridgeAdapter")
         self.bridge.stop()
+        if self.watchdog:
+            self.watchdog.stop()
+        if self.profiler_controller.active:
+            self.profiler_controller.stop(timeout=0)
+        if self.control_server:
+            self.control_server.stop()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        if self.metrics_dumper:
+            self.metrics_dumper.stop()
     
     @property
     def connected(self) -> bool:
@@ -354,6 +530,9 @@ class BridgeAdapter:
             "messages_per_second": self._message_count / max(uptime, 1),
             "bridge_stats": self.bridge.stats,
             "facade_stats": self.facade.get_stats(),
+            "latency": self.tracer.get_stats() if self.tracer else {},
+            "watchdog": self.watchdog.get_stats() if self.watchdog else {},
+            "memory": self.memory.get_stats() if self.memory else {},
         }
     
     def print_status(self):
@@ -367,6 +546,30 @@ class BridgeAdapter:
         print(f"Last Frame: {stats['last_frame']}")
         print(f"Messages: {stats['message_count']}")
         print(f"Rate: {stats['messages_per_second']:.1f} msg/s")
+        latency = stats["latency"]
+        if latency:
+            print(
+                "Latency p99: "
+                + ", ".join(
+                    f"{stage}={latency[stage]['p99']:.2f}"
+                    for stage in ("decode", "process", "callbacks", "total", "command_rtt")
+                )
+                + " ms"
+            )
+        watchdog = stats["watchdog"]
+        if watchdog:
+            print(
+                f"Slow frames: {watchdog['slow_frames']}/{watchdog['frames']} "
+                f"(budget {watchdog['budget_ms']:.1f}ms, max {watchdog['max_ms']:.2f}ms)"
+            )
+        memory = stats["memory"]
+        if memory:
+            budget = memory["budget_bytes"]
+            print(
+                f"History memory: {memory['total_bytes'] / 1e6:.1f}MB"
+                + (f" / {budget / 1e6:.1f}MB (depth x{memory['scale']:.2f})" if budget else "")
+                + f", RSS {memory['rss_bytes'] / 1e6:.1f}MB"
+            )
         print("=" * 50)
 
 
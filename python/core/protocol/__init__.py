@@ -1,5 +1,6 @@
 """Protocol Module - 协议层"""
 
+from .issues import IssueWindow
 from .timing import (
     TimingIssueType,
     ChannelTimingInfo,
@@ -9,6 +10,7 @@ from .timing import (
 )
 
 __all__ = [
+    "IssueWindow",
     "TimingIssueType",
     "ChannelTimingInfo",
     "MessageTimingInfo",
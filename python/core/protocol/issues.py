@@ -0,0 +1,123 @@
+"""
+Protocol Issues - 有界问题存储
+
+IssueWindow 用固定容量的环形缓冲保存最近的问题，另按时间分桶累计
+各维度（来源、严重性、通道……）的计数：
+
+- 记录一个问题 O(1)（过期桶在记录/查询时整体扣除）
+- 窗口内计数直接读取累加值，不遍历问题
+- 内存只与环形容量、桶数和维度取值个数有关，长时间运行保持平稳
+"""
+
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+
+class IssueWindow:
+    """最近问题环形缓冲 + 按时间分桶的计数"""
+
+    def __init__(
+        self,
+        capacity: int = 1000,
+        window: float = 300.0,
+        bucket_seconds: float = 10.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            capacity: 保留的最近问题条数
+            window: 计数窗口（秒）
+            bucket_seconds: 分桶粒度（秒），窗口边界的误差不超过一个桶
+            clock: 时间源（默认 time.time）
+        """
+        self.capacity = capacity
+        self.window = window
+        self.bucket_seconds = bucket_seconds
+        self._clock = clock
+
+        # (时间戳, 问题)
+        self._recent: Deque[Tuple[float, Any]] = deque(maxlen=capacity)
+        # (桶起始时间, {维度: {取值: 计数}}, 桶内问题数)
+        self._buckets: Deque[Tuple[float, Dict[str, Dict[Any, int]], List[int]]] = deque()
+        self._window_counts: Dict[str, Dict[Any, int]] = {}
+        self._window_total = 0
+
+        self.totals: Dict[str, Dict[Any, int]] = {}  # 自创建以来的计数
+        self.total_count = 0
+
+    # ==================== 记录 ====================
+
+    def add(self, item: Any, timestamp: Optional[float] = None, **dimensions: Any) -> None:
+        """记录一个问题
+
+        Args:
+            item: 问题对象（进入环形缓冲）
+            timestamp: 发生时间，默认当前时间
+            **dimensions: 计数维度，例如 source="timing", severity="warning"
+        """
+        now = self._clock() if timestamp is None else timestamp
+        self._expire(now)
+        self._recent.append((now, item))
+
+        start = now - now % self.bucket_seconds
+        # 时间回退的问题并入最新的桶
+        if not self._buckets or start > self._buckets[-1][0]:
+            self._buckets.append((start, {}, [0]))
+        _, bucket, bucket_total = self._buckets[-1]
+        bucket_total[0] += 1
+        self._window_total += 1
+        self.total_count += 1
+
+        for dim, value in dimensions.items():
+            for counts in (bucket, self._window_counts, self.totals):
+                values = counts.setdefault(dim, {})
+                values[value] = values.get(value, 0) + 1
+
+    def _expire(self, now: float) -> None:
+        cutoff = now - self.window
+        buckets = self._buckets
+        while buckets and buckets[0][0] + self.bucket_seconds <= cutoff:
+            _, bucket, bucket_total = buckets.popleft()
+            self._window_total -= bucket_total[0]
+            for dim, values in bucket.items():
+                window_values = self._window_counts[dim]
+                for value, n in values.items():
+                    left = window_values[value] - n
+                    if left:
+                        window_values[value] = left
+                    else:
+                        del window_values[value]
+
+    # ==================== 查询 ====================
+
+    def count(self) -> int:
+        """窗口内的问题数"""
+        self._expire(self._clock())
+        return self._window_total
+
+    def counts(self, dimension: str) -> Dict[Any, int]:
+        """窗口内某个维度的计数"""
+        self._expire(self._clock())
+        return dict(self._window_counts.get(dimension, {}))
+
+    def lifetime_counts(self, dimension: str) -> Dict[Any, int]:
+        """自创建以来某个维度的计数"""
+        return dict(self.totals.get(dimension, {}))
+
+    def recent(self, since: Optional[float] = None, limit: Optional[int] = None) -> List[Any]:
+        """环形缓冲中 since 之后的问题（按时间顺序，最多 limit 条）"""
+        items = [item for ts, item in self._recent if since is None or ts >= since]
+        return items[-limit:] if limit else items
+
+    def clear(self) -> None:
+        self._recent.clear()
+        self._buckets.clear()
+        self._window_counts.clear()
+        self._window_total = 0
+
+    def __len__(self) -> int:
+        return len(self._recent)
+
+    def __iter__(self) -> Iterator[Any]:
+        return (item for _, item in self._recent)
@@ -3,6 +3,8 @@ from typing import Dict, Optional, List
 from enum import Enum
 import logging
 
+from .issues import IssueWindow
+
 logger = logging.getLogger(__name__)
 
 
@@ -74,11 +76,12 @@ class TimingIssue:
 
 
 class TimingMonitor:
-    def __init__(self):
+    def __init__(self, max_recent_issues: int = 1000, issue_window: float = 300.0):
         self.last_seq = 0
         self.last_frame = 0
         self.expected_frame_gap = 1
-        self.issues: List[TimingIssue] = []
+        # 最近问题环形缓冲 + 按类型/严重性的时间分桶计数（内存不随运行时间增长）
+        self.issues = IssueWindow(capacity=max_recent_issues, window=issue_window)
 
         self.total_messages = 0
         self.frame_gaps = 0
@@ -194,7 +197,10 @@ class TimingMonitor:
 
         self.last_seq = timing.seq
         self.last_frame = timing.frame
-        self.issues.extend(issues)
+        for issue in issues:
+            self.issues.add(
+                issue, type=issue.issue_type.value, severity=issue.severity
+            )
 
         return issues
 
@@ -204,5 +210,7 @@ class TimingMonitor:
             "frame_gaps": self.frame_gaps,
             "out_of_order": self.out_of_order,
             "stale_channels": self.stale_channels,
-            "issue_rate": len(self.issues) / max(self.total_messages, 1),
+            "issue_rate": self.issues.total_count / max(self.total_messages, 1),
+            "recent_issues": self.issues.count(),
+            "recent_by_type": self.issues.counts("type"),
         }
@@ -6,6 +6,16 @@ Core Replay Module - 录制与回放系统
 - recorder: 数据录制器
 - replayer: 数据回放器
 - session: 会话管理
+- stream: 流式消息读取（按块 k 路归并）
+- index: 帧偏移旁路索引（index.bin）
+- keyframes: 累积状态关键帧
+- codec: 块压缩后端（gzip / zstd + 字典）
+- columnar: 列式会话导出与读取（Parquet / Arrow / NPZ）
+- batch: 多会话并行批处理（进程池 + 归约器）
+- catalog: 会话目录数据库（SQLite）
+- query: 帧级查询（逐帧二级索引 + 过滤表达式）
+- harness: 虚拟时钟快进回放与吞吐量报告
+- loadgen: 合成负载生成（多客户端、会话放大、丢失率与延迟）
 """
 
 from .message import (
@@ -26,6 +36,65 @@ from .replayer import (
     ReplaySession,
     create_replayer,
 )
+from .stream import (
+    find_message_files,
+    merge_chunks,
+)
+from .index import (
+    SessionIndex,
+    BlockEntry,
+    RoomMarker,
+    build_index,
+    load_or_build_index,
+)
+from .keyframes import (
+    KeyframeStore,
+    load_or_build_keyframes,
+)
+from .codec import (
+    ChunkCodec,
+    create_codec,
+    codec_for_path,
+    train_dictionary,
+    ZSTD_AVAILABLE,
+)
+from .columnar import (
+    ColumnarSession,
+    export_columnar,
+)
+from .batch import (
+    BatchEngine,
+    BatchResult,
+    FrameReducer,
+    SessionReducer,
+    ChannelStatsReducer,
+    find_sessions,
+)
+from .catalog import (
+    SessionCatalog,
+    SessionStats,
+)
+from .query import (
+    FrameQueryIndex,
+    FrameRange,
+    QueryError,
+    build_query_index,
+    load_or_build_query_index,
+)
+from .harness import (
+    FastForwardHarness,
+    ThroughputReport,
+    VirtualClock,
+    run_facade,
+)
+from .loadgen import (
+    LoadGenerator,
+    LoadProfile,
+    LoadReport,
+    SyntheticSession,
+    run_bridge_load,
+    scale_messages,
+)
 from .session import (
     SessionManager,
     SessionInfo,
@@ -49,6 +118,55 @@ __all__ = [
     "ReplayerConfig",
     "ReplaySession",
     "create_replayer",
+    # Stream
+    "find_message_files",
+    "merge_chunks",
+    # Index
+    "SessionIndex",
+    "BlockEntry",
+    "RoomMarker",
+    "build_index",
+    "load_or_build_index",
+    # Keyframes
+    "KeyframeStore",
+    "load_or_build_keyframes",
+    # Codec
+    "ChunkCodec",
+    "create_codec",
+    "codec_for_path",
+    "train_dictionary",
+    "ZSTD_AVAILABLE",
+    # Columnar
+    "ColumnarSession",
+    "export_columnar",
+    # Batch
+    "BatchEngine",
+    "BatchResult",
+    "FrameReducer",
+    "SessionReducer",
+    "ChannelStatsReducer",
+    "find_sessions",
+    # Catalog
+    "SessionCatalog",
+    "SessionStats",
+    # Query
+    "FrameQueryIndex",
+    "FrameRange",
+    "QueryError",
+    "build_query_index",
+    "load_or_build_query_index",
+    # Harness
+    "FastForwardHarness",
+    "ThroughputReport",
+    "VirtualClock",
+    "run_facade",
+    # Load generator
+    "LoadGenerator",
+    "LoadProfile",
+    "LoadReport",
+    "SyntheticSession",
+    "run_bridge_load",
+    "scale_messages",
     # Session
     "SessionManager",
     "SessionInfo",
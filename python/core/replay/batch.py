@@ -0,0 +1,352 @@
+"""
+Core Replay Batch - 多会话并行批处理
+
+对一批录制会话运行用户提供的归约器，按会话和块分片到进程池中执行，
+部分结果按完成顺序流式返回并合并：
+
+- FrameReducer: 逐帧归约，一个会话可按索引块拆成多个分片
+- SessionReducer: 整个会话一次归约，每个会话一个分片
+
+分片只在“干净”的块边界切分（边界之前的所有消息帧号都小于边界之后的），
+因此每帧的消息总是完整地落在同一个分片中。merge 必须满足结合律和交换律，
+分片结果的合并顺序不确定。
+
+归约器与其返回值需要可以 pickle（定义在模块顶层的类）。
+
+使用示例：
+```python
+from core.replay.batch import BatchEngine, ChannelStatsReducer
+
+engine = BatchEngine(workers=8)
+result = engine.run("recordings/session_*", ChannelStatsReducer())
+print(result.value)
+```
+"""
+
+import glob
+import logging
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .index import SessionIndex, build_index
+from .message import RawMessage
+from .stream import Record, find_message_files, merge_sources
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARD_MESSAGES = 20000
+
+
+# ==================== 归约器 ====================
+
+
+class FrameReducer:
+    """逐帧归约器
+
+    子类实现 add（以及需要时的 initial/merge/finalize）。
+    """
+
+    def initial(self) -> Any:
+        """部分聚合的初始值"""
+        return None
+
+    def add(self, acc: Any, frame: int, messages: List[RawMessage], session: str) -> Any:
+        """处理一帧的所有消息，返回新的部分聚合"""
+        raise NotImplementedError
+
+    def merge(self, a: Any, b: Any) -> Any:
+        """合并两个部分聚合"""
+        raise NotImplementedError
+
+    def finalize(self, acc: Any) -> Any:
+        """由最终聚合生成结果"""
+        return acc
+
+
+class SessionReducer:
+    """会话级归约器
+
+    子类实现 map_session（以及需要时的 initial/merge/finalize）。
+    """
+
+    def initial(self) -> Any:
+        return None
+
+    def map_session(self, session_dir: Path) -> Any:
+        """处理整个会话，返回部分聚合"""
+        raise NotImplementedError
+
+    def merge(self, a: Any, b: Any) -> Any:
+        raise NotImplementedError
+
+    def finalize(self, acc: Any) -> Any:
+        return acc
+
+
+Reducer = Union[FrameReducer, SessionReducer]
+
+
+class ChannelStatsReducer(FrameReducer):
+    """内置统计：帧数、消息数、各通道出现次数、帧号范围"""
+
+    def initial(self) -> Dict[str, Any]:
+        return {
+            "frames": 0,
+            "messages": 0,
+            "channels": {},
+            "min_frame": None,
+            "max_frame": None,
+            "sessions": {},
+        }
+
+    def add(self, acc, frame, messages, session):
+        acc["frames"] += 1
+        acc["messages"] += len(messages)
+        acc["sessions"][session] = acc["sessions"].get(session, 0) + 1
+        channels = acc["channels"]
+        for msg in messages:
+            for name in msg.payload or ():
+                channels[name] = channels.get(name, 0) + 1
+        if acc["min_frame"] is None or frame < acc["min_frame"]:
+            acc["min_frame"] = frame
+        if acc["max_frame"] is None or frame > acc["max_frame"]:
+            acc["max_frame"] = frame
+        return acc
+
+    def merge(self, a, b):
+        merged = self.initial()
+        for part in (a, b):
+            merged["frames"] += part["frames"]
+            merged["messages"] += part["messages"]
+            for key in ("channels", "sessions"):
+                for name, count in part[key].items():
+                    merged[key][name] = merged[key].get(name, 0) + count
+            for key, pick in (("min_frame", min), ("max_frame", max)):
+                values = [v for v in (merged[key], part[key]) if v is not None]
+                merged[key] = pick(values) if values else None
+        return merged
+
+
+# ==================== 分片 ====================
+
+
+@dataclass
+class Shard:
+    """一个工作单元：会话的一段连续块（或整个会话）"""
+
+    session_dir: Path
+    index: Optional[SessionIndex] = None  # 逐帧分片使用的索引
+    block_start: int = 0
+    block_end: int = 0
+    messages: int = 0  # 预计消息数（用于日志）
+
+    @property
+    def label(self) -> str:
+        if self.index is None:
+            return self.session_dir.name
+        return f"{self.session_dir.name}[{self.block_start}:{self.block_end}]"
+
+
+@dataclass
+class ShardResult:
+    """分片结果"""
+
+    shard: str
+    value: Any = None
+    frames: int = 0
+    elapsed: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class BatchResult:
+    """批处理结果"""
+
+    value: Any = None
+    sessions: int = 0
+    shards: int = 0
+    frames: int = 0
+    elapsed: float = 0.0
+    errors: List[Tuple[str, str]] = field(default_factory=list)
+
+
+def find_sessions(patterns: Union[str, Path, Iterable[Union[str, Path]]]) -> List[Path]:
+    """按 glob 模式查找会话目录（包含消息块文件的目录）"""
+    if isinstance(patterns, (str, Path)):
+        patterns = [patterns]
+    sessions: List[Path] = []
+    seen = set()
+    for pattern in patterns:
+        for match in sorted(glob.glob(str(pattern))):
+            path = Path(match)
+            if path.is_dir() and path not in seen and find_message_files(path):
+                seen.add(path)
+                sessions.append(path)
+    return sessions
+
+
+def _clean_boundaries(index: SessionIndex) -> List[bool]:
+    """块 k 之前是否可以切分（之前的最大帧号 < 之后的最小帧号）"""
+    blocks = index.blocks
+    suffix_min = [0] * (len(blocks) + 1)
+    suffix_min[len(blocks)] = float("inf")
+    for k in range(len(blocks) - 1, -1, -1):
+        suffix_min[k] = min(blocks[k].first_frame, suffix_min[k + 1])
+
+    clean = [True] * len(blocks)
+    running_max = -1
+    for k, block in enumerate(blocks):
+        clean[k] = running_max < suffix_min[k]
+        running_max = max(running_max, block.last_frame)
+    return clean
+
+
+def plan_session(session_dir: Path, shard_messages: int) -> List[Shard]:
+    """把一个会话按索引块拆成若干分片
+
+    没有 index.bin 的旧会话在内存中构建索引（不写入会话目录）。
+    """
+    index = SessionIndex.load(session_dir) or build_index(session_dir, save=False)
+    if not index.blocks:
+        return []
+
+    clean = _clean_boundaries(index)
+    shards: List[Shard] = []
+    start = 0
+    count = 0
+    for k, block in enumerate(index.blocks):
+        if k > start and clean[k] and count >= shard_messages:
+            shards.append(Shard(session_dir, index, start, k, count))
+            start, count = k, 0
+        count += block.count
+    shards.append(Shard(session_dir, index, start, len(index.blocks), count))
+    return shards
+
+
+# ==================== 执行 ====================
+
+
+def _iter_shard_frames(shard: Shard) -> Iterator[Tuple[int, List[RawMessage]]]:
+    index = shard.index
+    loaders: Iterable[Callable[[], List[Record]]] = (
+        (lambda b=block: index.read_block(b))
+        for block in index.blocks[shard.block_start : shard.block_end]
+    )
+    frame = None
+    group: List[RawMessage] = []
+    for msg in merge_sources(loaders):
+        if msg.frame != frame:
+            if group:
+                yield frame, group
+            frame, group = msg.frame, []
+        group.append(msg)
+    if group:
+        yield frame, group
+
+
+def run_shard(shard: Shard, reducer: Reducer) -> ShardResult:
+    """执行单个分片（在工作进程中调用）"""
+    start = time.perf_counter()
+    result = ShardResult(shard=shard.label)
+    try:
+        if isinstance(reducer, SessionReducer):
+            result.value = reducer.map_session(shard.session_dir)
+        else:
+            acc = reducer.initial()
+            session = shard.session_dir.name
+            for frame, messages in _iter_shard_frames(shard):
+                acc = reducer.add(acc, frame, messages, session)
+                result.frames += 1
+            result.value = acc
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {e}"
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+class BatchEngine:
+    """多会话并行批处理引擎"""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        shard_messages: int = DEFAULT_SHARD_MESSAGES,
+        executor_factory: Optional[Callable[[int], Executor]] = None,
+    ):
+        """
+        Args:
+            workers: 工作进程数，默认 CPU 核数；1 表示在当前进程中串行执行
+            shard_messages: 逐帧归约时每个分片的目标消息数
+            executor_factory: 自定义执行器（默认 ProcessPoolExecutor）
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.shard_messages = shard_messages
+        self.executor_factory = executor_factory or (
+            lambda n: ProcessPoolExecutor(max_workers=n)
+        )
+
+    def plan(self, sessions: List[Path], reducer: Reducer) -> List[Shard]:
+        """生成分片，大分片优先（减少长尾）"""
+        shards: List[Shard] = []
+        for session_dir in sessions:
+            if isinstance(reducer, SessionReducer):
+                shards.append(Shard(session_dir))
+            else:
+                shards.extend(plan_session(session_dir, self.shard_messages))
+        shards.sort(key=lambda s: s.messages, reverse=True)
+        return shards
+
+    def iter_results(
+        self, shards: List[Shard], reducer: Reducer
+    ) -> Iterator[ShardResult]:
+        """执行分片，按完成顺序流式返回部分结果"""
+        if self.workers <= 1 or len(shards) <= 1:
+            for shard in shards:
+                yield run_shard(shard, reducer)
+            return
+
+        with self.executor_factory(min(self.workers, len(shards))) as executor:
+            futures = [executor.submit(run_shard, shard, reducer) for shard in shards]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def run(
+        self,
+        sessions: Union[str, Path, Iterable[Union[str, Path]]],
+        reducer: Reducer,
+        on_result: Optional[Callable[[ShardResult], None]] = None,
+    ) -> BatchResult:
+        """对一批会话运行归约器
+
+        Args:
+            sessions: glob 模式或会话目录列表
+            reducer: FrameReducer 或 SessionReducer 实例
+            on_result: 每个分片完成时的回调（进度、流式输出）
+        """
+        start = time.perf_counter()
+        session_dirs = find_sessions(sessions)
+        shards = self.plan(session_dirs, reducer)
+        result = BatchResult(sessions=len(session_dirs), shards=len(shards))
+
+        acc = reducer.initial()
+        for shard_result in self.iter_results(shards, reducer):
+            if shard_result.error:
+                logger.warning(f"分片失败 {shard_result.shard}: {shard_result.error}")
+                result.errors.append((shard_result.shard, shard_result.error))
+            else:
+                acc = reducer.merge(acc, shard_result.value)
+                result.frames += shard_result.frames
+            if on_result:
+                on_result(shard_result)
+
+        result.value = reducer.finalize(acc)
+        result.elapsed = time.perf_counter() - start
+        logger.info(
+            f"批处理完成: {result.sessions} 个会话, {result.shards} 个分片, "
+            f"{result.frames} 帧, 耗时 {result.elapsed:.2f}s"
+        )
+        return result
@@ -0,0 +1,440 @@
+"""
+Core Replay Catalog - 会话目录数据库
+
+录制目录下的 SQLite 数据库（catalog.sqlite），缓存每个会话的：
+- 元数据（时间、时长、帧数、消息数、协议版本）
+- 目录大小与帧号范围
+- 访问过的房间（首次进入帧、进入次数）
+- 各通道消息数
+
+DataRecorder 在会话开始和结束时更新目录，SessionManager 直接查询目录，
+不再遍历每个会话目录计算大小和读取元数据。外部拷贝进来的会话可以通过
+reconcile（对账）补录，已删除的会话会从目录中移除。
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FILENAME = "catalog.sqlite"
+CATALOG_VERSION = 1
+
+# 会话状态
+STATUS_RECORDING = "recording"
+STATUS_COMPLETE = "complete"
+STATUS_INTERRUPTED = "interrupted"  # 录制器异常退出，未正常结束
+
+# 超过该时长没有任何写入的 "recording" 会话视为录制器已不存在（秒）
+STALE_RECORDING_SECONDS = 300.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'complete',
+    start_time REAL NOT NULL DEFAULT 0,
+    end_time REAL,
+    duration REAL NOT NULL DEFAULT 0,
+    total_frames INTEGER NOT NULL DEFAULT 0,
+    total_messages INTEGER NOT NULL DEFAULT 0,
+    total_events INTEGER NOT NULL DEFAULT 0,
+    size_bytes INTEGER NOT NULL DEFAULT 0,
+    protocol_version TEXT NOT NULL DEFAULT '2.0',
+    first_frame INTEGER,
+    last_frame INTEGER,
+    has_stats INTEGER NOT NULL DEFAULT 0,
+    dir_mtime REAL NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_start ON sessions(start_time);
+CREATE INDEX IF NOT EXISTS idx_sessions_size ON sessions(size_bytes);
+CREATE INDEX IF NOT EXISTS idx_sessions_frames ON sessions(total_frames);
+CREATE INDEX IF NOT EXISTS idx_sessions_duration ON sessions(duration);
+
+CREATE TABLE IF NOT EXISTS session_rooms (
+    session_id TEXT NOT NULL REFERENCES sessions(session_id) ON DELETE CASCADE,
+    room_index INTEGER NOT NULL,
+    first_frame INTEGER NOT NULL,
+    visits INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (session_id, room_index)
+);
+CREATE INDEX IF NOT EXISTS idx_rooms_room ON session_rooms(room_index);
+
+CREATE TABLE IF NOT EXISTS session_channels (
+    session_id TEXT NOT NULL REFERENCES sessions(session_id) ON DELETE CASCADE,
+    channel TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (session_id, channel)
+);
+CREATE INDEX IF NOT EXISTS idx_channels_channel ON session_channels(channel);
+"""
+
+# list_sessions 的排序方式 -> 索引列
+SORT_COLUMNS = {
+    "time": "start_time",
+    "size": "size_bytes",
+    "frames": "total_frames",
+    "duration": "duration",
+}
+
+
+@dataclass
+class SessionStats:
+    """会话统计（房间访问与通道计数），录制时增量累积"""
+
+    first_frame: Optional[int] = None
+    last_frame: Optional[int] = None
+    rooms: Dict[int, List[int]] = field(default_factory=dict)  # 房间 -> [首次帧, 进入次数]
+    channels: Dict[str, int] = field(default_factory=dict)
+    _room: Optional[int] = None
+
+    def add(self, frame: int, room_index: Optional[int], channels=()) -> None:
+        """累积一条消息（room_index 为 None 时不更新房间访问）"""
+        if self.first_frame is None or frame < self.first_frame:
+            self.first_frame = frame
+        if self.last_frame is None or frame > self.last_frame:
+            self.last_frame = frame
+        if room_index is not None and room_index != self._room:
+            self._room = room_index
+            entry = self.rooms.get(room_index)
+            if entry is None:
+                self.rooms[room_index] = [frame, 1]
+            else:
+                entry[1] += 1
+        for name in channels:
+            self.channels[name] = self.channels.get(name, 0) + 1
+
+
+def dir_size(path: Path) -> int:
+    """会话目录大小（字节）"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.stat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _dir_mtime(path: Path) -> float:
+    """目录签名：目录本身与 metadata.json 的最新修改时间"""
+    mtime = path.stat().st_mtime
+    metadata = path / "metadata.json"
+    if metadata.exists():
+        mtime = max(mtime, metadata.stat().st_mtime)
+    return mtime
+
+
+def _last_write_time(path: Path) -> float:
+    """目录及其中文件的最新修改时间（判断录制器是否仍在写入）"""
+    mtime = path.stat().st_mtime
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                mtime = max(mtime, entry.stat().st_mtime)
+            except OSError:
+                pass
+    return mtime
+
+
+def scan_session(session_dir: Path, deep: bool = True) -> Tuple[Dict[str, Any], Optional[SessionStats]]:
+    """扫描会话目录
+
+    Args:
+        session_dir: 会话目录
+        deep: 是否解码消息块统计房间与通道（对账时使用）
+
+    Returns:
+        (会话字段, 统计)；deep=False 时统计为 None
+    """
+    from .stream import find_message_files, read_chunk
+
+    row: Dict[str, Any] = {
+        "session_id": session_dir.name,
+        "path": str(session_dir),
+        "start_time": session_dir.stat().st_ctime,
+        "size_bytes": dir_size(session_dir),
+        "dir_mtime": _dir_mtime(session_dir),
+    }
+
+    data: Dict[str, Any] = {}
+    metadata_path = session_dir / "metadata.json"
+    meta_files = list(session_dir.glob("*_meta.json"))
+    summary_path = session_dir / "summary.json"
+    if metadata_path.exists():
+        data = json.loads(metadata_path.read_text(encoding="utf-8"))
+    elif meta_files:
+        data = json.loads(meta_files[0].read_text(encoding="utf-8"))
+    elif summary_path.exists():
+        summary = json.loads(summary_path.read_text(encoding="utf-8"))
+        data = {
+            "duration": summary.get("duration", 0),
+            "total_frames": summary.get("frames", 0),
+            "total_messages": summary.get("messages", 0),
+        }
+
+    for key in ("start_time", "end_time", "duration", "total_frames",
+                "total_messages", "total_events", "protocol_version"):
+        if data.get(key) is not None:
+            row[key] = data[key]
+    if not data.get("start_time"):
+        row["start_time"] = session_dir.stat().st_ctime
+
+    if not deep:
+        return row, None
+
+    stats = SessionStats()
+    for filepath in find_message_files(session_dir):
+        for (frame, _), msg in read_chunk(filepath):
+            room_index = msg.get("room_index")
+            payload = msg.get("payload")
+            stats.add(
+                frame,
+                int(room_index) if isinstance(room_index, (int, float)) else -1,
+                payload.keys() if isinstance(payload, dict) else (),
+            )
+    return row, stats
+
+
+class SessionCatalog:
+    """会话目录数据库
+
+    每次操作使用独立连接，可在录制线程、写入线程和其他进程中同时使用。
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            conn.execute(f"PRAGMA user_version = {CATALOG_VERSION}")
+
+    @classmethod
+    def for_directory(cls, recordings_dir: Path) -> "SessionCatalog":
+        """录制目录下的默认目录数据库"""
+        return cls(Path(recordings_dir) / CATALOG_FILENAME)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            conn = sqlite3.connect(str(self.path), timeout=10.0)
+            try:
+                conn.row_factory = sqlite3.Row
+                conn.execute("PRAGMA foreign_keys = ON")
+                yield conn
+                conn.commit()
+            finally:
+                conn.close()
+
+    # ==================== 写入 ====================
+
+    def upsert(
+        self,
+        row: Dict[str, Any],
+        stats: Optional[SessionStats] = None,
+        status: str = STATUS_COMPLETE,
+    ) -> None:
+        """插入或更新会话（提供 stats 时同时替换房间与通道统计）"""
+        row = dict(row, status=status, updated_at=time.time())
+        if stats is not None:
+            row.update(
+                first_frame=stats.first_frame,
+                last_frame=stats.last_frame,
+                has_stats=1,
+            )
+        columns = ", ".join(row)
+        placeholders = ", ".join("?" for _ in row)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in row if c != "session_id")
+
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT INTO sessions ({columns}) VALUES ({placeholders}) "
+                f"ON CONFLICT(session_id) DO UPDATE SET {updates}",
+                list(row.values()),
+            )
+            if stats is not None:
+                session_id = row["session_id"]
+                conn.execute("DELETE FROM session_rooms WHERE session_id = ?", (session_id,))
+                conn.execute("DELETE FROM session_channels WHERE session_id = ?", (session_id,))
+                conn.executemany(
+                    "INSERT INTO session_rooms VALUES (?, ?, ?, ?)",
+                    [(session_id, room, first, visits) for room, (first, visits) in stats.rooms.items()],
+                )
+                conn.executemany(
+                    "INSERT INTO session_channels VALUES (?, ?, ?)",
+                    [(session_id, name, count) for name, count in stats.channels.items()],
+                )
+
+    def remove(self, session_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    # ==================== 查询 ====================
+
+    def list(
+        self,
+        sort_by: str = "time",
+        reverse: bool = True,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """按索引列排序列出会话"""
+        column = SORT_COLUMNS.get(sort_by, "start_time")
+        order = "DESC" if reverse else "ASC"
+        sql = f"SELECT * FROM sessions ORDER BY {column} {order}, session_id {order}"
+        params: Tuple[Any, ...] = ()
+        if limit is not None:
+            sql += " LIMIT ?"
+            params = (limit,)
+        with self._connect() as conn:
+            return [dict(r) for r in conn.execute(sql, params)]
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def session_ids(self) -> List[str]:
+        with self._connect() as conn:
+            return [r[0] for r in conn.execute("SELECT session_id FROM sessions")]
+
+    def total_size(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM sessions").fetchone()[0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0), "
+                "COALESCE(SUM(total_frames), 0), COALESCE(SUM(total_messages), 0), "
+                "COALESCE(SUM(duration), 0) FROM sessions"
+            ).fetchone()
+        return {
+            "total_sessions": row[0],
+            "total_size": row[1],
+            "total_frames": row[2],
+            "total_messages": row[3],
+            "total_duration": row[4],
+        }
+
+    def get_rooms(self, session_id: str) -> Dict[int, Tuple[int, int]]:
+        """会话访问过的房间: 房间 -> (首次进入帧, 进入次数)"""
+        with self._connect() as conn:
+            return {
+                r["room_index"]: (r["first_frame"], r["visits"])
+                for r in conn.execute(
+                    "SELECT * FROM session_rooms WHERE session_id = ? ORDER BY first_frame",
+                    (session_id,),
+                )
+            }
+
+    def get_channels(self, session_id: str) -> Dict[str, int]:
+        with self._connect() as conn:
+            return {
+                r["channel"]: r["count"]
+                for r in conn.execute(
+                    "SELECT * FROM session_channels WHERE session_id = ?", (session_id,)
+                )
+            }
+
+    def sessions_with_room(self, room_index: int) -> List[str]:
+        """访问过指定房间的会话"""
+        with self._connect() as conn:
+            return [
+                r[0]
+                for r in conn.execute(
+                    "SELECT session_id FROM session_rooms WHERE room_index = ? ORDER BY session_id",
+                    (room_index,),
+                )
+            ]
+
+    def sessions_with_channel(self, channel: str, min_count: int = 1) -> List[str]:
+        """包含指定通道的会话"""
+        with self._connect() as conn:
+            return [
+                r[0]
+                for r in conn.execute(
+                    "SELECT session_id FROM session_channels "
+                    "WHERE channel = ? AND count >= ? ORDER BY session_id",
+                    (channel, min_count),
+                )
+            ]
+
+    # ==================== 对账 ====================
+
+    def reconcile(
+        self,
+        recordings_dir: Path,
+        deep: bool = True,
+        full: bool = False,
+        stale_after: float = STALE_RECORDING_SECONDS,
+    ) -> Dict[str, int]:
+        """与录制目录对账
+
+        - 新出现的会话目录：扫描后加入
+        - 目录或 metadata.json 有变化（或缺少统计且 deep=True）：重新扫描
+        - 已不存在的会话：移除
+        - 状态为 recording 但超过 stale_after 秒没有写入的会话（录制器崩溃）：
+          重新扫描并标记为 interrupted
+
+        Args:
+            recordings_dir: 录制目录
+            deep: 是否解码消息块统计房间与通道
+            full: 忽略修改时间，重新扫描所有会话
+            stale_after: 判定录制会话已中断的无写入时长（秒）
+
+        Returns:
+            {"added", "updated", "removed"} 计数
+        """
+        recordings_dir = Path(recordings_dir)
+        known = {row["session_id"]: row for row in self.list()}
+        result = {"added": 0, "updated": 0, "removed": 0}
+
+        present = set()
+        for item in recordings_dir.iterdir():
+            if not item.is_dir() or item.name.startswith((".", "_")):
+                continue
+            present.add(item.name)
+            row = known.get(item.name)
+            status = row["status"] if row is not None else STATUS_COMPLETE
+            if status == STATUS_RECORDING:
+                if time.time() - _last_write_time(item) < stale_after:
+                    continue  # 正在录制的会话由录制器维护
+                status = STATUS_INTERRUPTED
+                logger.warning(f"录制会话已中断（长时间无写入）: {item.name}")
+            elif (
+                row is not None
+                and not full
+                and row["dir_mtime"] >= _dir_mtime(item)
+                and (row["has_stats"] or not deep)
+            ):
+                continue
+            try:
+                fields, stats = scan_session(item, deep=deep)
+            except (OSError, ValueError) as e:
+                logger.warning(f"扫描会话失败 {item}: {e}")
+                continue
+            self.upsert(fields, stats, status=status)
+            result["updated" if row is not None else "added"] += 1
+
+        for session_id in set(known) - present:
+            self.remove(session_id)
+            result["removed"] += 1
+
+        if any(result.values()):
+            logger.info(
+                f"会话目录对账: 新增 {result['added']}, "
+                f"更新 {result['updated']}, 移除 {result['removed']}"
+            )
+        return result
@@ -0,0 +1,293 @@
+"""
+Core Replay Codec - 消息块压缩后端
+
+消息块以“帧”为单位压缩：每 block_size 行编码为一个独立的压缩帧
+（gzip member 或 zstd frame），帧之间直接拼接。索引记录每个帧的字节范围，
+随机访问时只需解压目标帧。
+
+支持的后端：
+- none: 不压缩（.jsonl）
+- gzip: 标准库 gzip（.jsonl.gz），默认
+- zstd: Zstandard（.jsonl.zst），可选依赖 zstandard，支持预训练字典
+
+使用字典录制时，字典会复制到会话目录（dictionary.zdict），
+回放时按块文件后缀和会话目录中的字典自动选择解码器。
+"""
+
+import gzip
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import zstandard as zstd
+
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstd = None
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DICTIONARY_FILENAME = "dictionary.zdict"
+DEFAULT_DICTIONARY_SIZE = 112640  # zstd 推荐的字典大小（110 KB）
+
+# (起始行, 结束行, 字节偏移, 字节长度)
+BlockSpan = Tuple[int, int, int, int]
+
+
+class ChunkCodec:
+    """压缩后端基类（不压缩）"""
+
+    name = "none"
+    suffix = ".jsonl"
+
+    def compress(self, data: bytes) -> bytes:
+        """压缩为一个独立的帧"""
+        return data
+
+    def decompress(self, data: bytes) -> bytes:
+        """解压一个或多个拼接的帧"""
+        return data
+
+    def describe(self) -> Dict[str, Any]:
+        """写入 metadata.json 的格式描述"""
+        return {"codec": self.name}
+
+
+class PlainCodec(ChunkCodec):
+    """不压缩"""
+
+
+class GzipCodec(ChunkCodec):
+    """gzip 后端（每帧一个 gzip member）"""
+
+    name = "gzip"
+    suffix = ".jsonl.gz"
+
+    def __init__(self, level: Optional[int] = None):
+        self.level = 6 if level is None else level
+
+    def compress(self, data: bytes) -> bytes:
+        return gzip.compress(data, compresslevel=self.level)
+
+    def decompress(self, data: bytes) -> bytes:
+        # gzip.decompress 会依次解压所有拼接的 member
+        return gzip.decompress(data)
+
+    def describe(self) -> Dict[str, Any]:
+        return {"codec": self.name, "level": self.level}
+
+
+class ZstdCodec(ChunkCodec):
+    """Zstandard 后端，可选预训练字典
+
+    压缩器/解压器不是线程安全的，按线程各自持有一份。
+    """
+
+    name = "zstd"
+    suffix = ".jsonl.zst"
+
+    def __init__(self, level: Optional[int] = None, dictionary: Optional[bytes] = None):
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstd 压缩需要安装 zstandard: pip install zstandard")
+        self.level = 3 if level is None else level
+        self.dictionary = dictionary
+        self._dict_data = (
+            zstd.ZstdCompressionDict(dictionary) if dictionary else None
+        )
+        self._local = threading.local()
+
+    @property
+    def dict_id(self) -> int:
+        return self._dict_data.dict_id() if self._dict_data else 0
+
+    def _compressor(self):
+        cctx = getattr(self._local, "cctx", None)
+        if cctx is None:
+            cctx = zstd.ZstdCompressor(
+                level=self.level, dict_data=self._dict_data, write_content_size=True
+            )
+            self._local.cctx = cctx
+        return cctx
+
+    def _decompressor(self):
+        dctx = getattr(self._local, "dctx", None)
+        if dctx is None:
+            dctx = zstd.ZstdDecompressor(dict_data=self._dict_data)
+            self._local.dctx = dctx
+        return dctx
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor().compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        dctx = self._decompressor()
+        parts: List[bytes] = []
+        while data:
+            dobj = dctx.decompressobj()
+            parts.append(dobj.decompress(data))
+            data = dobj.unused_data
+        return b"".join(parts)
+
+    def describe(self) -> Dict[str, Any]:
+        info: Dict[str, Any] = {"codec": self.name, "level": self.level}
+        if self._dict_data:
+            info["dictionary"] = DICTIONARY_FILENAME
+            info["dict_id"] = self.dict_id
+        return info
+
+
+CODECS = {
+    PlainCodec.name: PlainCodec,
+    GzipCodec.name: GzipCodec,
+    ZstdCodec.name: ZstdCodec,
+}
+
+
+def create_codec(
+    name: str,
+    level: Optional[int] = None,
+    dictionary: Optional[bytes] = None,
+) -> ChunkCodec:
+    """按名称创建压缩后端
+
+    Raises:
+        ValueError: 未知的后端名称
+        RuntimeError: zstd 不可用
+    """
+    if name == ZstdCodec.name:
+        return ZstdCodec(level, dictionary)
+    if name == GzipCodec.name:
+        return GzipCodec(level)
+    if name == PlainCodec.name:
+        return PlainCodec()
+    raise ValueError(f"未知的压缩后端: {name}（可选: {', '.join(CODECS)}）")
+
+
+# (字典路径, 修改时间) -> 解码器，LRU，避免批处理大量会话时保留所有字典
+DECODER_CACHE_SIZE = 8
+_decoder_cache: "OrderedDict[Tuple[str, float], ChunkCodec]" = OrderedDict()
+_decoder_lock = threading.Lock()
+
+
+def codec_for_path(filepath: Path) -> ChunkCodec:
+    """按块文件后缀选择解码器，zstd 块使用同目录下的字典（如果有）"""
+    filepath = Path(filepath)
+    if filepath.suffix == ".gz":
+        return GzipCodec()
+    if filepath.suffix != ".zst":
+        return PlainCodec()
+
+    dict_path = filepath.parent / DICTIONARY_FILENAME
+    try:
+        key = (str(dict_path), dict_path.stat().st_mtime)
+    except OSError:
+        key = ("", 0.0)
+
+    with _decoder_lock:
+        codec = _decoder_cache.get(key)
+        if codec is None:
+            dictionary = dict_path.read_bytes() if key[0] else None
+            codec = ZstdCodec(dictionary=dictionary)
+            _decoder_cache[key] = codec
+            while len(_decoder_cache) > DECODER_CACHE_SIZE:
+                _decoder_cache.popitem(last=False)
+        else:
+            _decoder_cache.move_to_end(key)
+        return codec
+
+
+def read_chunk_bytes(filepath: Path) -> bytes:
+    """读取并解压整个块文件"""
+    filepath = Path(filepath)
+    return codec_for_path(filepath).decompress(filepath.read_bytes())
+
+
+def write_blocks(
+    filepath: Path,
+    lines: List[bytes],
+    codec: ChunkCodec,
+    block_size: int,
+) -> List[BlockSpan]:
+    """将已编码的行（含换行符）按块压缩写入文件
+
+    Returns:
+        每个块的 (起始行, 结束行, 字节偏移, 字节长度)
+    """
+    spans: List[BlockSpan] = []
+    offset = 0
+    with open(filepath, "wb") as f:
+        for start in range(0, len(lines), block_size):
+            end = min(start + block_size, len(lines))
+            data = codec.compress(b"".join(lines[start:end]))
+            f.write(data)
+            spans.append((start, end, offset, len(data)))
+            offset += len(data)
+    return spans
+
+
+def load_dictionary(path: Path) -> bytes:
+    """读取字典文件"""
+    return Path(path).read_bytes()
+
+
+def collect_samples(
+    session_dirs: Iterable[Path], max_samples: int = 100000
+) -> List[bytes]:
+    """从已有会话的消息块中收集训练样本（每条消息一个样本）"""
+    from .stream import find_message_files, is_raw_chunk
+
+    samples: List[bytes] = []
+    for session_dir in session_dirs:
+        for filepath in find_message_files(Path(session_dir)):
+            try:
+                data = read_chunk_bytes(filepath)
+            except (OSError, EOFError, ValueError) as e:
+                logger.warning(f"读取样本失败 {filepath}: {e}")
+                continue
+            raw = is_raw_chunk(filepath.name)
+            for line in data.splitlines():
+                if raw:
+                    line = line.partition(b"\t")[2]
+                if line.strip():
+                    samples.append(line + b"\n")
+                    if len(samples) >= max_samples:
+                        return samples
+    return samples
+
+
+def train_dictionary(
+    session_dirs: Iterable[Path],
+    dict_size: int = DEFAULT_DICTIONARY_SIZE,
+    max_samples: int = 100000,
+) -> bytes:
+    """从已有会话训练 zstd 字典
+
+    Args:
+        session_dirs: 会话目录列表
+        dict_size: 字典大小（字节）
+        max_samples: 最多使用的样本数
+
+    Returns:
+        字典内容
+
+    Raises:
+        RuntimeError: zstd 不可用
+        ValueError: 样本不足
+    """
+    if not ZSTD_AVAILABLE:
+        raise RuntimeError("训练字典需要安装 zstandard: pip install zstandard")
+
+    samples = collect_samples(session_dirs, max_samples)
+    if len(samples) < 8:
+        raise ValueError(f"训练样本不足: {len(samples)} 条")
+
+    dictionary = zstd.train_dictionary(dict_size, samples)
+    logger.info(
+        f"训练字典完成: {len(samples)} 条样本, "
+        f"{len(dictionary.as_bytes())} 字节, dict_id={dictionary.dict_id()}"
+    )
+    return dictionary.as_bytes()
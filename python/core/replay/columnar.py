@@ -0,0 +1,518 @@
+"""
+Core Replay Columnar - 列式会话导出
+
+将录制会话按通道拆成列式表，供分析脚本做向量化扫描，
+无需再通过 DataReplayer 逐条解析 JSONL：
+
+- player: 玩家位置/速度/朝向
+- enemies: 敌人位置/血量/状态
+- projectiles: 敌方投射物、玩家泪弹、激光
+- rooms: 房间信息
+
+每张表都带 frame 与 room_index 键列。输出格式：
+- parquet / arrow: 需要 pyarrow
+- npz: 需要 numpy（pyarrow 不可用时的默认格式）
+
+导出按分片（part）增量写入，内存占用与会话长度无关；再次导出同一会话时
+只追加上次导出之后的帧。清单文件 columnar.json 记录分片与进度。
+
+使用示例：
+```python
+from core.replay.columnar import export_columnar, ColumnarSession
+
+export_columnar("recordings/session_xxx")
+cs = ColumnarSession("recordings/session_xxx/columnar")
+frames, counts = cs.enemy_counts()
+```
+"""
+
+import json
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .stream import find_message_files, merge_chunks
+
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+
+    ARROW_AVAILABLE = True
+except ImportError:
+    pa = pa_ipc = pq = None
+    ARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "columnar.json"
+COLUMNAR_DIRNAME = "columnar"
+COLUMNAR_VERSION = 1
+FORMATS = ("parquet", "arrow", "npz")
+DEFAULT_PART_ROWS = 50000
+
+# 投射物类别（projectiles.kind）
+PROJECTILE_KINDS = {"enemy_projectiles": 0, "player_tears": 1, "lasers": 2}
+
+Row = Tuple[Any, ...]
+
+
+@dataclass(frozen=True)
+class TableSpec:
+    """列式表定义
+
+    columns 为 (列名, 类型) 列表，类型为 "i"（整数）、"f"（浮点）或 "b"（布尔）。
+    前两列固定为 frame 与 room_index。
+    """
+
+    name: str
+    channel: str
+    columns: Tuple[Tuple[str, str], ...]
+    extract: Callable[[Any], Iterable[Row]]
+
+    @property
+    def column_names(self) -> List[str]:
+        return [name for name, _ in self.columns]
+
+
+def _num(value: Any, default: float = float("nan")) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _int(value: Any, default: int = -1) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _vec(value: Any) -> Tuple[float, float]:
+    if isinstance(value, dict):
+        return _num(value.get("x")), _num(value.get("y"))
+    return float("nan"), float("nan")
+
+
+def _entries(data: Any) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """列表或以序号为键的字典，统一为 (序号, 条目)"""
+    if isinstance(data, list):
+        items = enumerate(data, 1)
+    elif isinstance(data, dict):
+        items = ((_int(k, 0), v) for k, v in data.items())
+    else:
+        return
+    for idx, entry in items:
+        if isinstance(entry, dict):
+            yield idx, entry
+
+
+def _player_rows(data: Any) -> Iterator[Row]:
+    for idx, p in _entries(data):
+        aim = _vec(p.get("aim_dir"))
+        yield (
+            idx,
+            *_vec(p.get("pos")),
+            *_vec(p.get("vel")),
+            _int(p.get("move_dir")),
+            _int(p.get("fire_dir")),
+            _int(p.get("head_dir")),
+            *aim,
+        )
+
+
+def _enemy_rows(data: Any) -> Iterator[Row]:
+    for _, e in _entries(data):
+        yield (
+            _int(e.get("id")),
+            _int(e.get("type")),
+            _int(e.get("variant"), 0),
+            _int(e.get("subtype"), 0),
+            *_vec(e.get("pos")),
+            *_vec(e.get("vel")),
+            _num(e.get("hp")),
+            _num(e.get("max_hp")),
+            bool(e.get("is_boss")),
+            bool(e.get("is_champion")),
+            _int(e.get("state")),
+            _num(e.get("distance")),
+            _num(e.get("collision_radius")),
+        )
+
+
+def _projectile_rows(data: Any) -> Iterator[Row]:
+    if not isinstance(data, dict):
+        return
+    for key, kind in PROJECTILE_KINDS.items():
+        for _, p in _entries(data.get(key)):
+            yield (
+                kind,
+                _int(p.get("id")),
+                _int(p.get("variant"), 0),
+                *_vec(p.get("pos")),
+                *_vec(p.get("vel")),
+                _num(p.get("collision_radius")),
+                _num(p.get("height")),
+            )
+
+
+def _room_rows(data: Any) -> Iterator[Row]:
+    if not isinstance(data, dict):
+        return
+    yield (
+        _int(data.get("room_idx")),
+        _int(data.get("room_type")),
+        _int(data.get("room_shape")),
+        _int(data.get("stage")),
+        _int(data.get("stage_type")),
+        _int(data.get("grid_width")),
+        _int(data.get("grid_height")),
+        bool(data.get("is_clear")),
+        _int(data.get("enemy_count"), 0),
+        bool(data.get("has_boss")),
+        *_vec(data.get("top_left")),
+        *_vec(data.get("bottom_right")),
+    )
+
+
+_KEYS = (("frame", "i"), ("room_index", "i"))
+
+TABLES: Dict[str, TableSpec] = {
+    spec.name: spec
+    for spec in (
+        TableSpec(
+            "player",
+            "PLAYER_POSITION",
+            _KEYS
+            + (
+                ("player", "i"),
+                ("x", "f"),
+                ("y", "f"),
+                ("vx", "f"),
+                ("vy", "f"),
+                ("move_dir", "i"),
+                ("fire_dir", "i"),
+                ("head_dir", "i"),
+                ("aim_x", "f"),
+                ("aim_y", "f"),
+            ),
+            _player_rows,
+        ),
+        TableSpec(
+            "enemies",
+            "ENEMIES",
+            _KEYS
+            + (
+                ("id", "i"),
+                ("type", "i"),
+                ("variant", "i"),
+                ("subtype", "i"),
+                ("x", "f"),
+                ("y", "f"),
+                ("vx", "f"),
+                ("vy", "f"),
+                ("hp", "f"),
+                ("max_hp", "f"),
+                ("is_boss", "b"),
+                ("is_champion", "b"),
+                ("state", "i"),
+                ("distance", "f"),
+                ("collision_radius", "f"),
+            ),
+            _enemy_rows,
+        ),
+        TableSpec(
+            "projectiles",
+            "PROJECTILES",
+            _KEYS
+            + (
+                ("kind", "i"),
+                ("id", "i"),
+                ("variant", "i"),
+                ("x", "f"),
+                ("y", "f"),
+                ("vx", "f"),
+                ("vy", "f"),
+                ("collision_radius", "f"),
+                ("height", "f"),
+            ),
+            _projectile_rows,
+        ),
+        TableSpec(
+            "rooms",
+            "ROOM_INFO",
+            _KEYS
+            + (
+                ("room_idx", "i"),
+                ("room_type", "i"),
+                ("room_shape", "i"),
+                ("stage", "i"),
+                ("stage_type", "i"),
+                ("grid_width", "i"),
+                ("grid_height", "i"),
+                ("is_clear", "b"),
+                ("enemy_count", "i"),
+                ("has_boss", "b"),
+                ("top_left_x", "f"),
+                ("top_left_y", "f"),
+                ("bottom_right_x", "f"),
+                ("bottom_right_y", "f"),
+            ),
+            _room_rows,
+        ),
+    )
+}
+
+
+def default_format() -> str:
+    """可用的默认输出格式"""
+    if ARROW_AVAILABLE:
+        return "parquet"
+    if NUMPY_AVAILABLE:
+        return "npz"
+    raise RuntimeError("列式导出需要安装 pyarrow 或 numpy")
+
+
+def _check_format(fmt: str) -> None:
+    if fmt not in FORMATS:
+        raise ValueError(f"未知的列式格式: {fmt}（可选: {', '.join(FORMATS)}）")
+    if fmt in ("parquet", "arrow") and not ARROW_AVAILABLE:
+        raise RuntimeError(f"{fmt} 格式需要安装 pyarrow")
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("列式导出需要安装 numpy")
+
+
+_NUMPY_DTYPES = {"i": "int64", "f": "float64", "b": "bool"}
+
+
+def _to_arrays(spec: TableSpec, rows: List[Row]) -> Dict[str, Any]:
+    columns = list(zip(*rows)) if rows else [()] * len(spec.columns)
+    return {
+        name: np.asarray(values, dtype=_NUMPY_DTYPES[kind])
+        for (name, kind), values in zip(spec.columns, columns)
+    }
+
+
+class ColumnarWriter:
+    """列式表分片写入器
+
+    行先缓存在内存中，达到 part_rows 时写出一个分片。
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        fmt: Optional[str] = None,
+        part_rows: int = DEFAULT_PART_ROWS,
+    ):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.format = fmt or default_format()
+        _check_format(self.format)
+        self.part_rows = part_rows
+
+        self.manifest = self._load_manifest()
+        if self.manifest.get("format", self.format) != self.format:
+            raise ValueError(
+                f"已有导出格式为 {self.manifest['format']}，不能追加 {self.format}"
+            )
+        self.manifest["format"] = self.format
+        self.manifest.setdefault("version", COLUMNAR_VERSION)
+        self.manifest.setdefault("last_frame", -1)
+        self.manifest.setdefault("tables", {})
+        for name in TABLES:
+            self.manifest["tables"].setdefault(name, {"rows": 0, "parts": []})
+
+        self._rows: Dict[str, List[Row]] = {name: [] for name in TABLES}
+
+    @property
+    def last_frame(self) -> int:
+        return self.manifest["last_frame"]
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        path = self.output_dir / MANIFEST_FILENAME
+        if not path.exists():
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def add_payload(self, frame: int, room_index: int, payload: Dict[str, Any]) -> None:
+        """提取一条消息负载中的各通道行"""
+        for name, spec in TABLES.items():
+            data = payload.get(spec.channel)
+            if data is None:
+                continue
+            rows = self._rows[name]
+            for row in spec.extract(data):
+                rows.append((frame, room_index) + row)
+            if len(rows) >= self.part_rows:
+                self._write_part(name)
+
+    def mark_frame(self, frame: int) -> None:
+        """记录导出进度"""
+        if frame > self.manifest["last_frame"]:
+            self.manifest["last_frame"] = frame
+
+    def close(self) -> Dict[str, Any]:
+        """写出剩余的行与清单"""
+        for name in TABLES:
+            if self._rows[name]:
+                self._write_part(name)
+        with open(self.output_dir / MANIFEST_FILENAME, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2, ensure_ascii=False)
+        return self.manifest
+
+    def _write_part(self, name: str) -> None:
+        spec = TABLES[name]
+        rows = self._rows[name]
+        self._rows[name] = []
+
+        info = self.manifest["tables"][name]
+        part = f"{name}.part{len(info['parts']):04d}.{self.format}"
+        path = self.output_dir / part
+        arrays = _to_arrays(spec, rows)
+
+        if self.format == "npz":
+            np.savez(path, **arrays)
+        else:
+            table = pa.table(arrays)
+            if self.format == "parquet":
+                pq.write_table(table, path)
+            else:
+                with pa_ipc.new_file(path, table.schema) as writer:
+                    writer.write_table(table)
+
+        info["parts"].append({"file": part, "rows": len(rows)})
+        info["rows"] += len(rows)
+
+
+def export_columnar(
+    session_dir: Path,
+    output_dir: Optional[Path] = None,
+    fmt: Optional[str] = None,
+    part_rows: int = DEFAULT_PART_ROWS,
+) -> Dict[str, Any]:
+    """导出会话为列式表（增量追加）
+
+    Args:
+        session_dir: 会话目录
+        output_dir: 输出目录，默认为会话目录下的 columnar/
+        fmt: "parquet" / "arrow" / "npz"，默认 pyarrow 可用时为 parquet，否则 npz
+        part_rows: 每个分片的最大行数
+
+    Returns:
+        导出清单
+    """
+    session_dir = Path(session_dir)
+    output_dir = Path(output_dir) if output_dir else session_dir / COLUMNAR_DIRNAME
+    writer = ColumnarWriter(output_dir, fmt, part_rows)
+    start_frame = writer.last_frame + 1
+
+    exported = 0
+    for msg in merge_chunks(find_message_files(session_dir), min_frame=start_frame):
+        if msg.payload:
+            writer.add_payload(msg.frame, msg.room_index, msg.payload)
+            exported += 1
+        writer.mark_frame(msg.frame)
+
+    manifest = writer.close()
+    manifest_rows = {name: t["rows"] for name, t in manifest["tables"].items()}
+    logger.info(
+        f"列式导出 {session_dir.name}: {exported} 条消息 (从帧 {start_frame}), "
+        f"行数 {manifest_rows}"
+    )
+    return manifest
+
+
+class ColumnarSession:
+    """列式会话读取器（惰性）
+
+    表在首次访问时按需读取指定列，结果为 numpy 数组字典，适合向量化扫描。
+    """
+
+    def __init__(self, path: Path):
+        path = Path(path)
+        if not (path / MANIFEST_FILENAME).exists() and (
+            path / COLUMNAR_DIRNAME / MANIFEST_FILENAME
+        ).exists():
+            path = path / COLUMNAR_DIRNAME
+        self.path = path
+        with open(path / MANIFEST_FILENAME, "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.format: str = self.manifest["format"]
+        _check_format(self.format)
+        self._cache: Dict[Tuple[str, str], Any] = {}
+
+    @property
+    def tables(self) -> List[str]:
+        return list(self.manifest["tables"])
+
+    @property
+    def last_frame(self) -> int:
+        return self.manifest["last_frame"]
+
+    def num_rows(self, table: str) -> int:
+        return self.manifest["tables"][table]["rows"]
+
+    def columns(self, table: str) -> List[str]:
+        return TABLES[table].column_names
+
+    def iter_parts(
+        self, table: str, columns: Optional[List[str]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """逐分片读取（适合超出内存的扫描）"""
+        columns = columns or self.columns(table)
+        for part in self.manifest["tables"][table]["parts"]:
+            yield self._read_part(self.path / part["file"], columns)
+
+    def _read_part(self, path: Path, columns: List[str]) -> Dict[str, Any]:
+        if self.format == "npz":
+            with np.load(path) as data:
+                return {c: data[c] for c in columns}
+        if self.format == "parquet":
+            table = pq.read_table(path, columns=columns)
+        else:
+            with pa_ipc.open_file(path) as reader:
+                table = reader.read_all().select(columns)
+        return {c: table.column(c).to_numpy() for c in columns}
+
+    def column(self, table: str, name: str) -> Any:
+        """读取整列（缓存）"""
+        key = (table, name)
+        if key not in self._cache:
+            spec = TABLES[table]
+            dtype = _NUMPY_DTYPES[dict(spec.columns)[name]]
+            parts = [part[name] for part in self.iter_parts(table, [name])]
+            self._cache[key] = (
+                np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+            )
+        return self._cache[key]
+
+    def table(self, table: str, columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        """读取表的多列"""
+        return {c: self.column(table, c) for c in columns or self.columns(table)}
+
+    # ==================== 常用分析 ====================
+
+    def player_trajectory(self, player: int = 1) -> Tuple[Any, Any, Any]:
+        """玩家轨迹 (frame, x, y)"""
+        mask = self.column("player", "player") == player
+        return (
+            self.column("player", "frame")[mask],
+            self.column("player", "x")[mask],
+            self.column("player", "y")[mask],
+        )
+
+    def enemy_counts(self) -> Tuple[Any, Any]:
+        """每帧敌人数量 (frame, count)，只包含有敌人的帧"""
+        return np.unique(self.column("enemies", "frame"), return_counts=True)
@@ -0,0 +1,254 @@
+"""
+Core Replay Harness - 虚拟时钟快进回放
+
+不按实时节奏等待，以消费方能处理的最快速度驱动处理管线：
+
+- 虚拟时钟：按帧号推导 received_at 与 game_time（默认 30 帧/秒），
+  消费方看到的时间与真实回放一致，且每次运行结果确定
+- 直接调用消费方（例如 SocketBridgeFacade.process_message），
+  或通过 LuaSimulator 以线速写入套接字
+- 报告持续吞吐量（消息/秒、帧/秒）与逐帧处理延迟分布
+
+使用示例：
+```python
+from core.replay import DataReplayer, FastForwardHarness
+from services.facade import SocketBridgeFacade
+
+replayer = DataReplayer()
+replayer.load_session("session_20260202_234038")
+report = FastForwardHarness(replayer).run(SocketBridgeFacade().process_message)
+print(report.summary())
+```
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .message import RawMessage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FRAME_DELAY = 1.0 / 30
+
+
+def percentile(values: List[float], p: float) -> float:
+    """百分位（最近秩），values 为空时返回 0"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(p / 100 * (len(ordered) - 1)))))
+    return ordered[k]
+
+
+def latency_summary(values: List[float]) -> Dict[str, float]:
+    """延迟分布摘要（mean / p50 / p90 / p99 / max）"""
+    return {
+        "mean": sum(values) / len(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else 0.0,
+    }
+
+
+class VirtualClock:
+    """虚拟时钟：时间只由帧号决定"""
+
+    def __init__(
+        self,
+        frame_delay: float = DEFAULT_FRAME_DELAY,
+        start_time: float = 0.0,
+        start_game_time: int = 0,
+    ):
+        """
+        Args:
+            frame_delay: 每帧时长（秒）
+            start_time: 第一帧对应的 received_at
+            start_game_time: 第一帧对应的 game_time（毫秒）
+        """
+        self.frame_delay = frame_delay
+        self.start_time = start_time
+        self.start_game_time = start_game_time
+        self.origin_frame: Optional[int] = None
+        self.frame = 0
+
+    def advance(self, frame: int) -> None:
+        """推进到指定帧（第一次调用确定时间原点）"""
+        if self.origin_frame is None:
+            self.origin_frame = frame
+        self.frame = frame
+
+    @property
+    def elapsed(self) -> float:
+        """自第一帧起经过的虚拟时间（秒）"""
+        if self.origin_frame is None:
+            return 0.0
+        return (self.frame - self.origin_frame) * self.frame_delay
+
+    def now(self) -> float:
+        """当前虚拟 received_at"""
+        return self.start_time + self.elapsed
+
+    def game_time(self) -> int:
+        """当前虚拟 game_time（毫秒）"""
+        return self.start_game_time + int(round(self.elapsed * 1000))
+
+
+@dataclass
+class ThroughputReport:
+    """快进回放报告"""
+
+    messages: int = 0
+    frames: int = 0
+    errors: int = 0
+    elapsed: float = 0.0  # 实际耗时（秒）
+    virtual_elapsed: float = 0.0  # 虚拟时间跨度（秒）
+    frame_latencies_ms: List[float] = field(default_factory=list, repr=False)
+
+    @property
+    def messages_per_sec(self) -> float:
+        return self.messages / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def frames_per_sec(self) -> float:
+        return self.frames / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def speedup(self) -> float:
+        """相对实时回放的倍数"""
+        return self.virtual_elapsed / self.elapsed if self.elapsed > 0 else 0.0
+
+    def percentile(self, p: float) -> float:
+        """逐帧处理延迟的百分位（毫秒）"""
+        return percentile(self.frame_latencies_ms, p)
+
+    def latency(self) -> Dict[str, float]:
+        return latency_summary(self.frame_latencies_ms)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "messages": self.messages,
+            "frames": self.frames,
+            "errors": self.errors,
+            "elapsed": round(self.elapsed, 4),
+            "virtual_elapsed": round(self.virtual_elapsed, 4),
+            "messages_per_sec": round(self.messages_per_sec, 1),
+            "frames_per_sec": round(self.frames_per_sec, 1),
+            "speedup": round(self.speedup, 1),
+            "frame_latency_ms": {k: round(v, 4) for k, v in self.latency().items()},
+        }
+
+    def summary(self) -> str:
+        latency = self.latency()
+        return (
+            f"{self.messages} 条消息 / {self.frames} 帧, 耗时 {self.elapsed:.2f}s "
+            f"({self.messages_per_sec:.0f} msg/s, {self.speedup:.1f}x 实时), "
+            f"帧延迟 p50={latency['p50']:.3f}ms p99={latency['p99']:.3f}ms "
+            f"max={latency['max']:.3f}ms, 错误 {self.errors}"
+        )
+
+
+class FastForwardHarness:
+    """快进回放驱动器
+
+    从回放器按帧顺序读取消息（不等待），改写为虚拟时间后交给消费方。
+    """
+
+    def __init__(
+        self,
+        replayer,
+        frame_delay: float = DEFAULT_FRAME_DELAY,
+        rewrite_game_time: bool = True,
+    ):
+        """
+        Args:
+            replayer: 已加载会话的 DataReplayer
+            frame_delay: 虚拟时钟每帧时长（秒）
+            rewrite_game_time: 是否同时改写 game_time（否则保留录制值）
+        """
+        self.replayer = replayer
+        self.frame_delay = frame_delay
+        self.rewrite_game_time = rewrite_game_time
+        self.clock = VirtualClock(frame_delay)
+
+    def iter_messages(self, max_frames: Optional[int] = None) -> Iterator[RawMessage]:
+        """以虚拟时间迭代消息"""
+        clock = self.clock = VirtualClock(self.frame_delay)
+        frames = 0
+        last_frame = None
+        for msg in self.replayer.iter_messages(speed=0):
+            if msg.frame != last_frame:
+                frames += 1
+                if max_frames is not None and frames > max_frames:
+                    return
+                last_frame = msg.frame
+                clock.advance(msg.frame)
+            # 复制后改写，不影响回放器缓存的消息
+            update = {"received_at": clock.now()}
+            if self.rewrite_game_time:
+                update["game_time"] = clock.game_time()
+            yield msg.model_copy(update=update)
+
+    def run(
+        self,
+        consumer: Callable[[Dict[str, Any]], Any],
+        max_frames: Optional[int] = None,
+        as_dict: bool = True,
+    ) -> ThroughputReport:
+        """以最快速度把消息交给消费方
+
+        Args:
+            consumer: 消息处理函数（例如 SocketBridgeFacade.process_message）
+            max_frames: 最多回放的帧数
+            as_dict: 传给消费方的是协议字典（True）还是 RawMessage
+
+        Returns:
+            吞吐量与逐帧延迟报告；消费方抛出的异常计入 errors，不中断回放
+        """
+        report = ThroughputReport()
+        latencies = report.frame_latencies_ms
+        perf = time.perf_counter
+
+        frame = None
+        frame_cost = 0.0
+        start = perf()
+        for msg in self.iter_messages(max_frames):
+            if msg.frame != frame:
+                if frame is not None:
+                    latencies.append(frame_cost * 1000)
+                frame, frame_cost = msg.frame, 0.0
+                report.frames += 1
+
+            item = msg.to_dict() if as_dict else msg
+            t0 = perf()
+            try:
+                consumer(item)
+            except Exception as e:
+                report.errors += 1
+                if report.errors <= 10:
+                    logger.warning(f"消费方处理帧 {msg.frame} 失败: {e}")
+            frame_cost += perf() - t0
+            report.messages += 1
+
+        if frame is not None:
+            latencies.append(frame_cost * 1000)
+        report.elapsed = perf() - start
+        report.virtual_elapsed = self.clock.elapsed + (self.frame_delay if report.frames else 0)
+        logger.info(f"快进回放完成: {report.summary()}")
+        return report
+
+
+def run_facade(replayer, facade=None, **kwargs) -> ThroughputReport:
+    """以最快速度把会话送入 SocketBridgeFacade.process_message"""
+    if facade is None:
+        try:
+            from services.facade import SocketBridgeFacade
+        except ImportError:
+            from python.services.facade import SocketBridgeFacade
+        facade = SocketBridgeFacade()
+    max_frames = kwargs.pop("max_frames", None)
+    return FastForwardHarness(replayer, **kwargs).run(
+        facade.process_message, max_frames=max_frames
+    )
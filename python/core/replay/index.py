@@ -0,0 +1,345 @@
+"""
+Core Replay Index - 帧偏移索引
+
+会话目录中的二进制旁路索引（index.bin），记录：
+- 块条目: 消息块文件中每个压缩块的帧范围与字节位置
+- 房间标记: 房间切换发生的帧
+
+压缩块文件由多个独立的压缩帧（gzip member 或 zstd frame）拼接而成，每个帧
+即一个块（重启点），可以直接定位到字节偏移解压，无需从文件头开始解码。
+拼接后的文件仍是合法的 gzip/zstd 文件，旧的读取方式不受影响。
+
+文件格式（小端）::
+
+    header: b"SBIX" + u16 版本
+    块条目: b"B" + u32 first_frame + u32 last_frame + u32 count
+            + u64 offset + u64 length + u16 name_len + name(utf-8)
+    房间标记: b"R" + u32 frame + i32 room_index
+
+条目只追加写入，录制过程中崩溃时已写入的条目依然有效。
+"""
+
+import bisect
+import logging
+import struct
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from .codec import BlockSpan, ChunkCodec, codec_for_path, write_blocks
+from .message import RawMessage
+from .stream import (
+    Record,
+    find_message_files,
+    is_raw_chunk,
+    merge_sources,
+    parse_lines,
+)
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "index.bin"
+INDEX_MAGIC = b"SBIX"
+INDEX_VERSION = 1
+
+_HEADER = struct.Struct("<4sH")
+_BLOCK = struct.Struct("<IIIQQH")
+_ROOM = struct.Struct("<Ii")
+
+
+@dataclass
+class BlockEntry:
+    """块条目"""
+
+    chunk: str  # 块文件名（相对会话目录）
+    offset: int  # 字节偏移
+    length: int  # 字节长度
+    first_frame: int  # 块内最小帧号
+    last_frame: int  # 块内最大帧号
+    count: int  # 消息数
+
+
+@dataclass
+class RoomMarker:
+    """房间切换标记"""
+
+    frame: int
+    room_index: int
+
+
+@dataclass
+class SessionIndex:
+    """会话索引
+
+    块按写入顺序排列。seek 时对“截至该块的最大帧号”做二分查找，
+    即可定位第一个可能包含目标帧的块。
+    """
+
+    session_dir: Path
+    blocks: List[BlockEntry] = field(default_factory=list)
+    rooms: List[RoomMarker] = field(default_factory=list)
+
+    _max_last: List[int] = field(default_factory=list, repr=False)
+
+    def __post_init__(self):
+        self._rebuild_lookup()
+
+    def _rebuild_lookup(self) -> None:
+        running = -1
+        self._max_last = []
+        for block in self.blocks:
+            running = max(running, block.last_frame)
+            self._max_last.append(running)
+
+    # ==================== 读写 ====================
+
+    @classmethod
+    def load(cls, session_dir: Path) -> Optional["SessionIndex"]:
+        """读取会话索引，不存在或格式不符时返回 None"""
+        session_dir = Path(session_dir)
+        path = session_dir / INDEX_FILENAME
+        if not path.exists():
+            return None
+
+        data = path.read_bytes()
+        if len(data) < _HEADER.size:
+            return None
+        magic, version = _HEADER.unpack_from(data, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            logger.warning(f"索引格式不支持: {path}")
+            return None
+
+        index = cls(session_dir=session_dir)
+        pos = _HEADER.size
+        try:
+            while pos < len(data):
+                tag = data[pos : pos + 1]
+                pos += 1
+                if tag == b"B":
+                    first, last, count, offset, length, name_len = _BLOCK.unpack_from(
+                        data, pos
+                    )
+                    pos += _BLOCK.size
+                    name = data[pos : pos + name_len].decode("utf-8")
+                    pos += name_len
+                    index.blocks.append(
+                        BlockEntry(name, offset, length, first, last, count)
+                    )
+                elif tag == b"R":
+                    frame, room_index = _ROOM.unpack_from(data, pos)
+                    pos += _ROOM.size
+                    index.rooms.append(RoomMarker(frame, room_index))
+                else:
+                    raise ValueError(f"未知条目类型 {tag!r}")
+        except (struct.error, ValueError, UnicodeDecodeError) as e:
+            # 末尾不完整的条目（录制中断）直接丢弃
+            logger.warning(f"索引在 {pos} 处截断: {e}")
+
+        index._rebuild_lookup()
+        return index
+
+    def save(self) -> Path:
+        """完整写出索引"""
+        path = self.session_dir / INDEX_FILENAME
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(INDEX_MAGIC, INDEX_VERSION))
+            for block in self.blocks:
+                f.write(_pack_block(block))
+            for room in self.rooms:
+                f.write(_pack_room(room))
+        return path
+
+    # ==================== 查询 ====================
+
+    @property
+    def total_messages(self) -> int:
+        return sum(block.count for block in self.blocks)
+
+    def find_block(self, frame: int) -> int:
+        """第一个可能包含 >= frame 消息的块序号（越界时返回块数）"""
+        return bisect.bisect_left(self._max_last, frame)
+
+    def find_room_frame(self, room_index: int, occurrence: int = 0) -> Optional[int]:
+        """第 occurrence 次进入房间的帧号"""
+        seen = 0
+        for marker in self.rooms:
+            if marker.room_index == room_index:
+                if seen == occurrence:
+                    return marker.frame
+                seen += 1
+        return None
+
+    def room_at_frame(self, frame: int) -> int:
+        """指定帧所在的房间（无标记时返回 -1）"""
+        room_index = -1
+        for marker in self.rooms:
+            if marker.frame > frame:
+                break
+            room_index = marker.room_index
+        return room_index
+
+    def read_block(self, block: BlockEntry) -> List[Record]:
+        """读取单个块（只读取该块的字节范围）"""
+        path = self.session_dir / block.chunk
+        try:
+            with open(path, "rb") as f:
+                f.seek(block.offset)
+                raw = f.read(block.length)
+            raw = codec_for_path(path).decompress(raw)
+        except (OSError, EOFError, ValueError, RuntimeError) as e:
+            logger.warning(f"读取索引块失败 {block.chunk}@{block.offset}: {e}")
+            return []
+        return parse_lines(
+            raw.decode("utf-8").splitlines(), block.chunk, raw=is_raw_chunk(block.chunk)
+        )
+
+    def iter_messages(self, start_frame: int = 0) -> Iterator[RawMessage]:
+        """从指定帧开始按帧顺序迭代消息，跳过之前的所有块"""
+        start = self.find_block(start_frame)
+        loaders: Iterable[Callable[[], List[Record]]] = (
+            (lambda b=block: self.read_block(b)) for block in self.blocks[start:]
+        )
+        return merge_sources(loaders, min_frame=start_frame)
+
+
+def _pack_block(block: BlockEntry) -> bytes:
+    name = block.chunk.encode("utf-8")
+    return (
+        b"B"
+        + _BLOCK.pack(
+            block.first_frame,
+            block.last_frame,
+            block.count,
+            block.offset,
+            block.length,
+            len(name),
+        )
+        + name
+    )
+
+
+def _pack_room(room: RoomMarker) -> bytes:
+    return b"R" + _ROOM.pack(room.frame, room.room_index)
+
+
+class IndexWriter:
+    """录制时的索引写入器（追加写入）"""
+
+    def __init__(self, session_dir: Path):
+        self.path = Path(session_dir) / INDEX_FILENAME
+        self._last_room: Optional[int] = None
+        if not self.path.exists():
+            with open(self.path, "wb") as f:
+                f.write(_HEADER.pack(INDEX_MAGIC, INDEX_VERSION))
+
+    def write_chunk(
+        self,
+        filepath: Path,
+        messages: List[RawMessage],
+        codec: ChunkCodec,
+        block_size: int,
+    ) -> int:
+        """按块写出消息文件并追加索引条目
+
+        Args:
+            filepath: 块文件路径
+            messages: 消息列表（接收顺序）
+            codec: 压缩后端（每个块一个独立的压缩帧）
+            block_size: 每块消息数
+
+        Returns:
+            写入的字节数
+        """
+        return self.write_lines(
+            filepath,
+            [msg.to_json_line().encode("utf-8") for msg in messages],
+            [msg.frame for msg in messages],
+            [msg.room_index for msg in messages],
+            codec,
+            block_size,
+        )
+
+    def write_lines(
+        self,
+        filepath: Path,
+        lines: List[bytes],
+        frames: List[int],
+        rooms: List[int],
+        codec: ChunkCodec,
+        block_size: int,
+    ) -> int:
+        """按块写出已编码的行（含换行符）并追加索引条目"""
+        spans = write_blocks(filepath, lines, codec, block_size)
+        self.append_blocks(filepath.name, spans, frames, rooms)
+        return sum(length for _, _, _, length in spans)
+
+    def append_blocks(
+        self,
+        chunk: str,
+        spans: List[BlockSpan],
+        frames: List[int],
+        rooms: List[int],
+    ) -> None:
+        """为已写出的块追加索引条目"""
+        entries: List[bytes] = []
+        for start, end, offset, length in spans:
+            block_frames = frames[start:end]
+            entries.append(
+                _pack_block(
+                    BlockEntry(
+                        chunk=chunk,
+                        offset=offset,
+                        length=length,
+                        first_frame=min(block_frames),
+                        last_frame=max(block_frames),
+                        count=len(block_frames),
+                    )
+                )
+            )
+            for frame, room_index in zip(block_frames, rooms[start:end]):
+                if room_index != self._last_room:
+                    self._last_room = room_index
+                    entries.append(_pack_room(RoomMarker(frame, room_index)))
+
+        with open(self.path, "ab") as f:
+            f.write(b"".join(entries))
+
+
+def build_index(session_dir: Path, save: bool = True) -> SessionIndex:
+    """为没有索引的旧会话构建索引（每个块文件作为一个块）"""
+    session_dir = Path(session_dir)
+    index = SessionIndex(session_dir=session_dir)
+    last_room: Optional[int] = None
+
+    for filepath in find_message_files(session_dir):
+        records = index.read_block(
+            BlockEntry(filepath.name, 0, filepath.stat().st_size, 0, 0, 0)
+        )
+        if not records:
+            continue
+        index.blocks.append(
+            BlockEntry(
+                chunk=filepath.name,
+                offset=0,
+                length=filepath.stat().st_size,
+                first_frame=records[0][0][0],
+                last_frame=records[-1][0][0],
+                count=len(records),
+            )
+        )
+        for (frame, _), data in records:
+            room_index = data.get("room_index", -1)
+            if room_index != last_room:
+                last_room = room_index
+                index.rooms.append(RoomMarker(frame, room_index))
+
+    index._rebuild_lookup()
+    if save:
+        index.save()
+        logger.info(f"已为会话构建索引: {session_dir.name}, 块数: {len(index.blocks)}")
+    return index
+
+
+def load_or_build_index(session_dir: Path) -> SessionIndex:
+    """读取会话索引，不存在时为旧会话构建"""
+    return SessionIndex.load(session_dir) or build_index(session_dir)
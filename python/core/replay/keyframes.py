@@ -0,0 +1,167 @@
+"""
+Core Replay Keyframes - 累积状态关键帧
+
+get_state_at_frame 的累积状态（按帧顺序对 payload 做 dict.update）每隔约
+interval 帧保存一个快照。查询帧 F 时取不晚于 F 的最近关键帧，再应用其后
+至多 interval 帧的增量消息。
+
+关键帧在首次查询时构建，缓存到会话目录的 keyframes.jsonl.gz：
+第一行为头部（间隔与消息文件签名），之后每行一个关键帧。
+消息文件变化（签名不符）时自动重建。
+"""
+
+import bisect
+import gzip
+import json
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .message import RawMessage
+
+logger = logging.getLogger(__name__)
+
+KEYFRAMES_FILENAME = "keyframes.jsonl.gz"
+KEYFRAMES_VERSION = 1
+DEFAULT_KEYFRAME_INTERVAL = 300
+
+
+def files_signature(files: Iterable[Path]) -> List[List[Any]]:
+    """消息文件签名（文件名与大小），用于判断缓存是否过期"""
+    signature = []
+    for path in files:
+        try:
+            signature.append([path.name, path.stat().st_size])
+        except OSError:
+            signature.append([path.name, -1])
+    return signature
+
+
+@dataclass
+class KeyframeStore:
+    """关键帧存储"""
+
+    interval: int = DEFAULT_KEYFRAME_INTERVAL
+    frames: List[int] = field(default_factory=list)
+    states: List[Dict[str, Any]] = field(default_factory=list)
+    signature: List[List[Any]] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.frames)
+
+    @classmethod
+    def build(
+        cls,
+        messages: Iterable[RawMessage],
+        interval: int = DEFAULT_KEYFRAME_INTERVAL,
+        signature: Optional[List[List[Any]]] = None,
+    ) -> "KeyframeStore":
+        """按帧顺序遍历消息构建关键帧
+
+        关键帧 K 的状态包含所有 frame <= K 的消息。
+        """
+        store = cls(interval=interval, signature=signature or [])
+        state: Dict[str, Any] = {}
+        last_frame = -1
+        next_keyframe = -1
+
+        for msg in messages:
+            if msg.frame != last_frame:
+                if last_frame >= 0 and last_frame >= next_keyframe:
+                    store._append(last_frame, state)
+                    next_keyframe = last_frame + interval
+                last_frame = msg.frame
+            if msg.payload:
+                state.update(msg.payload)
+
+        if last_frame >= 0 and (not store.frames or store.frames[-1] != last_frame):
+            store._append(last_frame, state)
+        return store
+
+    def _append(self, frame: int, state: Dict[str, Any]) -> None:
+        # payload 按通道整体替换，不会原地修改，浅拷贝即可
+        self.frames.append(frame)
+        self.states.append(dict(state))
+
+    def find(self, frame: int) -> int:
+        """不晚于 frame 的最近关键帧序号（没有时返回 -1）"""
+        return bisect.bisect_right(self.frames, frame) - 1
+
+    # ==================== 磁盘缓存 ====================
+
+    def save(self, path: Path) -> None:
+        header = {
+            "version": KEYFRAMES_VERSION,
+            "interval": self.interval,
+            "signature": self.signature,
+        }
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps(header) + "\n")
+            for frame, state in zip(self.frames, self.states):
+                f.write(json.dumps({"frame": frame, "state": state}) + "\n")
+
+    @classmethod
+    def load(
+        cls,
+        path: Path,
+        interval: int,
+        signature: List[List[Any]],
+    ) -> Optional["KeyframeStore"]:
+        """读取缓存，间隔或签名不符时返回 None"""
+        if not path.exists():
+            return None
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                header = json.loads(f.readline())
+                if (
+                    header.get("version") != KEYFRAMES_VERSION
+                    or header.get("interval") != interval
+                    or header.get("signature") != signature
+                ):
+                    return None
+                store = cls(interval=interval, signature=signature)
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        store.frames.append(entry["frame"])
+                        store.states.append(entry["state"])
+                return store
+        except (OSError, EOFError, ValueError, KeyError) as e:
+            logger.warning(f"读取关键帧缓存失败 {path}: {e}")
+            return None
+
+
+def load_or_build_keyframes(
+    session_dir: Path,
+    files: List[Path],
+    messages_factory,
+    interval: int = DEFAULT_KEYFRAME_INTERVAL,
+    cache: bool = True,
+) -> KeyframeStore:
+    """读取会话的关键帧缓存，不存在或过期时构建
+
+    Args:
+        session_dir: 会话目录
+        files: 消息文件（用于缓存签名）
+        messages_factory: 返回按帧顺序消息迭代器的函数
+        interval: 关键帧间隔（帧）
+        cache: 是否读写磁盘缓存
+    """
+    path = Path(session_dir) / KEYFRAMES_FILENAME
+    signature = files_signature(files)
+
+    if cache:
+        store = KeyframeStore.load(path, interval, signature)
+        if store is not None:
+            return store
+
+    store = KeyframeStore.build(messages_factory(), interval, signature)
+    if cache:
+        try:
+            store.save(path)
+        except OSError as e:
+            logger.warning(f"写入关键帧缓存失败 {path}: {e}")
+    logger.info(f"构建关键帧: {store.count} 个, 间隔 {interval} 帧")
+    return store
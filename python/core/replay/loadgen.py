@@ -0,0 +1,524 @@
+"""
+Core Replay Load Generator - 合成负载生成
+
+基于 LuaSimulator 生成 v2.1 流量，测量桥接器与处理管线的扩展极限：
+
+- SyntheticSession: 合成流量（实体数量、投射物爆发、通道采集间隔、房间切换）
+- scale_messages: 放大录制会话（例如敌人 ×10）
+- LoadClient: 一个模拟游戏客户端，按速率或线速发送
+- LoadGenerator: 并发运行 N 个客户端，统计吞吐量、丢失率和端到端延迟
+
+IsaacBridge 每个监听端口只服务一个客户端（新连接会替换旧连接），
+因此 N 个客户端对应 N 个桥接器实例（run_bridge_load 在进程内启动）。
+
+端到端延迟：客户端在每行写入 sent_at（time.time()）和 client，
+BridgeProbe 在桥接器的 raw_message 回调中计算接收时间差。
+
+使用示例：
+```python
+from core.replay.loadgen import LoadProfile, run_bridge_load
+
+report = run_bridge_load(LoadProfile(frames=3000, enemies=40), clients=4)
+print(report.summary())
+```
+"""
+
+import json
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .harness import latency_summary
+from .message import RawMessage
+from .replayer import DEFAULT_HOST, DEFAULT_PORT, LuaSimulator
+
+logger = logging.getLogger(__name__)
+
+# 通道 -> 采集间隔（帧），与 Lua 端默认配置一致
+DEFAULT_CHANNEL_INTERVALS: Dict[str, int] = {
+    "PLAYER_POSITION": 1,
+    "ENEMIES": 1,
+    "PROJECTILES": 1,
+    "PLAYER_HEALTH": 15,
+    "PLAYER_STATS": 15,
+    "ROOM_INFO": 30,
+}
+
+_INTERVAL_NAMES = ((1, "HIGH"), (5, "MEDIUM"), (30, "LOW"))
+
+# 放大会话时复制实体的 id 偏移
+_SCALE_ID_STRIDE = 100000
+
+
+def _interval_name(frames: int) -> str:
+    for limit, name in _INTERVAL_NAMES:
+        if frames <= limit:
+            return name
+    return "RARE"
+
+
+# ==================== 流量来源 ====================
+
+
+@dataclass
+class LoadProfile:
+    """合成流量配置"""
+
+    frames: int = 1800  # 帧数（30 帧/秒时为 1 分钟）
+    enemies: int = 10  # 每帧敌人数
+    projectiles: int = 20  # 每帧敌方投射物数
+    burst_every: int = 0  # 每隔多少帧出现一次投射物爆发（0 表示不爆发）
+    burst_size: int = 200  # 爆发时的投射物数
+    burst_frames: int = 10  # 爆发持续帧数
+    room_every: int = 900  # 每隔多少帧切换房间
+    channel_intervals: Dict[str, int] = field(
+        default_factory=lambda: dict(DEFAULT_CHANNEL_INTERVALS)
+    )
+    start_frame: int = 1
+    seed: int = 0
+
+
+class SyntheticSession:
+    """合成 v2.1 流量（相同配置与种子生成相同的消息序列）"""
+
+    def __init__(self, profile: Optional[LoadProfile] = None):
+        self.profile = profile or LoadProfile()
+
+    def _vec(self, rng: random.Random, lo: float, hi: float) -> Dict[str, float]:
+        return {"x": round(rng.uniform(lo, hi), 2), "y": round(rng.uniform(lo, hi), 2)}
+
+    def _enemies(self, rng: random.Random, count: int, room: int) -> List[Dict[str, Any]]:
+        return [
+            {
+                "id": i + 1,
+                "type": 10 + (room + i) % 20,
+                "variant": 0,
+                "subtype": 0,
+                "pos": self._vec(rng, 60, 580),
+                "vel": self._vec(rng, -3, 3),
+                "hp": 10.0,
+                "max_hp": 10.0,
+                "is_boss": False,
+                "distance": round(rng.uniform(0, 400), 2),
+            }
+            for i in range(count)
+        ]
+
+    def _projectiles(self, rng: random.Random, count: int) -> Dict[str, Any]:
+        return {
+            "enemy_projectiles": [
+                {"id": 1000 + i, "pos": self._vec(rng, 60, 580), "vel": self._vec(rng, -8, 8)}
+                for i in range(count)
+            ],
+            "player_tears": [],
+            "lasers": [],
+        }
+
+    def _channel(self, name: str, rng: random.Random, frame: int, room: int) -> Any:
+        profile = self.profile
+        if name == "PLAYER_POSITION":
+            return [
+                {
+                    "pos": self._vec(rng, 60, 580),
+                    "vel": self._vec(rng, -5, 5),
+                    "move_dir": rng.randint(-1, 7),
+                    "fire_dir": rng.randint(-1, 7),
+                    "head_dir": rng.randint(0, 7),
+                    "aim_dir": {"x": 0.0, "y": 0.0},
+                }
+            ]
+        if name == "ENEMIES":
+            return self._enemies(rng, profile.enemies, room)
+        if name == "PROJECTILES":
+            count = profile.projectiles
+            if profile.burst_every and (frame % profile.burst_every) < profile.burst_frames:
+                count = profile.burst_size
+            return self._projectiles(rng, count)
+        if name == "PLAYER_HEALTH":
+            return [{"red_hearts": 6, "max_hearts": 6, "soul_hearts": 0}]
+        if name == "PLAYER_STATS":
+            return [{"player_type": 0, "damage": 3.5, "speed": 1.0, "tears": 10.0}]
+        if name == "ROOM_INFO":
+            return {"room_idx": room, "room_type": 1, "is_clear": False, "has_boss": False}
+        return {}
+
+    def iter_messages(self) -> Iterator[RawMessage]:
+        profile = self.profile
+        rng = random.Random(profile.seed)
+        for seq, frame in enumerate(
+            range(profile.start_frame, profile.start_frame + profile.frames)
+        ):
+            offset = frame - profile.start_frame
+            room = 1 + (offset // profile.room_every if profile.room_every else 0)
+            payload: Dict[str, Any] = {}
+            meta: Dict[str, Dict[str, Any]] = {}
+            for name, interval in profile.channel_intervals.items():
+                # 房间切换的第一帧发送全部通道
+                if offset % max(1, interval) and not (
+                    profile.room_every and offset % profile.room_every == 0
+                ):
+                    continue
+                payload[name] = self._channel(name, rng, frame, room)
+                meta[name] = {
+                    "channel": name,
+                    "collect_frame": frame,
+                    "interval": _interval_name(interval),
+                }
+            yield RawMessage(
+                msg_type="DATA",
+                seq=seq,
+                frame=frame,
+                prev_frame=frame - 1 if seq else None,
+                game_time=offset * 33,
+                timestamp=offset * 33,
+                room_index=room,
+                payload=payload,
+                channels=list(payload),
+                channel_meta=meta,
+            )
+
+    __iter__ = iter_messages
+
+
+def scale_message(
+    msg: RawMessage, enemy_factor: int = 1, projectile_factor: int = 1
+) -> RawMessage:
+    """复制消息中的敌人/敌方投射物（新 id，位置轻微偏移）"""
+    payload = msg.payload
+    if not payload or (enemy_factor <= 1 and projectile_factor <= 1):
+        return msg
+
+    def replicate(items: Any, factor: int) -> Any:
+        if factor <= 1 or not isinstance(items, list):
+            return items
+        scaled = list(items)
+        for k in range(1, factor):
+            for item in items:
+                if not isinstance(item, dict):
+                    continue
+                copy = dict(item)
+                copy["id"] = int(item.get("id", 0)) + k * _SCALE_ID_STRIDE
+                pos = item.get("pos")
+                if isinstance(pos, dict):
+                    copy["pos"] = {"x": pos.get("x", 0) + k, "y": pos.get("y", 0) + k}
+                scaled.append(copy)
+        return scaled
+
+    payload = dict(payload)
+    if "ENEMIES" in payload:
+        payload["ENEMIES"] = replicate(payload["ENEMIES"], enemy_factor)
+    projectiles = payload.get("PROJECTILES")
+    if isinstance(projectiles, dict) and "enemy_projectiles" in projectiles:
+        projectiles = dict(projectiles)
+        projectiles["enemy_projectiles"] = replicate(
+            projectiles["enemy_projectiles"], projectile_factor
+        )
+        payload["PROJECTILES"] = projectiles
+    return msg.model_copy(update={"payload": payload})
+
+
+def scale_messages(
+    messages: Iterable[RawMessage], enemy_factor: int = 1, projectile_factor: int = 1
+) -> Iterator[RawMessage]:
+    """放大录制会话（例如 replayer.iter_messages(speed=0)）"""
+    for msg in messages:
+        yield scale_message(msg, enemy_factor, projectile_factor)
+
+
+# ==================== 客户端 ====================
+
+
+@dataclass
+class ClientStats:
+    """单个客户端的发送统计"""
+
+    client: int
+    sent: int = 0
+    bytes: int = 0
+    elapsed: float = 0.0
+    error: Optional[str] = None
+
+
+class LoadClient(LuaSimulator):
+    """模拟游戏客户端
+
+    每行额外写入 client、seq（客户端内从 0 递增）和 sent_at，供接收端统计丢失与延迟。
+    """
+
+    def __init__(
+        self,
+        client_id: int,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        rate: float = 0.0,
+        batch_size: int = 64,
+    ):
+        """
+        Args:
+            client_id: 客户端编号
+            rate: 每秒消息数；<= 0 表示线速（按 batch_size 合并写入）
+            batch_size: 线速模式下每次写入的消息数
+        """
+        super().__init__(host, port)
+        self.client_id = client_id
+        self.rate = rate
+        self.batch_size = max(1, batch_size)
+        self.stats = ClientStats(client=client_id)
+
+    def _encode(self, msg: RawMessage, seq: int) -> bytes:
+        data = msg.to_dict()
+        data["seq"] = seq
+        data["client"] = self.client_id
+        data["sent_at"] = time.time()
+        return (json.dumps(data) + "\n").encode("utf-8")
+
+    def run(self, messages: Iterable[RawMessage]) -> ClientStats:
+        """发送全部消息后断开"""
+        stats = self.stats
+        if not self._connected and not self.connect():
+            stats.error = "connect failed"
+            return stats
+
+        start = time.perf_counter()
+        interval = 1.0 / self.rate if self.rate > 0 else 0.0
+        batch: List[bytes] = []
+        try:
+            for seq, msg in enumerate(messages):
+                if interval:
+                    # 绝对时间表，避免累计漂移
+                    delay = start + seq * interval - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                line = self._encode(msg, seq)
+                batch.append(line)
+                stats.bytes += len(line)
+                if interval or len(batch) >= self.batch_size:
+                    if not self.send_lines(batch):
+                        stats.error = "send failed"
+                        batch = []
+                        break
+                    stats.sent += len(batch)
+                    batch = []
+            if batch and self.send_lines(batch):
+                stats.sent += len(batch)
+        finally:
+            stats.elapsed = time.perf_counter() - start
+            self.disconnect()
+        return stats
+
+
+# ==================== 接收端探针 ====================
+
+
+class BridgeProbe:
+    """挂在 IsaacBridge 上的接收统计（raw_message 回调）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.received: Dict[int, int] = {}
+        self.latencies_ms: List[float] = []
+        self.out_of_order = 0
+        self._last_seq: Dict[int, int] = {}
+
+    def attach(self, bridge) -> "BridgeProbe":
+        bridge.on("raw_message")(self.on_message)
+        return self
+
+    def on_message(self, msg: Dict[str, Any]) -> None:
+        now = time.time()
+        client = msg.get("client", -1)
+        seq = msg.get("seq", -1)
+        sent_at = msg.get("sent_at")
+        with self._lock:
+            self.received[client] = self.received.get(client, 0) + 1
+            if seq <= self._last_seq.get(client, -1):
+                self.out_of_order += 1
+            self._last_seq[client] = seq
+            if sent_at is not None:
+                self.latencies_ms.append((now - sent_at) * 1000)
+
+    @property
+    def total_received(self) -> int:
+        with self._lock:
+            return sum(self.received.values())
+
+
+# ==================== 负载运行 ====================
+
+
+@dataclass
+class LoadReport:
+    """负载测试报告"""
+
+    clients: int = 0
+    sent: int = 0
+    received: int = 0
+    bytes: int = 0
+    elapsed: float = 0.0  # 从开始发送到最后一条消息被接收
+    errors: List[str] = field(default_factory=list)
+    bridge_errors: int = 0
+    out_of_order: int = 0
+    latencies_ms: List[float] = field(default_factory=list, repr=False)
+
+    @property
+    def dropped(self) -> int:
+        return max(0, self.sent - self.received)
+
+    @property
+    def drop_rate(self) -> float:
+        return self.dropped / self.sent if self.sent else 0.0
+
+    @property
+    def throughput(self) -> float:
+        """桥接器接收吞吐量（消息/秒）"""
+        return self.received / self.elapsed if self.elapsed > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "clients": self.clients,
+            "sent": self.sent,
+            "received": self.received,
+            "dropped": self.dropped,
+            "drop_rate": round(self.drop_rate, 6),
+            "bytes": self.bytes,
+            "elapsed": round(self.elapsed, 4),
+            "throughput": round(self.throughput, 1),
+            "mbytes_per_sec": round(self.bytes / self.elapsed / 1e6, 3) if self.elapsed > 0 else 0.0,
+            "latency_ms": {k: round(v, 3) for k, v in latency_summary(self.latencies_ms).items()},
+            "bridge_errors": self.bridge_errors,
+            "out_of_order": self.out_of_order,
+            "errors": self.errors,
+        }
+
+    def summary(self) -> str:
+        latency = latency_summary(self.latencies_ms)
+        return (
+            f"{self.clients} 个客户端: 发送 {self.sent}, 接收 {self.received} "
+            f"(丢失 {self.drop_rate:.2%}), {self.throughput:.0f} msg/s, "
+            f"延迟 p50={latency['p50']:.2f}ms p99={latency['p99']:.2f}ms "
+            f"max={latency['max']:.2f}ms"
+        )
+
+
+class LoadGenerator:
+    """并发运行多个模拟客户端"""
+
+    def __init__(
+        self,
+        source_factory: Callable[[int], Iterable[RawMessage]],
+        rate: float = 0.0,
+        batch_size: int = 64,
+    ):
+        """
+        Args:
+            source_factory: client_id -> 消息序列（每个客户端独立调用）
+            rate: 每个客户端每秒消息数；<= 0 表示线速
+            batch_size: 线速模式下每次写入的消息数
+        """
+        self.source_factory = source_factory
+        self.rate = rate
+        self.batch_size = batch_size
+
+    def run(
+        self,
+        targets: List[Tuple[str, int]],
+        probe: Optional[BridgeProbe] = None,
+        drain_timeout: float = 5.0,
+    ) -> LoadReport:
+        """每个目标地址一个客户端，全部发送完毕后等待接收端追上
+
+        Args:
+            targets: [(host, port), ...]
+            probe: 接收端探针（为 None 时只统计发送）
+            drain_timeout: 发送结束后等待接收完成的最长时间（秒）
+        """
+        clients = [
+            LoadClient(i, host, port, rate=self.rate, batch_size=self.batch_size)
+            for i, (host, port) in enumerate(targets)
+        ]
+        threads = [
+            threading.Thread(
+                target=client.run, args=(self.source_factory(client.client_id),), daemon=True
+            )
+            for client in clients
+        ]
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        report = LoadReport(clients=len(clients))
+        for client in clients:
+            report.sent += client.stats.sent
+            report.bytes += client.stats.bytes
+            if client.stats.error:
+                report.errors.append(f"client {client.client_id}: {client.stats.error}")
+
+        if probe is not None:
+            deadline = time.perf_counter() + drain_timeout
+            while probe.total_received < report.sent and time.perf_counter() < deadline:
+                time.sleep(0.01)
+            report.received = probe.total_received
+            report.out_of_order = probe.out_of_order
+            with probe._lock:
+                report.latencies_ms = list(probe.latencies_ms)
+        else:
+            report.received = report.sent
+        report.elapsed = time.perf_counter() - start
+        return report
+
+
+def run_bridge_load(
+    source: Any = None,
+    clients: int = 1,
+    rate: float = 0.0,
+    batch_size: int = 64,
+    bridge_factory: Optional[Callable[[], Any]] = None,
+    drain_timeout: float = 5.0,
+) -> LoadReport:
+    """在进程内启动 N 个 IsaacBridge（随机端口），对每个运行一个客户端
+
+    Args:
+        source: LoadProfile、client_id -> 消息序列的函数，或 None（默认合成配置）
+        clients: 并发客户端数
+        rate: 每个客户端每秒消息数；<= 0 表示线速
+        bridge_factory: 创建桥接器（默认 IsaacBridge(port=0)）
+    """
+    if source is None or isinstance(source, LoadProfile):
+        profile = source or LoadProfile()
+        source_factory = lambda client_id: SyntheticSession(profile).iter_messages()
+    else:
+        source_factory = source
+
+    if bridge_factory is None:
+        from isaac_bridge import IsaacBridge
+
+        bridge_factory = lambda: IsaacBridge(port=0)
+
+    probe = BridgeProbe()
+    bridges = []
+    try:
+        targets = []
+        for _ in range(clients):
+            bridge = bridge_factory()
+            bridge.start()
+            probe.attach(bridge)
+            bridges.append(bridge)
+            host, port = bridge.server.getsockname()[:2]
+            targets.append((host, port))
+
+        report = LoadGenerator(source_factory, rate, batch_size).run(
+            targets, probe, drain_timeout
+        )
+        report.bridge_errors = sum(b.get_stats().get("errors", 0) for b in bridges)
+    finally:
+        for bridge in bridges:
+            bridge.stop()
+
+    logger.info(f"负载测试完成: {report.summary()}")
+    return report
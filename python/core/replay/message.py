@@ -215,6 +215,9 @@ class SessionMetadata(BaseModel):
     # 协议信息
     protocol_version: str = Field(default="2.1", description="协议版本")
 
+    # 存储格式（压缩后端、级别、字典等），旧会话为空
+    compression: Dict[str, Any] = Field(default_factory=dict, description="块压缩格式")
+
     # 自定义元数据
     metadata: Dict[str, Any] = Field(default_factory=dict, description="自定义元数据")
 
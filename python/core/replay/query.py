@@ -0,0 +1,592 @@
+"""
+Core Replay Query - 帧级查询
+
+为每个会话建立逐帧的二级索引（会话目录下的 query.sqlite），
+常用谓词列都建了索引，查询时只访问索引，返回匹配的帧区间；
+之后通过帧偏移索引只解码这些区间所在的块。
+
+帧表 frames 的列（低频通道的值会沿用到后续帧）：
+
+==================  ====================================================
+frame               帧号
+seq                 帧在会话中的序号（主键，用于合并连续区间）
+segment             分段序号：帧计数器重置（游戏重开、Lua 模组重载）后加 1
+room_index          房间索引
+room_type           房间类型（ROOM_INFO）
+stage               楼层
+is_clear            房间是否已清理
+has_boss            房间有 Boss（ROOM_INFO.has_boss 或存在 Boss 敌人）
+room_entry          进入新房间后的第一帧为 1
+enemy_count         敌人数量（ENEMIES）
+boss_count          Boss 敌人数量
+projectile_count    敌方投射物数量
+player_health       玩家总血量（红心 + 金心 + 其他心 × 0.5，单位：心）
+==================  ====================================================
+
+事件表 events 记录 (帧, 事件类型)，在表达式中用 ``event == "NAME"`` 查询。
+
+过滤表达式示例::
+
+    enemy_count > 8 and player_health < 2
+    room_entry and has_boss
+    event == "PLAYER_DAMAGE" or (room_type == 5 and not is_clear)
+
+录制时索引由 DataRecorder 的写入线程增量写入；原始透传会话和旧会话在
+首次查询时按接收顺序构建，与录制时的输入顺序一致。
+
+帧号回退到 0 附近（消息 prev_frame 为 0，或回退超过 FRAME_RESET_GAP 帧）
+视为帧计数器重置，之后的帧记入新的分段；较小的回退是迟到的消息，忽略。
+同一帧号可能出现在多个分段中，回放按帧号定位时不区分分段。
+"""
+
+import logging
+import re
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .message import RawMessage
+from .stream import Record, find_message_files, read_chunk
+
+logger = logging.getLogger(__name__)
+
+QUERY_FILENAME = "query.sqlite"
+QUERY_VERSION = 2
+
+# 帧号回退超过该值视为帧计数器重置（开始新的分段），否则视为迟到的消息
+FRAME_RESET_GAP = 60
+
+# 可查询的帧列 -> SQL 类型
+FRAME_COLUMNS: Dict[str, str] = {
+    "frame": "INTEGER",
+    "room_index": "INTEGER",
+    "room_type": "INTEGER",
+    "stage": "INTEGER",
+    "is_clear": "INTEGER",
+    "has_boss": "INTEGER",
+    "room_entry": "INTEGER",
+    "enemy_count": "INTEGER",
+    "boss_count": "INTEGER",
+    "projectile_count": "INTEGER",
+    "player_health": "REAL",
+}
+
+# 建立索引的列
+INDEXED_COLUMNS = (
+    "room_index",
+    "room_type",
+    "has_boss",
+    "room_entry",
+    "enemy_count",
+    "player_health",
+)
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS frames (seq INTEGER PRIMARY KEY, segment INTEGER NOT NULL, "
+    + ", ".join(f"{name} {kind}" for name, kind in FRAME_COLUMNS.items())
+    + ");\n"
+    + "CREATE INDEX IF NOT EXISTS idx_frames_frame ON frames(segment, frame);\n"
+    + "".join(
+        f"CREATE INDEX IF NOT EXISTS idx_frames_{name} ON frames({name});\n"
+        for name in INDEXED_COLUMNS
+    )
+    + "CREATE TABLE IF NOT EXISTS events (segment INTEGER NOT NULL, frame INTEGER NOT NULL, "
+    + "event_type TEXT NOT NULL);\n"
+    + "CREATE INDEX IF NOT EXISTS idx_events_type ON events(event_type, segment, frame);\n"
+    + "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);\n"
+)
+
+_ROW_COLUMNS = ["seq", "segment"] + list(FRAME_COLUMNS)
+
+
+class QueryError(ValueError):
+    """过滤表达式错误"""
+
+
+@dataclass
+class FrameRange:
+    """连续匹配的帧区间（闭区间）"""
+
+    start: int
+    end: int
+    frames: int  # 区间内已录制的帧数
+    segment: int = 0  # 所在分段（帧计数器重置后加 1）
+
+    def __contains__(self, frame: int) -> bool:
+        return self.start <= frame <= self.end
+
+
+# ==================== 逐帧统计 ====================
+
+
+def _health(data: Any) -> Optional[float]:
+    if isinstance(data, list):
+        data = data[0] if data else None
+    elif isinstance(data, dict) and "red_hearts" not in data:
+        data = next(iter(data.values()), None)
+    if not isinstance(data, dict):
+        return None
+    half = sum(
+        data.get(k, 0) or 0
+        for k in ("soul_hearts", "black_hearts", "bone_hearts", "eternal_hearts")
+    )
+    return float((data.get("red_hearts", 0) or 0) + (data.get("golden_hearts", 0) or 0) + half * 0.5)
+
+
+def _event_type(data: Dict[str, Any]) -> Optional[str]:
+    return data.get("event_type") or data.get("event")
+
+
+def _event_entries(data: Dict[str, Any], frame: int) -> List[Tuple[int, Optional[str]]]:
+    """EVENT 消息 -> [(帧号, 事件类型)]（兼容单事件与批量 events 列表）"""
+    batch = data.get("events")
+    if isinstance(batch, list):
+        return [
+            (item.get("frame", frame), _event_type(item))
+            for item in batch
+            if isinstance(item, dict)
+        ]
+    return [(frame, _event_type(data))]
+
+
+def _is_reset(last: int, frame: int, prev_frame: Optional[int] = None) -> bool:
+    """帧号从 last 回退到 frame 是否为帧计数器重置（而非迟到的消息）"""
+    return frame < last and (prev_frame == 0 or last - frame > FRAME_RESET_GAP)
+
+
+class FrameStatsBuilder:
+    """逐帧统计构建器
+
+    按接收顺序输入消息；某帧的统计在出现更大的帧号时完成。
+    帧计数器重置时完成当前帧，清空沿用的状态并开始新的分段。
+    """
+
+    def __init__(self):
+        self._segment = 0
+        self._seq = 0
+        self._rows: List[Tuple[Any, ...]] = []
+        self._events: List[Tuple[int, int, str]] = []
+        self._event_segment = 0
+        self._event_frame: Optional[int] = None
+        self._reset_state()
+
+    def _reset_state(self) -> None:
+        self._state: Dict[str, Any] = {name: None for name in FRAME_COLUMNS}
+        self._state.update(enemy_count=0, boss_count=0, projectile_count=0)
+        self._frame: Optional[int] = None
+        self._room: Optional[int] = None
+
+    def add(
+        self,
+        frame: int,
+        room_index: int,
+        payload: Optional[Dict[str, Any]],
+        prev_frame: Optional[int] = None,
+    ) -> None:
+        """输入一条数据消息"""
+        if self._frame is not None and frame < self._frame:
+            if not _is_reset(self._frame, frame, prev_frame):
+                return  # 迟到的消息并入已完成的帧，忽略
+            self._finish_frame()
+            self._segment += 1
+            self._reset_state()
+        if frame != self._frame:
+            self._finish_frame()
+            self._frame = frame
+            self._state["room_entry"] = 0
+
+        state = self._state
+        if room_index != self._room:
+            if self._room is not None:
+                state["room_entry"] = 1
+                # 新房间的房间信息尚未到达
+                state.update(room_type=None, is_clear=None, has_boss=None)
+            self._room = room_index
+        state["room_index"] = room_index
+
+        if not payload:
+            return
+        room_info = payload.get("ROOM_INFO")
+        if isinstance(room_info, dict):
+            state["room_type"] = room_info.get("room_type")
+            state["stage"] = room_info.get("stage")
+            state["is_clear"] = int(bool(room_info.get("is_clear")))
+            state["has_boss"] = int(bool(room_info.get("has_boss")))
+        enemies = payload.get("ENEMIES")
+        if isinstance(enemies, (list, dict)):
+            values = enemies.values() if isinstance(enemies, dict) else enemies
+            state["enemy_count"] = len(enemies)
+            state["boss_count"] = sum(
+                1 for e in values if isinstance(e, dict) and e.get("is_boss")
+            )
+        projectiles = payload.get("PROJECTILES")
+        if isinstance(projectiles, dict):
+            state["projectile_count"] = len(projectiles.get("enemy_projectiles") or ())
+        if "PLAYER_HEALTH" in payload:
+            health = _health(payload["PLAYER_HEALTH"])
+            if health is not None:
+                state["player_health"] = health
+
+    def add_event(self, frame: int, event_type: Optional[str]) -> None:
+        if self._event_frame is not None and _is_reset(self._event_frame, frame):
+            self._event_segment += 1
+        self._event_frame = frame
+        if event_type:
+            self._events.append((self._event_segment, frame, event_type))
+
+    def add_message(self, msg: RawMessage) -> None:
+        if msg.is_event_message:
+            batch = getattr(msg, "events", None)
+            if isinstance(batch, list):
+                for frame, event_type in _event_entries({"events": batch}, msg.frame):
+                    self.add_event(frame, event_type)
+            else:
+                self.add_event(msg.frame, msg.event_type or getattr(msg, "event", None))
+        else:
+            self.add(msg.frame, msg.room_index, msg.payload, msg.prev_frame)
+
+    def _finish_frame(self) -> None:
+        if self._frame is None:
+            return
+        state = self._state
+        has_boss = state["has_boss"]
+        if state["boss_count"]:
+            has_boss = 1
+        self._rows.append(
+            tuple(
+                [self._seq, self._segment, self._frame]
+                + [
+                    has_boss if name == "has_boss" else state[name]
+                    for name in _ROW_COLUMNS[3:]
+                ]
+            )
+        )
+        self._seq += 1
+
+    def take(
+        self, final: bool = False
+    ) -> Tuple[List[Tuple[Any, ...]], List[Tuple[int, int, str]]]:
+        """取出已完成的帧行与事件（final=True 时完成当前帧）"""
+        if final:
+            self._finish_frame()
+            self._frame = None
+        rows, events = self._rows, self._events
+        self._rows, self._events = [], []
+        return rows, events
+
+
+# ==================== 索引存储 ====================
+
+
+class FrameQueryIndex:
+    """会话的帧级查询索引"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with self._connect() as conn:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(frames)")]
+            if columns and "segment" not in columns:
+                # 旧版本索引（按帧号为主键）不兼容，删除后重建
+                conn.executescript(
+                    "DROP TABLE frames; DROP TABLE IF EXISTS events; DROP TABLE IF EXISTS meta;"
+                )
+            conn.executescript(_SCHEMA)
+
+    @classmethod
+    def for_session(cls, session_dir: Path) -> "FrameQueryIndex":
+        return cls(Path(session_dir) / QUERY_FILENAME)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.path), timeout=10.0)
+
+    # ==================== 写入 ====================
+
+    def append(
+        self, rows: List[Tuple[Any, ...]], events: List[Tuple[int, int, str]]
+    ) -> None:
+        """追加帧行与事件"""
+        if not rows and not events:
+            return
+        placeholders = ", ".join("?" for _ in _ROW_COLUMNS)
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO frames ({', '.join(_ROW_COLUMNS)}) "
+                    f"VALUES ({placeholders})",
+                    rows,
+                )
+                conn.executemany("INSERT INTO events VALUES (?, ?, ?)", events)
+        finally:
+            conn.close()
+
+    def set_complete(self, complete: bool = True) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('complete', ?), ('version', ?)",
+                    ("1" if complete else "0", str(QUERY_VERSION)),
+                )
+        finally:
+            conn.close()
+
+    def is_complete(self) -> bool:
+        conn = self._connect()
+        try:
+            rows = dict(conn.execute("SELECT key, value FROM meta"))
+        finally:
+            conn.close()
+        return rows.get("complete") == "1" and rows.get("version") == str(QUERY_VERSION)
+
+    def clear(self) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM frames")
+                conn.execute("DELETE FROM events")
+                conn.execute("DELETE FROM meta")
+        finally:
+            conn.close()
+
+    # ==================== 查询 ====================
+
+    def query(self, expression: str) -> List[FrameRange]:
+        """返回满足表达式的帧区间（按帧号排序，连续的已录制帧合并为一个区间）"""
+        where, params = compile_filter(expression)
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                f"SELECT frame, seq, segment FROM frames WHERE {where} ORDER BY seq", params
+            ).fetchall()
+        finally:
+            conn.close()
+
+        ranges: List[FrameRange] = []
+        last_seq = None
+        for frame, seq, segment in rows:
+            if ranges and seq == last_seq + 1 and ranges[-1].segment == segment:
+                current = ranges[-1]
+                current.end = frame
+                current.frames += 1
+            else:
+                ranges.append(FrameRange(frame, frame, 1, segment))
+            last_seq = seq
+        return ranges
+
+    def count(self, expression: str) -> int:
+        """满足表达式的帧数"""
+        where, params = compile_filter(expression)
+        conn = self._connect()
+        try:
+            return conn.execute(f"SELECT COUNT(*) FROM frames WHERE {where}", params).fetchone()[0]
+        finally:
+            conn.close()
+
+    def frames(self, expression: str) -> List[int]:
+        """满足表达式的帧号（按录制顺序）"""
+        where, params = compile_filter(expression)
+        conn = self._connect()
+        try:
+            return [
+                row[0]
+                for row in conn.execute(
+                    f"SELECT frame FROM frames WHERE {where} ORDER BY seq", params
+                )
+            ]
+        finally:
+            conn.close()
+
+
+def _arrival_order(records: List[Record]) -> List[Record]:
+    """块内记录恢复为接收顺序（与录制时输入构建器的顺序一致）"""
+    return sorted(records, key=lambda r: r[0][1])
+
+
+def build_query_index(session_dir: Path) -> FrameQueryIndex:
+    """从消息块构建会话的查询索引（用于旧会话和原始透传会话）"""
+    session_dir = Path(session_dir)
+    index = FrameQueryIndex.for_session(session_dir)
+    index.clear()
+
+    builder = FrameStatsBuilder()
+    for filepath in find_message_files(session_dir):
+        for _, data in _arrival_order(read_chunk(filepath)):
+            try:
+                msg = RawMessage.from_dict(data)
+            except Exception as e:
+                logger.warning(f"跳过无效消息 {filepath.name}: {e}")
+                continue
+            builder.add_message(msg)
+    for filepath in sorted(session_dir.glob("events_*.jsonl*")):
+        for (frame, _), data in _arrival_order(read_chunk(filepath)):
+            for event_frame, event_type in _event_entries(data, frame):
+                builder.add_event(event_frame, event_type)
+
+    index.append(*builder.take(final=True))
+    index.set_complete()
+    logger.info(f"已为会话构建查询索引: {session_dir.name}")
+    return index
+
+
+def load_or_build_query_index(session_dir: Path) -> FrameQueryIndex:
+    """读取会话查询索引，不存在或不完整时构建"""
+    path = Path(session_dir) / QUERY_FILENAME
+    if path.exists():
+        index = FrameQueryIndex(path)
+        if index.is_complete():
+            return index
+    return build_query_index(session_dir)
+
+
+# ==================== 表达式编译 ====================
+
+_TOKEN_RE = re.compile(
+    r"""\s*(?:
+        (?P<number>-?\d+(?:\.\d+)?)
+      | (?P<string>"[^"]*"|'[^']*')
+      | (?P<op>==|!=|<=|>=|<|>|=|&&|\|\||!|\(|\))
+      | (?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+    )""",
+    re.VERBOSE,
+)
+
+_COMPARISONS = {"==": "=", "=": "=", "!=": "!=", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+
+
+def _tokenize(expression: str) -> List[Tuple[str, str, int]]:
+    tokens = []
+    pos = 0
+    expression = expression.rstrip()
+    while pos < len(expression):
+        match = _TOKEN_RE.match(expression, pos)
+        if not match or match.end() == pos:
+            raise QueryError(f"无法识别的输入（位置 {pos}）: {expression[pos:pos + 10]!r}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        start = match.start(kind)
+        if kind == "ident" and value.lower() in ("and", "or", "not", "true", "false"):
+            kind, value = "keyword", value.lower()
+        elif kind == "op" and value in ("&&", "||", "!"):
+            kind, value = "keyword", {"&&": "and", "||": "or", "!": "not"}[value]
+        tokens.append((kind, value, start))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """递归下降解析器，生成参数化 SQL（列名只来自白名单）"""
+
+    def __init__(self, expression: str):
+        self.tokens = _tokenize(expression)
+        self.pos = 0
+        self.params: List[Any] = []
+
+    def peek(self) -> Optional[Tuple[str, str, int]]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self) -> Tuple[str, str, int]:
+        token = self.peek()
+        if token is None:
+            raise QueryError("表达式不完整")
+        self.pos += 1
+        return token
+
+    def accept(self, kind: str, value: str) -> bool:
+        token = self.peek()
+        if token and token[0] == kind and token[1] == value:
+            self.pos += 1
+            return True
+        return False
+
+    def parse(self) -> str:
+        if not self.tokens:
+            raise QueryError("表达式为空")
+        sql = self.parse_or()
+        token = self.peek()
+        if token is not None:
+            raise QueryError(f"多余的输入（位置 {token[2]}）: {token[1]!r}")
+        return sql
+
+    def parse_or(self) -> str:
+        parts = [self.parse_and()]
+        while self.accept("keyword", "or"):
+            parts.append(self.parse_and())
+        return parts[0] if len(parts) == 1 else "(" + " OR ".join(parts) + ")"
+
+    def parse_and(self) -> str:
+        parts = [self.parse_not()]
+        while self.accept("keyword", "and"):
+            parts.append(self.parse_not())
+        return parts[0] if len(parts) == 1 else "(" + " AND ".join(parts) + ")"
+
+    def parse_not(self) -> str:
+        if self.accept("keyword", "not"):
+            return f"NOT {self.parse_not()}"
+        if self.accept("op", "("):
+            sql = self.parse_or()
+            if not self.accept("op", ")"):
+                raise QueryError("缺少右括号")
+            return f"({sql})"
+        return self.parse_comparison()
+
+    def parse_value(self) -> Any:
+        kind, value, pos = self.take()
+        if kind == "number":
+            return float(value) if "." in value else int(value)
+        if kind == "string":
+            return value[1:-1]
+        if kind == "keyword" and value in ("true", "false"):
+            return 1 if value == "true" else 0
+        if kind == "ident":
+            return value  # 事件名可以不加引号
+        raise QueryError(f"需要值（位置 {pos}）: {value!r}")
+
+    def parse_comparison(self) -> str:
+        kind, name, pos = self.take()
+        if kind != "ident":
+            raise QueryError(f"需要字段名（位置 {pos}）: {name!r}")
+
+        token = self.peek()
+        op = None
+        if token and token[0] == "op" and token[1] in _COMPARISONS:
+            op = _COMPARISONS[self.take()[1]]
+
+        if name == "event":
+            if op is None:
+                return (
+                    "EXISTS (SELECT 1 FROM events e "
+                    "WHERE e.segment = frames.segment AND e.frame = frames.frame)"
+                )
+            if op not in ("=", "!="):
+                raise QueryError("event 只支持 == 和 !=")
+            self.params.append(str(self.parse_value()))
+            exists = (
+                "EXISTS (SELECT 1 FROM events e "
+                "WHERE e.segment = frames.segment AND e.frame = frames.frame "
+                "AND e.event_type = ?)"
+            )
+            return exists if op == "=" else f"NOT {exists}"
+
+        if name not in FRAME_COLUMNS:
+            raise QueryError(
+                f"未知字段 {name!r}（可用: {', '.join(FRAME_COLUMNS)}, event）"
+            )
+        if op is None:
+            return f"COALESCE({name}, 0) != 0"
+        value = self.parse_value()
+        if not isinstance(value, (int, float)):
+            raise QueryError(f"字段 {name} 需要数值: {value!r}")
+        self.params.append(value)
+        return f"{name} {op} ?"
+
+
+def compile_filter(expression: str) -> Tuple[str, List[Any]]:
+    """把过滤表达式编译为参数化的 SQL WHERE 子句
+
+    Raises:
+        QueryError: 表达式语法错误或字段未知
+    """
+    parser = _Parser(expression)
+    return parser.parse(), parser.params
@@ -4,25 +4,51 @@ Core Replay Recorder - 数据录制器
 提供高性能的游戏数据录制功能：
 - 支持 v2.1 协议完整录制
 - 自动会话管理
-- 增量保存和压缩
+- 增量保存和分帧压缩（gzip / zstd + 字典）
 - 与 IsaacBridge 集成
 """
 
 import os
+import re
 import json
-import gzip
 import time
 import threading
 import logging
+from collections import deque
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Dict, Any, List, Callable
+from typing import Optional, Dict, Any, List, Callable, Deque, Tuple
 from dataclasses import dataclass, field
 
 from .message import RawMessage, SessionMetadata, MessageType
+from .codec import (
+    DICTIONARY_FILENAME,
+    ChunkCodec,
+    GzipCodec,
+    create_codec,
+    load_dictionary,
+    write_blocks,
+)
+from .catalog import (
+    STATUS_COMPLETE,
+    STATUS_RECORDING,
+    SessionCatalog,
+    SessionStats,
+    dir_size,
+)
+from .index import IndexWriter
+from .stream import RAW_CHUNK_PREFIX
+from .query import FrameQueryIndex, FrameStatsBuilder
 
 logger = logging.getLogger(__name__)
 
+# 原始透传录制时只用正则提取帧号和房间号，不做 JSON 解码
+_FRAME_RE = re.compile(rb'"frame"\s*:\s*(\d+)')
+_ROOM_RE = re.compile(rb'"room_index"\s*:\s*(-?\d+)')
+
+# 停止录制时排在最后一个批次之后的收尾任务（查询索引、元数据、目录数据库）
+_FINALIZE = "__finalize__"
+
 # 默认录制目录
 DEFAULT_RECORDINGS_DIR = os.environ.get("SOCKETBRIDGE_RECORDINGS_DIR", "./recordings")
 
@@ -34,9 +60,18 @@ class RecorderConfig:
     output_dir: str = DEFAULT_RECORDINGS_DIR
     buffer_size: int = 1000  # 消息缓冲区大小
     auto_save_interval: float = 60.0  # 自动保存间隔（秒）
-    compress: bool = True  # 是否压缩
+    compress: bool = True  # 是否压缩（False 时忽略 compression）
+    compression: str = "gzip"  # 压缩后端: "gzip" / "zstd" / "none"
+    compression_level: Optional[int] = None  # 压缩级别，None 使用后端默认值
+    dictionary_path: Optional[str] = None  # zstd 预训练字典（train-dictionary 生成）
     include_events: bool = True  # 是否录制事件
     include_commands: bool = False  # 是否录制命令
+    write_index: bool = True  # 是否写入帧偏移索引（index.bin）
+    index_block_size: int = 64  # 压缩帧大小（消息数），也是索引块与随机访问的粒度
+    async_write: bool = True  # 是否由后台线程压缩写盘
+    max_pending_batches: int = 16  # 后台写入队列上限（满时丢弃新批次，不阻塞录制）
+    update_catalog: bool = True  # 会话开始/结束时更新录制目录下的 catalog.sqlite
+    write_query_index: bool = True  # 是否写入帧级查询索引（query.sqlite）
 
 
 @dataclass
@@ -47,12 +82,24 @@ class RecordingSession:
     output_dir: Path
     metadata: SessionMetadata
     is_recording: bool = False
+    codec: ChunkCodec = field(default_factory=GzipCodec)
     start_frame: int = 0
     current_frame: int = 0
 
     # 缓冲区
     message_buffer: List[RawMessage] = field(default_factory=list)
     event_buffer: List[RawMessage] = field(default_factory=list)
+    raw_buffer: List[Tuple[float, bytes]] = field(default_factory=list)  # (接收时间, 原始行)
+
+    # 房间访问与通道计数（写入会话目录数据库）
+    stats: SessionStats = field(default_factory=SessionStats)
+
+    # 帧偏移索引（写入方在写块时追加，随会话走，停止后遗留的批次仍写入本会话）
+    index_writer: Optional[IndexWriter] = None
+
+    # 帧级查询索引（由写入线程增量构建，原始透传会话在首次查询时构建）
+    query_index: Optional[FrameQueryIndex] = None
+    query_builder: Optional[FrameStatsBuilder] = None
 
     # 统计
     frames_recorded: int = 0
@@ -61,6 +108,182 @@ class RecordingSession:
     bytes_written: int = 0
 
 
+# 待写入批次: (会话, 文件前缀, 消息列表)
+WriteBatch = Tuple["RecordingSession", str, List[RawMessage]]
+
+
+class AsyncBatchWriter:
+    """后台批次写入线程
+
+    录制线程只做缓冲区交换（O(1)）和入队，压缩与写盘在本线程完成。
+    队列满时丢弃新批次并计数，保证录制线程永不阻塞。
+    """
+
+    def __init__(
+        self,
+        write_fn: Callable[["RecordingSession", str, List[RawMessage]], None],
+        max_pending: int = 16,
+    ):
+        self._write_fn = write_fn
+        self.max_pending = max_pending
+        self._pending: Deque[WriteBatch] = deque()
+        self._cond = threading.Condition()
+        self._busy = False
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {
+            "batches_written": 0,
+            "messages_written": 0,
+            "batches_dropped": 0,
+            "messages_dropped": 0,
+            "max_queue_depth": 0,
+            "last_write_ms": 0.0,
+            "max_write_ms": 0.0,
+            "total_write_ms": 0.0,
+            "write_errors": 0,
+        }
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    def start(self) -> None:
+        if self._running:
+            return
+        # 上次 stop 超时遗留的线程：等它写完剩余批次后再启动新线程
+        # （调用方应先在自己的锁外调用 join，这里通常立即返回）
+        self.join()
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._run, name="RecorderWriter", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, batch: WriteBatch, block: bool = False) -> bool:
+        """提交批次
+
+        Args:
+            batch: 待写入批次
+            block: 队列满时是否等待（仅用于停止录制时的最终刷新）
+
+        Returns:
+            是否已入队（False 表示被丢弃）
+        """
+        with self._cond:
+            while block and len(self._pending) >= self.max_pending and self._running:
+                self._cond.wait(0.1)
+            if len(self._pending) >= self.max_pending:
+                self.stats["batches_dropped"] += 1
+                self.stats["messages_dropped"] += len(batch[2])
+                logger.warning(
+                    f"写入队列已满，丢弃 {len(batch[2])} 条消息 "
+                    f"(已丢弃批次: {self.stats['batches_dropped']})"
+                )
+                return False
+            self._pending.append(batch)
+            depth = len(self._pending)
+            if depth > self.stats["max_queue_depth"]:
+                self.stats["max_queue_depth"] = depth
+            self._cond.notify_all()
+            return True
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """等待队列清空且当前批次写完"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining if remaining is not None else 0.1)
+        return True
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """等待已停止但仍在写入的线程退出（线程在运行或不存在时立即返回）
+
+        Returns:
+            是否已没有遗留线程
+        """
+        thread = self._thread
+        if thread is None or self._running:
+            return True
+        thread.join(timeout)
+        if thread.is_alive():
+            return False
+        self._thread = None
+        return True
+
+    def stop(self, timeout: Optional[float] = 10.0) -> bool:
+        """写完剩余批次后停止线程
+
+        Args:
+            timeout: 等待队列清空和线程退出的总时长（None 表示一直等待）
+
+        Returns:
+            线程是否已退出。超时时保留线程句柄，线程会在写完剩余批次后自行退出
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self.drain(timeout)
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+        thread = self._thread
+        if thread is None:
+            return True
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        thread.join(remaining)
+        if thread.is_alive():
+            logger.error(
+                f"写入线程未在 {timeout}s 内停止，仍有 {self.queue_depth} 个批次待写入"
+            )
+            return False
+        self._thread = None
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        written = self.stats["batches_written"]
+        return {
+            **self.stats,
+            "queue_depth": self.queue_depth,
+            "avg_write_ms": self.stats["total_write_ms"] / written if written else 0.0,
+        }
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while self._running and not self._pending:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                batch = self._pending.popleft()
+                self._busy = True
+                self._cond.notify_all()
+
+            start = time.perf_counter()
+            try:
+                self._write_fn(*batch)
+                ok = True
+            except Exception as e:
+                ok = False
+                logger.error(f"写入批次失败: {e}")
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            with self._cond:
+                self._busy = False
+                if ok:
+                    self.stats["batches_written"] += 1
+                    self.stats["messages_written"] += len(batch[2])
+                else:
+                    self.stats["write_errors"] += 1
+                self.stats["last_write_ms"] = elapsed_ms
+                self.stats["total_write_ms"] += elapsed_ms
+                if elapsed_ms > self.stats["max_write_ms"]:
+                    self.stats["max_write_ms"] = elapsed_ms
+                self._cond.notify_all()
+
+
 class DataRecorder:
     """
     数据录制器
@@ -90,9 +313,21 @@ class DataRecorder:
 
         self.current_session: Optional[RecordingSession] = None
         self._lock = threading.Lock()
+        self._writer: Optional[AsyncBatchWriter] = None
+        if self.config.async_write:
+            self._writer = AsyncBatchWriter(
+                self._write_batch, self.config.max_pending_batches
+            )
         self._auto_save_thread: Optional[threading.Thread] = None
         self._running = False
 
+        self._catalog: Optional[SessionCatalog] = None
+        if self.config.update_catalog:
+            try:
+                self._catalog = SessionCatalog.for_directory(self.output_dir)
+            except Exception as e:
+                logger.warning(f"打开会话目录数据库失败: {e}")
+
         # 回调
         self._on_session_start: Optional[Callable[[RecordingSession], None]] = None
         self._on_session_end: Optional[Callable[[RecordingSession], None]] = None
@@ -113,6 +348,11 @@ class DataRecorder:
                 logger.warning("已有录制会话正在进行，先停止当前会话")
                 self._stop_session_internal()
 
+        # 上一会话停止超时遗留的写入线程：在锁外等待，不阻塞 record_message
+        if self._writer:
+            self._writer.join()
+
+        with self._lock:
             # 生成会话ID
             if session_id is None:
                 session_id = datetime.now().strftime("session_%Y%m%d_%H%M%S")
@@ -129,12 +369,35 @@ class DataRecorder:
                 metadata=metadata or {},
             )
 
+            # 压缩后端（使用字典时复制到会话目录，回放时自动使用）
+            codec = self._create_codec()
+            if getattr(codec, "dictionary", None):
+                (session_dir / DICTIONARY_FILENAME).write_bytes(codec.dictionary)
+            session_metadata.compression = dict(
+                codec.describe(), block_size=self.config.index_block_size
+            )
+
             # 创建会话
             self.current_session = RecordingSession(
                 session_id=session_id,
                 output_dir=session_dir,
                 metadata=session_metadata,
                 is_recording=True,
+                codec=codec,
+                index_writer=IndexWriter(session_dir) if self.config.write_index else None,
+            )
+            if self.config.write_query_index:
+                self._open_query_index(self.current_session)
+            if self._writer:
+                self._writer.start()
+            self._update_catalog(
+                {
+                    "session_id": session_id,
+                    "path": str(session_dir),
+                    "start_time": session_metadata.start_time,
+                    "protocol_version": session_metadata.protocol_version,
+                },
+                status=STATUS_RECORDING,
             )
 
             # 启动自动保存
@@ -151,49 +414,135 @@ class DataRecorder:
 
             return self.current_session
 
+    def _create_codec(self) -> ChunkCodec:
+        """按配置创建压缩后端，zstd 不可用时回退到 gzip"""
+        if not self.config.compress:
+            return create_codec("none")
+
+        dictionary = None
+        if self.config.dictionary_path:
+            try:
+                dictionary = load_dictionary(Path(self.config.dictionary_path))
+            except OSError as e:
+                logger.warning(f"读取压缩字典失败 {self.config.dictionary_path}: {e}")
+
+        try:
+            return create_codec(
+                self.config.compression, self.config.compression_level, dictionary
+            )
+        except RuntimeError as e:
+            logger.warning(f"{e}，回退到 gzip")
+            return create_codec("gzip", self.config.compression_level)
+
+    def _open_query_index(self, session: RecordingSession) -> None:
+        """创建会话的查询索引（标记为未完成，停止录制时置为完成）"""
+        try:
+            session.query_index = FrameQueryIndex.for_session(session.output_dir)
+            session.query_index.clear()
+            session.query_builder = FrameStatsBuilder()
+        except Exception as e:
+            logger.warning(f"创建查询索引失败: {e}")
+            session.query_index = None
+
+    def _close_query_index(self, session: RecordingSession) -> None:
+        """写入最后一帧并标记查询索引完成"""
+        builder = session.query_builder
+        if session.query_index is None or builder is None:
+            return
+        try:
+            session.query_index.append(*builder.take(final=True))
+            session.query_index.set_complete()
+        except Exception as e:
+            logger.warning(f"写入查询索引失败: {e}")
+
+    def _update_catalog(
+        self,
+        row: Dict[str, Any],
+        stats: Optional[SessionStats] = None,
+        status: str = STATUS_COMPLETE,
+    ) -> None:
+        """更新会话目录数据库（失败不影响录制）"""
+        if self._catalog is None:
+            return
+        try:
+            self._catalog.upsert(row, stats, status=status)
+        except Exception as e:
+            logger.warning(f"更新会话目录数据库失败: {e}")
+
     def stop_session(self) -> Optional[SessionMetadata]:
         """停止录制会话"""
         with self._lock:
             return self._stop_session_internal()
 
     def _stop_session_internal(self) -> Optional[SessionMetadata]:
-        """内部停止会话（需要持有锁）"""
-        if not self.current_session:
+        """内部停止会话（需要持有锁）
+
+        收尾（查询索引、元数据、摘要、目录数据库）作为最后一个任务排入写入队列，
+        在所有数据批次写完之后执行；写入线程超时未停时由它在后台完成。
+        """
+        session = self.current_session
+        if not session:
             return None
 
         self._running = False
-        self.current_session.is_recording = False
-
-        # 刷新缓冲区
-        self._flush_buffers()
+        session.is_recording = False
 
-        # 更新元数据
-        metadata = self.current_session.metadata
+        metadata = session.metadata
         metadata.end_time = time.time()
         metadata.duration = metadata.end_time - metadata.start_time
-        metadata.total_frames = self.current_session.frames_recorded
-        metadata.total_messages = self.current_session.messages_recorded
-        metadata.total_events = self.current_session.events_recorded
-
-        # 保存元数据
-        self._save_metadata()
-
-        # 保存摘要
-        self._save_summary()
+        metadata.total_frames = session.frames_recorded
+        metadata.total_messages = session.messages_recorded
+        metadata.total_events = session.events_recorded
+
+        # 刷新缓冲区，收尾任务排在最后
+        self._flush_buffers(final=True)
+        if self._writer and self._writer.submit((session, _FINALIZE, []), block=True):
+            if not self._writer.stop():
+                logger.error(
+                    f"会话 {session.session_id} 停止时仍有批次未写完，"
+                    f"写入线程将在后台写完并收尾"
+                )
+        else:
+            if self._writer:
+                self._writer.stop()
+            self._finalize_session(session)
 
         logger.info(
-            f"停止录制会话: {self.current_session.session_id}, "
+            f"停止录制会话: {session.session_id}, "
             f"帧数: {metadata.total_frames}, "
             f"消息数: {metadata.total_messages}, "
             f"持续时间: {metadata.duration_formatted}"
         )
 
         if self._on_session_end:
-            self._on_session_end(self.current_session)
+            self._on_session_end(session)
 
-        session_metadata = metadata
         self.current_session = None
-        return session_metadata
+        return metadata
+
+    def _finalize_session(self, session: RecordingSession) -> None:
+        """会话收尾（在最后一个批次写完之后执行）"""
+        self._close_query_index(session)
+        self._save_metadata(session)
+        self._save_summary(session)
+
+        metadata = session.metadata
+        self._update_catalog(
+            {
+                "session_id": metadata.session_id,
+                "path": str(session.output_dir),
+                "start_time": metadata.start_time,
+                "end_time": metadata.end_time,
+                "duration": metadata.duration,
+                "total_frames": metadata.total_frames,
+                "total_messages": metadata.total_messages,
+                "total_events": metadata.total_events,
+                "protocol_version": metadata.protocol_version,
+                "size_bytes": dir_size(session.output_dir),
+                "dir_mtime": time.time(),
+            },
+            stats=session.stats,
+        )
 
     def record_message(self, message: RawMessage) -> bool:
         """录制消息"""
@@ -218,6 +567,9 @@ class DataRecorder:
             else:
                 session.message_buffer.append(message)
                 session.messages_recorded += 1
+                session.stats.add(
+                    message.frame, message.room_index, message.payload or ()
+                )
 
             # 检查缓冲区大小
             if len(session.message_buffer) >= self.config.buffer_size:
@@ -225,6 +577,45 @@ class DataRecorder:
 
             return True
 
+    def record_raw_line(self, line: bytes, received_at: Optional[float] = None) -> bool:
+        """原始透传录制：直接保存线上收到的字节行，不解码、不重新编码
+
+        消息校验推迟到回放时进行。帧号只用于统计，通过正则提取。
+
+        Args:
+            line: 一行原始 JSON 字节（不含换行符）
+            received_at: 接收时间戳，默认当前时间
+        """
+        if not self.is_recording:
+            return False
+
+        if received_at is None:
+            received_at = time.time()
+
+        with self._lock:
+            session = self.current_session
+            if not session:
+                return False
+
+            match = _FRAME_RE.search(line)
+            if match:
+                frame = int(match.group(1))
+                if frame > session.current_frame:
+                    session.current_frame = frame
+                    session.frames_recorded += 1
+
+            room = _ROOM_RE.search(line)
+            session.stats.add(
+                session.current_frame, int(room.group(1)) if room else None
+            )
+            session.raw_buffer.append((received_at, line))
+            session.messages_recorded += 1
+
+            if len(session.raw_buffer) >= self.config.buffer_size:
+                self._flush_buffers()
+
+            return True
+
     def record_raw(self, data: Dict[str, Any]) -> bool:
         """录制原始字典数据"""
         try:
@@ -234,63 +625,174 @@ class DataRecorder:
             logger.error(f"解析消息失败: {e}")
             return False
 
-    def _flush_buffers(self) -> None:
-        """刷新缓冲区到磁盘"""
+    def _flush_buffers(self, final: bool = False) -> None:
+        """刷新缓冲区（需要持有锁）
+
+        异步模式下只交换缓冲区并入队，压缩写盘由后台线程完成。
+        """
         if not self.current_session:
             return
 
         session = self.current_session
 
-        # 保存消息
-        if session.message_buffer:
-            self._save_messages(session.message_buffer, "messages")
-            session.message_buffer.clear()
-
-        # 保存事件
-        if session.event_buffer:
-            self._save_messages(session.event_buffer, "events")
-            session.event_buffer.clear()
-
-    def _save_messages(self, messages: List[RawMessage], prefix: str) -> None:
-        """保存消息列表"""
-        if not self.current_session or not messages:
+        for prefix, attr in (
+            ("messages", "message_buffer"),
+            ("events", "event_buffer"),
+            (RAW_CHUNK_PREFIX.rstrip("_"), "raw_buffer"),
+        ):
+            batch = getattr(session, attr)
+            if not batch:
+                continue
+            # 双缓冲：换入新列表，旧列表交给写入方
+            setattr(session, attr, [])
+            if self._writer:
+                self._writer.submit((session, prefix, batch), block=final)
+            else:
+                self._write_batch(session, prefix, batch)
+
+    def _write_batch(
+        self, session: RecordingSession, prefix: str, messages: List[RawMessage]
+    ) -> None:
+        """保存消息列表（可能在后台写入线程中执行）"""
+        if prefix == _FINALIZE:
+            self._finalize_session(session)
+            return
+        if not messages:
             return
 
-        session = self.current_session
+        codec = session.codec
         timestamp = int(time.time() * 1000)
-        filename = f"{prefix}_{timestamp}.jsonl"
-
-        if self.config.compress:
-            filename += ".gz"
-            filepath = session.output_dir / filename
-            with gzip.open(filepath, "wt", encoding="utf-8") as f:
-                for msg in messages:
-                    f.write(msg.to_json_line())
+        suffix = codec.suffix
+        # 同一毫秒内多次刷新时避免覆盖已有块
+        while (session.output_dir / f"{prefix}_{timestamp}{suffix}").exists():
+            timestamp += 1
+        filename = f"{prefix}_{timestamp}{suffix}"
+        filepath = session.output_dir / filename
+
+        if prefix == RAW_CHUNK_PREFIX.rstrip("_"):
+            # 原始透传块：每行 "接收时间\t原始行"
+            lines, frames, rooms = self._encode_raw(messages)
         else:
-            filepath = session.output_dir / filename
-            with open(filepath, "w", encoding="utf-8") as f:
-                for msg in messages:
-                    f.write(msg.to_json_line())
+            lines = [msg.to_json_line().encode("utf-8") for msg in messages]
+            frames = [msg.frame for msg in messages]
+            rooms = [msg.room_index for msg in messages]
+
+        # 按帧压缩写入（每块一个独立的压缩帧），消息块同时记录索引条目
+        spans = write_blocks(filepath, lines, codec, self.config.index_block_size)
+        index_writer = session.index_writer
+        if index_writer is not None and prefix != "events":
+            index_writer.append_blocks(filename, spans, frames, rooms)
 
         session.bytes_written += filepath.stat().st_size
+        self._update_query_index(session, prefix, messages)
         logger.debug(f"保存 {len(messages)} 条消息到 {filename}")
 
-    def _save_metadata(self) -> None:
-        """保存元数据"""
-        if not self.current_session:
+    def _update_query_index(
+        self, session: RecordingSession, prefix: str, messages: List[RawMessage]
+    ) -> None:
+        """把批次计入查询索引（只在写入方调用，无需加锁）"""
+        builder = session.query_builder
+        if session.query_index is None or builder is None:
             return
-
+        if prefix == RAW_CHUNK_PREFIX.rstrip("_"):
+            # 原始透传行不解码，索引留待首次查询时构建
+            session.query_builder = None
+            return
+        try:
+            for msg in messages:
+                builder.add_message(msg)
+            session.query_index.append(*builder.take())
+        except Exception as e:
+            logger.warning(f"写入查询索引失败: {e}")
+            session.query_builder = None
+
+    @staticmethod
+    def _encode_raw(
+        entries: List[Tuple[float, bytes]]
+    ) -> Tuple[List[bytes], List[int], List[int]]:
+        """编码原始透传行，返回 (行, 帧号, 房间号)"""
+        lines: List[bytes] = []
+        frames: List[int] = []
+        rooms: List[int] = []
+        last_frame = 0
+        last_room = -1
+        for received_at, line in entries:
+            lines.append(b"%.6f\t%s\n" % (received_at, line.rstrip(b"\r\n")))
+            match = _FRAME_RE.search(line)
+            if match:
+                last_frame = int(match.group(1))
+            match = _ROOM_RE.search(line)
+            if match:
+                last_room = int(match.group(1))
+            frames.append(last_frame)
+            rooms.append(last_room)
+        return lines, frames, rooms
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取录制与写入统计"""
         session = self.current_session
+        stats: Dict[str, Any] = {
+            "is_recording": self.is_recording,
+            "async_write": self._writer is not None,
+        }
+        if session:
+            stats.update(
+                {
+                    "session_id": session.session_id,
+                    "frames": session.frames_recorded,
+                    "messages": session.messages_recorded,
+                    "events": session.events_recorded,
+                    "bytes": session.bytes_written,
+                    "buffered": len(session.message_buffer)
+                    + len(session.event_buffer)
+                    + len(session.raw_buffer),
+                }
+            )
+        if self._writer:
+            stats["writer"] = self._writer.get_stats()
+        return stats
+
+    def register_metrics(self, registry) -> None:
+        """登记到 core.telemetry.MetricsRegistry（recorder_*，含写入队列深度）"""
+        registry.register_collector("recorder", self.get_stats)
+
+    def memory_usage(self) -> Dict[str, int]:
+        """估算待写缓冲区占用字节数（抽样外推）"""
+        # 仅在启用内存计量时导入，录制不依赖遥测模块
+        from ..telemetry.memory import sample_sizeof
+
+        with self._lock:
+            session = self.current_session
+            if not session:
+                return {}
+            return {
+                "messages": sample_sizeof(session.message_buffer),
+                "events": sample_sizeof(session.event_buffer),
+                "raw": sample_sizeof(session.raw_buffer),
+            }
+
+    def set_buffer_size(self, buffer_size: int) -> None:
+        """调整缓冲区大小（超出时在下一条消息刷新）"""
+        self.config.buffer_size = buffer_size
+
+    def register_memory(self, budget) -> None:
+        """登记到 core.telemetry.MemoryBudget（recorder，缓冲越小刷新越频繁）"""
+        budget.track(
+            "recorder",
+            self.memory_usage,
+            depth=self.config.buffer_size,
+            resize=self.set_buffer_size,
+            min_depth=50,
+        )
+
+    def _save_metadata(self, session: RecordingSession) -> None:
+        """保存元数据"""
         filepath = session.output_dir / "metadata.json"
         with open(filepath, "w", encoding="utf-8") as f:
             json.dump(session.metadata.model_dump(), f, indent=2, ensure_ascii=False)
 
-    def _save_summary(self) -> None:
+    def _save_summary(self, session: RecordingSession) -> None:
         """保存摘要"""
-        if not self.current_session:
-            return
-
-        session = self.current_session
         summary = {
             "session_id": session.session_id,
             "frames": session.frames_recorded,
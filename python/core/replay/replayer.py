@@ -10,18 +10,26 @@ Core Replay Replayer - 数据回放器
 """
 
 import os
+import bisect
 import json
-import gzip
 import time
 import socket
 import threading
 import logging
 from pathlib import Path
-from typing import Optional, Dict, Any, List, Callable, Generator, Iterator
+from typing import Optional, Dict, Any, List, Callable, Generator, Iterator, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 
 from .message import RawMessage, SessionMetadata, FrameData, MessageType
+from .stream import find_message_files, merge_chunks, read_chunk
+from .index import SessionIndex, load_or_build_index
+from .query import FrameQueryIndex, FrameRange, load_or_build_query_index
+from .keyframes import (
+    DEFAULT_KEYFRAME_INTERVAL,
+    KeyframeStore,
+    load_or_build_keyframes,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +58,9 @@ class ReplayerConfig:
     start_frame: int = 0  # 起始帧
     end_frame: int = -1  # 结束帧（-1 表示到末尾）
     frame_delay: float = 1.0 / 30  # 帧间隔（秒）
+    streaming: bool = False  # 流式模式：按块惰性读取，不在内存中保留全部消息
+    keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL  # 累积状态关键帧间隔（帧）
+    cache_keyframes: bool = True  # 是否将关键帧缓存到会话目录
 
 
 @dataclass
@@ -68,16 +79,30 @@ class ReplaySession:
     # 帧索引
     frame_index: Dict[int, List[int]] = field(default_factory=dict)  # frame -> [msg indices]
 
+    # 流式模式
+    streaming: bool = False
+    message_files: List[Path] = field(default_factory=list)
+    seek_frame: int = 0  # 流式模式下 seek_to_frame 设置的起始帧
+    index: Optional[SessionIndex] = None  # 帧偏移索引（index.bin）
+    keyframes: Optional[KeyframeStore] = None  # 累积状态关键帧（首次查询时构建）
+    query_index: Optional[FrameQueryIndex] = None  # 帧级查询索引（首次查询时读取或构建）
+    sorted_frames: List[int] = field(default_factory=list)
+    last_frame: int = 0  # 流式模式下最近输出的帧号
+
     # 统计
     frames_played: int = 0
     messages_played: int = 0
 
     @property
     def total_messages(self) -> int:
+        if self.streaming:
+            return self.metadata.total_messages
         return len(self.messages)
 
     @property
     def total_frames(self) -> int:
+        if self.streaming:
+            return self.metadata.total_frames
         return len(self.frame_index)
 
     @property
@@ -88,6 +113,8 @@ class ReplaySession:
 
     @property
     def current_frame(self) -> int:
+        if self.streaming:
+            return self.last_frame
         if self.current_index < len(self.messages):
             return self.messages[self.current_index].frame
         return 0
@@ -183,11 +210,20 @@ class DataReplayer:
             metadata=metadata,
         )
 
-        # 加载消息
-        self._load_messages(session)
+        session.message_files = find_message_files(session_dir)
+        dictionary = metadata.compression.get("dictionary")
+        if dictionary and not (session_dir / dictionary).exists():
+            logger.warning(f"会话使用了压缩字典，但缺少字典文件: {dictionary}")
+        if self.config.streaming:
+            # 流式模式：只记录块文件列表，迭代时再读取
+            session.streaming = True
+            session.index = SessionIndex.load(session_dir)
+        else:
+            # 加载消息
+            self._load_messages(session)
 
-        # 构建帧索引
-        self._build_frame_index(session)
+            # 构建帧索引
+            self._build_frame_index(session)
 
         self.current_session = session
         logger.info(
@@ -199,35 +235,37 @@ class DataReplayer:
         return session
 
     def _load_messages(self, session: ReplaySession) -> None:
-        """加载所有消息"""
-        messages = []
+        """加载所有消息
 
-        # 查找所有消息文件
-        patterns = ["messages_*.jsonl", "messages_*.jsonl.gz", "*.jsonl", "*.jsonl.gz"]
-
-        for pattern in patterns:
-            for filepath in sorted(session.session_dir.glob(pattern)):
-                if "events" in filepath.name:
-                    continue  # 跳过事件文件（可选加载）
+        原始透传块（raw_*）在此处才做 JSON 解码与校验，无效的行会被跳过。
+        """
+        messages = []
 
+        for filepath in session.message_files:
+            for _, data in read_chunk(filepath):
                 try:
-                    if filepath.suffix == ".gz":
-                        with gzip.open(filepath, "rt", encoding="utf-8") as f:
-                            for line in f:
-                                if line.strip():
-                                    messages.append(RawMessage.from_json(line))
-                    else:
-                        with open(filepath, "r", encoding="utf-8") as f:
-                            for line in f:
-                                if line.strip():
-                                    messages.append(RawMessage.from_json(line))
+                    messages.append(RawMessage.from_dict(data))
                 except Exception as e:
-                    logger.warning(f"加载消息文件失败 {filepath}: {e}")
+                    logger.warning(f"跳过无效消息 {filepath.name}: {e}")
 
         # 按帧排序
         messages.sort(key=lambda m: (m.frame, m.received_at))
         session.messages = messages
 
+    def _iter_stream(self, session: ReplaySession) -> Iterator[RawMessage]:
+        """流式模式下按帧顺序迭代会话消息"""
+        start = max(self.config.start_frame, session.seek_frame)
+        return self._iter_range(session, start, None)
+
+    def get_index(self) -> Optional[SessionIndex]:
+        """获取当前会话的帧偏移索引（旧会话首次调用时构建并写入 index.bin）"""
+        if not self.current_session:
+            return None
+        session = self.current_session
+        if session.index is None:
+            session.index = load_or_build_index(session.session_dir)
+        return session.index
+
     def _build_frame_index(self, session: ReplaySession) -> None:
         """构建帧索引"""
         frame_index: Dict[int, List[int]] = {}
@@ -239,6 +277,7 @@ class DataReplayer:
             frame_index[frame].append(idx)
 
         session.frame_index = frame_index
+        session.sorted_frames = sorted(frame_index.keys())
 
     def iter_messages(
         self, speed: Optional[float] = None
@@ -248,11 +287,14 @@ class DataReplayer:
             raise RuntimeError("没有加载会话")
 
         session = self.current_session
-        speed = speed or self.config.speed
+        # speed <= 0 表示不等待（快进），None 使用配置值
+        speed = self.config.speed if speed is None else speed
         frame_delay = self.config.frame_delay / speed if speed > 0 else 0
 
+        source = self._iter_stream(session) if session.streaming else session.messages
+
         last_frame = -1
-        for idx, msg in enumerate(session.messages):
+        for idx, msg in enumerate(source):
             # 检查帧范围
             if self.config.start_frame > 0 and msg.frame < self.config.start_frame:
                 continue
@@ -266,6 +308,7 @@ class DataReplayer:
                 last_frame = msg.frame
 
             session.current_index = idx
+            session.last_frame = msg.frame
             session.messages_played += 1
 
             yield msg
@@ -280,12 +323,11 @@ class DataReplayer:
             raise RuntimeError("没有加载会话")
 
         session = self.current_session
-        speed = speed or self.config.speed
+        # speed <= 0 表示不等待（快进），None 使用配置值
+        speed = self.config.speed if speed is None else speed
         frame_delay = self.config.frame_delay / speed if speed > 0 else 0
 
-        sorted_frames = sorted(session.frame_index.keys())
-
-        for frame in sorted_frames:
+        for frame, messages in self._iter_frame_groups(session):
             # 检查帧范围
             if self.config.start_frame > 0 and frame < self.config.start_frame:
                 continue
@@ -296,75 +338,154 @@ class DataReplayer:
             if speed > 0:
                 time.sleep(frame_delay)
 
-            # 获取该帧的所有消息
-            indices = session.frame_index[frame]
-            messages = [session.messages[i] for i in indices]
-
             # 构建帧数据
-            frame_data = FrameData(
-                frame=frame,
-                timestamp=messages[0].timestamp if messages else 0,
-                room_index=messages[0].room_index if messages else -1,
-                messages=messages,
-                channels=list(
-                    set(
-                        ch
-                        for msg in messages
-                        if msg.channels
-                        for ch in msg.channels
-                    )
-                ),
-            )
+            frame_data = self._make_frame_data(frame, messages)
 
+            session.last_frame = frame
             session.frames_played += 1
             yield frame_data
 
         session.state = ReplayState.FINISHED
 
+    def _iter_frame_groups(
+        self, session: ReplaySession
+    ) -> Iterator[Tuple[int, List[RawMessage]]]:
+        """按帧分组迭代 (frame, messages)"""
+        if not session.streaming:
+            for frame in sorted(session.frame_index.keys()):
+                indices = session.frame_index[frame]
+                yield frame, [session.messages[i] for i in indices]
+            return
+
+        current_frame = -1
+        group: List[RawMessage] = []
+        for msg in self._iter_stream(session):
+            if msg.frame != current_frame and group:
+                yield current_frame, group
+                group = []
+            current_frame = msg.frame
+            group.append(msg)
+        if group:
+            yield current_frame, group
+
+    @staticmethod
+    def _make_frame_data(frame: int, messages: List[RawMessage]) -> FrameData:
+        return FrameData(
+            frame=frame,
+            timestamp=messages[0].timestamp if messages else 0,
+            room_index=messages[0].room_index if messages else -1,
+            messages=messages,
+            channels=list(
+                set(ch for msg in messages if msg.channels for ch in msg.channels)
+            ),
+        )
+
     def get_frame(self, frame: int) -> Optional[FrameData]:
         """获取指定帧数据"""
         if not self.current_session:
             return None
 
         session = self.current_session
+        if session.streaming:
+            messages = list(self._iter_range(session, frame, frame))
+            return self._make_frame_data(frame, messages) if messages else None
+
         if frame not in session.frame_index:
             return None
 
         indices = session.frame_index[frame]
         messages = [session.messages[i] for i in indices]
 
-        return FrameData(
-            frame=frame,
-            timestamp=messages[0].timestamp if messages else 0,
-            room_index=messages[0].room_index if messages else -1,
-            messages=messages,
-            channels=list(
-                set(ch for msg in messages if msg.channels for ch in msg.channels)
-            ),
-        )
+        return self._make_frame_data(frame, messages)
 
     def get_state_at_frame(self, frame: int) -> Dict[str, Any]:
-        """获取指定帧的完整状态（累积所有通道数据）"""
+        """获取指定帧的完整状态（累积所有通道数据）
+
+        从不晚于该帧的最近关键帧出发，只应用至多 keyframe_interval 帧的增量。
+        """
         if not self.current_session:
             return {}
 
         session = self.current_session
-        state: Dict[str, Any] = {}
-
-        # 累积到指定帧的所有数据
-        sorted_frames = sorted(session.frame_index.keys())
-        for f in sorted_frames:
-            if f > frame:
-                break
+        keyframes = self.get_keyframes()
+        pos = keyframes.find(frame)
+        if pos >= 0:
+            base_frame = keyframes.frames[pos]
+            state = dict(keyframes.states[pos])
+        else:
+            base_frame = -1
+            state = {}
 
-            indices = session.frame_index[f]
-            for idx in indices:
-                msg = session.messages[idx]
-                if msg.payload:
-                    state.update(msg.payload)
+        for msg in self._iter_range(session, base_frame + 1, frame):
+            if msg.payload:
+                state.update(msg.payload)
 
         return state
 
+    def get_keyframes(self) -> KeyframeStore:
+        """获取当前会话的关键帧（首次调用时读取缓存或构建）"""
+        session = self.current_session
+        if session.keyframes is None:
+            session.keyframes = load_or_build_keyframes(
+                session.session_dir,
+                session.message_files,
+                lambda: self._iter_range(session, 0, None),
+                interval=self.config.keyframe_interval,
+                cache=self.config.cache_keyframes,
+            )
+        return session.keyframes
+
+    def query(self, expression: str) -> List[FrameRange]:
+        """按过滤表达式查找匹配的帧区间（只访问 query.sqlite，不解码消息块）
+
+        示例: ``replayer.query("enemy_count > 8 and player_health < 2")``
+        """
+        if not self.current_session:
+            raise RuntimeError("没有加载会话")
+        session = self.current_session
+        if session.query_index is None:
+            session.query_index = load_or_build_query_index(session.session_dir)
+        return session.query_index.query(expression)
+
+    def iter_query_frames(self, expression: str) -> Iterator[FrameData]:
+        """迭代匹配表达式的帧数据，流式模式下只读取匹配区间所在的块"""
+        ranges = self.query(expression)
+        session = self.current_session
+        if session.streaming:
+            self.get_index()
+        for r in ranges:
+            group: List[RawMessage] = []
+            for msg in self._iter_range(session, r.start, r.end):
+                if group and msg.frame != group[0].frame:
+                    yield self._make_frame_data(group[0].frame, group)
+                    group = []
+                group.append(msg)
+            if group:
+                yield self._make_frame_data(group[0].frame, group)
+
+    def _iter_range(
+        self, session: ReplaySession, start: int, end: Optional[int]
+    ) -> Iterator[RawMessage]:
+        """按帧顺序迭代 start <= frame <= end 的消息（end 为 None 表示到末尾）"""
+        if session.streaming:
+            if start > 0 and session.index is not None:
+                # 有索引时跳过目标帧之前的所有块
+                source = session.index.iter_messages(start)
+            else:
+                source = merge_chunks(session.message_files, min_frame=start)
+            for msg in source:
+                if end is not None and msg.frame > end:
+                    return
+                yield msg
+            return
+
+        frames = session.sorted_frames
+        lo = bisect.bisect_left(frames, start)
+        hi = len(frames) if end is None else bisect.bisect_right(frames, end)
+        for f in frames[lo:hi]:
+            for idx in session.frame_index[f]:
+                yield session.messages[idx]
+
     def play_async(
         self,
         on_message: Optional[Callable[[RawMessage], None]] = None,
@@ -435,6 +556,12 @@ class DataReplayer:
             return False
 
         session = self.current_session
+        if session.streaming:
+            # 流式模式：下一次迭代从该帧开始
+            session.seek_frame = frame
+            session.current_index = 0
+            return True
+
         if frame not in session.frame_index:
             # 找最接近的帧
             sorted_frames = sorted(session.frame_index.keys())
@@ -450,6 +577,16 @@ class DataReplayer:
         session.current_index = indices[0] if indices else 0
         return True
 
+    def seek_to_room(self, room_index: int, occurrence: int = 0) -> bool:
+        """跳转到第 occurrence 次进入指定房间的帧"""
+        index = self.get_index()
+        if index is None:
+            return False
+        frame = index.find_room_frame(room_index, occurrence)
+        if frame is None:
+            return False
+        return self.seek_to_frame(frame)
+
     def on_message(self, callback: Callable[[RawMessage], None]) -> Callable:
         """注册消息回调装饰器"""
         self._on_message = callback
@@ -546,18 +683,68 @@ class LuaSimulator:
             logger.error(f"发送消息失败: {e}")
             return False
 
+    def send_lines(self, lines: List[bytes]) -> bool:
+        """一次写入多行（线速模式）"""
+        if not self._connected or not self.socket:
+            return False
+
+        try:
+            self.socket.sendall(b"".join(lines))
+            return True
+        except Exception as e:
+            logger.error(f"发送消息失败: {e}")
+            return False
+
     def replay_session(
         self,
         replayer: DataReplayer,
         speed: float = 1.0,
-    ) -> None:
-        """回放会话"""
+        batch_size: int = 256,
+    ) -> Dict[str, Any]:
+        """回放会话
+
+        Args:
+            replayer: 已加载会话的回放器
+            speed: 回放速度；<= 0 时以线速发送（不等待，按 batch_size 行合并写入）
+            batch_size: 线速模式下每次写入的消息数
+
+        Returns:
+            发送统计（消息数、字节数、耗时、消息/秒）
+        """
+        stats = {"messages": 0, "bytes": 0, "elapsed": 0.0, "messages_per_sec": 0.0}
         if not self._connected:
             if not self.connect():
-                return
-
-        for msg in replayer.iter_messages(speed=speed):
-            if not self.send_message(msg):
-                break
+                return stats
 
+        start = time.perf_counter()
+        if speed > 0:
+            for msg in replayer.iter_messages(speed=speed):
+                line = msg.to_json_line().encode("utf-8")
+                if not self.send_lines([line]):
+                    break
+                stats["messages"] += 1
+                stats["bytes"] += len(line)
+        else:
+            batch: List[bytes] = []
+            batch_bytes = 0
+            for msg in replayer.iter_messages(speed=0):
+                line = msg.to_json_line().encode("utf-8")
+                batch.append(line)
+                batch_bytes += len(line)
+                if len(batch) >= batch_size:
+                    if not self.send_lines(batch):
+                        batch = []
+                        break
+                    stats["messages"] += len(batch)
+                    stats["bytes"] += batch_bytes
+                    batch = []
+                    batch_bytes = 0
+            if batch and self.send_lines(batch):
+                stats["messages"] += len(batch)
+                stats["bytes"] += batch_bytes
+
+        stats["elapsed"] = time.perf_counter() - start
+        if stats["elapsed"] > 0:
+            stats["messages_per_sec"] = stats["messages"] / stats["elapsed"]
         self.disconnect()
+        return stats
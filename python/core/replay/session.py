@@ -6,6 +6,7 @@ Core Replay Session Manager - 会话管理
 - 按时间/大小排序
 - 清理旧会话
 - 会话元数据查询
+- 会话目录数据库（catalog.sqlite）加速查询
 """
 
 import os
@@ -17,6 +18,7 @@ from datetime import datetime
 from typing import Optional, List, Dict, Any
 from dataclasses import dataclass, field
 
+from .catalog import CATALOG_FILENAME, SessionCatalog
 from .message import SessionMetadata
 
 logger = logging.getLogger(__name__)
@@ -37,6 +39,24 @@ class SessionInfo:
     total_messages: int = 0
     size_bytes: int = 0
     protocol_version: str = "2.0"
+    first_frame: Optional[int] = None
+    last_frame: Optional[int] = None
+
+    @classmethod
+    def from_catalog(cls, row: Dict[str, Any]) -> "SessionInfo":
+        """由目录数据库中的行创建"""
+        return cls(
+            session_id=row["session_id"],
+            path=Path(row["path"]),
+            start_time=row["start_time"],
+            duration=row["duration"],
+            total_frames=row["total_frames"],
+            total_messages=row["total_messages"],
+            size_bytes=row["size_bytes"],
+            protocol_version=row["protocol_version"],
+            first_frame=row["first_frame"],
+            last_frame=row["last_frame"],
+        )
 
     @property
     def start_datetime(self) -> datetime:
@@ -69,6 +89,8 @@ class SessionInfo:
             "total_messages": self.total_messages,
             "size_bytes": self.size_bytes,
             "protocol_version": self.protocol_version,
+            "first_frame": self.first_frame,
+            "last_frame": self.last_frame,
         }
 
 
@@ -92,12 +114,60 @@ class SessionManager:
     # 删除旧会话
     manager.cleanup(keep_count=10)
     ```
+
+    录制目录中存在 catalog.sqlite（由 DataRecorder 或 reconcile 创建）时，
+    查询直接走目录数据库，每次只对会话目录做一次轻量对账（stat），
+    不再逐个计算目录大小和读取元数据。
     """
 
-    def __init__(self, recordings_dir: Optional[str] = None):
+    def __init__(
+        self,
+        recordings_dir: Optional[str] = None,
+        use_catalog: Optional[bool] = None,
+    ):
+        """
+        Args:
+            recordings_dir: 录制目录
+            use_catalog: 是否使用目录数据库；None 表示已存在时使用，True 时自动创建
+        """
         self.recordings_dir = Path(recordings_dir or DEFAULT_RECORDINGS_DIR)
         self.recordings_dir.mkdir(parents=True, exist_ok=True)
 
+        self.catalog: Optional[SessionCatalog] = None
+        if use_catalog is None:
+            use_catalog = (self.recordings_dir / CATALOG_FILENAME).exists()
+        if use_catalog:
+            self.catalog = self._open_catalog()
+
+    def _open_catalog(self) -> Optional[SessionCatalog]:
+        try:
+            return SessionCatalog.for_directory(self.recordings_dir)
+        except Exception as e:
+            logger.warning(f"打开会话目录数据库失败，回退到目录扫描: {e}")
+            return None
+
+    def reconcile(self, deep: bool = True, full: bool = False) -> Dict[str, int]:
+        """与录制目录对账（需要时创建目录数据库）
+
+        Args:
+            deep: 是否解码消息块统计房间与通道
+            full: 重新扫描所有会话
+        """
+        if self.catalog is None:
+            self.catalog = SessionCatalog.for_directory(self.recordings_dir)
+        return self.catalog.reconcile(self.recordings_dir, deep=deep, full=full)
+
+    def _sync_catalog(self) -> bool:
+        """轻量对账（新增/删除/修改过的会话只读元数据），返回目录数据库是否可用"""
+        if self.catalog is None:
+            return False
+        try:
+            self.catalog.reconcile(self.recordings_dir, deep=False)
+            return True
+        except Exception as e:
+            logger.warning(f"会话目录数据库对账失败，回退到目录扫描: {e}")
+            return False
+
     def list_sessions(
         self,
         sort_by: str = "time",
@@ -113,6 +183,12 @@ class SessionManager:
         Returns:
             会话信息列表
         """
+        if self._sync_catalog():
+            return [
+                SessionInfo.from_catalog(row)
+                for row in self.catalog.list(sort_by=sort_by, reverse=reverse)
+            ]
+
         sessions = []
 
         for item in self.recordings_dir.iterdir():
@@ -209,6 +285,11 @@ class SessionManager:
         """获取指定会话信息"""
         session_dir = self.recordings_dir / session_id
 
+        if self.catalog is not None and session_dir.exists():
+            row = self.catalog.get(session_id)
+            if row is not None:
+                return SessionInfo.from_catalog(row)
+
         if not session_dir.exists():
             # 模糊匹配
             matches = list(self.recordings_dir.glob(f"*{session_id}*"))
@@ -237,6 +318,8 @@ class SessionManager:
 
         try:
             shutil.rmtree(session.path)
+            if self.catalog is not None:
+                self.catalog.remove(session.session_id)
             logger.info(f"删除会话: {session_id}")
             return True
         except Exception as e:
@@ -291,11 +374,15 @@ class SessionManager:
 
     def get_total_size(self) -> int:
         """获取总大小（字节）"""
+        if self._sync_catalog():
+            return self.catalog.total_size()
         sessions = self.list_sessions()
         return sum(s.size_bytes for s in sessions)
 
     def get_stats(self) -> Dict[str, Any]:
         """获取统计信息"""
+        if self._sync_catalog():
+            return self.catalog.get_stats()
         sessions = self.list_sessions()
         return {
             "total_sessions": len(sessions),
@@ -0,0 +1,227 @@
+"""
+Core Replay Stream - 流式消息读取
+
+按块（chunk 文件）惰性读取录制消息，并以 k 路归并按帧顺序输出：
+- 每个块独立解码并按 (frame, received_at) 排序
+- 块按写入顺序（文件名中的毫秒时间戳）激活，同时只保留少量块在内存中
+- RawMessage 在出堆时才构造
+"""
+
+import functools
+import heapq
+import json
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .codec import read_chunk_bytes
+from .message import RawMessage
+
+logger = logging.getLogger(__name__)
+
+# 消息文件匹配模式（按优先级），同一文件只会被收录一次
+MESSAGE_FILE_PATTERNS = (
+    "messages_*.jsonl",
+    "messages_*.jsonl.gz",
+    "messages_*.jsonl.zst",
+    "*.jsonl",
+    "*.jsonl.gz",
+    "*.jsonl.zst",
+)
+
+# 原始透传块文件前缀
+RAW_CHUNK_PREFIX = "raw_"
+
+# 会话目录中不属于消息块的 JSONL 文件（事件、关键帧缓存等）
+NON_MESSAGE_MARKERS = ("events", "keyframes")
+
+# 排序键: (frame, received_at)
+SortKey = Tuple[int, float]
+# 已解码记录: (排序键, 消息字典)
+Record = Tuple[SortKey, Dict[str, Any]]
+
+
+def find_message_files(session_dir: Path) -> List[Path]:
+    """查找会话目录中的消息块文件（去重，按写入顺序排列）
+
+    跳过事件文件（events_*）和关键帧缓存等非消息文件。
+    """
+    seen = set()
+    files: List[Path] = []
+    for pattern in MESSAGE_FILE_PATTERNS:
+        for filepath in sorted(Path(session_dir).glob(pattern)):
+            if filepath in seen or any(m in filepath.name for m in NON_MESSAGE_MARKERS):
+                continue
+            seen.add(filepath)
+            files.append(filepath)
+    files.sort(key=lambda p: p.name)
+    return files
+
+
+def is_raw_chunk(name: str) -> bool:
+    """是否为原始透传块（raw_*，每行为 "接收时间\t原始行"）"""
+    return name.startswith(RAW_CHUNK_PREFIX)
+
+
+def parse_lines(
+    lines: Iterable[str], source: str = "", raw: bool = False
+) -> List[Record]:
+    """解码 JSON 行并按 (frame, received_at) 排序，损坏的行会被跳过
+
+    Args:
+        lines: 文本行
+        source: 来源名称（用于日志）
+        raw: 是否为原始透传格式（接收时间 + 制表符 + 线上原始 JSON）
+    """
+    records: List[Record] = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            if raw:
+                received_at, _, body = line.partition("\t")
+                data = json.loads(body)
+                if isinstance(data, dict):
+                    data["received_at"] = float(received_at)
+            else:
+                data = json.loads(line)
+        except (json.JSONDecodeError, ValueError) as e:
+            logger.warning(f"跳过损坏的行 {source}: {e}")
+            continue
+        if not isinstance(data, dict):
+            logger.warning(f"跳过非对象的行 {source}")
+            continue
+        try:
+            key = (
+                int(data.get("frame", 0) or 0),
+                float(data.get("received_at", 0) or 0),
+            )
+        except (TypeError, ValueError) as e:
+            logger.warning(f"跳过帧号无效的行 {source}: {e}")
+            continue
+        records.append((key, data))
+    records.sort(key=lambda r: r[0])
+    return records
+
+
+def read_chunk(filepath: Path) -> List[Record]:
+    """读取单个块并按 (frame, received_at) 排序
+
+    只做 JSON 解码，RawMessage 延迟到使用时构造。解压方式由文件后缀决定。
+    """
+    try:
+        lines = read_chunk_bytes(filepath).decode("utf-8").splitlines()
+        return parse_lines(lines, filepath.name, raw=is_raw_chunk(filepath.name))
+    except (OSError, EOFError, ValueError, RuntimeError) as e:
+        logger.warning(f"读取消息块失败 {filepath}: {e}")
+        return []
+
+
+class ChunkCursor:
+    """单个数据源（块文件或索引块）的读取游标"""
+
+    def __init__(self, seq: int, loader: Callable[[], List[Record]]):
+        self.seq = seq
+        self.loader = loader
+        self._records: List[Record] = []
+        self._pos = 0
+
+    def load(self) -> Optional[SortKey]:
+        """解码数据源，返回最小排序键（空数据源返回 None）"""
+        self._records = self.loader()
+        self._pos = 0
+        return self._records[0][0] if self._records else None
+
+    def pop(self) -> Tuple[Dict[str, Any], Optional[SortKey]]:
+        """取出当前记录，返回 (记录, 下一条记录的排序键)"""
+        _, data = self._records[self._pos]
+        self._records[self._pos] = None  # 释放已输出的记录
+        self._pos += 1
+        if self._pos < len(self._records):
+            return data, self._records[self._pos][0]
+        self._records = []
+        return data, None
+
+
+def merge_sources(
+    loaders: Iterable[Callable[[], List[Record]]],
+    min_frame: int = 0,
+) -> Iterator[RawMessage]:
+    """k 路归并多个数据源，按 (frame, received_at) 输出消息
+
+    数据源按写入顺序激活：当即将输出最近激活的数据源中的最小记录时，才激活下一个。
+    录制器按接收顺序写入，后写的数据源最小帧号通常不小于先写的，因此归并结果与
+    全量排序一致，同时内存中通常只有两个数据源。
+
+    该假设不成立时（帧计数器重置、消息迟到超过一个块），新激活的数据源含有比
+    已输出记录更小的记录：此时记录警告并一次性激活其余全部数据源，之后的输出
+    保持有序；已输出的记录不会重排。
+
+    Args:
+        loaders: 数据源加载函数（按写入顺序），返回已排序的记录
+        min_frame: 跳过帧号小于该值的消息（不构造 RawMessage）
+    """
+    pending = iter(enumerate(loaders))
+    heap: List[Tuple[int, float, int, ChunkCursor]] = []
+    last_loaded_min: Optional[SortKey] = None
+    last_key: Optional[SortKey] = None
+    exhausted = False
+
+    def load(seq: int, loader: Callable[[], List[Record]]) -> Optional[SortKey]:
+        cursor = ChunkCursor(seq, loader)
+        first = cursor.load()
+        if first is not None:
+            heapq.heappush(heap, (first[0], first[1], seq, cursor))
+        return first
+
+    def activate_next() -> bool:
+        nonlocal last_loaded_min, exhausted
+        for seq, loader in pending:
+            first = load(seq, loader)
+            if first is None:
+                continue
+            last_loaded_min = first
+            if last_key is not None and first < last_key:
+                logger.warning(
+                    f"数据源 {seq} 的最小帧 {first[0]} 小于已输出的帧 {last_key[0]}，"
+                    f"改为同时读取其余全部数据源"
+                )
+                for rest in pending:
+                    load(*rest)
+                exhausted = True
+            return True
+        exhausted = True
+        return False
+
+    activate_next()
+    while heap:
+        top = heap[0]
+        # 即将输出最新激活数据源的最小记录时，下一个数据源可能含有同样小的记录
+        while not exhausted and (top[0], top[1]) >= last_loaded_min:
+            if not activate_next():
+                break
+            top = heap[0]
+
+        frame, received_at, seq, cursor = heapq.heappop(heap)
+        data, next_key = cursor.pop()
+        if next_key is not None:
+            heapq.heappush(heap, (next_key[0], next_key[1], seq, cursor))
+        last_key = (frame, received_at)
+
+        if frame < min_frame:
+            continue
+        try:
+            yield RawMessage.from_dict(data)
+        except Exception as e:
+            logger.warning(f"跳过无效消息 frame={frame}: {e}")
+
+
+def merge_chunks(
+    files: List[Path],
+    min_frame: int = 0,
+) -> Iterator[RawMessage]:
+    """k 路归并多个块文件，按 (frame, received_at) 输出消息"""
+    return merge_sources(
+        (functools.partial(read_chunk, filepath) for filepath in files),
+        min_frame=min_frame,
+    )
@@ -0,0 +1,71 @@
+"""
+Telemetry Module - 运行时遥测
+
+- tracing: 端到端延迟追踪（阶段打点、滚动延迟直方图、指令回显）
+- IssueWindow: 有界问题存储（定义于 core.protocol.issues，此处重新导出）
+- metrics: 统一指标注册表、本地 Prometheus 端点与 JSON 转储
+- watchdog: 帧预算看门狗与慢帧采样剖析
+- profiling: 运行时剖析控制（帧窗口、按房间触发，带帧/房间标签输出）
+- control: 本地控制套接字（按行文本命令，JSON 回复）
+- memory: 历史存储内存计量与全局预算（自适应缩减历史深度）
+
+导出名按需加载：导入 core.telemetry.memory 等子模块时不会连带加载
+HTTP 指标端点、剖析器和控制套接字。
+"""
+
+import importlib
+from typing import Any
+
+# 导出名 -> 定义所在的模块（相对 core.telemetry）
+_EXPORTS = {
+    # Tracing
+    "ECHO_FIELD": ".tracing",
+    "STAGES": ".tracing",
+    "LatencyHistogram": ".tracing",
+    "MessageTrace": ".tracing",
+    "Tracer": ".tracing",
+    # Issues
+    "IssueWindow": "..protocol.issues",
+    # Metrics
+    "Counter": ".metrics",
+    "Gauge": ".metrics",
+    "Histogram": ".metrics",
+    "MetricsDumper": ".metrics",
+    "MetricsRegistry": ".metrics",
+    "MetricsServer": ".metrics",
+    # Watchdog
+    "DEFAULT_FRAME_BUDGET_MS": ".watchdog",
+    "FrameBudgetWatchdog": ".watchdog",
+    "ProfileCapture": ".watchdog",
+    "SamplingProfiler": ".watchdog",
+    "SlowFrame": ".watchdog",
+    # Profiling
+    "MODE_DETERMINISTIC": ".profiling",
+    "MODE_SAMPLING": ".profiling",
+    "ProfileRun": ".profiling",
+    "ProfilerController": ".profiling",
+    # Control
+    "ControlServer": ".control",
+    "send_control_command": ".control",
+    # Memory
+    "MemoryBudget": ".memory",
+    "MemoryTarget": ".memory",
+    "deep_sizeof": ".memory",
+    "process_rss": ".memory",
+    "sample_sizeof": ".memory",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
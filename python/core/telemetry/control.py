@@ -0,0 +1,117 @@
+"""
+Telemetry Control - 本地控制套接字
+
+在 127.0.0.1 上监听，按行接收文本命令，每条命令回复一行 JSON。
+第一个词选择处理器，其余部分作为参数：
+
+    $ nc 127.0.0.1 9528
+    profile start 600 next-room label=boss
+    {"ok": true, "run": {...}}
+    profile stop
+    {"ok": true, "run": {..., "path": "profiles/profile_sampling_f..."}}
+
+处理器通过 register(name, handler) 登记，handler(args) 返回可 JSON 序列化的字典。
+"""
+
+import json
+import logging
+import shlex
+import socket
+import socketserver
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[List[str]], Dict[str, Any]]
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class ControlServer:
+    """本地文本命令服务器"""
+
+    def __init__(self, port: int = 9528, host: str = "127.0.0.1"):
+        self.host = host
+        self._port = port
+        self.handlers: Dict[str, Handler] = {}
+        self._server: Optional[_TCPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self.register("help", lambda args: {"ok": True, "commands": sorted(self.handlers)})
+
+    @property
+    def port(self) -> int:
+        """实际监听端口（port=0 时由系统分配）"""
+        if self._server is not None:
+            return self._server.server_address[1]
+        return self._port
+
+    def register(self, name: str, handler: Handler) -> None:
+        self.handlers[name] = handler
+
+    def execute(self, line: str) -> Dict[str, Any]:
+        """执行一行命令"""
+        try:
+            words = shlex.split(line)
+        except ValueError as e:
+            return {"ok": False, "error": f"命令解析失败: {e}"}
+        if not words:
+            return {"ok": False, "error": "空命令"}
+        handler = self.handlers.get(words[0])
+        if handler is None:
+            return {"ok": False, "error": f"未知命令: {words[0]}（help 查看可用命令）"}
+        try:
+            return handler(words[1:])
+        except Exception as e:
+            logger.error(f"Control command error: {e}")
+            return {"ok": False, "error": str(e)}
+
+    def start(self) -> None:
+        if self._server is not None:
+            return
+        server = self
+
+        class RequestHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for raw in self.rfile:
+                    line = raw.decode("utf-8", errors="replace").strip()
+                    if not line:
+                        continue
+                    if line in ("quit", "exit"):
+                        break
+                    reply = server.execute(line)
+                    self.wfile.write(
+                        (json.dumps(reply, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+                    )
+
+        self._server = _TCPServer((self.host, self._port), RequestHandler)
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="ControlServer", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Control socket listening on {self.host}:{self.port}")
+
+    def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+
+def send_control_command(
+    line: str, port: int = 9528, host: str = "127.0.0.1", timeout: float = 5.0
+) -> Dict[str, Any]:
+    """向控制套接字发送一条命令并返回回复"""
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        sock.sendall((line.strip() + "\n").encode("utf-8"))
+        reply = sock.makefile("rb").readline()
+    if not reply:
+        raise ConnectionError("控制套接字没有回复")
+    return json.loads(reply)
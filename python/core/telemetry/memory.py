@@ -0,0 +1,278 @@
+"""
+Telemetry Memory - 历史存储的内存计量与预算
+
+各组件的历史存储（通道状态历史、实体历史、异常检测样本、录制缓冲）
+通过 register_memory(budget) 登记到 MemoryBudget：
+
+- measure(): 返回 {子项: 估算字节}，例如按通道拆分
+- depth / resize(depth): 可选，历史深度的基准值与调整函数
+
+MemoryBudget.check() 汇总各组件占用；设置了预算且超出时，按同一比例
+缩小所有可调历史的深度（不低于 min_depth），占用回落到预算的
+grow_threshold 以下后再逐步恢复。字节数是 sys.getsizeof 的深度估算，
+长历史按均匀抽样外推，用于相对比较与预算控制，不等同于精确 RSS。
+
+check() 会遍历组件的历史容器，应在写入这些容器的线程（处理线程）上
+调用；maybe_check() 按 check_interval 节流，可以每条消息调用一次。
+"""
+
+import logging
+import os
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# 深度估算时视为叶子的类型（不再展开）
+_ATOMIC = (str, bytes, bytearray, int, float, bool, complex, type(None), type)
+
+
+def deep_sizeof(obj: Any, seen: Optional[Set[int]] = None) -> int:
+    """估算对象及其引用对象的总字节数（同一对象只计一次）"""
+    if seen is None:
+        seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        item_id = id(item)
+        if item_id in seen:
+            continue
+        seen.add(item_id)
+        size += sys.getsizeof(item)
+        if isinstance(item, _ATOMIC):
+            continue
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            stack.extend(item)
+        else:
+            attrs = getattr(item, "__dict__", None)
+            if attrs is not None:
+                stack.append(attrs)
+            for slot in getattr(type(item), "__slots__", ()):
+                value = getattr(item, slot, None)
+                if value is not None:
+                    stack.append(value)
+    return size
+
+
+def sample_sizeof(items: Any, sample: int = 16, seen: Optional[Set[int]] = None) -> int:
+    """估算序列的总字节数：均匀抽取至多 sample 项做深度估算后按长度外推"""
+    count = len(items)
+    size = sys.getsizeof(items)
+    if count == 0:
+        return size
+    if count <= sample:
+        picked: Iterable[Any] = items
+        picked_count = count
+    else:
+        step = count / sample
+        seq = items if isinstance(items, (list, tuple)) else list(items)
+        picked = [seq[int(i * step)] for i in range(sample)]
+        picked_count = sample
+    seen = set() if seen is None else seen
+    seen.add(id(items))
+    measured = sum(deep_sizeof(item, seen) for item in picked)
+    return size + int(measured * count / picked_count)
+
+
+def process_rss() -> Optional[int]:
+    """当前进程常驻内存（字节）；无法获取时返回 None"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss
+    except Exception:
+        return None
+
+
+@dataclass
+class MemoryTarget:
+    """一个被计量的历史存储"""
+
+    name: str
+    measure: Callable[[], Dict[str, int]]
+    depth: int = 0  # 基准历史深度（0 表示只计量、不调整）
+    resize: Optional[Callable[[int], None]] = None
+    min_depth: int = 1
+    current_depth: int = 0
+    usage: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def adjustable(self) -> bool:
+        return self.resize is not None and self.depth > 0
+
+    @property
+    def bytes(self) -> int:
+        return sum(self.usage.values())
+
+
+class MemoryBudget:
+    """历史存储内存计量与全局预算"""
+
+    def __init__(
+        self,
+        budget_bytes: Optional[int] = None,
+        check_interval: float = 5.0,
+        shrink_margin: float = 0.9,
+        grow_threshold: float = 0.6,
+        grow_step: float = 1.25,
+        min_scale: float = 0.05,
+    ):
+        """
+        Args:
+            budget_bytes: 全局预算（None 只计量不调整）
+            check_interval: maybe_check 的最小间隔（秒）
+            shrink_margin: 超出预算时把占用压到预算的该比例
+            grow_threshold: 占用低于预算的该比例时逐步恢复深度
+            grow_step: 每次恢复的深度倍数
+            min_scale: 深度比例下限
+        """
+        self.budget_bytes = budget_bytes
+        self.check_interval = check_interval
+        self.shrink_margin = shrink_margin
+        self.grow_threshold = grow_threshold
+        self.grow_step = grow_step
+        self.min_scale = min_scale
+
+        self.targets: Dict[str, MemoryTarget] = {}
+        self.scale = 1.0
+        self.total_bytes = 0
+        self.checks = 0
+        self.shrinks = 0
+        self.grows = 0
+        self.last_check_ms = 0.0
+        self._last_check = 0.0
+
+    # ==================== 登记 ====================
+
+    def track(
+        self,
+        name: str,
+        measure: Callable[[], Dict[str, int]],
+        depth: int = 0,
+        resize: Optional[Callable[[int], None]] = None,
+        min_depth: int = 1,
+    ) -> MemoryTarget:
+        """登记一个历史存储（同名覆盖）"""
+        target = MemoryTarget(
+            name=name,
+            measure=measure,
+            depth=depth,
+            resize=resize,
+            min_depth=min_depth,
+            current_depth=depth,
+        )
+        self.targets[name] = target
+        if target.adjustable and self.scale < 1.0:
+            self._apply(target)
+        return target
+
+    def untrack(self, name: str) -> None:
+        self.targets.pop(name, None)
+
+    # ==================== 计量与调整 ====================
+
+    def measure(self) -> int:
+        """重新计量全部组件，返回总字节数"""
+        total = 0
+        for target in list(self.targets.values()):
+            try:
+                target.usage = dict(target.measure())
+            except Exception as e:
+                logger.debug(f"Memory measure failed for {target.name}: {e}")
+                continue
+            total += target.bytes
+        self.total_bytes = total
+        return total
+
+    def maybe_check(self, now: Optional[float] = None) -> bool:
+        """距上次检查超过 check_interval 时执行 check()"""
+        now = time.monotonic() if now is None else now
+        if now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+        self.check()
+        return True
+
+    def check(self) -> int:
+        """计量并按预算调整历史深度，返回调整后的总字节数"""
+        started = time.perf_counter()
+        total = self.measure()
+        self.checks += 1
+        budget = self.budget_bytes
+        if budget:
+            if total > budget:
+                self._shrink(total, budget)
+                total = self.measure()
+            elif total < budget * self.grow_threshold and self.scale < 1.0:
+                self._set_scale(min(1.0, self.scale * self.grow_step))
+                self.grows += 1
+        self.last_check_ms = (time.perf_counter() - started) * 1000
+        return total
+
+    def _shrink(self, total: int, budget: int) -> None:
+        adjustable = [t for t in self.targets.values() if t.adjustable]
+        variable = sum(t.bytes for t in adjustable)
+        if variable <= 0:
+            return
+        fixed = total - variable
+        allowed = max(0.0, budget * self.shrink_margin - fixed)
+        scale = max(self.min_scale, self.scale * allowed / variable)
+        if scale >= self.scale:
+            return
+        self.shrinks += 1
+        logger.info(
+            f"Memory budget exceeded ({total / 1e6:.1f}MB > {budget / 1e6:.1f}MB), "
+            f"history depth scale {self.scale:.2f} -> {scale:.2f}"
+        )
+        self._set_scale(scale)
+
+    def _set_scale(self, scale: float) -> None:
+        self.scale = scale
+        for target in self.targets.values():
+            if target.adjustable:
+                self._apply(target)
+
+    def _apply(self, target: MemoryTarget) -> None:
+        depth = max(target.min_depth, int(target.depth * self.scale))
+        if depth != target.current_depth:
+            target.resize(depth)
+            target.current_depth = depth
+
+    # ==================== 统计 ====================
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "budget_bytes": self.budget_bytes or 0,
+            "total_bytes": self.total_bytes,
+            "rss_bytes": process_rss() or 0,
+            "scale": self.scale,
+            "checks": self.checks,
+            "shrinks": self.shrinks,
+            "grows": self.grows,
+            "last_check_ms": self.last_check_ms,
+            "components": {
+                name: {
+                    "bytes": target.bytes,
+                    "depth": target.current_depth,
+                    "parts": dict(target.usage),
+                }
+                for name, target in self.targets.items()
+            },
+        }
+
+    def register_metrics(self, registry) -> None:
+        """登记到 core.telemetry.MetricsRegistry（memory_*）"""
+        registry.register_collector("memory", self.get_stats)
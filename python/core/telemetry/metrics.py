@@ -0,0 +1,450 @@
+"""
+Telemetry Metrics - 统一指标注册表
+
+各组件把计数器、仪表和延迟直方图登记到同一个 MetricsRegistry，
+进程外通过本地 HTTP 端点（Prometheus 文本格式）或定期 JSON 转储观察：
+
+- Counter: 单调递增计数（消息数、字节数……）
+- Gauge: 瞬时值（队列深度、连接状态……）
+- Histogram: 复用 LatencyHistogram 的对数分桶（HDR 风格），
+  以 Prometheus summary 导出（窗口分位数 + 累计 _sum/_count）
+- Collector: 回调函数返回现有的统计字典（IsaacBridge.stats、
+  DataProcessor.get_stats() ……），数值叶子按路径展开为指标
+
+使用示例：
+```python
+registry = MetricsRegistry()
+bridge.register_metrics(registry)
+facade.register_metrics(registry)
+
+server = MetricsServer(registry, port=9100)   # http://127.0.0.1:9100/metrics
+server.start()
+dumper = MetricsDumper(registry, "metrics.json", interval=10)
+dumper.start()
+```
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import asdict, is_dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from .tracing import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+_NAME_RE = re.compile(r"[^a-zA-Z0-9_]+")
+
+# 导出的分位数
+SUMMARY_QUANTILES = (50, 90, 99)
+
+
+def metric_name(*parts: str) -> str:
+    """拼接并清理指标名（非法字符替换为下划线）"""
+    name = "_".join(p for p in parts if p)
+    name = _NAME_RE.sub("_", name).strip("_").lower()
+    if name and name[0].isdigit():
+        name = "_" + name
+    return name
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    items = key + extra
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _label_str(key: LabelKey) -> str:
+    """JSON 快照中的标签键，例如 channel=ENEMIES"""
+    return ",".join(f"{k}={v}" for k, v in key)
+
+
+class _Metric:
+    """指标族（按标签区分子序列）"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str = ""):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str = ""):
+        super().__init__(name, help)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self) -> List[Tuple[LabelKey, float]]:
+        with self._lock:
+            return list(self._values.items())
+
+
+class Gauge(_Metric):
+    """瞬时值；可绑定回调，在导出时取值"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str = "", func: Optional[Callable[[], float]] = None):
+        super().__init__(name, help)
+        self._values: Dict[LabelKey, float] = {}
+        self._func = func
+
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: Any) -> float:
+        if self._func is not None and not labels:
+            return self._func()
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self) -> List[Tuple[LabelKey, float]]:
+        if self._func is not None:
+            try:
+                return [((), float(self._func()))]
+            except Exception as e:
+                logger.error(f"Gauge {self.name} callback error: {e}")
+                return []
+        with self._lock:
+            return list(self._values.items())
+
+
+class Histogram(_Metric):
+    """延迟直方图族，每个标签组合一个 LatencyHistogram"""
+
+    kind = "summary"
+
+    def __init__(self, name: str, help: str = "", window: float = 60.0):
+        super().__init__(name, help)
+        self.window = window
+        self._children: Dict[LabelKey, LatencyHistogram] = {}
+
+    def labels(self, **labels: Any) -> LatencyHistogram:
+        """取（必要时创建）标签对应的直方图；热路径上缓存返回值即可"""
+        key = _label_key(labels)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, LatencyHistogram(window=self.window))
+        return child
+
+    def attach(self, histogram: LatencyHistogram, **labels: Any) -> None:
+        """挂接已有的直方图（例如 Tracer 的阶段直方图）"""
+        with self._lock:
+            self._children[_label_key(labels)] = histogram
+
+    def record(self, value: float, **labels: Any) -> None:
+        self.labels(**labels).record(value)
+
+    def children(self) -> List[Tuple[LabelKey, LatencyHistogram]]:
+        with self._lock:
+            return list(self._children.items())
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self, namespace: str = "socketbridge", histogram_window: float = 60.0):
+        self.namespace = namespace
+        self.histogram_window = histogram_window
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: Dict[str, Callable[[], Any]] = {}
+        self._lock = threading.Lock()
+
+    # ==================== 登记 ====================
+
+    def _get_or_create(self, cls, name: str, help: str, **kwargs) -> Any:
+        full_name = metric_name(self.namespace, name)
+        with self._lock:
+            metric = self._metrics.get(full_name)
+            if metric is None:
+                metric = cls(full_name, help, **kwargs)
+                self._metrics[full_name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {full_name} already registered as {metric.kind}")
+        return metric
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        return self._get_or_create(Counter, name, help)
+
+    def gauge(self, name: str, help: str = "", func: Optional[Callable[[], float]] = None) -> Gauge:
+        gauge = self._get_or_create(Gauge, name, help)
+        if func is not None:
+            gauge._func = func
+        return gauge
+
+    def histogram(self, name: str, help: str = "", window: Optional[float] = None) -> Histogram:
+        return self._get_or_create(
+            Histogram, name, help,
+            window=self.histogram_window if window is None else window,
+        )
+
+    def register_collector(self, name: str, func: Callable[[], Any]) -> None:
+        """登记统计回调（同名覆盖）
+
+        回调返回字典或 dataclass，数值/布尔叶子按路径展开为
+        <namespace>_<name>_<key>_<subkey> 指标；其余类型忽略。
+        """
+        with self._lock:
+            self._collectors[metric_name(name)] = func
+
+    def unregister_collector(self, name: str) -> None:
+        with self._lock:
+            self._collectors.pop(metric_name(name), None)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(metric_name(self.namespace, name))
+
+    # ==================== 采集 ====================
+
+    def _collect(self) -> Iterator[Tuple[str, Any]]:
+        with self._lock:
+            collectors = list(self._collectors.items())
+        for name, func in collectors:
+            try:
+                yield name, func()
+            except Exception as e:
+                logger.error(f"Metrics collector {name} error: {e}")
+
+    @staticmethod
+    def _flatten(prefix: str, value: Any) -> Iterator[Tuple[str, float]]:
+        if is_dataclass(value) and not isinstance(value, type):
+            value = asdict(value)
+        if isinstance(value, bool):
+            yield prefix, int(value)
+        elif isinstance(value, (int, float)):
+            yield prefix, value
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                yield from MetricsRegistry._flatten(metric_name(prefix, str(key)), item)
+
+    def render_prometheus(self) -> str:
+        """Prometheus 文本格式（0.0.4）"""
+        lines: List[str] = []
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+
+        for name, metric in metrics:
+            if metric.help:
+                lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            if isinstance(metric, Histogram):
+                for key, hist in metric.children():
+                    snap = hist.snapshot(SUMMARY_QUANTILES)
+                    for q in SUMMARY_QUANTILES:
+                        labels = _format_labels(key, (("quantile", f"{q / 100:g}"),))
+                        lines.append(f"{name}{labels} {_format_value(snap[f'p{q:g}'])}")
+                    labels = _format_labels(key)
+                    lines.append(f"{name}_sum{labels} {_format_value(hist.total_sum)}")
+                    lines.append(f"{name}_count{labels} {hist.total_count}")
+            else:
+                for key, value in metric.samples():
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+        for name, stats in self._collect():
+            for leaf, value in self._flatten(metric_name(self.namespace, name), stats):
+                lines.append(f"# TYPE {leaf} untyped")
+                lines.append(f"{leaf} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON 友好的快照"""
+        result: Dict[str, Any] = {
+            "timestamp": time.time(),
+            "counters": {},
+            "gauges": {},
+            "histograms": {},
+            "collectors": {},
+        }
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        for name, metric in metrics:
+            if isinstance(metric, Histogram):
+                result["histograms"][name] = {
+                    _label_str(key): {
+                        **hist.snapshot(SUMMARY_QUANTILES),
+                        "total_count": hist.total_count,
+                        "total_sum": hist.total_sum,
+                    }
+                    for key, hist in metric.children()
+                }
+            else:
+                section = result["counters" if isinstance(metric, Counter) else "gauges"]
+                samples = metric.samples()
+                if len(samples) == 1 and not samples[0][0]:
+                    section[name] = samples[0][1]
+                else:
+                    section[name] = {_label_str(key): value for key, value in samples}
+        for name, stats in self._collect():
+            result["collectors"][name] = dict(self._flatten("", stats))
+        return result
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.snapshot(), indent=indent, ensure_ascii=False, default=str)
+
+
+class MetricsServer:
+    """本地 HTTP 指标端点
+
+    GET /metrics       Prometheus 文本格式
+    GET /metrics.json  JSON 快照
+    """
+
+    def __init__(self, registry: MetricsRegistry, port: int = 9100, host: str = "127.0.0.1"):
+        self.registry = registry
+        self.host = host
+        self._port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        """实际监听端口（port=0 时由系统分配）"""
+        if self._server is not None:
+            return self._server.server_address[1]
+        return self._port
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/metrics"
+
+    def start(self) -> None:
+        if self._server is not None:
+            return
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path in ("/", "/metrics"):
+                    body = registry.render_prometheus().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                elif path == "/metrics.json":
+                    body = registry.to_json().encode("utf-8")
+                    content_type = "application/json; charset=utf-8"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("Metrics %s - %s", self.address_string(), format % args)
+
+        self._server = ThreadingHTTPServer((self.host, self._port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="MetricsServer", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Metrics endpoint listening on {self.url}")
+
+    def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+
+class MetricsDumper:
+    """定期把 JSON 快照写入文件（先写临时文件再替换，读取方不会看到半个文件）"""
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        path: Union[str, Path],
+        interval: float = 10.0,
+    ):
+        self.registry = registry
+        self.path = Path(path)
+        self.interval = interval
+        self.dumps = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def dump(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(self.registry.to_json(), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self.dumps += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.dump()
+            except Exception as e:
+                logger.error(f"Metrics dump error: {e}")
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="MetricsDumper", daemon=True)
+        self._thread.start()
+
+    def stop(self, final_dump: bool = True) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+        self._thread = None
+        if final_dump:
+            try:
+                self.dump()
+            except Exception as e:
+                logger.error(f"Metrics dump error: {e}")
@@ -0,0 +1,348 @@
+"""
+Telemetry Profiling - 运行时剖析控制
+
+ProfilerController 挂接到 IsaacBridge（raw_message），在运行中启停剖析器：
+
+- sampling: SamplingProfiler 定时采样处理线程调用栈，输出折叠栈（.folded）
+- deterministic: cProfile，输出 pstats 文件（.prof，可用 snakeviz 等查看）
+
+捕获可以限定帧数窗口，也可以等到下一次换房间（或进入指定房间）再开始，
+因此可以只剖析一场 Boss 战。输出文件名与同名 .json 元数据记录帧范围与房间：
+
+    profiles/profile_sampling_f1200-1800_r84_20260202_234500.folded
+    profiles/profile_sampling_f1200-1800_r84_20260202_234500.json
+
+cProfile 只剖析调用 enable() 的线程，因此捕获的开始与结束都在处理线程
+（收到消息时）完成；stop() 会等待下一条消息完成收尾。
+
+控制命令（控制台与控制套接字共用）：
+    profile start [帧数] [sampling|deterministic] [next-room|room=<索引>] [label=<名称>]
+    profile stop
+    profile status
+"""
+
+import cProfile
+import json
+import logging
+import pstats
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from .watchdog import SamplingProfiler
+
+logger = logging.getLogger(__name__)
+
+MODE_SAMPLING = "sampling"
+MODE_DETERMINISTIC = "deterministic"
+MODES = (MODE_SAMPLING, MODE_DETERMINISTIC)
+_MODE_ALIASES = {"sample": MODE_SAMPLING, "cprofile": MODE_DETERMINISTIC, "det": MODE_DETERMINISTIC}
+
+STATE_ARMED = "armed"  # 等待第一条消息或换房间触发
+STATE_RUNNING = "running"
+
+_LABEL_RE = re.compile(r"[^a-zA-Z0-9_.-]+")
+
+
+@dataclass
+class ProfileRun:
+    """一次剖析捕获"""
+
+    mode: str
+    frames: Optional[int] = None  # 捕获的帧数窗口（None 表示直到 stop）
+    label: str = ""
+    next_room: bool = False  # 换房间后开始
+    room: Optional[int] = None  # 进入该房间后开始
+    state: str = STATE_ARMED
+    armed_at: float = field(default_factory=time.time)
+    armed_room: Optional[int] = None
+
+    started_at: float = 0.0
+    start_frame: int = -1
+    end_frame: int = -1
+    rooms: List[int] = field(default_factory=list)
+    messages: int = 0
+    frames_seen: int = 0
+    stop_requested: bool = False
+
+    path: Optional[Path] = None
+    done: threading.Event = field(default_factory=threading.Event)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "state": self.state,
+            "label": self.label,
+            "frames_window": self.frames,
+            "start_frame": self.start_frame,
+            "end_frame": self.end_frame,
+            "rooms": list(self.rooms),
+            "messages": self.messages,
+            "frames": self.frames_seen,
+            "duration": (time.time() - self.started_at) if self.started_at else 0.0,
+            "path": str(self.path) if self.path else None,
+        }
+
+
+class ProfilerController:
+    """运行时剖析控制器"""
+
+    def __init__(
+        self,
+        output_dir: Union[str, Path] = "profiles",
+        mode: str = MODE_SAMPLING,
+        sample_interval: float = 0.002,
+    ):
+        self.output_dir = Path(output_dir)
+        self.default_mode = mode
+        self.sample_interval = sample_interval
+        self.last_run: Optional[ProfileRun] = None
+        self._run: Optional[ProfileRun] = None
+        self._sampler: Optional[SamplingProfiler] = None
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._lock = threading.RLock()
+
+    # ==================== 挂接 ====================
+
+    def attach(self, bridge) -> None:
+        """挂接到 IsaacBridge：每条 DATA/FULL 消息驱动捕获窗口"""
+
+        @bridge.on("raw_message")
+        def on_raw_message(msg: dict):
+            if self._run is not None and msg.get("type") in ("DATA", "FULL"):
+                self.on_message(msg.get("frame", 0), msg.get("room_index", -1))
+
+    @property
+    def active(self) -> bool:
+        return self._run is not None
+
+    # ==================== 控制 ====================
+
+    def start(
+        self,
+        frames: Optional[int] = None,
+        mode: Optional[str] = None,
+        label: str = "",
+        next_room: bool = False,
+        room: Optional[int] = None,
+    ) -> ProfileRun:
+        """布置一次捕获（在下一条消息时开始）
+
+        Args:
+            frames: 捕获帧数，None 表示直到 stop()
+            mode: sampling / deterministic，默认使用构造时的模式
+            label: 写入文件名与元数据的标签
+            next_room: 等到下一次换房间再开始
+            room: 等到进入该房间索引再开始
+        """
+        mode = _MODE_ALIASES.get(mode, mode) if mode else self.default_mode
+        if mode not in MODES:
+            raise ValueError(f"未知剖析模式: {mode}（可选: {', '.join(MODES)}）")
+        with self._lock:
+            if self._run is not None:
+                raise RuntimeError("已有剖析正在进行，先执行 stop")
+            run = ProfileRun(
+                mode=mode,
+                frames=frames if frames and frames > 0 else None,
+                label=_LABEL_RE.sub("_", label).strip("_"),
+                next_room=next_room,
+                room=room,
+            )
+            self._run = run
+        logger.info(f"Profiler armed: {mode}, frames={run.frames}, room={room}, next_room={next_room}")
+        return run
+
+    def stop(self, timeout: float = 2.0) -> Optional[ProfileRun]:
+        """结束捕获并写出文件
+
+        deterministic 模式在处理线程收尾，这里最多等待 timeout 秒；
+        超时后在下一条消息到达时写出。尚未开始的捕获直接取消。
+        """
+        with self._lock:
+            run = self._run
+            if run is None:
+                return None
+            if run.state == STATE_ARMED:
+                self._run = None
+                run.done.set()
+                logger.info("Profiler disarmed before capture started")
+                return run
+            if run.mode == MODE_SAMPLING:
+                self._finish(run)
+                return run
+            run.stop_requested = True
+        run.done.wait(timeout)
+        return run
+
+    def on_message(self, frame: int, room: int) -> None:
+        """处理线程上每条消息调用一次"""
+        with self._lock:
+            run = self._run
+            if run is None:
+                return
+            if run.state == STATE_ARMED:
+                if self._should_begin(run, room):
+                    self._begin(run, frame, room)
+                return
+
+            run.messages += 1
+            if frame != run.end_frame:
+                run.frames_seen += 1
+                run.end_frame = frame
+            if room not in run.rooms:
+                run.rooms.append(room)
+            if run.stop_requested or (run.frames and run.frames_seen >= run.frames):
+                self._finish(run)
+
+    def _should_begin(self, run: ProfileRun, room: int) -> bool:
+        if run.room is not None:
+            return room == run.room
+        if run.next_room:
+            if run.armed_room is None:
+                run.armed_room = room
+                return False
+            return room != run.armed_room
+        return True
+
+    def _begin(self, run: ProfileRun, frame: int, room: int) -> None:
+        run.state = STATE_RUNNING
+        run.started_at = time.time()
+        run.start_frame = run.end_frame = frame
+        run.rooms = [room]
+        run.frames_seen = 1
+        run.messages = 1
+        if run.mode == MODE_SAMPLING:
+            self._sampler = SamplingProfiler(interval=self.sample_interval)
+            self._sampler.start()
+            self._sampler.begin()  # 采样当前（处理）线程
+        else:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        logger.info(f"Profiler started at frame {frame} (room {room})")
+
+    def _finish(self, run: ProfileRun) -> None:
+        try:
+            if run.mode == MODE_SAMPLING:
+                capture = self._sampler.end()
+                self._sampler.stop()
+                self._sampler = None
+                run.path = self._write_sampling(run, capture)
+            else:
+                self._cprofile.disable()
+                run.path = self._write_deterministic(run, self._cprofile)
+                self._cprofile = None
+            logger.info(f"Profile written: {run.path}")
+        except Exception as e:
+            logger.error(f"Failed to write profile: {e}")
+        finally:
+            self._run = None
+            self.last_run = run
+            run.done.set()
+
+    # ==================== 输出 ====================
+
+    def _base_path(self, run: ProfileRun) -> Path:
+        rooms = "-".join(str(r) for r in run.rooms) or "na"
+        parts = [f"profile_{run.mode}", f"f{run.start_frame}-{run.end_frame}", f"r{rooms}"]
+        if run.label:
+            parts.append(run.label)
+        parts.append(datetime.fromtimestamp(run.started_at).strftime("%Y%m%d_%H%M%S"))
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        return self.output_dir / "_".join(parts)
+
+    def _write_meta(self, base: Path, run: ProfileRun, extra: Dict[str, Any]) -> None:
+        meta = run.to_dict()
+        meta.pop("path", None)
+        meta["state"] = "complete"
+        meta.update(extra)
+        base.with_suffix(".json").write_text(
+            json.dumps(meta, indent=2, ensure_ascii=False), encoding="utf-8"
+        )
+
+    def _write_sampling(self, run: ProfileRun, capture) -> Path:
+        base = self._base_path(run)
+        path = base.with_suffix(".folded")
+        path.write_text(capture.to_collapsed() + "\n", encoding="utf-8")
+        self._write_meta(base, run, {
+            "samples": capture.sample_count,
+            "interval_ms": capture.interval * 1000,
+            "top": [
+                {"function": name, "samples": count, "ms": ms}
+                for name, count, ms in capture.top(20)
+            ],
+        })
+        return path
+
+    def _write_deterministic(self, run: ProfileRun, profile: cProfile.Profile) -> Path:
+        base = self._base_path(run)
+        path = base.with_suffix(".prof")
+        profile.dump_stats(str(path))
+        stats = pstats.Stats(profile)
+        entries = sorted(stats.stats.items(), key=lambda item: -item[1][3])[:20]
+        self._write_meta(base, run, {
+            "top": [
+                {
+                    "function": f"{func} ({Path(filename).name}:{line})",
+                    "calls": nc,
+                    "tottime": tt,
+                    "cumtime": ct,
+                }
+                for (filename, line, func), (cc, nc, tt, ct, _) in entries
+            ],
+        })
+        return path
+
+    # ==================== 命令 ====================
+
+    def status(self) -> Dict[str, Any]:
+        run = self._run
+        return {
+            "active": run is not None,
+            "run": run.to_dict() if run else None,
+            "last": self.last_run.to_dict() if self.last_run else None,
+            "output_dir": str(self.output_dir),
+        }
+
+    def handle_command(self, args: List[str]) -> Dict[str, Any]:
+        """处理 profile 子命令（控制台与控制套接字共用）
+
+        start [帧数] [sampling|deterministic] [next-room|room=<索引>] [label=<名称>]
+        stop
+        status
+        """
+        if not args or args[0] == "status":
+            return {"ok": True, **self.status()}
+        action, rest = args[0], args[1:]
+
+        if action == "start":
+            kwargs: Dict[str, Any] = {}
+            for token in rest:
+                if token.isdigit():
+                    kwargs["frames"] = int(token)
+                elif token in MODES or token in _MODE_ALIASES:
+                    kwargs["mode"] = token
+                elif token == "next-room":
+                    kwargs["next_room"] = True
+                elif token.startswith("room="):
+                    kwargs["room"] = int(token[5:])
+                elif token.startswith("label="):
+                    kwargs["label"] = token[6:]
+                else:
+                    return {"ok": False, "error": f"无法识别的参数: {token}"}
+            try:
+                run = self.start(**kwargs)
+            except (ValueError, RuntimeError) as e:
+                return {"ok": False, "error": str(e)}
+            return {"ok": True, "run": run.to_dict()}
+
+        if action == "stop":
+            run = self.stop()
+            if run is None:
+                return {"ok": False, "error": "没有正在进行的剖析"}
+            return {"ok": True, "run": run.to_dict()}
+
+        return {"ok": False, "error": f"未知子命令: {action}（start / stop / status）"}
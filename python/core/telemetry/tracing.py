@@ -0,0 +1,266 @@
+"""
+Telemetry Tracing - 端到端延迟追踪
+
+每条消息从接收到处理完成按阶段打点，阶段耗时写入滚动延迟直方图：
+
+==============  ==========================================================
+decode          JSON 解码（IsaacBridge 接收线程）
+process         DataProcessor / SocketBridgeFacade 处理
+callbacks       用户回调（frame / message）
+total           从收到完整行到所有处理完成
+react           从收到最近一条消息到 send_input/send_command 发出
+command_rtt     指令发出到 Lua 回显（Lua 在应用指令的那一帧回显）
+apply_frames    指令所依据的数据帧到 Lua 应用指令的帧数差（单位：帧）
+==============  ==========================================================
+
+Lua 端与 Python 端的时钟不同源（game_time 为游戏内毫秒），因此跨进程延迟
+只通过指令回显的往返时间测量。
+
+使用示例：
+```python
+tracer = Tracer()
+bridge.tracer = tracer
+...
+print(tracer.get_stats()["process"]["p99"])
+```
+"""
+
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+STAGE_DECODE = "decode"
+STAGE_PROCESS = "process"
+STAGE_CALLBACKS = "callbacks"
+STAGE_TOTAL = "total"
+STAGE_REACT = "react"
+STAGE_COMMAND_RTT = "command_rtt"
+STAGE_APPLY_FRAMES = "apply_frames"
+
+STAGES = (
+    STAGE_DECODE,
+    STAGE_PROCESS,
+    STAGE_CALLBACKS,
+    STAGE_TOTAL,
+    STAGE_REACT,
+    STAGE_COMMAND_RTT,
+    STAGE_APPLY_FRAMES,
+)
+
+# 指令回显字段名（send_input / send_command 写入，Lua 原样回传）
+ECHO_FIELD = "echo"
+
+# 最多保留的未回显指令数
+MAX_PENDING_ECHOES = 1024
+
+
+class LatencyHistogram:
+    """滚动延迟直方图
+
+    对数分桶（每十倍 buckets_per_decade 个桶，相对误差约 12%），记录 O(1)。
+    计数分两代，每 window 秒轮换一次，快照合并两代，
+    因此统计覆盖最近 window 到 2×window 秒。
+    """
+
+    def __init__(
+        self,
+        window: float = 60.0,
+        min_value: float = 0.001,
+        max_value: float = 60000.0,
+        buckets_per_decade: int = 20,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.window = window
+        self.min_value = min_value
+        self.max_value = max_value
+        self.buckets_per_decade = buckets_per_decade
+        self._log_min = math.log10(min_value)
+        self._size = int(math.ceil(math.log10(max_value / min_value) * buckets_per_decade)) + 1
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._current = self._new_generation()
+        self._previous = self._new_generation()
+        self._rotated_at = clock()
+        self.total_count = 0  # 自创建以来的记录数（不随窗口轮换）
+        self.total_sum = 0.0  # 自创建以来的记录值之和
+
+    def _new_generation(self) -> Dict[str, Any]:
+        return {
+            "counts": [0] * self._size,
+            "count": 0,
+            "sum": 0.0,
+            "min": math.inf,
+            "max": 0.0,
+        }
+
+    def _bucket(self, value: float) -> int:
+        if value <= self.min_value:
+            return 0
+        index = int((math.log10(value) - self._log_min) * self.buckets_per_decade)
+        return min(index, self._size - 1)
+
+    def _bucket_value(self, index: int) -> float:
+        """桶的代表值（几何中点）"""
+        return 10 ** (self._log_min + (index + 0.5) / self.buckets_per_decade)
+
+    def _maybe_rotate(self, now: float) -> None:
+        elapsed = now - self._rotated_at
+        if elapsed < self.window:
+            return
+        if elapsed >= 2 * self.window:
+            self._previous = self._new_generation()
+        else:
+            self._previous = self._current
+        self._current = self._new_generation()
+        self._rotated_at = now
+
+    def record(self, value: float) -> None:
+        """记录一个值（毫秒，或任意非负量）"""
+        if value < 0:
+            value = 0.0
+        with self._lock:
+            self._maybe_rotate(self._clock())
+            gen = self._current
+            gen["counts"][self._bucket(value)] += 1
+            gen["count"] += 1
+            gen["sum"] += value
+            if value < gen["min"]:
+                gen["min"] = value
+            if value > gen["max"]:
+                gen["max"] = value
+            self.total_count += 1
+            self.total_sum += value
+
+    def percentile(self, p: float) -> float:
+        return self.snapshot(percentiles=(p,))[f"p{p:g}"]
+
+    def snapshot(self, percentiles: Tuple[float, ...] = (50, 90, 99)) -> Dict[str, float]:
+        """窗口内的统计：count / mean / min / max / pXX"""
+        with self._lock:
+            self._maybe_rotate(self._clock())
+            gens = (self._previous, self._current)
+            count = sum(g["count"] for g in gens)
+            result: Dict[str, float] = {"count": count}
+            if not count:
+                result.update(mean=0.0, min=0.0, max=0.0)
+                result.update({f"p{p:g}": 0.0 for p in percentiles})
+                return result
+            low = min(g["min"] for g in gens)
+            high = max(g["max"] for g in gens)
+            result.update(mean=sum(g["sum"] for g in gens) / count, min=low, max=high)
+            counts = [a + b for a, b in zip(gens[0]["counts"], gens[1]["counts"])]
+
+        for p in percentiles:
+            rank = max(1, int(math.ceil(p / 100 * count)))
+            seen = 0
+            for index, n in enumerate(counts):
+                seen += n
+                if seen >= rank:
+                    value = self._bucket_value(index)
+                    break
+            result[f"p{p:g}"] = min(max(value, low), high)
+        return result
+
+
+@dataclass
+class MessageTrace:
+    """一条消息的追踪上下文"""
+
+    frame: int
+    seq: Optional[int]
+    started: float  # perf_counter，收到完整行的时间
+    last_mark: float
+
+
+class Tracer:
+    """端到端延迟追踪器（IsaacBridge / BridgeAdapter 共享一个实例）"""
+
+    def __init__(self, window: float = 60.0, enabled: bool = True):
+        self.enabled = enabled
+        self.histograms: Dict[str, LatencyHistogram] = {
+            stage: LatencyHistogram(window=window) for stage in STAGES
+        }
+        self.current: Optional[MessageTrace] = None
+        self._pending: Dict[int, Tuple[float, int]] = {}  # echo -> (发送时间, 数据帧)
+        self._next_echo = 1
+        self._lock = threading.Lock()
+        self.echoes_sent = 0
+        self.echoes_received = 0
+        self.echoes_unmatched = 0
+
+    # ==================== 消息阶段 ====================
+
+    def begin(self, started: float, frame: int = 0, seq: Optional[int] = None) -> Optional[MessageTrace]:
+        """开始追踪一条消息（started 为收到完整行时的 perf_counter）"""
+        if not self.enabled:
+            return None
+        trace = MessageTrace(frame=frame, seq=seq, started=started, last_mark=started)
+        self.current = trace
+        return trace
+
+    def mark(self, trace: Optional[MessageTrace], stage: str) -> None:
+        """记录从上一个打点到现在的阶段耗时"""
+        if trace is None:
+            return
+        now = time.perf_counter()
+        self.histograms[stage].record((now - trace.last_mark) * 1000)
+        trace.last_mark = now
+
+    def finish(self, trace: Optional[MessageTrace]) -> None:
+        if trace is None:
+            return
+        self.histograms[STAGE_TOTAL].record((time.perf_counter() - trace.started) * 1000)
+
+    # ==================== 指令回显 ====================
+
+    def on_command_sent(self) -> Optional[int]:
+        """指令发出时调用，返回写入指令的回显编号"""
+        if not self.enabled:
+            return None
+        now = time.perf_counter()
+        trace = self.current
+        if trace is not None:
+            self.histograms[STAGE_REACT].record((now - trace.started) * 1000)
+        with self._lock:
+            echo = self._next_echo
+            self._next_echo += 1
+            self._pending[echo] = (now, trace.frame if trace else -1)
+            if len(self._pending) > MAX_PENDING_ECHOES:
+                # dict 保持插入顺序，丢弃最早的未回显指令
+                self._pending.pop(next(iter(self._pending)))
+            self.echoes_sent += 1
+        return echo
+
+    def on_echo(self, msg: Dict[str, Any]) -> Optional[float]:
+        """收到 Lua 回显（CMD 消息带 echo 字段），返回往返时间（毫秒）"""
+        echo = msg.get(ECHO_FIELD)
+        with self._lock:
+            pending = self._pending.pop(echo, None)
+            if pending is None:
+                self.echoes_unmatched += 1
+                return None
+            self.echoes_received += 1
+        sent_at, source_frame = pending
+        rtt = (time.perf_counter() - sent_at) * 1000
+        self.histograms[STAGE_COMMAND_RTT].record(rtt)
+        applied = msg.get("applied_frame", msg.get("frame"))
+        if source_frame >= 0 and isinstance(applied, int):
+            self.histograms[STAGE_APPLY_FRAMES].record(max(0, applied - source_frame))
+        return rtt
+
+    # ==================== 统计 ====================
+
+    def get_stats(self) -> Dict[str, Any]:
+        """各阶段的滚动统计（毫秒；apply_frames 单位为帧）"""
+        stats: Dict[str, Any] = {
+            stage: hist.snapshot() for stage, hist in self.histograms.items()
+        }
+        stats["echo"] = {
+            "sent": self.echoes_sent,
+            "received": self.echoes_received,
+            "pending": len(self._pending),
+            "unmatched": self.echoes_unmatched,
+        }
+        return stats
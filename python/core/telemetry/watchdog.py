@@ -0,0 +1,446 @@
+"""
+Telemetry Watchdog - 帧预算看门狗
+
+60 fps 下游戏每 16.7ms 发出一帧。FrameBudgetWatchdog 对每条消息的处理
+（门面处理、内部回调、用户 frame/message 回调）端到端计时：
+
+- 超出预算的帧记为慢帧，耗时按阶段和回调拆分
+- 配合 SamplingProfiler：处理期间后台线程对处理线程的调用栈定时采样，
+  帧结束时若未超预算则丢弃样本，超预算则保留为该慢帧的采样剖析
+- 慢帧保存在有界队列中，日志按间隔限流
+
+使用示例：
+```python
+watchdog = FrameBudgetWatchdog(budget_ms=16.7, profiler=SamplingProfiler())
+watchdog.start()
+
+watchdog.begin(frame)
+process(msg)
+watchdog.mark("process")
+watchdog.time_call("frame:on_frame", on_frame, frame)
+watchdog.mark("callbacks")
+watchdog.end()
+
+for slow in watchdog.recent_slow():
+    print(slow.summary())
+```
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter as _Counter, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .tracing import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FRAME_BUDGET_MS = 1000.0 / 60
+
+Stack = Tuple[str, ...]
+
+
+def callback_name(fn: Callable) -> str:
+    """回调的可读名称（module.qualname）"""
+    fn = getattr(fn, "__func__", fn)
+    name = getattr(fn, "__qualname__", None) or getattr(fn, "__name__", None) or repr(fn)
+    module = getattr(fn, "__module__", None)
+    return f"{module}.{name}" if module else name
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+# ==================== 采样剖析 ====================
+
+
+@dataclass
+class ProfileCapture:
+    """一次采样剖析结果（调用栈从外到内）"""
+
+    interval: float
+    samples: List[Stack] = field(default_factory=list)
+
+    @property
+    def sample_count(self) -> int:
+        return len(self.samples)
+
+    def collapsed(self) -> Dict[str, int]:
+        """折叠栈计数（flamegraph.pl / speedscope 可直接读取）"""
+        return dict(_Counter(";".join(stack) for stack in self.samples))
+
+    def to_collapsed(self) -> str:
+        return "\n".join(f"{stack} {n}" for stack, n in sorted(self.collapsed().items()))
+
+    def top(self, n: int = 10, leaf: bool = True) -> List[Tuple[str, int, float]]:
+        """最热的位置 [(函数 (文件:行), 样本数, 估算毫秒)]
+
+        leaf=True 时只统计栈顶（自身时间）；leaf=False 时按包含时间统计
+        （出现在栈中任意位置，每个样本计一次，栈底的公共帧会排在前面）。
+        """
+        counts: _Counter = _Counter()
+        for stack in self.samples:
+            if not stack:
+                continue
+            if leaf:
+                counts[stack[-1]] += 1
+            else:
+                counts.update(set(stack))
+        return [
+            (name, count, count * self.interval * 1000)
+            for name, count in counts.most_common(n)
+        ]
+
+    def to_dict(self, top: int = 10) -> Dict[str, Any]:
+        return {
+            "interval_ms": self.interval * 1000,
+            "samples": self.sample_count,
+            "top": [
+                {"function": name, "samples": count, "ms": ms}
+                for name, count, ms in self.top(top)
+            ],
+            "collapsed": self.collapsed(),
+        }
+
+
+class SamplingProfiler:
+    """调用栈采样剖析器
+
+    后台线程只在 begin()/end() 之间采样目标线程（sys._current_frames），
+    空闲时阻塞等待，不占用 CPU。
+    """
+
+    def __init__(self, interval: float = 0.002, max_depth: int = 48):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._target: Optional[int] = None
+        self._samples: List[Stack] = []
+        self.total_samples = 0
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="SamplingProfiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if not self._running:
+            return
+        self._running = False
+        self._active.set()  # 唤醒采样线程
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self._active.clear()
+
+    def begin(self, thread_id: Optional[int] = None) -> None:
+        """开始采样目标线程（默认当前线程）"""
+        with self._lock:
+            self._target = threading.get_ident() if thread_id is None else thread_id
+            self._samples = []
+        self._active.set()
+
+    def end(self) -> ProfileCapture:
+        """停止采样并取出样本"""
+        self._active.clear()
+        with self._lock:
+            samples, self._samples = self._samples, []
+            self._target = None
+        return ProfileCapture(interval=self.interval, samples=samples)
+
+    def sample(self, thread_id: int) -> Optional[Stack]:
+        """采一次目标线程的调用栈"""
+        frame = sys._current_frames().get(thread_id)
+        if frame is None:
+            return None
+        stack: List[str] = []
+        while frame is not None and len(stack) < self.max_depth:
+            stack.append(_frame_label(frame))
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    def _run(self) -> None:
+        while self._running:
+            if not self._active.wait(0.5):
+                continue
+            target = self._target
+            if target is not None:
+                stack = self.sample(target)
+                if stack is not None:
+                    with self._lock:
+                        if self._target == target:
+                            self._samples.append(stack)
+                            self.total_samples += 1
+            time.sleep(self.interval)
+
+
+# ==================== 看门狗 ====================
+
+
+@dataclass
+class SlowFrame:
+    """超出预算的一帧"""
+
+    frame: int
+    timestamp: float
+    total_ms: float
+    budget_ms: float
+    stages: Dict[str, float] = field(default_factory=dict)
+    callbacks: Dict[str, float] = field(default_factory=dict)
+    profile: Optional[ProfileCapture] = None
+
+    @property
+    def over_ms(self) -> float:
+        return self.total_ms - self.budget_ms
+
+    def summary(self, top: int = 3) -> str:
+        parts = [f"frame {self.frame}: {self.total_ms:.2f}ms (budget {self.budget_ms:.2f}ms)"]
+        if self.stages:
+            parts.append(
+                "stages " + ", ".join(f"{k}={v:.2f}" for k, v in self.stages.items())
+            )
+        if self.callbacks:
+            slowest = sorted(self.callbacks.items(), key=lambda x: -x[1])[:top]
+            parts.append("callbacks " + ", ".join(f"{k}={v:.2f}" for k, v in slowest))
+        if self.profile and self.profile.samples:
+            hot = self.profile.top(top)
+            parts.append("hot " + ", ".join(f"{name}×{count}" for name, count, _ in hot))
+        return " | ".join(parts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "frame": self.frame,
+            "timestamp": self.timestamp,
+            "total_ms": self.total_ms,
+            "budget_ms": self.budget_ms,
+            "stages": dict(self.stages),
+            "callbacks": dict(self.callbacks),
+            "profile": self.profile.to_dict() if self.profile else None,
+        }
+
+
+@dataclass
+class _FrameTiming:
+    frame: int
+    started: float
+    last_mark: float
+    stages: Dict[str, float] = field(default_factory=dict)
+    callbacks: Dict[str, float] = field(default_factory=dict)
+
+
+class FrameBudgetWatchdog:
+    """帧预算看门狗（在消息处理线程上调用 begin/mark/end）"""
+
+    def __init__(
+        self,
+        budget_ms: float = DEFAULT_FRAME_BUDGET_MS,
+        profiler: Optional[SamplingProfiler] = None,
+        max_slow_frames: int = 100,
+        log_interval: float = 5.0,
+        on_slow: Optional[Callable[[SlowFrame], None]] = None,
+        window: float = 60.0,
+        profile: bool = True,
+    ):
+        """
+        Args:
+            budget_ms: 每帧处理预算（毫秒）
+            profiler: 采样剖析器（None 时只计时不采样）
+            max_slow_frames: 保留的最近慢帧数
+            log_interval: 慢帧警告日志的最小间隔（秒），期间的慢帧合并计数
+            on_slow: 慢帧回调
+            window: 处理耗时直方图滚动窗口（秒）
+            profile: 启动时是否开启采样（可用 set_profiling 运行时切换）
+        """
+        self.budget_ms = budget_ms
+        self.profiler = profiler
+        self.profile_enabled = profile
+        self._started = False
+        self.log_interval = log_interval
+        self.on_slow = on_slow
+        self.histogram = LatencyHistogram(window=window)
+        self.slow_frames: Deque[SlowFrame] = deque(maxlen=max_slow_frames)
+        self.current: Optional[_FrameTiming] = None
+
+        self.frames = 0
+        self.slow_count = 0
+        self.max_ms = 0.0
+        # 慢帧中各阶段/回调的累计耗时（毫秒），用于归因
+        self.slow_stage_ms: Dict[str, float] = {}
+        self.slow_callback_ms: Dict[str, float] = {}
+
+        self._last_log = 0.0
+        self._suppressed = 0
+        self._slow_counter = None
+
+    # ==================== 生命周期 ====================
+
+    def start(self) -> None:
+        self._started = True
+        if self.profiler and self.profile_enabled:
+            self.profiler.start()
+
+    def stop(self) -> None:
+        self._started = False
+        if self.profiler:
+            self.profiler.stop()
+
+    def set_profiling(self, enabled: bool) -> bool:
+        """运行时开关慢帧采样
+
+        Returns:
+            是否生效（构造时未提供 profiler 则返回 False）
+        """
+        if self.profiler is None:
+            return False
+        self.profile_enabled = enabled
+        if self._started:
+            if enabled:
+                self.profiler.start()
+            else:
+                self.profiler.stop()
+        return True
+
+    def handle_command(self, args: List[str]) -> Dict[str, Any]:
+        """处理 watchdog 子命令（控制套接字）
+
+        profile on|off
+        status
+        """
+        if not args or args[0] == "status":
+            return {"ok": True, "profiling": self.profile_enabled, **self.get_stats()}
+        if args[0] == "profile" and len(args) == 2 and args[1] in ("on", "off"):
+            if not self.set_profiling(args[1] == "on"):
+                return {"ok": False, "error": "看门狗没有配置采样剖析器"}
+            return {"ok": True, "profiling": self.profile_enabled}
+        return {"ok": False, "error": f"无法识别的参数: {' '.join(args)}（profile on|off / status）"}
+
+    # ==================== 计时 ====================
+
+    def begin(self, frame: int = 0) -> None:
+        now = time.perf_counter()
+        self.current = _FrameTiming(frame=frame, started=now, last_mark=now)
+        if self.profiler and self.profiler.running:
+            self.profiler.begin()
+
+    def mark(self, stage: str) -> None:
+        """记录从上一个打点到现在的阶段耗时"""
+        timing = self.current
+        if timing is None:
+            return
+        now = time.perf_counter()
+        timing.stages[stage] = timing.stages.get(stage, 0.0) + (now - timing.last_mark) * 1000
+        timing.last_mark = now
+
+    def add_callback(self, name: str, elapsed_ms: float) -> None:
+        timing = self.current
+        if timing is not None:
+            timing.callbacks[name] = timing.callbacks.get(name, 0.0) + elapsed_ms
+
+    def time_call(self, name: str, fn: Callable, *args, **kwargs) -> Any:
+        """调用 fn 并把耗时归到回调 name"""
+        started = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.add_callback(name, (time.perf_counter() - started) * 1000)
+
+    def end(self) -> Optional[SlowFrame]:
+        """结束当前帧，超预算时返回 SlowFrame"""
+        timing = self.current
+        if timing is None:
+            return None
+        self.current = None
+        total_ms = (time.perf_counter() - timing.started) * 1000
+        profile = self.profiler.end() if self.profiler and self.profiler.running else None
+
+        self.frames += 1
+        self.histogram.record(total_ms)
+        if total_ms > self.max_ms:
+            self.max_ms = total_ms
+        if total_ms <= self.budget_ms:
+            return None
+
+        slow = SlowFrame(
+            frame=timing.frame,
+            timestamp=time.time(),
+            total_ms=total_ms,
+            budget_ms=self.budget_ms,
+            stages=timing.stages,
+            callbacks=timing.callbacks,
+            profile=profile,
+        )
+        self._record_slow(slow)
+        return slow
+
+    def _record_slow(self, slow: SlowFrame) -> None:
+        self.slow_count += 1
+        self.slow_frames.append(slow)
+        for stage, ms in slow.stages.items():
+            self.slow_stage_ms[stage] = self.slow_stage_ms.get(stage, 0.0) + ms
+        for name, ms in slow.callbacks.items():
+            self.slow_callback_ms[name] = self.slow_callback_ms.get(name, 0.0) + ms
+        if self._slow_counter is not None:
+            self._slow_counter.inc()
+
+        now = time.monotonic()
+        if now - self._last_log >= self.log_interval:
+            suffix = f" (+{self._suppressed} more since last report)" if self._suppressed else ""
+            logger.warning(f"Slow frame {slow.summary()}{suffix}")
+            self._last_log = now
+            self._suppressed = 0
+        else:
+            self._suppressed += 1
+
+        if self.on_slow:
+            try:
+                self.on_slow(slow)
+            except Exception as e:
+                logger.error(f"Slow frame callback error: {e}")
+
+    # ==================== 统计 ====================
+
+    def recent_slow(self, limit: Optional[int] = None) -> List[SlowFrame]:
+        frames = list(self.slow_frames)
+        return frames[-limit:] if limit else frames
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "budget_ms": self.budget_ms,
+            "frames": self.frames,
+            "slow_frames": self.slow_count,
+            "slow_ratio": self.slow_count / max(self.frames, 1),
+            "max_ms": self.max_ms,
+            "processing_ms": self.histogram.snapshot(),
+            "slow_stage_ms": dict(self.slow_stage_ms),
+            "slow_callback_ms": dict(
+                sorted(self.slow_callback_ms.items(), key=lambda x: -x[1])[:10]
+            ),
+            "profiler_samples": self.profiler.total_samples if self.profiler else 0,
+        }
+
+    def register_metrics(self, registry) -> None:
+        """登记到 MetricsRegistry（frame_processing_ms、slow_frames_total）"""
+        registry.histogram(
+            "frame_processing_ms", "Per-message processing time (ms)"
+        ).attach(self.histogram)
+        self._slow_counter = registry.counter(
+            "slow_frames_total", "Messages whose processing exceeded the frame budget"
+        )
+        self._slow_counter.inc(0)
+        registry.gauge("frame_budget_ms", "Per-message processing budget (ms)").set(self.budget_ms)
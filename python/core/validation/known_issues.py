@@ -305,6 +305,33 @@ class DynamicAnomalyDetector:
         if len(self.history[channel]) > self.history_size:
             self.history[channel].pop(0)
 
+    def set_history_size(self, history_size: int):
+        """调整每通道样本深度（保留最近的样本）"""
+        self.history_size = history_size
+        for channel, history in self.history.items():
+            if len(history) > history_size:
+                self.history[channel] = history[-history_size:]
+
+    def memory_usage(self, sample: int = 16) -> Dict[str, int]:
+        """按通道估算样本占用字节数（抽样外推）"""
+        # 仅在启用内存计量时导入，校验模块不依赖遥测模块
+        from ..telemetry.memory import sample_sizeof
+
+        return {
+            channel: sample_sizeof(history, sample)
+            for channel, history in list(self.history.items())
+        }
+
+    def register_memory(self, budget, name: str = "anomaly_detector") -> None:
+        """登记到 core.telemetry.MemoryBudget"""
+        budget.track(
+            name,
+            self.memory_usage,
+            depth=self.history_size,
+            resize=self.set_history_size,
+            min_depth=10,  # detect_anomaly 至少需要 10 个样本
+        )
+
     def detect_anomaly(self, channel: str, value: Any) -> Optional[ValidationIssue]:
         """检测异常"""
         if channel not in self.history or len(self.history[channel]) < 10:
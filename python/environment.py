@@ -12,7 +12,13 @@ SocketBridge 环境建模层
 """
 
 import math
-from typing import Dict, List, Set, Tuple, Optional, Any
+import heapq
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Set, Tuple, Optional, Any, Iterable, Callable
 from dataclasses import dataclass, field
 from enum import Enum
 import logging
@@ -122,6 +128,485 @@ class DangerZone:
     estimated_frames: int = 60
 
 
+# 8 邻接方向 (dx, dy, 代价倍率)，对角移动代价为 √2
+_NEIGHBOR_OFFSETS: Tuple[Tuple[int, int, float], ...] = (
+    (1, 0, 1.0),
+    (-1, 0, 1.0),
+    (0, 1, 1.0),
+    (0, -1, 1.0),
+    (1, 1, math.sqrt(2)),
+    (1, -1, math.sqrt(2)),
+    (-1, 1, math.sqrt(2)),
+    (-1, -1, math.sqrt(2)),
+)
+
+
+class DistanceField:
+    """网格距离场（Dijkstra 波前）
+
+    从一组源格子出发，计算到房间内所有格子的最短路径代价（像素）。
+    数据按行优先存放在扁平数组中（index = gy * width + gx），查询为 O(1)。
+
+    - 以玩家为源：流场（flow field），沿距离下降方向即可走回玩家
+    - 以敌人/投射物为源：到最近威胁的距离场
+    """
+
+    INF = float("inf")
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        distances: List[float],
+        sources: List[Tuple[int, int]],
+    ):
+        self.width = width
+        self.height = height
+        self.distances = distances
+        self.sources = sources
+
+    @classmethod
+    def compute(
+        cls,
+        game_map: "GameMap",
+        sources: Iterable[Tuple[int, int]],
+        hazard_penalty: float = 2.0,
+    ) -> "DistanceField":
+        """以波前方式从源格子扩散计算距离场
+
+        Args:
+            game_map: 地图（提供邻接表）
+            sources: 源格子坐标 (gx, gy)；不可行走的源格子同样会作为起点
+            hazard_penalty: 进入危险格子（尖刺、蛛网）的代价倍率
+
+        Returns:
+            距离场
+        """
+        width, height = game_map.width, game_map.height
+        size = width * height
+        distances = [cls.INF] * size
+        neighbors = game_map.get_neighbor_table()
+        hazard = game_map.get_hazard_mask()
+
+        heap: List[Tuple[float, int]] = []
+        seeded: List[Tuple[int, int]] = []
+        for gx, gy in sources:
+            if 0 <= gx < width and 0 <= gy < height:
+                idx = gy * width + gx
+                if distances[idx] > 0.0:
+                    distances[idx] = 0.0
+                    heap.append((0.0, idx))
+                    seeded.append((gx, gy))
+        heapq.heapify(heap)
+
+        while heap:
+            dist, idx = heapq.heappop(heap)
+            if dist > distances[idx]:
+                continue
+            for n_idx, step in neighbors[idx]:
+                cost = step * hazard_penalty if hazard[n_idx] else step
+                new_dist = dist + cost
+                if new_dist < distances[n_idx]:
+                    distances[n_idx] = new_dist
+                    heapq.heappush(heap, (new_dist, n_idx))
+
+        return cls(width, height, distances, seeded)
+
+    def get(self, gx: int, gy: int) -> float:
+        """获取格子的距离（越界或不可达返回 INF）"""
+        if 0 <= gx < self.width and 0 <= gy < self.height:
+            return self.distances[gy * self.width + gx]
+        return self.INF
+
+    def is_reachable(self, gx: int, gy: int) -> bool:
+        """格子是否可从源到达"""
+        return self.get(gx, gy) < self.INF
+
+    def descend(self, gx: int, gy: int) -> Optional[Tuple[int, int]]:
+        """沿距离下降方向移动一步（流场方向），已在源格子时返回 None
+
+        与建场时的邻接规则一致：对角移动要求两个正交格子都可达（禁止切墙角）。
+        """
+        current = self.get(gx, gy)
+        if current == 0.0 or current == self.INF:
+            return None
+
+        best: Optional[Tuple[int, int]] = None
+        best_dist = current
+        for dx, dy, _ in _NEIGHBOR_OFFSETS:
+            d = self.get(gx + dx, gy + dy)
+            if d >= best_dist:
+                continue
+            if dx != 0 and dy != 0:
+                if self.get(gx + dx, gy) == self.INF or self.get(gx, gy + dy) == self.INF:
+                    continue
+            best_dist = d
+            best = (gx + dx, gy + dy)
+        return best
+
+    def path_to_source(self, gx: int, gy: int) -> List[Tuple[int, int]]:
+        """从指定格子沿流场回到源格子的路径（包含起点和源）"""
+        if not self.is_reachable(gx, gy):
+            return []
+        path = [(gx, gy)]
+        step = self.descend(gx, gy)
+        while step is not None:
+            path.append(step)
+            step = self.descend(*step)
+        return path
+
+    def iter_reachable(self) -> Iterable[Tuple[int, int, float]]:
+        """遍历所有可达格子 (gx, gy, distance)"""
+        width = self.width
+        for idx, dist in enumerate(self.distances):
+            if dist < self.INF:
+                yield idx % width, idx // width, dist
+
+
+class DangerRaster:
+    """危险热力栅格
+
+    以子格分辨率（默认每格 4×4）覆盖整个房间，由两层组成：
+
+    - 静态层：危险区域（尖刺、蛛网、add_danger_zone）与火堆，
+      房间几何或危险区域变化时惰性重建
+    - 动态层：敌方投射物在未来 horizon_frames 帧内的扫掠体积，
+      按投射物 ID 记录写入的格子，移动时只撤销/重写该投射物的贡献
+
+    点查询和批量查询均为数组查表。
+    """
+
+    def __init__(
+        self,
+        game_map: "GameMap",
+        resolution: int = 4,
+        horizon_frames: int = 30,
+        time_step: int = 3,
+        projectile_margin: float = 15.0,
+        hazard_margin: float = 10.0,
+    ):
+        """
+        Args:
+            game_map: 所属地图
+            resolution: 每个网格格子划分的子格数（每边）
+            horizon_frames: 投射物轨迹预测的帧数
+            time_step: 轨迹采样步长（帧）
+            projectile_margin: 投射物危险半径的额外边距（约为玩家半径）
+            hazard_margin: 火堆危险半径的额外边距
+        """
+        self.game_map = game_map
+        self.resolution = resolution
+        self.horizon_frames = horizon_frames
+        self.time_step = time_step
+        self.projectile_margin = projectile_margin
+        self.hazard_margin = hazard_margin
+
+        self.cols = 0
+        self.rows = 0
+        self.cell_size = game_map.grid_size / resolution
+        self.origin: Tuple[float, float] = (0.0, 0.0)
+
+        self.static: List[float] = []
+        self.dynamic: List[float] = []
+
+        # 投射物 ID -> (运动状态键, [(子格索引, 贡献值)])
+        self._stamps: Dict[int, Tuple[Tuple, List[Tuple[int, float]]]] = {}
+        self._layout_key: Optional[Tuple] = None
+        self._static_dirty = True
+
+    def invalidate_static(self):
+        """标记静态层需要重建"""
+        self._static_dirty = True
+
+    def _ensure_layout(self):
+        """房间几何变化时重新分配栅格"""
+        gm = self.game_map
+        key = (gm.geometry_version, gm.width, gm.height, gm.grid_size, gm.top_left)
+        if key == self._layout_key:
+            return
+
+        self._layout_key = key
+        self.cell_size = gm.grid_size / self.resolution
+        self.cols = gm.width * self.resolution
+        self.rows = gm.height * self.resolution
+        self.origin = gm.top_left
+        self.static = [0.0] * (self.cols * self.rows)
+        self.dynamic = [0.0] * (self.cols * self.rows)
+        self._stamps.clear()
+        self._static_dirty = True
+
+    def _ensure_static(self):
+        self._ensure_layout()
+        if self._static_dirty:
+            self._rebuild_static()
+
+    def _rebuild_static(self):
+        """重建静态层"""
+        static = [0.0] * (self.cols * self.rows)
+
+        for zone in self.game_map.danger_zones:
+            for idx, value in self._circle_cells(
+                zone.center.x, zone.center.y, zone.radius, zone.intensity
+            ):
+                if value > static[idx]:
+                    static[idx] = value
+
+        for fire in self.game_map.entities.get(EntityType.FIRE_HAZARD, []):
+            if not fire.is_active:
+                continue
+            for idx, value in self._circle_cells(
+                fire.position.x,
+                fire.position.y,
+                fire.radius + self.hazard_margin,
+                1.0,
+            ):
+                if value > static[idx]:
+                    static[idx] = value
+
+        self.static = static
+        self._static_dirty = False
+
+    def _circle_cells(
+        self, cx: float, cy: float, radius: float, intensity: float
+    ) -> List[Tuple[int, float]]:
+        """圆形区域覆盖的子格及其危险值（越靠近中心越危险）"""
+        if radius <= 0 or intensity <= 0:
+            return []
+
+        cs = self.cell_size
+        ox, oy = self.origin
+        min_sx = max(0, int((cx - radius - ox) / cs))
+        max_sx = min(self.cols - 1, int((cx + radius - ox) / cs))
+        min_sy = max(0, int((cy - radius - oy) / cs))
+        max_sy = min(self.rows - 1, int((cy + radius - oy) / cs))
+
+        cells = []
+        for sy in range(min_sy, max_sy + 1):
+            py = oy + (sy + 0.5) * cs - cy
+            for sx in range(min_sx, max_sx + 1):
+                px = ox + (sx + 0.5) * cs - cx
+                dist = math.sqrt(px * px + py * py)
+                if dist < radius:
+                    cells.append((sy * self.cols + sx, (1 - dist / radius) * intensity))
+        return cells
+
+    def _sweep_cells(self, proj: ProjectileData) -> List[Tuple[int, float]]:
+        """投射物扫掠体积：沿速度方向按时间采样，越晚到达的位置权重越低"""
+        radius = proj.size + self.projectile_margin
+        contribution: Dict[int, float] = {}
+        steps = max(1, self.horizon_frames // max(1, self.time_step))
+        for step in range(steps + 1):
+            t = step * self.time_step
+            weight = 1.0 - t / (self.horizon_frames + self.time_step)
+            x = proj.position.x + proj.velocity.x * t
+            y = proj.position.y + proj.velocity.y * t
+            for idx, value in self._circle_cells(x, y, radius, weight):
+                if value > contribution.get(idx, 0.0):
+                    contribution[idx] = value
+        return list(contribution.items())
+
+    def update_projectiles(self, projectiles: Dict[int, ProjectileData]):
+        """增量更新动态层
+
+        只有新增、移动或消失的投射物会修改栅格。
+        """
+        self._ensure_layout()
+        dynamic = self.dynamic
+        seen: Set[int] = set()
+
+        for proj_id, proj in projectiles.items():
+            if not proj.is_enemy:
+                continue
+            seen.add(proj_id)
+            key = (
+                round(proj.position.x, 1),
+                round(proj.position.y, 1),
+                round(proj.velocity.x, 2),
+                round(proj.velocity.y, 2),
+                proj.size,
+            )
+            old = self._stamps.get(proj_id)
+            if old is not None:
+                if old[0] == key:
+                    continue
+                for idx, value in old[1]:
+                    dynamic[idx] -= value
+
+            cells = self._sweep_cells(proj)
+            for idx, value in cells:
+                dynamic[idx] += value
+            self._stamps[proj_id] = (key, cells)
+
+        for proj_id in [pid for pid in self._stamps if pid not in seen]:
+            for idx, value in self._stamps.pop(proj_id)[1]:
+                dynamic[idx] -= value
+
+        # 没有投射物时清零，消除浮点累积误差
+        if not self._stamps:
+            self.dynamic = [0.0] * len(dynamic)
+
+    def clear_dynamic(self):
+        """清除动态层"""
+        self._stamps.clear()
+        self.dynamic = [0.0] * len(self.dynamic)
+
+    def _index(self, x: float, y: float) -> int:
+        sx = int((x - self.origin[0]) // self.cell_size)
+        sy = int((y - self.origin[1]) // self.cell_size)
+        if 0 <= sx < self.cols and 0 <= sy < self.rows:
+            return sy * self.cols + sx
+        return -1
+
+    def get(self, position: Vector2D) -> float:
+        """获取位置的危险等级 0-1"""
+        self._ensure_static()
+        idx = self._index(position.x, position.y)
+        if idx < 0:
+            return 0.0
+        return max(self.static[idx], min(1.0, self.dynamic[idx]))
+
+    def get_many(self, positions: List[Vector2D]) -> List[float]:
+        """批量获取危险等级"""
+        self._ensure_static()
+        static, dynamic = self.static, self.dynamic
+        result = []
+        for pos in positions:
+            idx = self._index(pos.x, pos.y)
+            if idx < 0:
+                result.append(0.0)
+            else:
+                result.append(max(static[idx], min(1.0, dynamic[idx])))
+        return result
+
+    def get_cell_danger(self, gx: int, gy: int) -> float:
+        """获取网格格子内的最大危险等级"""
+        self._ensure_static()
+        res = self.resolution
+        best = 0.0
+        for sy in range(gy * res, min(self.rows, (gy + 1) * res)):
+            row = sy * self.cols
+            for sx in range(gx * res, min(self.cols, (gx + 1) * res)):
+                value = max(self.static[row + sx], min(1.0, self.dynamic[row + sx]))
+                if value > best:
+                    best = value
+        return best
+
+
+# 可见度射线方向数与最大探测距离（格）
+_VISIBILITY_RAYS = 16
+_VISIBILITY_RANGE = 6
+
+
+@dataclass
+class RoomGeometry:
+    """房间静态几何快照
+
+    包含从 ROOM_LAYOUT 解析出的全部静态数据，以及按需计算后挂载的派生数据
+    （邻接表、危险掩码、净空距离场、可见度）。由 RoomGeometryCache 缓存，
+    重新进入同一房间时直接套用到 GameMap。
+    """
+
+    room_index: int
+    fingerprint: str
+    width: int
+    height: int
+    grid_size: float
+    pixel_width: float
+    pixel_height: float
+    top_left: Tuple[float, float]
+    grid: Dict[Tuple[int, int], TileType]
+    static_obstacles: Set[Tuple[int, int]]
+    void_tiles: Set[Tuple[int, int]]
+    danger_zones: List[DangerZone]
+    doors: List[DoorData]
+    derived: Dict[str, Any] = field(default_factory=dict)
+
+
+class RoomGeometryCache:
+    """房间几何 LRU 缓存
+
+    键为 (room_index, 布局指纹)。指纹由 ROOM_LAYOUT 负载和影响解析结果的
+    RoomInfo 字段计算，同一房间布局变化（如岩石被炸毁后重新下发）时会生成新条目。
+    后台编译线程也会读写缓存，所有访问都持有内部锁。
+    """
+
+    def __init__(self, capacity: int = 32):
+        self.capacity = capacity
+        self._entries: "OrderedDict[Tuple[int, str], RoomGeometry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(
+        room_info: RoomInfo, layout_data: Optional[Dict[str, Any]]
+    ) -> str:
+        """计算布局指纹（规范化 JSON 的 blake2b 摘要）"""
+        payload = {
+            "width": room_info.grid_width,
+            "height": room_info.grid_height,
+            "shape": room_info.room_shape,
+            "top_left": list(room_info.top_left) if room_info.top_left else None,
+            "pixel": [room_info.pixel_width, room_info.pixel_height],
+            "layout": layout_data,
+        }
+        data = json.dumps(
+            payload, sort_keys=True, separators=(",", ":"), default=str
+        ).encode("utf-8")
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def make_key(
+        self, room_info: RoomInfo, layout_data: Optional[Dict[str, Any]]
+    ) -> Tuple[int, str]:
+        return (room_info.room_index, self.fingerprint(room_info, layout_data))
+
+    def get(self, key: Tuple[int, str]) -> Optional[RoomGeometry]:
+        with self._lock:
+            geometry = self._entries.get(key)
+            if geometry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return geometry
+
+    def latest_for_room(self, room_index: int) -> Optional[RoomGeometry]:
+        """最近使用的同一 room_index 的几何（不计入命中统计）
+
+        用作后台编译完成前的临时地图：回溯进入房间时布局通常未变。
+        """
+        with self._lock:
+            for (index, _), geometry in reversed(self._entries.items()):
+                if index == room_index:
+                    return geometry
+        return None
+
+    def put(self, key: Tuple[int, str], geometry: RoomGeometry):
+        with self._lock:
+            self._entries[key] = geometry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Tuple[int, str]) -> bool:
+        return key in self._entries
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
 class GameMap:
     """游戏地图模型
 
@@ -171,6 +656,15 @@ class GameMap:
         # 世界坐标 → 网格坐标: gx = int((world_x - top_left_x) / grid_size)
         self.top_left: Tuple[float, float] = (0.0, 0.0)
 
+        # 几何版本号：房间几何重建时递增，用于派生数据（邻接表等）的缓存失效
+        self.geometry_version = 0
+        self._derived_cache: Dict[str, Tuple[int, Any]] = {}
+        # 当前几何对应的缓存快照（派生数据计算后回写到快照中）
+        self._geometry: Optional[RoomGeometry] = None
+
+        # 危险热力栅格（静态危险 + 投射物扫掠体积）
+        self.danger_raster = DangerRaster(self)
+
         # 房间实体注册表 (EntityType -> List[RoomEntity])
         # 用于存储: FIRE_HAZARDS, BUTTONS, DESTRUCTIBLES, INTERACTABLES, PICKUPS, etc.
         self.entities: Dict[EntityType, List[RoomEntity]] = {
@@ -242,6 +736,8 @@ class GameMap:
 
         # 默认创建一个空房间（墙壁边界）
         self._create_default_walls()
+        self.geometry_version += 1
+        self._geometry = None
 
     def update_from_room_layout(
         self, room_info: RoomInfo, layout_data: Dict[str, Any], grid_size: float = 40.0
@@ -394,10 +890,7 @@ class GameMap:
                     elif tile_type == 8 or tile_type == 9:
                         # SPIKES, SPIKES_ONOFF -> HAZARD
                         self.grid[(gx, gy)] = TileType.HAZARD
-                        center = Vector2D(
-                            x=gx * self.grid_size + self.grid_size / 2,
-                            y=gy * self.grid_size + self.grid_size / 2,
-                        )
+                        center = self.cell_center(gx, gy)
                         self.danger_zones.append(
                             DangerZone(
                                 center=center,
@@ -409,10 +902,7 @@ class GameMap:
                     elif tile_type == 10:
                         # SPIDERWEB -> HAZARD
                         self.grid[(gx, gy)] = TileType.HAZARD
-                        center = Vector2D(
-                            x=gx * self.grid_size + self.grid_size / 2,
-                            y=gy * self.grid_size + self.grid_size / 2,
-                        )
+                        center = self.cell_center(gx, gy)
                         self.danger_zones.append(
                             DangerZone(
                                 center=center,
@@ -518,6 +1008,8 @@ class GameMap:
                 except (ValueError, TypeError):
                     pass
         self._create_default_walls(door_positions)
+        self.geometry_version += 1
+        self._geometry = None
 
     def _mark_l_shape_void_tiles(self, room_info: RoomInfo):
         """为L形房间标记VOID区域
@@ -593,6 +1085,8 @@ class GameMap:
         """清除所有房间实体"""
         for entity_list in self.entities.values():
             entity_list.clear()
+        # 火堆参与静态危险层
+        self.danger_raster.invalidate_static()
         logger.debug("[GameMap] Cleared all entities")
 
     # ========== 实体更新方法 ==========
@@ -630,6 +1124,7 @@ class GameMap:
             except (ValueError, TypeError) as e:
                 logger.warning(f"[GameMap] Failed to parse fire_hazard: {e}")
 
+        self.danger_raster.invalidate_static()
         logger.debug(f"[GameMap] Updated {count} fire_hazards")
 
     def update_buttons(self, button_data: Dict[str, Dict[str, Any]]):
@@ -886,6 +1381,198 @@ class GameMap:
         # 注意：不再将边界墙添加到 static_obstacles
         # static_obstacles 只包含来自 ROOM_LAYOUT 的实际游戏障碍物
 
+    # ========== 网格辅助方法 ==========
+
+    def position_to_cell(self, position: Vector2D) -> Tuple[int, int]:
+        """世界坐标 → 网格坐标（已考虑 top_left 偏移）"""
+        return self._get_grid_coords(position, self.top_left)
+
+    def cell_center(self, gx: int, gy: int) -> Vector2D:
+        """网格坐标 → 格子中心的世界坐标"""
+        return Vector2D(
+            self.top_left[0] + (gx + 0.5) * self.grid_size,
+            self.top_left[1] + (gy + 0.5) * self.grid_size,
+        )
+
+    def is_cell_walkable(self, gx: int, gy: int) -> bool:
+        """格子是否可行走（非墙壁、非虚空、在网格内）"""
+        tile = self.grid.get((gx, gy))
+        return tile is not None and tile not in (TileType.WALL, TileType.VOID)
+
+    def _get_derived(self, key: str, builder) -> Any:
+        """获取按 geometry_version 缓存的派生数据"""
+        cached = self._derived_cache.get(key)
+        if cached is not None and cached[0] == self.geometry_version:
+            return cached[1]
+        value = builder()
+        self._derived_cache[key] = (self.geometry_version, value)
+        if self._geometry is not None:
+            self._geometry.derived[key] = value
+        return value
+
+    def get_neighbor_table(self) -> List[List[Tuple[int, float]]]:
+        """获取可行走格子的 8 邻接表（扁平索引 → [(邻居索引, 代价)]）
+
+        对角移动要求两个相邻的正交格子都可行走（禁止切墙角）。
+        房间几何不变时复用缓存。
+        """
+        return self._get_derived("neighbors", self._build_neighbor_table)
+
+    def _build_neighbor_table(self) -> List[List[Tuple[int, float]]]:
+        width, height = self.width, self.height
+        walkable = [
+            self.is_cell_walkable(idx % width, idx // width)
+            for idx in range(width * height)
+        ]
+        table: List[List[Tuple[int, float]]] = [[] for _ in range(width * height)]
+
+        for gy in range(height):
+            for gx in range(width):
+                idx = gy * width + gx
+                for dx, dy, mult in _NEIGHBOR_OFFSETS:
+                    nx, ny = gx + dx, gy + dy
+                    if not (0 <= nx < width and 0 <= ny < height):
+                        continue
+                    if not walkable[ny * width + nx]:
+                        continue
+                    if dx != 0 and dy != 0:
+                        if not (
+                            walkable[gy * width + nx] and walkable[ny * width + gx]
+                        ):
+                            continue
+                    table[idx].append((ny * width + nx, mult * self.grid_size))
+
+        return table
+
+    def get_hazard_mask(self) -> List[bool]:
+        """获取危险格子掩码（扁平索引，HAZARD 格子为 True）"""
+
+        def build() -> List[bool]:
+            width = self.width
+            return [
+                self.grid.get((idx % width, idx // width)) == TileType.HAZARD
+                for idx in range(width * self.height)
+            ]
+
+        return self._get_derived("hazard_mask", build)
+
+    def get_clearance_field(self) -> DistanceField:
+        """获取净空距离场（每个格子到最近墙壁/虚空格子的距离，像素）"""
+
+        def build() -> DistanceField:
+            blocked = [
+                (gx, gy)
+                for gy in range(self.height)
+                for gx in range(self.width)
+                if not self.is_cell_walkable(gx, gy)
+            ]
+            return DistanceField.compute(self, blocked, hazard_penalty=1.0)
+
+        return self._get_derived("clearance", build)
+
+    def get_visibility(self) -> List[float]:
+        """获取每个格子的开阔度 0-1（扁平索引）
+
+        从格子中心向 16 个方向发射射线，取各射线无遮挡长度
+        （以 _VISIBILITY_RANGE 格封顶）的平均比例。不可行走格子为 0。
+        """
+        return self._get_derived("visibility", self._build_visibility)
+
+    def _build_visibility(self) -> List[float]:
+        width, height = self.width, self.height
+        walkable = [
+            self.is_cell_walkable(idx % width, idx // width)
+            for idx in range(width * height)
+        ]
+        directions = [
+            (
+                math.cos(2 * math.pi * i / _VISIBILITY_RAYS),
+                math.sin(2 * math.pi * i / _VISIBILITY_RAYS),
+            )
+            for i in range(_VISIBILITY_RAYS)
+        ]
+        # 以半格步长采样射线
+        samples = _VISIBILITY_RANGE * 2
+
+        visibility = [0.0] * (width * height)
+        for gy in range(height):
+            for gx in range(width):
+                idx = gy * width + gx
+                if not walkable[idx]:
+                    continue
+                clear_steps = 0
+                for dx, dy in directions:
+                    for step in range(1, samples + 1):
+                        sx = int(gx + 0.5 + dx * step * 0.5)
+                        sy = int(gy + 0.5 + dy * step * 0.5)
+                        if not (0 <= sx < width and 0 <= sy < height):
+                            break
+                        if not walkable[sy * width + sx]:
+                            break
+                        clear_steps += 1
+                visibility[idx] = clear_steps / (_VISIBILITY_RAYS * samples)
+        return visibility
+
+    # ========== 房间几何缓存 ==========
+
+    def export_geometry(self, room_index: int, fingerprint: str) -> RoomGeometry:
+        """导出当前静态几何快照
+
+        应在房间几何刚构建完成、尚未叠加运行时危险区域时调用。
+        之后按需计算的派生数据会回写到该快照中。
+        """
+        geometry = RoomGeometry(
+            room_index=room_index,
+            fingerprint=fingerprint,
+            width=self.width,
+            height=self.height,
+            grid_size=self.grid_size,
+            pixel_width=self.pixel_width,
+            pixel_height=self.pixel_height,
+            top_left=self.top_left,
+            grid=dict(self.grid),
+            static_obstacles=set(self.static_obstacles),
+            void_tiles=set(self.void_tiles),
+            danger_zones=list(self.danger_zones),
+            doors=list(self.doors),
+        )
+        for key, (version, value) in self._derived_cache.items():
+            if version == self.geometry_version:
+                geometry.derived[key] = value
+        self._geometry = geometry
+        return geometry
+
+    def apply_geometry(self, geometry: RoomGeometry):
+        """套用缓存的几何快照（跳过 ROOM_LAYOUT 解析）
+
+        快照中的容器会被复制，运行时修改不会污染缓存；
+        已计算的派生数据直接复用。
+        """
+        self.width = geometry.width
+        self.height = geometry.height
+        self.grid_size = geometry.grid_size
+        self.pixel_width = geometry.pixel_width
+        self.pixel_height = geometry.pixel_height
+        self.top_left = geometry.top_left
+        self.grid = dict(geometry.grid)
+        self.static_obstacles = set(geometry.static_obstacles)
+        self.void_tiles = set(geometry.void_tiles)
+        self.danger_zones = list(geometry.danger_zones)
+        self.doors = list(geometry.doors)
+
+        self.geometry_version += 1
+        self._geometry = geometry
+        self._derived_cache = {
+            key: (self.geometry_version, value)
+            for key, value in geometry.derived.items()
+        }
+        self.danger_raster.invalidate_static()
+
+        logger.debug(
+            f"[GameMap] Applied cached geometry: room={geometry.room_index}, "
+            f"grid={self.width}x{self.height}, derived={sorted(geometry.derived)}"
+        )
+
     def add_dynamic_obstacle(
         self,
         position: Vector2D,
@@ -926,6 +1613,7 @@ class GameMap:
         """清除所有动态障碍物"""
         self.dynamic_obstacles.clear()
         self.dynamic_obstacles_dict.clear()
+        self.danger_raster.clear_dynamic()
 
     def update_dynamic_obstacles(
         self, enemies: Dict[int, EnemyData], projectiles: Dict[int, ProjectileData]
@@ -982,6 +1670,9 @@ class GameMap:
         self.dynamic_obstacles.clear()
         self.dynamic_obstacles.extend(self.dynamic_obstacles_dict.values())
 
+        # 增量更新投射物的危险扫掠体积
+        self.danger_raster.update_projectiles(projectiles)
+
     def add_danger_zone(
         self,
         center: Vector2D,
@@ -999,10 +1690,12 @@ class GameMap:
             estimated_frames=estimated_frames,
         )
         self.danger_zones.append(zone)
+        self.danger_raster.invalidate_static()
 
     def clear_danger_zones(self):
         """清除危险区域"""
         self.danger_zones.clear()
+        self.danger_raster.invalidate_static()
 
     def is_obstacle(self, position: Vector2D, margin: float = 0) -> bool:
         """
@@ -1232,21 +1925,16 @@ class GameMap:
 
     def get_danger_level(self, position: Vector2D) -> float:
         """
-        获取位置的 danger_level
+        获取位置的 danger_level（危险栅格查表）
 
         Returns:
             危险等级 0-1
         """
-        max_danger = 0.0
+        return self.danger_raster.get(position)
 
-        for zone in self.danger_zones:
-            distance = position.distance_to(zone.center)
-            if distance < zone.radius:
-                # 越靠近中心越危险
-                danger = (1 - distance / zone.radius) * zone.intensity
-                max_danger = max(max_danger, danger)
-
-        return max_danger
+    def get_danger_levels(self, positions: List[Vector2D]) -> List[float]:
+        """批量获取多个位置的危险等级"""
+        return self.danger_raster.get_many(positions)
 
     def update(
         self, enemies: Dict[int, EnemyData], projectiles: Dict[int, ProjectileData]
@@ -1255,6 +1943,213 @@ class GameMap:
         self.update_dynamic_obstacles(enemies, projectiles)
 
 
+def compile_room_geometry(
+    room_info: RoomInfo,
+    layout_data: Dict[str, Any],
+    key: Tuple[int, str],
+    precompute: bool = True,
+) -> RoomGeometry:
+    """在独立的 GameMap 上编译房间几何（可在工作线程中调用）
+
+    Args:
+        room_info: 房间信息
+        layout_data: ROOM_LAYOUT 原始数据
+        key: 缓存键 (room_index, 指纹)
+        precompute: 是否预先计算派生数据（邻接表、净空距离场、可见度）
+
+    Returns:
+        房间几何快照
+    """
+    game_map = GameMap()
+    game_map.update_from_room_layout(
+        room_info, layout_data, layout_data.get("grid_size", 40.0)
+    )
+    geometry = game_map.export_geometry(*key)
+    if precompute:
+        game_map.get_neighbor_table()
+        game_map.get_hazard_mask()
+        game_map.get_clearance_field()
+        game_map.get_visibility()
+    return geometry
+
+
+def _compile_room_task(
+    cache: RoomGeometryCache, room_info: RoomInfo, layout_data: Dict[str, Any]
+) -> Tuple[Tuple[int, str], RoomGeometry]:
+    """后台编译任务：在工作线程中计算布局指纹，缓存未命中时才编译"""
+    key = cache.make_key(room_info, layout_data)
+    geometry = cache.get(key)
+    if geometry is None:
+        geometry = compile_room_geometry(room_info, layout_data, key)
+    return key, geometry
+
+
+@dataclass
+class ScoringWeights:
+    """候选位置评分权重
+
+    距离项使用区间评分：落在 [low, high] 内得 1 分，区间外线性衰减。
+    """
+
+    player_distance: float = 0.3
+    enemy_distance: float = 0.3
+    danger: float = 0.5  # 惩罚项
+    visibility: float = 0.2
+    player_band: Tuple[float, float] = (50.0, 200.0)
+    enemy_band: Tuple[float, float] = (100.0, 300.0)
+
+
+@dataclass
+class ScoringContext:
+    """评分上下文（传给自定义评分项）"""
+
+    game_map: "GameMap"
+    positions: List[Vector2D]
+    cells: List[int]  # 候选点所在格子的扁平索引
+    player_field: Optional[DistanceField]
+    enemy_field: Optional[DistanceField]
+
+
+# 自定义评分项：返回与 context.positions 等长的分数列表
+ScoreTerm = Callable[[ScoringContext], List[float]]
+
+
+def _band_score(distance: float, low: float, high: float) -> float:
+    if distance == DistanceField.INF:
+        return 0.0
+    if distance < low:
+        return distance / low if low > 0 else 1.0
+    if distance > high:
+        return max(0.0, 1.0 - (distance - high) / high) if high > 0 else 0.0
+    return 1.0
+
+
+class PositionScorer:
+    """候选位置评分引擎
+
+    在覆盖整个房间的固定点阵上一次性计算所有评分项，各项均为扁平数组查表：
+
+    - 到玩家的路径距离（玩家流场）
+    - 到最近敌人的路径距离（多源距离场，一次波前，与敌人数量无关）
+    - 危险栅格值
+    - 格子开阔度
+
+    点阵按房间几何缓存，每帧代价只与点阵大小有关。
+    """
+
+    def __init__(
+        self,
+        game_map: "GameMap",
+        weights: Optional[ScoringWeights] = None,
+        density: int = 2,
+    ):
+        """
+        Args:
+            game_map: 地图
+            weights: 评分权重
+            density: 每个格子每边的候选点数
+        """
+        self.game_map = game_map
+        self.weights = weights or ScoringWeights()
+        self.density = density
+        self._terms: Dict[str, Tuple[float, ScoreTerm]] = {}
+
+    def add_term(self, name: str, weight: float, term: ScoreTerm):
+        """注册自定义评分项（同名覆盖）"""
+        self._terms[name] = (weight, term)
+
+    def remove_term(self, name: str):
+        self._terms.pop(name, None)
+
+    def get_candidates(self) -> Tuple[List[Vector2D], List[int]]:
+        """获取候选点阵（位置列表, 所在格子扁平索引列表）"""
+        return self.game_map._get_derived(
+            f"lattice_{self.density}", self._build_candidates
+        )
+
+    def _build_candidates(self) -> Tuple[List[Vector2D], List[int]]:
+        game_map = self.game_map
+        step = game_map.grid_size / self.density
+        ox, oy = game_map.top_left
+        positions: List[Vector2D] = []
+        cells: List[int] = []
+        for gy in range(game_map.height):
+            for gx in range(game_map.width):
+                if not game_map.is_cell_walkable(gx, gy):
+                    continue
+                for sy in range(self.density):
+                    for sx in range(self.density):
+                        positions.append(
+                            Vector2D(
+                                ox + gx * game_map.grid_size + (sx + 0.5) * step,
+                                oy + gy * game_map.grid_size + (sy + 0.5) * step,
+                            )
+                        )
+                        cells.append(gy * game_map.width + gx)
+        return positions, cells
+
+    def score(
+        self,
+        player_field: Optional[DistanceField] = None,
+        enemy_field: Optional[DistanceField] = None,
+    ) -> Tuple[List[Vector2D], List[float]]:
+        """对全部候选点评分
+
+        Returns:
+            (候选位置列表, 分数列表)
+        """
+        positions, cells = self.get_candidates()
+        w = self.weights
+        scores = [0.0] * len(positions)
+
+        if player_field is not None and w.player_distance:
+            low, high = w.player_band
+            dist = player_field.distances
+            for i, idx in enumerate(cells):
+                scores[i] += w.player_distance * _band_score(dist[idx], low, high)
+
+        if enemy_field is not None and w.enemy_distance:
+            low, high = w.enemy_band
+            dist = enemy_field.distances
+            for i, idx in enumerate(cells):
+                scores[i] += w.enemy_distance * _band_score(dist[idx], low, high)
+
+        if w.danger:
+            danger = self.game_map.get_danger_levels(positions)
+            for i, value in enumerate(danger):
+                scores[i] -= w.danger * value
+
+        if w.visibility:
+            visibility = self.game_map.get_visibility()
+            for i, idx in enumerate(cells):
+                scores[i] += w.visibility * visibility[idx]
+
+        if self._terms:
+            context = ScoringContext(
+                game_map=self.game_map,
+                positions=positions,
+                cells=cells,
+                player_field=player_field,
+                enemy_field=enemy_field,
+            )
+            for weight, term in self._terms.values():
+                for i, value in enumerate(term(context)):
+                    scores[i] += weight * value
+
+        return positions, scores
+
+    def top_k(
+        self,
+        k: int,
+        player_field: Optional[DistanceField] = None,
+        enemy_field: Optional[DistanceField] = None,
+    ) -> List[Tuple[Vector2D, float]]:
+        """返回得分最高的 k 个候选点 [(位置, 分数)]"""
+        positions, scores = self.score(player_field, enemy_field)
+        best = heapq.nlargest(k, range(len(scores)), key=scores.__getitem__)
+        return [(positions[i], scores[i]) for i in best]
+
+
 class SpatialQuery:
     """空间查询工具
 
@@ -1420,10 +2315,39 @@ class EnvironmentModel:
     支持与Pathfinder集成，实现自动障碍物和危险区域同步。
     """
 
-    def __init__(self, grid_size: float = 40.0, width: int = 13, height: int = 7):
+    def __init__(
+        self,
+        grid_size: float = 40.0,
+        width: int = 13,
+        height: int = 7,
+        async_compile: bool = False,
+    ):
+        """
+        Args:
+            grid_size: 网格大小（像素）
+            width: 网格宽度
+            height: 网格高度
+            async_compile: 是否在后台线程编译新房间布局。
+                编译完成前由仅含边界墙的粗略地图回答查询，完成后在下一次
+                update_room/poll_room_compile 时整体替换。
+        """
         self.game_map = GameMap(grid_size, width, height)
         self.spatial_query = SpatialQuery(self.game_map)
 
+        # 房间静态几何缓存（回溯进入已访问房间时跳过布局解析）
+        self.geometry_cache = RoomGeometryCache()
+
+        # 战略位置评分引擎
+        self.position_scorer = PositionScorer(self.game_map)
+
+        # 后台房间编译
+        self.async_compile = async_compile
+        self._compile_executor: Optional[ThreadPoolExecutor] = None
+        self._pending_compile: Optional[Tuple[int, Future]] = None
+        self._current_geometry_key: Optional[Tuple[int, str]] = None
+        # 每次加载房间几何递增；后台结果只在票号一致时换入
+        self._room_ticket = 0
+
         # 玩家碰撞半径
         self.player_radius = 15.0
 
@@ -1434,6 +2358,15 @@ class EnvironmentModel:
         self._pathfinder = None
         self._pathfinder_last_sync_room = -1
 
+        # 每帧距离场（惰性计算，同一帧内的所有移动查询共享）
+        self._player_position: Optional[Vector2D] = None
+        self._threat_positions: List[Vector2D] = []
+        # 单源距离场只依赖房间几何，按源格子缓存到几何变化为止
+        self._source_fields: Dict[Tuple[int, int], DistanceField] = {}
+        self._source_fields_version = -1
+        # 威胁距离场按 (几何版本, 源格子集合) 缓存，同一帧的全部威胁与仅敌人两种源集合可并存
+        self._threat_fields: "OrderedDict[Tuple, DistanceField]" = OrderedDict()
+
     def bind_pathfinder(self, pathfinder):
         """绑定寻路器并保持自动同步
 
@@ -1486,8 +2419,7 @@ class EnvironmentModel:
         # 3. 同步危险区域
         danger_zones: Dict[Tuple[int, int], float] = {}
         for zone in self.game_map.danger_zones:
-            gx = int(zone.center.x / self.game_map.grid_size)
-            gy = int(zone.center.y / self.game_map.grid_size)
+            gx, gy = self.game_map.position_to_cell(zone.center)
             # 使用危险强度作为代价乘数
             danger_zones[(gx, gy)] = zone.intensity
         self._pathfinder.set_danger_zones(danger_zones)
@@ -1507,6 +2439,7 @@ class EnvironmentModel:
         projectiles: Dict[int, ProjectileData],
         room_layout: Optional[Dict[str, Any]] = None,
         entity_data: Optional[Dict[str, Any]] = None,
+        player_pos: Optional[Vector2D] = None,
     ):
         """更新环境模型
 
@@ -1523,7 +2456,11 @@ class EnvironmentModel:
                     "INTERACTABLES": [...],
                     "PICKUPS": [...],
                 }
+            player_pos: 玩家位置（可选，用于本帧的流场计算）
         """
+        # 换入已完成的后台编译结果
+        self.poll_room_compile()
+
         # 如果房间变化了，或者第一次有布局数据，重置地图
         # 注意：初始房间的room_index可能是-1，需要特殊处理
         room_changed = room_info and room_info.room_index != self.current_room_index
@@ -1555,18 +2492,21 @@ class EnvironmentModel:
 
         if room_changed or first_layout:
             self.current_room_index = room_info.room_index if room_info else -1
-            if room_layout and layout_is_valid:
-                # Extract grid_size from layout data (135 or 252 in replay data)
-                layout_grid_size = room_layout.get("grid_size", 40.0)
-                self.game_map.update_from_room_layout(
-                    room_info, room_layout, layout_grid_size
-                )
-            else:
-                self.game_map.update_from_room_info(room_info)
+            self._load_room_geometry(
+                room_info, room_layout if room_layout and layout_is_valid else None
+            )
 
         # 更新动态障碍物
         self.game_map.update_dynamic_obstacles(enemies, projectiles)
 
+        # 记录本帧的玩家与威胁位置（距离场在首次查询时计算）
+        if player_pos is not None:
+            self._player_position = player_pos
+        self._threat_positions = [e.position for e in enemies.values() if e.hp > 0]
+        self._threat_positions.extend(
+            p.position for p in projectiles.values() if p.is_enemy
+        )
+
         # 更新房间实体（如果提供）
         if entity_data:
             self.game_map.clear_entities()
@@ -1589,6 +2529,201 @@ class EnvironmentModel:
         # 同步到绑定的寻路器
         self._sync_pathfinder()
 
+    def _load_room_geometry(
+        self, room_info: RoomInfo, room_layout: Optional[Dict[str, Any]]
+    ):
+        """构建房间静态几何，命中缓存时直接套用快照
+
+        后台编译模式下布局指纹也在工作线程中计算，接收线程只做 O(1) 的工作。
+        """
+        self._room_ticket += 1
+
+        if self.async_compile and room_layout and room_info is not None:
+            # 先用该房间最近的缓存几何（或仅含边界墙的粗略地图）顶上
+            provisional = self.geometry_cache.latest_for_room(room_info.room_index)
+            if provisional is not None:
+                self.game_map.apply_geometry(provisional)
+                self._current_geometry_key = (
+                    provisional.room_index,
+                    provisional.fingerprint,
+                )
+            else:
+                self.game_map.update_from_room_info(room_info)
+                self.game_map.clear_danger_zones()
+                self._current_geometry_key = None
+            self._submit_room_compile(room_info, room_layout)
+            return
+
+        key = None
+        if room_info is not None:
+            key = self.geometry_cache.make_key(room_info, room_layout)
+        self._current_geometry_key = key
+
+        if key is not None:
+            cached = self.geometry_cache.get(key)
+            if cached is not None:
+                self.game_map.apply_geometry(cached)
+                return
+
+        if room_layout:
+            # Extract grid_size from layout data (135 or 252 in replay data)
+            layout_grid_size = room_layout.get("grid_size", 40.0)
+            self.game_map.update_from_room_layout(
+                room_info, room_layout, layout_grid_size
+            )
+        else:
+            self.game_map.update_from_room_info(room_info)
+
+        if key is not None:
+            self.geometry_cache.put(key, self.game_map.export_geometry(*key))
+
+    def _submit_room_compile(self, room_info: RoomInfo, room_layout: Dict[str, Any]):
+        """提交后台编译任务（同一时间只保留最新房间的任务）"""
+        if self._pending_compile is not None:
+            _, future = self._pending_compile
+            future.cancel()
+
+        if self._compile_executor is None:
+            self._compile_executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="RoomCompiler"
+            )
+        future = self._compile_executor.submit(
+            _compile_room_task, self.geometry_cache, room_info, room_layout
+        )
+        self._pending_compile = (self._room_ticket, future)
+        logger.debug(
+            f"[EnvironmentModel] Room compile submitted: room={room_info.room_index}"
+        )
+
+    def poll_room_compile(self) -> bool:
+        """检查后台编译任务，完成则存入缓存并换入当前地图
+
+        Returns:
+            本次调用是否换入了新的房间几何
+        """
+        if self._pending_compile is None:
+            return False
+        ticket, future = self._pending_compile
+        if not future.done():
+            return False
+        self._pending_compile = None
+
+        if future.cancelled():
+            return False
+        try:
+            key, geometry = future.result()
+        except Exception as e:
+            logger.warning(f"[EnvironmentModel] Room compile failed: {e}")
+            return False
+
+        self.geometry_cache.put(key, geometry)
+        if ticket != self._room_ticket:
+            # 编译期间已离开该房间，只保留缓存
+            return False
+        if key == self._current_geometry_key:
+            # 临时地图即为最终布局
+            return False
+
+        self._current_geometry_key = key
+        self.game_map.apply_geometry(geometry)
+        # 强制寻路器按完整布局重新同步
+        self._pathfinder_last_sync_room = -1
+        self._sync_pathfinder()
+        logger.debug(f"[EnvironmentModel] Compiled room swapped in: room={key[0]}")
+        return True
+
+    def wait_for_room_compile(self, timeout: Optional[float] = None) -> bool:
+        """阻塞等待后台编译完成并换入（用于回放和测试）"""
+        if self._pending_compile is None:
+            return False
+        _, future = self._pending_compile
+        try:
+            future.result(timeout=timeout)
+        except Exception:
+            pass
+        return self.poll_room_compile()
+
+    @property
+    def is_compiling(self) -> bool:
+        """是否有未换入的后台编译任务"""
+        return self._pending_compile is not None
+
+    def shutdown(self):
+        """关闭后台编译线程"""
+        if self._compile_executor is not None:
+            self._compile_executor.shutdown(wait=False, cancel_futures=True)
+            self._compile_executor = None
+        self._pending_compile = None
+
+    # ========== 距离场 ==========
+
+    def set_player_position(self, player_pos: Vector2D):
+        """设置本帧玩家位置（流场的源）"""
+        self._player_position = player_pos
+
+    def get_player_field(
+        self, player_pos: Optional[Vector2D] = None
+    ) -> Optional[DistanceField]:
+        """获取以玩家为源的流场
+
+        房间几何不变时，同一格子的流场只计算一次。
+
+        Args:
+            player_pos: 玩家位置，默认使用 update_room/set_player_position 记录的位置
+
+        Returns:
+            距离场，无玩家位置时返回 None
+        """
+        pos = player_pos or self._player_position
+        if pos is None:
+            return None
+        return self._get_field_from(pos)
+
+    def _get_field_from(self, position: Vector2D) -> DistanceField:
+        """获取以指定位置所在格子为源的距离场（房间几何不变时复用）"""
+        version = self.game_map.geometry_version
+        if self._source_fields_version != version:
+            self._source_fields.clear()
+            self._source_fields_version = version
+
+        cell = self.game_map.position_to_cell(position)
+        field = self._source_fields.get(cell)
+        if field is None:
+            field = DistanceField.compute(self.game_map, [cell])
+            self._source_fields[cell] = field
+        return field
+
+    def get_threat_field(
+        self, threat_positions: Optional[List[Vector2D]] = None
+    ) -> Optional[DistanceField]:
+        """获取到最近威胁（敌人、敌方投射物）的距离场
+
+        Args:
+            threat_positions: 威胁位置，默认使用 update_room 记录的敌人和敌方投射物
+
+        Returns:
+            距离场，无威胁时返回 None
+        """
+        positions = (
+            threat_positions if threat_positions is not None else self._threat_positions
+        )
+        if not positions:
+            return None
+
+        cells = tuple(
+            sorted({self.game_map.position_to_cell(pos) for pos in positions})
+        )
+        key = (self.game_map.geometry_version, cells)
+        field = self._threat_fields.get(key)
+        if field is None:
+            field = DistanceField.compute(self.game_map, cells)
+            self._threat_fields[key] = field
+            while len(self._threat_fields) > 4:
+                self._threat_fields.popitem(last=False)
+        else:
+            self._threat_fields.move_to_end(key)
+        return field
+
     def is_safe(self, position: Vector2D) -> Tuple[bool, float]:
         """
         检查位置是否安全
@@ -1611,53 +2746,76 @@ class EnvironmentModel:
         min_distance: float = 50.0,
         max_distance: float = 200.0,
     ) -> Optional[Vector2D]:
-        """获取附近的安全位置"""
-        return self.game_map.get_nearest_walkable_position(near_position, max_distance)
+        """获取附近的安全位置
+
+        有威胁时，在可达距离 [min_distance, max_distance] 内选择离威胁最远的格子；
+        无威胁时返回最近的可行走位置。
+        """
+        threat_field = self.get_threat_field()
+        if threat_field is None:
+            return self.game_map.get_nearest_walkable_position(
+                near_position, max_distance
+            )
+
+        field = self._get_field_from(near_position)
+        best: Optional[Tuple[int, int]] = None
+        best_score = -DistanceField.INF
+        for gx, gy, dist in field.iter_reachable():
+            if dist < min_distance or dist > max_distance:
+                continue
+            score = threat_field.get(gx, gy)
+            if score > best_score:
+                best_score = score
+                best = (gx, gy)
+
+        if best is None:
+            return self.game_map.get_nearest_walkable_position(
+                near_position, max_distance
+            )
+        return self.game_map.cell_center(*best)
 
     def find_escape_route(
-        self, player_pos: Vector2D, threat_positions: List[Vector2D]
+        self,
+        player_pos: Vector2D,
+        threat_positions: List[Vector2D],
+        max_distance: float = 400.0,
     ) -> List[Vector2D]:
         """
         寻找逃跑路线
 
+        从玩家流场中选取可达范围内离威胁最远的格子，再沿流场回溯得到路径。
+
         Args:
             player_pos: 玩家位置
             threat_positions: 威胁位置列表
+            max_distance: 最大逃跑路径长度（像素）
 
         Returns:
-            逃跑路径
+            逃跑路径（格子中心点，不含起点）
         """
-        # 简单策略：向威胁的反方向移动
-        escape_direction = Vector2D(0, 0)
-
-        for threat_pos in threat_positions:
-            direction = player_pos - threat_pos
-            dist = direction.magnitude()
-            if dist > 0:
-                escape_direction = escape_direction + (direction / dist)
-
-        if escape_direction.magnitude() == 0:
+        threat_field = self.get_threat_field(threat_positions)
+        if threat_field is None:
             return []
 
-        escape_direction = escape_direction.normalized()
-
-        # 生成逃跑路径
-        path = []
-        step_size = 20.0
-        max_steps = 20
-
-        for i in range(1, max_steps + 1):
-            new_pos = player_pos + escape_direction * (step_size * i)
-
-            if not self.game_map.is_in_bounds(new_pos):
-                break
+        player_field = self._get_field_from(player_pos)
+        start = self.game_map.position_to_cell(player_pos)
+        best = start
+        best_score = threat_field.get(*start)
+        for gx, gy, dist in player_field.iter_reachable():
+            if dist > max_distance or not self.game_map.is_cell_walkable(gx, gy):
+                continue
+            # 越远离威胁越好，路程作为次要代价
+            score = threat_field.get(gx, gy) - 0.25 * dist
+            if score > best_score:
+                best_score = score
+                best = (gx, gy)
 
-            if self.game_map.is_obstacle(new_pos, self.player_radius):
-                break
+        if best == start:
+            return []
 
-            path.append(new_pos)
-
-        return path
+        cells = player_field.path_to_source(*best)
+        cells.reverse()
+        return [self.game_map.cell_center(gx, gy) for gx, gy in cells[1:]]
 
     def get_cover_value(
         self, position: Vector2D, enemy_positions: List[Vector2D]
@@ -1701,81 +2859,41 @@ class EnvironmentModel:
         return 0.1  # 能看到大部分敌人，掩体价值低
 
     def can_reach_position(self, start: Vector2D, end: Vector2D) -> bool:
-        """检查是否能够到达目标位置"""
+        """检查是否能够到达目标位置（基于距离场的路径可达性）"""
         if not self.game_map.is_in_bounds(end):
             return False
 
         if self.game_map.is_obstacle(end, self.player_radius):
             return False
 
-        # 简单的视线检查
-        return self.spatial_query.find_line_of_sight(start, end)
+        field = self._get_field_from(start)
+        return field.is_reachable(*self.game_map.position_to_cell(end))
 
     def get_strategic_positions(
-        self, player_pos: Vector2D, enemies: Dict[int, EnemyData]
+        self,
+        player_pos: Vector2D,
+        enemies: Dict[int, EnemyData],
+        top_k: int = 5,
     ) -> List[Vector2D]:
         """
         获取战略位置列表
 
-        用于选择最佳的移动位置。
+        用于选择最佳的移动位置。由 position_scorer 在全房间点阵上评分，
+        评分权重和自定义评分项可通过 position_scorer 配置。
 
         Args:
             player_pos: 玩家当前位置
             enemies: 敌人字典
+            top_k: 返回的位置数量
 
         Returns:
             按价值排序的位置列表
         """
-        positions = []
+        player_field = self._get_field_from(player_pos)
 
-        # 获取房间中心区域的位置
-        center = Vector2D(self.game_map.pixel_width / 2, self.game_map.pixel_height / 2)
-
-        # 在中心区域采样
-        sample_radius = 100.0
-        angles = [i * math.pi / 6 for i in range(12)]
-
-        for angle in angles:
-            pos = Vector2D(
-                center.x + sample_radius * math.cos(angle),
-                center.y + sample_radius * math.sin(angle),
-            )
-
-            if self.game_map.is_in_bounds(pos) and not self.game_map.is_obstacle(
-                pos, self.player_radius
-            ):
-                # 计算位置价值
-                value = self._calculate_position_value(pos, player_pos, enemies)
-                positions.append((pos, value))
-
-        # 排序并返回
-        positions.sort(key=lambda x: x[1], reverse=True)
-        return [p[0] for p in positions[:5]]
-
-    def _calculate_position_value(
-        self, position: Vector2D, player_pos: Vector2D, enemies: Dict[int, EnemyData]
-    ) -> float:
-        """计算位置价值"""
-        value = 0.0
-
-        # 距离因素：不要太远也不要太近
-        dist_to_player = position.distance_to(player_pos)
-        if 50 < dist_to_player < 200:
-            value += 0.3
-        elif dist_to_player <= 50:
-            value += 0.1
-
-        # 掩体因素
-        enemy_positions = [e.position for e in enemies.values() if e.hp > 0]
-        cover_value = self.get_cover_value(position, enemy_positions)
-        value += cover_value * 0.4
-
-        # 距离敌人适中
-        if enemies:
-            min_enemy_dist = min(
-                position.distance_to(e.position) for e in enemies.values()
-            )
-            if 100 < min_enemy_dist < 300:
-                value += 0.3
+        enemy_field = self.get_threat_field(
+            [e.position for e in enemies.values() if e.hp > 0]
+        )
 
-        return value
+        ranked = self.position_scorer.top_k(top_k, player_field, enemy_field)
+        return [pos for pos, _ in ranked]
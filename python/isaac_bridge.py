@@ -14,10 +14,10 @@ import socket
 import json
 import threading
 import time
-from collections import defaultdict
+from collections import defaultdict, deque
 from dataclasses import dataclass, field
 from typing import Dict, Any, Optional, Callable, List, Tuple
-from queue import Queue, Empty
+from queue import Empty
 from enum import Enum
 import logging
 
@@ -37,6 +37,14 @@ class MessageType(Enum):
     COMMAND = "CMD"
 
 
+class OverflowPolicy(Enum):
+    """事件队列满时的处理策略"""
+
+    DROP_OLDEST = "drop_oldest"  # 丢弃最旧的事件
+    DROP_NEWEST = "drop_newest"  # 丢弃新到的事件
+    COALESCE = "coalesce"  # 新事件替换队列中同类型的最近一条；无同类型时丢弃最旧的
+
+
 class CollectInterval(Enum):
     """采集频率枚举"""
 
@@ -101,6 +109,126 @@ class Event:
     timestamp: float = field(default_factory=time.time)
 
 
+class EventChannel:
+    """有界事件队列
+
+    环形缓冲（deque）+ 条件变量。与 queue.Queue 的 put/get/get_nowait/
+    qsize/empty 接口兼容（get 超时抛出 queue.Empty），另外提供 drain()
+    一次加锁批量取出。队列满时 put(block=True) 先等待空位，超时（或
+    block=False）后按 OverflowPolicy 处理，不会无限增长。
+    """
+
+    def __init__(
+        self,
+        capacity: int = 1024,
+        policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+    ):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.policy = OverflowPolicy(policy)
+        self._events: deque = deque()
+        lock = threading.Lock()
+        self._not_empty = threading.Condition(lock)
+        self._not_full = threading.Condition(lock)
+        self.stats = {
+            "put": 0,
+            "dropped": 0,
+            "coalesced": 0,
+            "high_water": 0,
+        }
+
+    def put(self, event: Event, block: bool = True, timeout: float = None) -> bool:
+        """放入事件，返回新事件是否进入队列
+
+        Args:
+            event: 事件
+            block: 队列满时是否等待消费者腾出空位（接收线程应传 False）
+            timeout: 最长等待秒数（None 表示一直等待），超时后按溢出策略处理
+        """
+        with self._not_empty:
+            events = self._events
+            self.stats["put"] += 1
+            if block and len(events) >= self.capacity:
+                self._not_full.wait_for(
+                    lambda: len(events) < self.capacity, timeout
+                )
+            if len(events) >= self.capacity:
+                if self.policy is OverflowPolicy.DROP_NEWEST:
+                    self.stats["dropped"] += 1
+                    return False
+                if self.policy is OverflowPolicy.COALESCE and self._coalesce(event):
+                    self.stats["coalesced"] += 1
+                    self._not_empty.notify()
+                    return True
+                events.popleft()
+                self.stats["dropped"] += 1
+            events.append(event)
+            if len(events) > self.stats["high_water"]:
+                self.stats["high_water"] = len(events)
+            self._not_empty.notify()
+            return True
+
+    def _coalesce(self, event: Event) -> bool:
+        """用新事件替换队列中同类型的最近一条（需持有锁）"""
+        events = self._events
+        for i in range(len(events) - 1, -1, -1):
+            if events[i].type == event.type:
+                events[i] = event
+                return True
+        return False
+
+    def get(self, block: bool = True, timeout: float = None) -> Event:
+        """取出最旧的事件；没有事件时抛出 queue.Empty"""
+        with self._not_empty:
+            if block:
+                if not self._not_empty.wait_for(lambda: self._events, timeout):
+                    raise Empty
+            elif not self._events:
+                raise Empty
+            event = self._events.popleft()
+            self._not_full.notify()
+            return event
+
+    def get_nowait(self) -> Event:
+        return self.get(block=False)
+
+    def drain(self, max_n: Optional[int] = None) -> List[Event]:
+        """一次取出至多 max_n 个事件（None 表示全部），不阻塞"""
+        with self._not_empty:
+            events = self._events
+            if max_n is None or max_n >= len(events):
+                drained = list(events)
+                events.clear()
+            else:
+                drained = [events.popleft() for _ in range(max(0, max_n))]
+            if drained:
+                self._not_full.notify_all()
+            return drained
+
+    def clear(self) -> None:
+        with self._not_empty:
+            self._events.clear()
+            self._not_full.notify_all()
+
+    def qsize(self) -> int:
+        return len(self._events)
+
+    def empty(self) -> bool:
+        return not self._events
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "depth": len(self._events),
+            "capacity": self.capacity,
+            "policy": self.policy.value,
+        }
+
+
 @dataclass
 class DataMessage:
     """完整的数据消息对象，包含所有元数据"""
@@ -274,7 +402,20 @@ class IsaacBridge:
     - 发送控制指令
     """
 
-    def __init__(self, host: str = "127.0.0.1", port: int = 9527):
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 9527,
+        event_capacity: int = 1024,
+        event_policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+    ):
+        """
+        Args:
+            host: 监听地址
+            port: 监听端口（0 由系统分配）
+            event_capacity: 事件队列容量（get_event / drain_events 未及时消费时生效）
+            event_policy: 事件队列满时的处理策略
+        """
         self.host = host
         self.port = port
 
@@ -289,9 +430,15 @@ class IsaacBridge:
         self.connected = False
 
         # 事件系统
-        self.event_queue: Queue[Event] = Queue()
+        self.event_queue = EventChannel(event_capacity, event_policy)
         self.handlers: Dict[str, List[Callable]] = defaultdict(list)
 
+        # 原始行监听器 (line_bytes, received_at)，在 JSON 解码之前调用
+        self._raw_taps: List[Callable[[bytes, float], None]] = []
+
+        # 延迟追踪器（core.telemetry.Tracer），为 None 时不追踪
+        self.tracer = None
+
         # 线程
         self._accept_thread: Optional[threading.Thread] = None
         self._receive_thread: Optional[threading.Thread] = None
@@ -426,7 +573,7 @@ class IsaacBridge:
 
     def _receive_loop(self):
         """接收数据循环"""
-        buffer = ""
+        buffer = b""
         last_data_time = time.time()
         heartbeat_interval = 5.0  # 5秒没有数据视为断开
 
@@ -441,19 +588,7 @@ class IsaacBridge:
                     break
 
                 last_data_time = time.time()
-                buffer += data.decode("utf-8")
-
-                # 处理完整的 JSON 行
-                while "\n" in buffer:
-                    line, buffer = buffer.split("\n", 1)
-                    if line.strip():
-                        try:
-                            msg = json.loads(line)
-                            self._process_message(msg)
-                            self.stats["messages_received"] += 1
-                        except json.JSONDecodeError as e:
-                            logger.warning(f"JSON decode error: {e}")
-                            self.stats["errors"] += 1
+                buffer = self._consume(buffer + data, last_data_time)
 
             except socket.timeout:
                 # 检查心跳超时（游戏可能异常退出）
@@ -483,6 +618,38 @@ class IsaacBridge:
         # 连接断开处理
         self._handle_disconnect()
 
+    def _consume(self, buffer: bytes, received_at: float) -> bytes:
+        """处理缓冲区中的完整 JSON 行，返回剩余的不完整部分
+
+        按字节分帧，多字节 UTF-8 字符跨 recv 边界时不会解码失败。
+        """
+        while b"\n" in buffer:
+            line, buffer = buffer.split(b"\n", 1)
+            if line.strip():
+                for tap in self._raw_taps:
+                    try:
+                        tap(line, received_at)
+                    except Exception as e:
+                        logger.error(f"Raw tap error: {e}")
+                try:
+                    line_at = time.perf_counter()
+                    msg = json.loads(line)
+                    tracer = self.tracer
+                    trace = None
+                    if tracer is not None and isinstance(msg, dict):
+                        trace = tracer.begin(
+                            line_at, msg.get("frame", 0), msg.get("seq")
+                        )
+                        tracer.mark(trace, "decode")
+                    self._process_message(msg)
+                    if trace is not None:
+                        tracer.finish(trace)
+                    self.stats["messages_received"] += 1
+                except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                    logger.warning(f"JSON decode error: {e}")
+                    self.stats["errors"] += 1
+        return buffer
+
     def _handle_disconnect(self):
         """处理连接断开，清理资源并触发事件"""
         if self.connected:
@@ -558,24 +725,40 @@ class IsaacBridge:
             self._trigger_handlers("message", full_msg)
 
         elif msg_type == MessageType.EVENT.value:
-            event_type = msg.get("event_type")
-            event_data = msg.get("data", {})
-            timestamp = msg.get("timestamp", 0)
-
-            event = Event(type=event_type, data=event_data, frame=frame)
-            self.event_queue.put(event)
-            self.stats["events_received"] += 1
-
-            # 向后兼容
-            self._trigger_handlers(f"event:{event_type}", event_data)
-            self._trigger_handlers("event", event)
-
-            # 新回调
-            self._trigger_handlers("event_message", event)
+            batch = msg.get("events")
+            if isinstance(batch, list):
+                # 批量事件（Lua EventSystem.flush 每帧一条）
+                for item in batch:
+                    if isinstance(item, dict):
+                        self._dispatch_event(item, item.get("frame", frame))
+            else:
+                self._dispatch_event(msg, frame)
 
         elif msg_type == MessageType.COMMAND.value:
-            result = msg.get("result", {})
-            self._trigger_handlers("command_result", result)
+            if "echo" in msg:
+                # Lua 应用指令时的回显
+                if self.tracer is not None:
+                    self.tracer.on_echo(msg)
+                self._trigger_handlers("command_echo", msg)
+            else:
+                result = msg.get("result", {})
+                self._trigger_handlers("command_result", result)
+
+    def _dispatch_event(self, item: dict, frame: int):
+        """入队单个事件并触发事件回调"""
+        event_type = item.get("event_type") or item.get("event")
+        event_data = item.get("data") or {}
+
+        event = Event(type=event_type, data=event_data, frame=frame)
+        self.event_queue.put(event, block=False)
+        self.stats["events_received"] += 1
+
+        # 向后兼容
+        self._trigger_handlers(f"event:{event_type}", event_data)
+        self._trigger_handlers("event", event)
+
+        # 新回调
+        self._trigger_handlers("event_message", event)
 
     def _trigger_handlers(self, event: str, data: Any):
         """触发事件处理器"""
@@ -588,6 +771,20 @@ class IsaacBridge:
 
     # ==================== 公共 API ====================
 
+    def add_raw_tap(self, tap: Callable[[bytes, float], None]):
+        """注册原始行监听器
+
+        监听器在接收线程中以 (原始行字节, 接收时间) 调用，早于 JSON 解码，
+        用于原始透传录制等不需要解析消息的场景。
+        """
+        if tap not in self._raw_taps:
+            self._raw_taps.append(tap)
+
+    def remove_raw_tap(self, tap: Callable[[bytes, float], None]):
+        """移除原始行监听器"""
+        if tap in self._raw_taps:
+            self._raw_taps.remove(tap)
+
     def on(self, event: str):
         """
         注册事件处理器（支持装饰器用法）
@@ -601,6 +798,7 @@ class IsaacBridge:
         - "event": 任意游戏事件
         - "full_state": 完整状态更新
         - "command_result": 命令执行结果
+        - "command_echo": Lua 应用指令时的回显（启用 tracer 时指令带 echo 字段）
         """
 
         def decorator(handler: Callable):
@@ -746,6 +944,11 @@ class IsaacBridge:
         if not self.connected or not self.client:
             return False
 
+        if self.tracer is not None:
+            echo = self.tracer.on_command_sent()
+            if echo is not None:
+                data = dict(data, echo=echo)
+
         try:
             msg = json.dumps(data) + "\n"
             self.client.send(msg.encode("utf-8"))
@@ -762,6 +965,10 @@ class IsaacBridge:
         except Empty:
             return None
 
+    def drain_events(self, max_n: Optional[int] = None) -> List[Event]:
+        """批量取出至多 max_n 个事件（None 表示全部），不阻塞"""
+        return self.event_queue.drain(max_n)
+
     def get_state(self) -> GameState:
         """获取当前游戏状态"""
         return self.state
@@ -774,6 +981,20 @@ class IsaacBridge:
         """获取统计信息"""
         return dict(self.stats)
 
+    def register_metrics(self, registry) -> None:
+        """登记到 core.telemetry.MetricsRegistry（bridge_*）"""
+        registry.register_collector(
+            "bridge",
+            lambda: {
+                **self.stats,
+                "connected": self.connected,
+                "event_queue_depth": self.event_queue.qsize(),
+                "events_dropped": self.event_queue.stats["dropped"],
+                "events_coalesced": self.event_queue.stats["coalesced"],
+                "event_queue_high_water": self.event_queue.stats["high_water"],
+            },
+        )
+
     def is_connected(self) -> bool:
         """检查是否已连接"""
         return self.connected
@@ -1,7 +1,10 @@
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Any, Dict, List, Optional, Tuple
 from .base import Vector2D, EntityType, ObjectState
 
+# 位置/速度历史默认深度（由持有实体的状态管理器传入实际深度）
+DEFAULT_MAX_HISTORY = 60
+
 
 @dataclass
 class EntityData:
@@ -17,13 +20,19 @@ class EntityData:
     position_history: List[Vector2D] = field(default_factory=list)
     velocity_history: List[Vector2D] = field(default_factory=list)
 
-    def update_position(self, pos: Vector2D, vel: Vector2D, frame: int):
+    def update_position(
+        self, pos: Vector2D, vel: Vector2D, frame: int,
+        max_history: int = DEFAULT_MAX_HISTORY,
+    ):
         self.position = pos
         self.velocity = vel
         self.last_seen_frame = frame
         self.position_history.append(pos)
         self.velocity_history.append(vel)
-        max_history = 60
+        self.trim_history(max_history)
+
+    def trim_history(self, max_history: int):
+        """截断位置/速度历史，保留最近 max_history 条"""
         if len(self.position_history) > max_history:
             self.position_history = self.position_history[-max_history:]
             self.velocity_history = self.velocity_history[-max_history:]
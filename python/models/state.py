@@ -87,6 +87,26 @@ class TimingAwareStateManager:
         self.channels[channel] = state
         self.current_frame = max(self.current_frame, current_frame)
 
+    def set_max_history(self, max_history: int):
+        """调整每通道历史深度（保留最近的记录）"""
+        self.max_history = max_history
+        for channel, history in self.history.items():
+            if history.maxlen != max_history:
+                self.history[channel] = deque(history, maxlen=max_history)
+
+    def memory_usage(self, sample: int = 16) -> Dict[str, int]:
+        """按通道估算历史占用字节数（抽样外推）"""
+        # 仅在启用内存计量时导入，数据模型不依赖遥测模块
+        try:
+            from core.telemetry.memory import sample_sizeof
+        except ImportError:
+            from python.core.telemetry.memory import sample_sizeof
+
+        return {
+            channel: sample_sizeof(history, sample)
+            for channel, history in list(self.history.items())
+        }
+
     def get_channel(self, channel: str) -> Optional[ChannelState]:
         return self.channels.get(channel)
 
@@ -16,6 +16,11 @@ from collections import defaultdict
 import time
 import logging
 
+try:
+    from models.entities import DEFAULT_MAX_HISTORY
+except ImportError:
+    from python.models.entities import DEFAULT_MAX_HISTORY
+
 logger = logging.getLogger(__name__)
 
 T = TypeVar("T")
@@ -236,6 +241,29 @@ class EntityStateManager(Generic[T]):
             if tracked.last_seen_frame >= threshold
         ]
 
+    def set_max_history(self, max_history: int):
+        """调整每实体历史深度（保留最近的记录）"""
+        self.config.max_history = max_history
+        for entity_id, history in self._history.items():
+            if len(history) > max_history:
+                self._history[entity_id] = history[-max_history:]
+
+    def memory_usage(self, sample: int = 16) -> Dict[str, int]:
+        """估算实体与历史占用字节数（抽样外推）"""
+        # 仅在启用内存计量时导入，状态管理不依赖遥测模块
+        try:
+            from core.telemetry.memory import sample_sizeof
+        except ImportError:
+            from python.core.telemetry.memory import sample_sizeof
+
+        entities = [tracked.data for tracked in list(self._entities.values())]
+        seen = set()
+        usage = {"entities": sample_sizeof(entities, sample, seen)}
+        if self._history:
+            histories = list(self._history.values())
+            usage["history"] = sample_sizeof(histories, sample, seen)
+        return usage
+
     def get_history(self, entity_id: int) -> List[T]:
         """获取实体历史"""
         return list(self._history.get(entity_id, []))
@@ -282,6 +310,10 @@ class EntityStateManager(Generic[T]):
             **self._stats,
         }
 
+    def register_metrics(self, registry) -> None:
+        """登记到 core.telemetry.MetricsRegistry（entity_<name>_*）"""
+        registry.register_collector(f"entity_{self.name}", self.get_stats)
+
     @property
     def current_frame(self) -> int:
         """当前帧号"""
@@ -313,6 +345,7 @@ class GameEntityState:
         pickup_expiry: int = 30,        # PICKUPS: LOW 频率（每15帧），30帧过期
         bomb_expiry: int = 30,          # BOMBS: LOW 频率（每15帧），30帧过期
         grid_entity_expiry: int = -1,   # GRID_ENTITIES: 静态障碍物，不自动过期
+        entity_history: int = DEFAULT_MAX_HISTORY,  # EntityData 位置/速度历史深度
     ):
         # ========================================
         # 动态实体 - 启用自动过期
@@ -373,6 +406,9 @@ class GameEntityState:
             id_getter=lambda x: x.grid_index if hasattr(x, "grid_index") else x.get("grid_index", 0),
         )
 
+        # 实体自带的位置/速度历史深度（EntityData.update_position 传入）
+        self.entity_history = entity_history
+
         # 当前帧
         self._current_frame = 0
         self._current_room = -1
@@ -472,6 +508,60 @@ class GameEntityState:
             "grid_entities": self.grid_entities.get_stats(),
         }
 
+    def register_metrics(self, registry) -> None:
+        """登记到 core.telemetry.MetricsRegistry（entity_state_*）"""
+        registry.register_collector("entity_state", self.get_stats)
+
+    def _managers(self) -> Dict[str, "EntityStateManager"]:
+        return {
+            "enemies": self.enemies,
+            "enemy_projectiles": self.enemy_projectiles,
+            "player_tears": self.player_tears,
+            "lasers": self.lasers,
+            "pickups": self.pickups,
+            "bombs": self.bombs,
+            "grid_entities": self.grid_entities,
+        }
+
+    def memory_usage(self) -> Dict[str, int]:
+        """按实体类型估算占用字节数（含实体自带的位置/速度历史）"""
+        return {
+            name: sum(manager.memory_usage().values())
+            for name, manager in self._managers().items()
+        }
+
+    def set_entity_history(self, max_history: int):
+        """调整实体位置/速度历史深度（已跟踪实体立即截断）"""
+        self.entity_history = max_history
+        for manager in self._managers().values():
+            for data in manager.get_all():
+                trim = getattr(data, "trim_history", None)
+                if trim is not None:
+                    trim(max_history)
+
+    def register_memory(self, budget) -> None:
+        """登记到 core.telemetry.MemoryBudget（entity_state）
+
+        预算调整的深度作用于实体位置/速度历史（entity_history），
+        启用了历史记录的管理器按同一比例缩放。
+        """
+        base_depth = self.entity_history
+        base_history = {
+            name: manager.config.max_history
+            for name, manager in self._managers().items()
+            if manager.config.enable_history
+        }
+
+        def resize(depth: int):
+            self.set_entity_history(depth)
+            managers = self._managers()
+            for name, history in base_history.items():
+                managers[name].set_max_history(max(1, history * depth // base_depth))
+
+        budget.track(
+            "entity_state", self.memory_usage, depth=base_depth, resize=resize, min_depth=2
+        )
+
     @property
     def current_frame(self) -> int:
         return self._current_frame
@@ -323,6 +323,22 @@ class SocketBridgeFacade:
             stats["entity_state"] = self.entity_state.get_stats()
         return stats
 
+    def register_metrics(self, registry) -> None:
+        """把处理器、质量监控和实体状态登记到 core.telemetry.MetricsRegistry"""
+        self.processor.register_metrics(registry)
+        if self.monitor:
+            self.monitor.register_metrics(registry)
+        if self.entity_state:
+            self.entity_state.register_metrics(registry)
+
+    def register_memory(self, budget) -> None:
+        """把处理器、质量监控和实体状态的历史登记到 core.telemetry.MemoryBudget"""
+        self.processor.register_memory(budget)
+        if self.monitor:
+            self.monitor.register_memory(budget)
+        if self.entity_state:
+            self.entity_state.register_memory(budget)
+
     def set_enabled(self, channel: str, enabled: bool):
         """启用/禁用通道"""
         channel = ChannelRegistry.get(channel)
@@ -14,6 +14,7 @@ import time
 
 try:
     from core.protocol.timing import TimingMonitor, TimingIssue, TimingIssueType
+    from core.protocol.issues import IssueWindow
     from core.validation.known_issues import (
         KnownIssueRegistry,
         ValidationIssue,
@@ -22,6 +23,7 @@ try:
     from models.state import TimingAwareStateManager
 except ImportError:
     from python.core.protocol.timing import TimingMonitor, TimingIssue, TimingIssueType
+    from python.core.protocol.issues import IssueWindow
     from python.core.validation.known_issues import (
         KnownIssueRegistry,
         ValidationIssue,
@@ -80,13 +82,25 @@ class DataQualityMonitor:
     - 提供质量报告
     """
 
-    def __init__(self, issue_callback: Optional[Callable[[QualityIssue], None]] = None):
-        self.timing_monitor = TimingMonitor()
+    def __init__(
+        self,
+        issue_callback: Optional[Callable[[QualityIssue], None]] = None,
+        max_recent_issues: int = 1000,
+        issue_window: float = 300.0,
+    ):
+        """
+        Args:
+            issue_callback: 问题回调
+            max_recent_issues: 保留的最近问题条数（环形缓冲）
+            issue_window: 统计窗口（秒），get_stats 只计入窗口内的问题
+        """
+        self.timing_monitor = TimingMonitor(max_recent_issues, issue_window)
         self.known_issues = KnownIssueRegistry()
         self.state_manager = TimingAwareStateManager()
         self.issue_callback = issue_callback
 
-        self.issues: List[QualityIssue] = []
+        # 最近问题 + 按来源/严重性/通道的时间分桶计数，每条消息 O(1)
+        self.issues = IssueWindow(capacity=max_recent_issues, window=issue_window)
         self.issue_counts: Dict[str, int] = defaultdict(int)
         self.start_time = time.time()
         self.last_report_time = self.start_time
@@ -119,8 +133,6 @@ class DataQualityMonitor:
         Returns:
             当前质量统计
         """
-        self.issues = [i for i in self.issues if time.time() - i.timestamp < 300]
-
         try:
             from core.protocol.timing import MessageTimingInfo
 
@@ -201,7 +213,13 @@ class DataQualityMonitor:
             details=details or {},
         )
 
-        self.issues.append(issue)
+        self.issues.add(
+            issue,
+            issue.timestamp,
+            source=source.value,
+            severity=severity,
+            channel=channel,
+        )
         self.issue_counts[id] += 1
 
         for cb in self._callbacks.get(channel, []):
@@ -235,43 +253,43 @@ class DataQualityMonitor:
     def get_stats(self) -> QualityStats:
         """获取质量统计"""
         now = time.time()
-        duration = now - self.start_time
-
-        by_source = defaultdict(int)
-        by_severity = defaultdict(int)
-        by_channel = defaultdict(int)
-
-        for issue in self.issues:
-            by_source[issue.source.value] += 1
-            by_severity[issue.severity] += 1
-            by_channel[issue.channel] += 1
-
         total_messages = self.timing_monitor.total_messages
+        total_issues = self.issues.count()
 
         return QualityStats(
             total_messages=total_messages,
-            total_issues=len(self.issues),
-            by_source=dict(by_source),
-            by_severity=dict(by_severity),
-            by_channel=dict(by_channel),
-            issue_rate=len(self.issues) / max(total_messages, 1),
+            total_issues=total_issues,
+            by_source=self.issues.counts("source"),
+            by_severity=self.issues.counts("severity"),
+            by_channel=self.issues.counts("channel"),
+            issue_rate=total_issues / max(total_messages, 1),
             last_update=now,
         )
 
+    def register_metrics(self, registry) -> None:
+        """登记到 core.telemetry.MetricsRegistry（quality_*）"""
+        registry.register_collector("quality", self.get_stats)
+
+    def register_memory(self, budget) -> None:
+        """登记到 core.telemetry.MemoryBudget（quality，按通道计量状态历史）"""
+        budget.track(
+            "quality",
+            self.state_manager.memory_usage,
+            depth=self.state_manager.max_history,
+            resize=self.state_manager.set_max_history,
+        )
+
     def get_recent_issues(
         self, limit: int = 20, since: Optional[float] = None
     ) -> List[QualityIssue]:
         """获取最近问题"""
         since = since or (time.time() - 60)
-        return [i for i in self.issues if i.timestamp >= since][-limit:]
+        return self.issues.recent(since=since, limit=limit)
 
     def get_issue_summary(self) -> Dict[str, Any]:
         """获取问题摘要"""
         stats = self.get_stats()
-
-        critical = [i for i in self.issues if i.severity == "critical"]
-        errors = [i for i in self.issues if i.severity == "error"]
-        warnings = [i for i in self.issues if i.severity == "warning"]
+        by_severity = stats.by_severity
 
         return {
             "timestamp": datetime.now().isoformat(),
@@ -280,9 +298,9 @@ class DataQualityMonitor:
             "total_issues": stats.total_issues,
             "issue_rate": f"{stats.issue_rate:.2%}",
             "by_severity": {
-                "critical": len(critical),
-                "error": len(errors),
-                "warning": len(warnings),
+                "critical": by_severity.get("critical", 0),
+                "error": by_severity.get("error", 0),
+                "warning": by_severity.get("warning", 0),
             },
             "by_source": stats.by_source,
             "top_issues": sorted(self.issue_counts.items(), key=lambda x: -x[1])[:10],
@@ -7,6 +7,7 @@ Data Processor - 数据处理器
 from typing import Dict, Any, Optional, List, Callable, TypeVar, Generic
 from dataclasses import dataclass
 import logging
+import time
 
 try:
     from core.protocol.timing import MessageTimingInfo, TimingMonitor
@@ -63,6 +64,11 @@ class DataProcessor:
         self._validation_enabled = validation_enabled
         self._message_count = 0
 
+        # 指标（register_metrics 之后启用）：按通道的解析耗时与消息计数
+        self._parse_cost = None
+        self._parse_cost_by_channel: Dict[str, Any] = {}
+        self._channel_counter = None
+
         self._init_channels()
 
     def _init_channels(self):
@@ -128,9 +134,19 @@ class DataProcessor:
                 if not channel:
                     continue
 
+                parse_cost = self._parse_cost
+                if parse_cost is not None:
+                    started = time.perf_counter()
                 processed = channel.process(
                     channel_data, timing, frame, validate=validate
                 )
+                if parse_cost is not None:
+                    hist = self._parse_cost_by_channel.get(channel_name)
+                    if hist is None:
+                        hist = parse_cost.labels(channel=channel_name)
+                        self._parse_cost_by_channel[channel_name] = hist
+                    hist.record((time.perf_counter() - started) * 1000)
+                    self._channel_counter.inc(channel=channel_name)
 
                 if processed is not None:
                     self._data_cache[channel_name] = processed
@@ -227,6 +243,31 @@ class DataProcessor:
             "timing_stats": timing_stats,
         }
 
+    def register_metrics(self, registry) -> None:
+        """登记到 core.telemetry.MetricsRegistry
+
+        - processor_*: get_stats() 的数值项
+        - channel_parse_ms{channel}: 各通道解析+验证耗时
+        - channel_messages_total{channel}: 各通道处理次数
+        """
+        self._parse_cost_by_channel = {}
+        self._channel_counter = registry.counter(
+            "channel_messages_total", "Channel payloads processed"
+        )
+        self._parse_cost = registry.histogram(
+            "channel_parse_ms", "Channel parse and validation cost (ms)"
+        )
+        registry.register_collector("processor", self.get_stats)
+
+    def register_memory(self, budget) -> None:
+        """登记到 core.telemetry.MemoryBudget（processor，按通道计量状态历史）"""
+        budget.track(
+            "processor",
+            self.state_manager.memory_usage,
+            depth=self.state_manager.max_history,
+            resize=self.state_manager.set_max_history,
+        )
+
     def get_synchronized_data(
         self, channels: List[str], max_frame_diff: int = 5
     ) -> Optional[Dict[str, Any]]:
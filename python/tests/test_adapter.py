@@ -4,6 +4,7 @@ Test Bridge Adapter - 测试连接适配器
 验证 BridgeAdapter 的基础功能。
 """
 
+import json
 import pytest
 import sys
 from pathlib import Path
@@ -43,6 +44,11 @@ class TestAdapterConfig:
         assert config.monitoring_enabled is True
         assert config.auto_reconnect is True
         assert config.log_messages is False
+        # 遥测默认关闭，指令不带 echo 字段
+        assert config.tracing is False
+        assert config.metrics is False
+        assert config.frame_budget_ms is None
+        assert config.memory_accounting is False
     
     def test_custom_config(self):
         """测试自定义配置"""
@@ -235,3 +241,574 @@ class TestAdapterChannelAccess:
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
+
+
+class TestLatencyTracing:
+    """测试端到端延迟追踪"""
+
+    def test_histogram_percentiles_and_window(self):
+        """测试直方图百分位与滚动窗口"""
+        from core.telemetry import LatencyHistogram
+
+        now = [0.0]
+        hist = LatencyHistogram(window=10.0, clock=lambda: now[0])
+        for value in range(1, 101):
+            hist.record(float(value))
+
+        snap = hist.snapshot()
+        assert snap["count"] == 100
+        assert snap["min"] == 1.0 and snap["max"] == 100.0
+        assert snap["p50"] == pytest.approx(50, rel=0.15)
+        assert snap["p99"] == pytest.approx(99, rel=0.15)
+
+        now[0] = 15.0  # 轮换一次：上一代仍计入
+        hist.record(5.0)
+        assert hist.snapshot()["count"] == 101
+        now[0] = 40.0  # 超过两个窗口：全部过期
+        assert hist.snapshot()["count"] == 0
+        assert hist.total_count == 101
+
+    def test_adapter_traces_command_echo(self):
+        """测试消息阶段打点与指令回显往返"""
+        import json
+        import socket
+        import time
+        from core.connection import AdapterConfig, BridgeAdapter
+
+        adapter = BridgeAdapter(AdapterConfig(port=0, tracing=True))
+
+        @adapter.on("frame")
+        def on_frame(frame, data):
+            adapter.send_input(move=(1, 0))
+
+        adapter.start()
+        try:
+            port = adapter.bridge.server.getsockname()[1]
+            game = socket.create_connection(("127.0.0.1", port), timeout=5)
+            deadline = time.time() + 5
+            while not adapter.connected and time.time() < deadline:
+                time.sleep(0.01)
+
+            msg = {
+                "version": "2.1", "type": "DATA", "frame": 10, "room_index": 1,
+                "seq": 1, "payload": {}, "channels": [],
+            }
+            game.sendall((json.dumps(msg) + "\n").encode())
+            command = json.loads(game.makefile().readline())
+            assert command["move"] == {"x": 1, "y": 0}
+            assert command["echo"] == 1
+
+            echo = {"version": "2.1", "type": "CMD", "frame": 12, "echo": 1, "applied_frame": 12}
+            game.sendall((json.dumps(echo) + "\n").encode())
+            while adapter.tracer.echoes_received < 1 and time.time() < deadline:
+                time.sleep(0.01)
+            game.close()
+        finally:
+            adapter.stop()
+
+        latency = adapter.get_stats()["latency"]
+        for stage in ("decode", "process", "callbacks", "total", "react", "command_rtt"):
+            assert latency[stage]["count"] >= 1, stage
+        assert latency["apply_frames"]["max"] == pytest.approx(2, rel=0.15)
+        assert latency["echo"] == {"sent": 1, "received": 1, "pending": 0, "unmatched": 0}
+
+
+class TestMetricsRegistry:
+    """测试统一指标注册表与本地端点"""
+
+    def test_render_prometheus_and_snapshot(self):
+        """测试计数器、仪表、直方图与统计回调的导出"""
+        from dataclasses import dataclass
+        from core.telemetry import MetricsRegistry
+
+        @dataclass
+        class Stats:
+            total: int = 3
+            ok: bool = True
+            name: str = "ignored"
+
+        registry = MetricsRegistry()
+        registry.counter("messages_total", "Messages").inc(2)
+        registry.counter("messages_total").inc(channel="ENEMIES")
+        queue = [1, 2, 3]
+        registry.gauge("queue_depth", func=lambda: len(queue))
+        hist = registry.histogram("parse_ms")
+        for value in (1.0, 2.0, 4.0):
+            hist.record(value, channel="ENEMIES")
+        registry.register_collector("demo", lambda: {"stats": Stats(), "by_type": {"frame gap": 5}})
+
+        text = registry.render_prometheus()
+        assert "# TYPE socketbridge_messages_total counter" in text
+        assert "socketbridge_messages_total 2" in text
+        assert 'socketbridge_messages_total{channel="ENEMIES"} 1' in text
+        assert "socketbridge_queue_depth 3.0" in text
+        assert 'socketbridge_parse_ms{channel="ENEMIES",quantile="0.99"}' in text
+        assert 'socketbridge_parse_ms_count{channel="ENEMIES"} 3' in text
+        assert 'socketbridge_parse_ms_sum{channel="ENEMIES"} 7.0' in text
+        assert "socketbridge_demo_stats_total 3" in text
+        assert "socketbridge_demo_stats_ok 1" in text
+        assert "socketbridge_demo_by_type_frame_gap 5" in text
+        assert "ignored" not in text
+
+        snap = registry.snapshot()
+        assert snap["counters"]["socketbridge_messages_total"] == {"": 2, "channel=ENEMIES": 1}
+        assert snap["gauges"]["socketbridge_queue_depth"] == 3.0
+        assert snap["histograms"]["socketbridge_parse_ms"]["channel=ENEMIES"]["total_count"] == 3
+        assert snap["collectors"]["demo"]["stats_total"] == 3
+
+        with pytest.raises(ValueError):
+            registry.gauge("messages_total")
+
+    def test_adapter_metrics_endpoint_and_dump(self, tmp_path):
+        """测试适配器组件上报、HTTP 端点与 JSON 转储"""
+        import json
+        import socket
+        import time
+        import urllib.request
+        from core.connection import AdapterConfig, BridgeAdapter
+        from core.replay.loadgen import LoadProfile, SyntheticSession
+
+        dump_path = tmp_path / "metrics.json"
+        adapter = BridgeAdapter(AdapterConfig(
+            port=0, tracing=True, metrics_port=0, metrics_dump_path=str(dump_path),
+            metrics_dump_interval=60,
+        ))
+        messages = [m.to_dict() for m in SyntheticSession(LoadProfile(frames=5)).iter_messages()]
+
+        adapter.start()
+        try:
+            port = adapter.bridge.server.getsockname()[1]
+            game = socket.create_connection(("127.0.0.1", port), timeout=5)
+            deadline = time.time() + 5
+            while not adapter.connected and time.time() < deadline:
+                time.sleep(0.01)
+            for msg in messages:
+                game.sendall((json.dumps(msg) + "\n").encode())
+            while adapter.message_count < len(messages) and time.time() < deadline:
+                time.sleep(0.01)
+
+            with urllib.request.urlopen(adapter.metrics_server.url, timeout=5) as resp:
+                assert resp.headers["Content-Type"].startswith("text/plain")
+                text = resp.read().decode("utf-8")
+            game.close()
+        finally:
+            adapter.stop()
+
+        assert f"socketbridge_messages_processed_total {len(messages)}" in text
+        assert f"socketbridge_bridge_messages_received {len(messages)}" in text
+        assert "socketbridge_bridge_event_queue_depth 0" in text
+        assert 'socketbridge_channel_parse_ms_count{channel="ENEMIES"}' in text
+        assert 'socketbridge_pipeline_latency_ms{stage="total",quantile="0.5"}' in text
+        assert "socketbridge_processor_message_count" in text
+        assert "socketbridge_quality_total_messages" in text
+        assert "socketbridge_entity_state_enemies_total_updates" in text
+
+        # stop() 时写出最终快照
+        dump = json.loads(dump_path.read_text(encoding="utf-8"))
+        assert dump["counters"]["socketbridge_messages_processed_total"] == len(messages)
+        assert dump["collectors"]["bridge"]["messages_received"] == len(messages)
+
+
+class TestFrameBudgetWatchdog:
+    """测试帧预算看门狗与慢帧采样剖析"""
+
+    def test_slow_frame_attribution_and_profile(self):
+        """测试慢帧按阶段/回调归因，并保留采样剖析"""
+        import time
+        from core.telemetry import FrameBudgetWatchdog, SamplingProfiler
+
+        def slow_handler():
+            time.sleep(0.03)
+
+        slow_events = []
+        watchdog = FrameBudgetWatchdog(
+            budget_ms=10, profiler=SamplingProfiler(interval=0.001), on_slow=slow_events.append,
+        )
+        watchdog.start()
+        try:
+            watchdog.begin(1)
+            watchdog.mark("process")
+            watchdog.time_call("frame:fast", lambda: None)
+            watchdog.mark("callbacks")
+            assert watchdog.end() is None
+
+            watchdog.begin(2)
+            watchdog.mark("process")
+            watchdog.time_call("frame:slow_handler", slow_handler)
+            watchdog.mark("callbacks")
+            slow = watchdog.end()
+        finally:
+            watchdog.stop()
+
+        assert slow is not None and slow_events == [slow]
+        assert slow.frame == 2 and slow.total_ms > 10
+        assert slow.stages["callbacks"] >= 25
+        assert slow.callbacks["frame:slow_handler"] >= 25
+        assert slow.profile.sample_count > 0
+        assert any("slow_handler" in name for name, _, _ in slow.profile.top(5))
+        assert "slow_handler" in slow.profile.to_collapsed()
+
+        stats = watchdog.get_stats()
+        assert stats["frames"] == 2 and stats["slow_frames"] == 1
+        assert list(stats["slow_callback_ms"]) == ["frame:slow_handler"]
+        assert watchdog.recent_slow() == [slow]
+
+    def test_adapter_flags_slow_user_handler(self):
+        """测试适配器对超预算的用户 frame 回调报警"""
+        import time
+        from core.connection import AdapterConfig, BridgeAdapter
+
+        adapter = BridgeAdapter(AdapterConfig(
+            port=0, frame_budget_ms=5, profile_interval=0.001, metrics=True,
+        ))
+
+        @adapter.on("frame")
+        def heavy_frame_handler(frame, data):
+            if frame == 2:
+                time.sleep(0.02)
+
+        adapter.watchdog.start()
+        try:
+            for frame in (1, 2, 3):
+                adapter._process_raw_message({
+                    "version": "2.1", "type": "DATA", "frame": frame, "room_index": 1,
+                    "payload": {}, "channels": [],
+                })
+        finally:
+            adapter.watchdog.stop()
+
+        slow = adapter.watchdog.recent_slow()
+        assert [s.frame for s in slow] == [2]
+        name = max(slow[0].callbacks, key=slow[0].callbacks.get)
+        assert name.startswith("frame:") and name.endswith("heavy_frame_handler")
+        assert "process" in slow[0].stages
+        assert adapter.get_stats()["watchdog"]["slow_frames"] == 1
+        assert "socketbridge_slow_frames_total 1" in adapter.metrics.render_prometheus()
+
+
+class TestProfilerController:
+    """测试运行时剖析控制"""
+
+    @staticmethod
+    def _busy(ms: float):
+        import time
+        end = time.perf_counter() + ms / 1000
+        while time.perf_counter() < end:
+            sum(range(200))
+
+    def test_sampling_frame_window(self, tmp_path):
+        """测试采样模式按帧窗口捕获并写出带帧/房间标签的文件"""
+        import json
+        from core.telemetry import ProfilerController
+
+        controller = ProfilerController(output_dir=tmp_path, sample_interval=0.001)
+        result = controller.handle_command(["start", "3", "label=boss fight"])
+        assert result["ok"] and result["run"]["state"] == "armed"
+        assert controller.handle_command(["start"])["ok"] is False
+
+        for frame, room in ((10, 5), (11, 5), (12, 6), (13, 6)):
+            controller.on_message(frame, room)
+            self._busy(10)
+
+        assert not controller.active
+        run = controller.last_run
+        assert (run.start_frame, run.end_frame, run.rooms) == (10, 12, [5, 6])
+        assert run.path.suffix == ".folded"
+        assert run.path.name.startswith("profile_sampling_f10-12_r5-6_boss_fight_")
+        assert "_busy" in run.path.read_text(encoding="utf-8")
+        meta = json.loads(run.path.with_suffix(".json").read_text(encoding="utf-8"))
+        assert meta["state"] == "complete" and meta["frames"] == 3 and meta["samples"] > 0
+
+    def test_deterministic_next_room(self, tmp_path):
+        """测试确定性模式在换房间后开始，stop 后在处理线程收尾"""
+        import pstats
+        from core.telemetry import ProfilerController
+
+        controller = ProfilerController(output_dir=tmp_path)
+        controller.start(mode="cprofile", next_room=True)
+        controller.on_message(1, 3)
+        controller.on_message(2, 3)
+        assert controller.status()["run"]["state"] == "armed"
+
+        controller.on_message(3, 4)
+        self._busy(2)
+        controller.on_message(4, 4)
+        run = controller.stop(timeout=0)
+        assert controller.active and not run.path
+        controller.on_message(5, 4)
+
+        assert not controller.active
+        assert (run.start_frame, run.end_frame, run.rooms) == (3, 5, [4])
+        assert run.path.suffix == ".prof"
+        stats = pstats.Stats(str(run.path))
+        assert any(func == "_busy" for _, _, func in stats.stats)
+
+    def test_stop_before_start_disarms(self, tmp_path):
+        """测试尚未开始的捕获被取消且不写文件"""
+        from core.telemetry import ProfilerController
+
+        controller = ProfilerController(output_dir=tmp_path)
+        controller.start(room=9)
+        controller.on_message(1, 3)
+        run = controller.stop()
+        assert run.state == "armed" and run.path is None
+        assert not controller.active
+        assert not list(tmp_path.iterdir())
+        assert controller.handle_command(["stop"])["ok"] is False
+        assert controller.handle_command(["start", "bogus"])["ok"] is False
+
+    def test_adapter_control_socket(self, tmp_path):
+        """测试通过控制套接字启停适配器的剖析"""
+        from core.connection import AdapterConfig, BridgeAdapter
+        from core.telemetry import send_control_command
+
+        adapter = BridgeAdapter(AdapterConfig(
+            port=0, control_port=0, profile_dir=str(tmp_path), frame_budget_ms=None,
+        ))
+        adapter.control_server.start()
+        try:
+            port = adapter.control_server.port
+            reply = send_control_command("profile start 2 room=7", port=port)
+            assert reply["ok"] and reply["run"]["frames_window"] == 2
+            assert "profile" in send_control_command("help", port=port)["commands"]
+            assert send_control_command("nope", port=port)["ok"] is False
+
+            for frame, room in ((1, 6), (2, 7), (3, 7)):
+                adapter.bridge._consume(
+                    (json.dumps({
+                        "version": "2.1", "type": "DATA", "frame": frame, "room_index": room,
+                        "payload": {}, "channels": [],
+                    }) + "\n").encode("utf-8"),
+                    0.0,
+                )
+
+            status = send_control_command("profile status", port=port)
+            assert status["active"] is False
+            assert status["last"]["start_frame"] == 2 and status["last"]["end_frame"] == 3
+            assert status["last"]["path"].endswith(".folded")
+            assert send_control_command("stats", port=port)["ok"]
+        finally:
+            adapter.control_server.stop()
+
+    def test_slow_frame_profiling_off_by_default(self):
+        """测试慢帧采样默认关闭，可通过控制套接字开关"""
+        from core.connection import AdapterConfig, BridgeAdapter
+        from core.telemetry import DEFAULT_FRAME_BUDGET_MS, send_control_command
+
+        adapter = BridgeAdapter(AdapterConfig(
+            port=0, control_port=0, frame_budget_ms=DEFAULT_FRAME_BUDGET_MS,
+        ))
+        profiler = adapter.watchdog.profiler
+        adapter.watchdog.start()
+        adapter.control_server.start()
+        try:
+            assert profiler.running is False
+            port = adapter.control_server.port
+            assert send_control_command("watchdog profile on", port=port)["profiling"] is True
+            assert profiler.running is True
+            assert send_control_command("watchdog status", port=port)["profiling"] is True
+            assert send_control_command("watchdog profile off", port=port)["ok"]
+            assert profiler.running is False
+            assert send_control_command("watchdog bogus", port=port)["ok"] is False
+        finally:
+            adapter.control_server.stop()
+            adapter.watchdog.stop()
+
+
+class TestMemoryBudget:
+    """测试历史存储内存计量与预算"""
+
+    @staticmethod
+    def _fill(state_manager, channel: str, count: int, width: int = 20):
+        from core.protocol.timing import ChannelTimingInfo
+
+        for frame in range(count):
+            timing = ChannelTimingInfo(
+                channel=channel, collect_frame=frame, collect_time=frame,
+                interval="HIGH", stale_frames=0,
+            )
+            data = [{"id": i, "pos": {"x": float(i), "y": float(frame)}} for i in range(width)]
+            state_manager.update_channel(channel, data, timing, frame)
+
+    def test_sample_estimate_close_to_deep_size(self):
+        """测试抽样外推与完整深度估算接近"""
+        from core.telemetry import deep_sizeof, sample_sizeof
+
+        items = [{"id": i, "values": list(range(10))} for i in range(500)]
+        full = deep_sizeof(items)
+        estimate = sample_sizeof(items, sample=16)
+        assert full > 0
+        assert abs(estimate - full) / full < 0.2
+        assert sample_sizeof([]) > 0
+
+    def test_state_history_resize(self):
+        """测试通道历史按通道计量并可缩减深度"""
+        from models.state import TimingAwareStateManager
+
+        manager = TimingAwareStateManager(max_history=100)
+        self._fill(manager, "ENEMIES", 100)
+        self._fill(manager, "PICKUPS", 10, width=2)
+        usage = manager.memory_usage()
+        assert set(usage) == {"ENEMIES", "PICKUPS"}
+        assert usage["ENEMIES"] > usage["PICKUPS"] * 10
+
+        manager.set_max_history(20)
+        assert len(manager.history["ENEMIES"]) == 20
+        assert manager.history["ENEMIES"][-1].collect_frame == 99
+        self._fill(manager, "PICKUPS", 30, width=2)
+        assert len(manager.history["PICKUPS"]) == 20
+
+    def test_budget_shrinks_and_restores_depth(self):
+        """测试超出预算时缩减历史深度，占用回落后逐步恢复"""
+        from core.telemetry import MemoryBudget
+        from models.state import TimingAwareStateManager
+
+        manager = TimingAwareStateManager(max_history=200)
+        self._fill(manager, "ENEMIES", 200)
+        budget = MemoryBudget()
+        budget.track(
+            "states", manager.memory_usage,
+            depth=manager.max_history, resize=manager.set_max_history,
+        )
+        budget.track("fixed", lambda: {"other": 1000})
+        full = budget.check()
+        assert budget.scale == 1.0 and budget.shrinks == 0
+
+        budget.budget_bytes = full // 2
+        total = budget.check()
+        assert budget.shrinks == 1 and budget.scale < 0.5
+        assert total <= budget.budget_bytes
+        assert len(manager.history["ENEMIES"]) == manager.max_history < 100
+
+        budget.budget_bytes = full * 10
+        budget.check()
+        assert budget.grows == 1
+        assert manager.max_history > budget.targets["states"].depth * 0.5
+
+        stats = budget.get_stats()
+        assert stats["components"]["fixed"]["bytes"] == 1000
+        assert "ENEMIES" in stats["components"]["states"]["parts"]
+
+    def test_adapter_memory_stats_and_budget(self):
+        """测试适配器登记各组件历史并执行预算"""
+        from core.connection import AdapterConfig, BridgeAdapter
+        from services.entity_state import GameEntityState
+
+        bystander = GameEntityState()
+        adapter = BridgeAdapter(AdapterConfig(
+            port=0, frame_budget_ms=None, memory_budget_mb=0.05, memory_check_interval=0,
+            metrics=True,
+        ))
+        try:
+            assert {"processor", "quality", "entity_state"} <= set(adapter.memory.targets)
+            self._fill(adapter.facade.processor.state_manager, "ENEMIES", 300)
+            adapter._process_raw_message({
+                "version": "2.1", "type": "DATA", "frame": 1, "room_index": 1,
+                "payload": {}, "channels": [],
+            })
+            memory = adapter.get_stats()["memory"]
+            assert memory["checks"] == 1 and memory["shrinks"] == 1
+            assert adapter.facade.processor.state_manager.max_history < 300
+            assert adapter.facade.entity_state.entity_history < bystander.entity_history
+            assert "socketbridge_memory_total_bytes" in adapter.metrics.render_prometheus()
+        finally:
+            adapter.stop()
+
+
+class TestEventChannel:
+    """测试有界事件队列"""
+
+    @staticmethod
+    def _event(event_type: str, n: int = 0):
+        from isaac_bridge import Event
+        return Event(type=event_type, data={"n": n}, frame=n)
+
+    def test_drop_oldest_and_drain(self):
+        """测试默认策略丢弃最旧事件，drain 批量取出"""
+        from isaac_bridge import EventChannel
+
+        channel = EventChannel(capacity=3)
+        for n in range(5):
+            assert channel.put(self._event("HIT", n), block=False)
+        assert [e.frame for e in channel.drain(2)] == [2, 3]
+        assert [e.frame for e in channel.drain()] == [4]
+        assert channel.empty() and channel.drain() == []
+        stats = channel.get_stats()
+        assert stats["dropped"] == 2 and stats["high_water"] == 3
+
+    def test_drop_newest(self):
+        """测试队列满时拒绝新事件"""
+        from isaac_bridge import EventChannel, OverflowPolicy
+
+        channel = EventChannel(capacity=2, policy=OverflowPolicy.DROP_NEWEST)
+        results = [channel.put(self._event("HIT", n), block=False) for n in range(3)]
+        assert results == [True, True, False]
+        assert [e.frame for e in channel.drain()] == [0, 1]
+
+    def test_coalesce_by_type(self):
+        """测试同类型事件合并为最新一条，无同类型时丢弃最旧"""
+        from isaac_bridge import EventChannel, OverflowPolicy
+
+        channel = EventChannel(capacity=3, policy="coalesce")
+        assert channel.policy is OverflowPolicy.COALESCE
+        for event_type, n in (("MOVE", 0), ("HIT", 1), ("MOVE", 2), ("MOVE", 3), ("DEATH", 4)):
+            channel.put(self._event(event_type, n), block=False)
+        # MOVE(3) 替换 MOVE(2)；DEATH 无同类型，丢弃最旧的 MOVE(0)
+        assert [(e.type, e.frame) for e in channel.drain()] == [("HIT", 1), ("MOVE", 3), ("DEATH", 4)]
+        stats = channel.get_stats()
+        assert stats["coalesced"] == 1 and stats["dropped"] == 1
+
+    def test_get_blocks_until_put(self):
+        """测试 get 与 queue.Queue 语义兼容（超时抛出 Empty）"""
+        import threading
+        from queue import Empty
+        from isaac_bridge import EventChannel
+
+        channel = EventChannel(capacity=4)
+        with pytest.raises(Empty):
+            channel.get(timeout=0.01)
+        threading.Timer(0.02, lambda: channel.put(self._event("HIT", 7))).start()
+        assert channel.get(timeout=2.0).frame == 7
+
+    def test_put_blocks_until_space_then_applies_policy(self):
+        """测试 put(block=True) 等待空位，超时后按溢出策略处理"""
+        import threading
+        import time
+        from isaac_bridge import EventChannel, OverflowPolicy
+
+        channel = EventChannel(capacity=1, policy=OverflowPolicy.DROP_NEWEST)
+        channel.put(self._event("HIT", 0))
+
+        started = time.perf_counter()
+        assert channel.put(self._event("HIT", 1), timeout=0.05) is False
+        assert time.perf_counter() - started >= 0.05
+
+        threading.Timer(0.02, channel.get).start()
+        assert channel.put(self._event("HIT", 2), timeout=2.0) is True
+        assert [e.frame for e in channel.drain()] == [2]
+        assert channel.get_stats()["dropped"] == 1
+
+    def test_bridge_batched_event_message(self):
+        """测试桥接器解析批量 EVENT 消息并保持容量上限"""
+        from isaac_bridge import IsaacBridge
+
+        bridge = IsaacBridge(port=0, event_capacity=2)
+        seen = []
+        bridge.on("event:ROOM_CLEAR")(seen.append)
+        line = json.dumps({
+            "version": "2.1", "type": "EVENT", "frame": 10,
+            "events": [
+                {"event": "ROOM_ENTER", "data": {"room_index": 3}, "frame": 9},
+                {"event": "ROOM_CLEAR", "data": {"room_index": 3}, "frame": 10},
+                {"event": "PLAYER_DAMAGE", "data": {}, "frame": 10},
+            ],
+        }) + "\n"
+        bridge._consume(line.encode("utf-8"), 0.0)
+        # 旧格式单事件仍然支持
+        bridge._consume(b'{"type": "EVENT", "frame": 11, "event": "ROOM_CLEAR", "data": {}}\n', 0.0)
+
+        assert bridge.stats["events_received"] == 4
+        assert seen == [{"room_index": 3}, {}]
+        events = bridge.drain_events()
+        assert [(e.type, e.frame) for e in events] == [("PLAYER_DAMAGE", 10), ("ROOM_CLEAR", 11)]
+        assert bridge.event_queue.stats["dropped"] == 2
@@ -0,0 +1,73 @@
+"""
+Tests for benchmarks - 基准框架测试
+"""
+
+import pytest
+
+from benchmarks import (
+    BenchContext,
+    BenchResult,
+    compare_results,
+    load_baseline,
+    load_cases,
+    run_benchmarks,
+    save_baseline,
+)
+
+
+def make_result(name: str, throughput: float, p50: float) -> BenchResult:
+    return BenchResult(
+        name=name, unit="msg", item="msg", units=100, items=100,
+        seconds=100 / throughput, throughput=throughput, repeats=1,
+        latency_ms={"mean": p50, "p50": p50, "p90": p50, "p99": p50, "max": p50},
+    )
+
+
+class TestBenchmarks:
+    """基准运行、基线与比较测试"""
+
+    def test_compare_flags_regressions(self):
+        """测试吞吐量下降/延迟上升超过阈值时标记退化"""
+        baseline = {
+            "a": make_result("a", 1000, 1.0),
+            "b": make_result("b", 1000, 1.0),
+            "gone": make_result("gone", 1000, 1.0),
+        }
+        current = {
+            "a": make_result("a", 950, 1.05),  # 阈值内
+            "b": make_result("b", 700, 1.5),   # 退化
+            "new": make_result("new", 1, 1.0),  # 基线中没有，不比较
+        }
+        comparisons = compare_results(baseline, current, threshold=0.1)
+        assert {(c.name, c.metric) for c in comparisons} == {
+            ("a", "throughput"), ("a", "p50_ms"), ("b", "throughput"), ("b", "p50_ms"),
+        }
+        regressed = {(c.name, c.metric) for c in comparisons if c.regressed}
+        assert regressed == {("b", "throughput"), ("b", "p50_ms")}
+        b_throughput = next(c for c in comparisons if c.name == "b" and c.metric == "throughput")
+        assert b_throughput.change == pytest.approx(-0.3)
+
+    def test_run_and_baseline_roundtrip(self, tmp_path):
+        """测试在 fixture 会话上运行基准并保存/读取基线"""
+        assert {
+            "bridge_framing", "processor", "facade_monitoring_on", "facade_monitoring_off",
+            "entity_state", "environment_update_room", "environment_queries",
+            "recorder_write", "replay_load", "replay_stream",
+        } <= set(load_cases())
+
+        with BenchContext() as ctx:
+            results = run_benchmarks(ctx, ["entity_state", "bridge_framing"], repeat=1)
+            tmp = ctx.recordings_dir
+        assert not tmp.exists()  # 临时副本已清理
+
+        assert set(results) == {"entity_state", "bridge_framing"}
+        framing = results["bridge_framing"]
+        assert framing.units == 4989 and framing.item == "chunk"
+        assert results["entity_state"].units == results["entity_state"].items
+        assert all(r.throughput > 0 and r.latency_ms["p50"] > 0 for r in results.values())
+
+        path = tmp_path / "baseline.json"
+        save_baseline(path, results, fixture="session_20260202_234038")
+        loaded = load_baseline(path)
+        assert loaded["bridge_framing"].units == 4989
+        assert not any(c.regressed for c in compare_results(loaded, results))
@@ -335,6 +335,29 @@ class TestGameEntityState:
         all_grids = state.get_grid_entities()
         assert len(all_grids) == 2
 
+    def test_entity_history_per_state(self):
+        """测试实体位置历史深度按状态实例独立调整"""
+        from models.base import EntityType, Vector2D
+        from models.entities import EntityData
+
+        state = GameEntityState(entity_history=8)
+        other = GameEntityState()
+        enemy = EntityData(
+            id=1, entity_type=EntityType.ENEMY,
+            position=Vector2D(0, 0), velocity=Vector2D(0, 0),
+        )
+        for frame in range(20):
+            enemy.update_position(
+                Vector2D(frame, 0), Vector2D(1, 0), frame, state.entity_history
+            )
+        assert len(enemy.position_history) == 8
+        state.update_enemies([enemy], frame=20)
+
+        state.set_entity_history(3)
+        assert len(enemy.position_history) == len(enemy.velocity_history) == 3
+        assert enemy.position_history[-1].x == 19
+        assert other.entity_history == 60
+
 
 # ============================================================================
 # SocketBridgeFacade 集成测试
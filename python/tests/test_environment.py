@@ -0,0 +1,471 @@
+"""
+Tests for environment module - 环境建模层测试
+
+包括：
+- DistanceField 距离场
+- EnvironmentModel 移动查询
+- DangerRaster 危险栅格
+- RoomGeometryCache 房间几何缓存
+- 后台房间编译
+- PositionScorer 战略位置评分
+"""
+
+import pytest
+import sys
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+
+# 确保可以导入模块
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from environment import (
+    GameMap,
+    EnvironmentModel,
+    DistanceField,
+    RoomGeometryCache,
+    ScoringWeights,
+    TileType,
+)
+from models.base import Vector2D
+from models.entities import RoomInfo, EnemyData, ProjectileData
+
+
+# 15x9 房间（含边界墙），top_left=(60, 140)，与录制数据一致
+TOP_LEFT = (60.0, 140.0)
+
+
+def make_room_info(room_index: int = 1) -> RoomInfo:
+    return RoomInfo(
+        room_index=room_index,
+        grid_width=15,
+        grid_height=9,
+        top_left=TOP_LEFT,
+        room_shape=1,
+    )
+
+
+def tile_at(gx: int, gy: int, tile_type: int = 2, collision: int = 1) -> Dict[str, Any]:
+    """生成网格坐标 (gx, gy) 处的 ROOM_LAYOUT 格子（世界坐标为格子中心）"""
+    return {
+        "x": TOP_LEFT[0] - 40 + gx * 40 + 20,
+        "y": TOP_LEFT[1] - 40 + gy * 40 + 20,
+        "type": tile_type,
+        "collision": collision,
+    }
+
+
+def make_layout(tiles: List[Tuple[int, int]], tile_type: int = 2) -> Dict[str, Any]:
+    grid = {str(i): tile_at(gx, gy, tile_type) for i, (gx, gy) in enumerate(tiles)}
+    return {"grid": grid, "doors": {}, "grid_size": 40, "width": 15, "height": 9}
+
+
+@pytest.fixture
+def wall_room() -> EnvironmentModel:
+    """x=7 处有一列岩石，只在 y=7 留出缺口"""
+    env = EnvironmentModel()
+    layout = make_layout([(7, y) for y in range(1, 7)])
+    env.update_room(make_room_info(), {}, {}, room_layout=layout)
+    return env
+
+
+class TestGameMapCells:
+    """GameMap 网格辅助方法测试"""
+
+    def test_cell_round_trip(self, wall_room):
+        game_map = wall_room.game_map
+        center = game_map.cell_center(3, 4)
+        assert game_map.position_to_cell(center) == (3, 4)
+
+    def test_walkable(self, wall_room):
+        game_map = wall_room.game_map
+        assert game_map.is_cell_walkable(3, 3) is True
+        assert game_map.is_cell_walkable(7, 3) is False
+        assert game_map.is_cell_walkable(0, 0) is False
+
+    def test_neighbor_table_cached_per_geometry(self, wall_room):
+        game_map = wall_room.game_map
+        table = game_map.get_neighbor_table()
+        assert game_map.get_neighbor_table() is table
+
+        game_map.update_from_room_info(make_room_info(2))
+        assert game_map.get_neighbor_table() is not table
+
+
+class TestDistanceField:
+    """DistanceField 测试"""
+
+    def test_source_distance_zero(self, wall_room):
+        field = DistanceField.compute(wall_room.game_map, [(3, 3)])
+        assert field.get(3, 3) == 0.0
+        assert field.get(4, 3) == pytest.approx(40.0)
+        assert field.get(4, 4) == pytest.approx(40.0 * 2 ** 0.5)
+
+    def test_walls_unreachable(self, wall_room):
+        field = DistanceField.compute(wall_room.game_map, [(3, 3)])
+        assert field.is_reachable(7, 3) is False
+        assert field.get(-1, 0) == DistanceField.INF
+
+    def test_path_goes_around_wall(self, wall_room):
+        field = DistanceField.compute(wall_room.game_map, [(3, 3)])
+        # 直线距离 7 格，但必须绕过 y=7 的缺口
+        assert field.get(10, 3) > 7 * 40.0
+        path = field.path_to_source(10, 3)
+        assert path[0] == (10, 3)
+        assert path[-1] == (3, 3)
+        assert (7, 7) in path
+
+    def test_path_does_not_cut_corners(self):
+        """L 形障碍：(4,4) 到源 (5,5) 的对角线被 (5,4) 挡住"""
+        env = EnvironmentModel()
+        layout = make_layout([(5, 2), (5, 3), (5, 4), (6, 4), (7, 4)])
+        env.update_room(make_room_info(), {}, {}, room_layout=layout)
+        game_map = env.game_map
+
+        field = DistanceField.compute(game_map, [(5, 5)])
+        assert field.descend(4, 4) == (4, 5)
+
+        path = field.path_to_source(6, 3)
+        assert path[-1] == (5, 5)
+        for (ax, ay), (bx, by) in zip(path, path[1:]):
+            assert game_map.is_cell_walkable(bx, by)
+            if ax != bx and ay != by:
+                assert game_map.is_cell_walkable(bx, ay)
+                assert game_map.is_cell_walkable(ax, by)
+
+    def test_multi_source(self, wall_room):
+        field = DistanceField.compute(wall_room.game_map, [(2, 2), (12, 2)])
+        assert field.get(2, 2) == 0.0
+        assert field.get(12, 2) == 0.0
+        assert field.get(11, 2) == pytest.approx(40.0)
+
+
+class TestEnvironmentQueries:
+    """EnvironmentModel 基于距离场的查询测试"""
+
+    def test_can_reach_around_wall(self, wall_room):
+        game_map = wall_room.game_map
+        start = game_map.cell_center(3, 3)
+        end = game_map.cell_center(10, 3)
+        assert wall_room.can_reach_position(start, end) is True
+
+    def test_cannot_reach_enclosed_cell(self):
+        env = EnvironmentModel()
+        ring = [(9, 2), (10, 2), (11, 2), (9, 3), (11, 3), (9, 4), (10, 4), (11, 4)]
+        env.update_room(make_room_info(), {}, {}, room_layout=make_layout(ring))
+        start = env.game_map.cell_center(3, 3)
+        end = env.game_map.cell_center(10, 3)
+        assert env.can_reach_position(start, end) is False
+
+    def test_player_field_shared(self, wall_room):
+        pos = wall_room.game_map.cell_center(3, 3)
+        wall_room.set_player_position(pos)
+        field = wall_room.get_player_field()
+        assert field is wall_room.get_player_field()
+
+    def test_threat_field_from_update(self, wall_room):
+        enemy = EnemyData(1, position=wall_room.game_map.cell_center(2, 2))
+        wall_room.update_room(make_room_info(), {1: enemy}, {})
+        field = wall_room.get_threat_field()
+        assert field is not None
+        assert field.get(2, 2) == 0.0
+
+    def test_escape_route_moves_away(self, wall_room):
+        game_map = wall_room.game_map
+        player = game_map.cell_center(3, 3)
+        threat = game_map.cell_center(2, 3)
+        route = wall_room.find_escape_route(player, [threat])
+        assert route
+        threat_field = wall_room.get_threat_field([threat])
+        end_cell = game_map.position_to_cell(route[-1])
+        assert threat_field.get(*end_cell) > threat_field.get(3, 3)
+
+    def test_escape_route_without_threats(self, wall_room):
+        player = wall_room.game_map.cell_center(3, 3)
+        assert wall_room.find_escape_route(player, []) == []
+
+    def test_safe_spot_away_from_threat(self, wall_room):
+        game_map = wall_room.game_map
+        enemy = EnemyData(1, position=game_map.cell_center(2, 3))
+        wall_room.update_room(make_room_info(), {1: enemy}, {})
+        spot = wall_room.get_safe_spot(game_map.cell_center(3, 3))
+        assert spot is not None
+        gx, gy = game_map.position_to_cell(spot)
+        assert game_map.is_cell_walkable(gx, gy)
+        assert wall_room.get_threat_field().get(gx, gy) > 40.0
+
+
+def make_projectile(proj_id: int, pos: Vector2D, vel: Vector2D) -> ProjectileData:
+    proj = ProjectileData(proj_id, position=pos, velocity=vel)
+    proj.is_enemy = True
+    return proj
+
+
+class TestDangerRaster:
+    """DangerRaster 危险栅格测试"""
+
+    def test_empty_room_safe(self, wall_room):
+        game_map = wall_room.game_map
+        assert game_map.get_danger_level(game_map.cell_center(3, 3)) == 0.0
+
+    def test_danger_zone_falloff(self, wall_room):
+        game_map = wall_room.game_map
+        center = game_map.cell_center(4, 4)
+        game_map.add_danger_zone(center, radius=40.0)
+        near = game_map.get_danger_level(center)
+        far = game_map.get_danger_level(Vector2D(center.x + 30, center.y))
+        assert near > 0.8
+        assert 0.0 < far < near
+        assert game_map.get_danger_level(game_map.cell_center(10, 4)) == 0.0
+
+        game_map.clear_danger_zones()
+        assert game_map.get_danger_level(center) == 0.0
+
+    def test_spike_zone_world_coordinates(self):
+        env = EnvironmentModel()
+        layout = make_layout([(5, 5)], tile_type=8)
+        env.update_room(make_room_info(), {}, {}, room_layout=layout)
+        spike = env.game_map.cell_center(5, 5)
+        assert env.game_map.get_danger_level(spike) > 0.5
+
+    def test_cleared_fires_stop_stamping(self, wall_room):
+        fire_pos = wall_room.game_map.cell_center(4, 4)
+        fires = [{"id": 1, "pos": {"x": fire_pos.x, "y": fire_pos.y}}]
+        wall_room.update_room(
+            make_room_info(), {}, {}, entity_data={"FIRE_HAZARDS": fires}
+        )
+        assert wall_room.game_map.get_danger_level(fire_pos) > 0.5
+
+        # 本帧没有 FIRE_HAZARDS 键：实体被清空，火堆不应继续产生危险
+        wall_room.update_room(make_room_info(), {}, {}, entity_data={"BUTTONS": {}})
+        assert wall_room.game_map.get_danger_level(fire_pos) == 0.0
+
+    def test_projectile_sweep_incremental(self, wall_room):
+        game_map = wall_room.game_map
+        start = game_map.cell_center(2, 4)
+        proj = make_projectile(7, start, Vector2D(5, 0))
+        game_map.update({}, {7: proj})
+
+        ahead = Vector2D(start.x + 60, start.y)
+        behind = Vector2D(start.x - 60, start.y)
+        assert game_map.get_danger_level(ahead) > 0.0
+        assert game_map.get_danger_level(behind) == 0.0
+
+        # 投射物移动后旧的贡献被撤销
+        proj.position = game_map.cell_center(10, 2)
+        game_map.update({}, {7: proj})
+        assert game_map.get_danger_level(ahead) == 0.0
+        assert game_map.get_danger_level(game_map.cell_center(10, 2)) > 0.0
+
+        game_map.update({}, {})
+        assert game_map.danger_raster.dynamic == [0.0] * len(
+            game_map.danger_raster.dynamic
+        )
+
+    def test_get_many_matches_get(self, wall_room):
+        game_map = wall_room.game_map
+        game_map.add_danger_zone(game_map.cell_center(4, 4), radius=60.0)
+        positions = [game_map.cell_center(gx, 4) for gx in range(1, 8)]
+        assert game_map.get_danger_levels(positions) == [
+            game_map.get_danger_level(p) for p in positions
+        ]
+
+
+class TestRoomGeometryCache:
+    """RoomGeometryCache 房间几何缓存测试"""
+
+    def test_reenter_room_uses_cache(self, monkeypatch):
+        env = EnvironmentModel()
+        layout_a = make_layout([(7, y) for y in range(1, 7)])
+        layout_b = make_layout([(3, 3)])
+        env.update_room(make_room_info(1), {}, {}, room_layout=layout_a)
+        env.update_room(make_room_info(2), {}, {}, room_layout=layout_b)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("layout should not be re-parsed")
+
+        monkeypatch.setattr(env.game_map, "update_from_room_layout", fail)
+        env.update_room(make_room_info(1), {}, {}, room_layout=layout_a)
+
+        assert env.game_map.is_cell_walkable(7, 3) is False
+        assert env.game_map.is_cell_walkable(3, 3) is True
+        assert env.geometry_cache.hits == 1
+
+    def test_layout_change_misses(self):
+        env = EnvironmentModel()
+        env.update_room(make_room_info(1), {}, {}, room_layout=make_layout([(3, 3)]))
+        env.update_room(make_room_info(2), {}, {}, room_layout=make_layout([]))
+        env.update_room(make_room_info(1), {}, {}, room_layout=make_layout([(4, 4)]))
+        assert env.geometry_cache.hits == 0
+        assert env.game_map.is_cell_walkable(3, 3) is True
+        assert env.game_map.is_cell_walkable(4, 4) is False
+
+    def test_derived_data_reused(self, wall_room):
+        table = wall_room.game_map.get_neighbor_table()
+        clearance = wall_room.game_map.get_clearance_field()
+        layout = make_layout([(7, y) for y in range(1, 7)])
+        wall_room.update_room(make_room_info(2), {}, {}, room_layout=make_layout([]))
+        wall_room.update_room(make_room_info(1), {}, {}, room_layout=layout)
+        assert wall_room.game_map.get_neighbor_table() is table
+        assert wall_room.game_map.get_clearance_field() is clearance
+
+    def test_runtime_zones_do_not_leak_into_cache(self, wall_room):
+        game_map = wall_room.game_map
+        game_map.add_danger_zone(game_map.cell_center(3, 3), radius=40.0)
+        layout = make_layout([(7, y) for y in range(1, 7)])
+        wall_room.update_room(make_room_info(2), {}, {}, room_layout=make_layout([]))
+        wall_room.update_room(make_room_info(1), {}, {}, room_layout=layout)
+        assert game_map.danger_zones == []
+
+    def test_lru_eviction(self):
+        cache = RoomGeometryCache(capacity=2)
+        env = EnvironmentModel()
+        env.geometry_cache = cache
+        for index in (1, 2, 3):
+            env.update_room(make_room_info(index), {}, {}, room_layout=make_layout([]))
+        assert len(cache) == 2
+        assert cache.make_key(make_room_info(1), make_layout([])) not in cache
+
+    def test_clearance_and_visibility(self, wall_room):
+        game_map = wall_room.game_map
+        clearance = game_map.get_clearance_field()
+        assert clearance.get(1, 1) == pytest.approx(40.0)
+        assert clearance.get(4, 4) > clearance.get(1, 1)
+
+        visibility = game_map.get_visibility()
+        width = game_map.width
+        assert visibility[0] == 0.0
+        assert 0.0 < visibility[1 * width + 1] < visibility[4 * width + 3]
+
+
+class TestAsyncRoomCompile:
+    """后台房间编译测试"""
+
+    def test_fallback_then_swap(self, monkeypatch):
+        env = EnvironmentModel(async_compile=True)
+        layout = make_layout([(7, y) for y in range(1, 7)])
+
+        # 接收线程上不计算布局指纹
+        def fail(*args, **kwargs):
+            raise AssertionError("fingerprint computed on the receive thread")
+
+        try:
+            env.update_room(make_room_info(2), {}, {}, room_layout=make_layout([]))
+            assert env.wait_for_room_compile(timeout=5.0) is True
+
+            monkeypatch.setattr(env.geometry_cache, "make_key", fail)
+            env.update_room(make_room_info(1), {}, {}, room_layout=layout)
+            monkeypatch.undo()
+
+            # 编译完成前：粗略地图，只有边界墙
+            assert env.is_compiling is True
+            assert env.game_map.is_cell_walkable(7, 3) is True
+            assert env.game_map.is_cell_walkable(0, 0) is False
+
+            assert env.wait_for_room_compile(timeout=5.0) is True
+            assert env.is_compiling is False
+            assert env.game_map.is_cell_walkable(7, 3) is False
+            # 派生数据已在后台预先计算
+            assert "visibility" in env.game_map._geometry.derived
+        finally:
+            env.shutdown()
+
+    def test_stale_compile_only_cached(self):
+        env = EnvironmentModel(async_compile=True)
+        layout_a = make_layout([(7, y) for y in range(1, 7)])
+        try:
+            env.update_room(make_room_info(1), {}, {}, room_layout=layout_a)
+
+            # 编译结果换入前已进入另一个没有布局的房间
+            env.update_room(make_room_info(2), {}, {})
+            assert env.wait_for_room_compile(timeout=5.0) is False
+            assert env.game_map.is_cell_walkable(7, 3) is True
+            assert env.geometry_cache.make_key(make_room_info(1), layout_a) in (
+                env.geometry_cache
+            )
+
+            # 回到房间 1 时立即套用缓存几何，后台确认布局未变后不再替换
+            env.update_room(make_room_info(1), {}, {}, room_layout=layout_a)
+            assert env.game_map.is_cell_walkable(7, 3) is False
+            assert env.wait_for_room_compile(timeout=5.0) is False
+            assert env.is_compiling is False
+            assert env.game_map.is_cell_walkable(7, 3) is False
+        finally:
+            env.shutdown()
+
+    def test_changed_layout_replaces_provisional(self):
+        env = EnvironmentModel(async_compile=True)
+        try:
+            env.update_room(make_room_info(1), {}, {}, room_layout=make_layout([(3, 3)]))
+            env.wait_for_room_compile(timeout=5.0)
+            env.update_room(make_room_info(2), {}, {})
+
+            env.update_room(make_room_info(1), {}, {}, room_layout=make_layout([(4, 4)]))
+            assert env.game_map.is_cell_walkable(3, 3) is False
+            assert env.wait_for_room_compile(timeout=5.0) is True
+            assert env.game_map.is_cell_walkable(3, 3) is True
+            assert env.game_map.is_cell_walkable(4, 4) is False
+        finally:
+            env.shutdown()
+
+
+class TestPositionScorer:
+    """PositionScorer 战略位置评分测试"""
+
+    def test_lattice_covers_walkable_cells(self, wall_room):
+        positions, cells = wall_room.position_scorer.get_candidates()
+        game_map = wall_room.game_map
+        assert len(positions) == len(cells)
+        assert all(
+            game_map.is_cell_walkable(idx % game_map.width, idx // game_map.width)
+            for idx in cells
+        )
+        # 13x7 内部区域减去 6 格岩石，每格 2x2 个候选点
+        assert len(positions) == (13 * 7 - 6) * 4
+        assert wall_room.position_scorer.get_candidates()[0] is positions
+
+    def test_strategic_positions_respect_enemy_band(self, wall_room):
+        game_map = wall_room.game_map
+        player = game_map.cell_center(3, 4)
+        enemy = EnemyData(1, position=game_map.cell_center(2, 4))
+        result = wall_room.get_strategic_positions(player, {1: enemy}, top_k=3)
+        assert len(result) == 3
+        for pos in result:
+            assert pos.distance_to(enemy.position) > 80.0
+
+    def test_strategic_positions_reuse_threat_field(self, wall_room, monkeypatch):
+        game_map = wall_room.game_map
+        player = game_map.cell_center(3, 4)
+        enemy = EnemyData(1, position=game_map.cell_center(10, 4))
+        wall_room.update_room(make_room_info(), {1: enemy}, {}, player_pos=player)
+        wall_room.get_player_field()
+        threat_field = wall_room.get_threat_field()
+
+        def fail(*args, **kwargs):
+            raise AssertionError("enemy field should come from the threat cache")
+
+        monkeypatch.setattr(DistanceField, "compute", fail)
+        wall_room.get_strategic_positions(player, {1: enemy}, top_k=3)
+        assert wall_room.get_threat_field() is threat_field
+
+    def test_danger_penalised(self, wall_room):
+        game_map = wall_room.game_map
+        scorer = wall_room.position_scorer
+        scorer.weights = ScoringWeights(
+            player_distance=0.0, enemy_distance=0.0, visibility=0.0, danger=1.0
+        )
+        game_map.add_danger_zone(game_map.cell_center(4, 4), radius=60.0)
+        positions, scores = scorer.score()
+        worst = min(range(len(scores)), key=scores.__getitem__)
+        assert game_map.position_to_cell(positions[worst]) == (4, 4)
+
+    def test_custom_term(self, wall_room):
+        game_map = wall_room.game_map
+        scorer = wall_room.position_scorer
+        target = game_map.cell_center(12, 1)
+        scorer.add_term(
+            "corner",
+            10.0,
+            lambda ctx: [-p.distance_to(target) / 100.0 for p in ctx.positions],
+        )
+        (best, _), = scorer.top_k(1)
+        assert game_map.position_to_cell(best) == (12, 1)
@@ -3,8 +3,13 @@ Tests for core.replay module - 录制回放模块测试
 """
 
 import pytest
+import gzip
 import json
+import shutil
+import socket
+import sqlite3
 import tempfile
+import threading
 import time
 from pathlib import Path
 from typing import Dict, Any
@@ -17,9 +22,34 @@ from core.replay.message import (
     MessageType,
     CollectInterval,
 )
-from core.replay.recorder import DataRecorder, RecorderConfig, RecordingSession
-from core.replay.replayer import DataReplayer, ReplayerConfig, ReplayState
+from core.replay.recorder import (
+    AsyncBatchWriter,
+    DataRecorder,
+    RecorderConfig,
+    RecordingSession,
+)
+from core.replay.replayer import DataReplayer, LuaSimulator, ReplayerConfig, ReplayState
 from core.replay.session import SessionManager, SessionInfo
+from core.replay.stream import find_message_files, merge_chunks
+from core.replay.index import SessionIndex, build_index
+from core.replay.keyframes import KeyframeStore
+from core.replay.codec import codec_for_path, create_codec, train_dictionary
+from core.replay.columnar import ARROW_AVAILABLE, ColumnarSession, export_columnar
+from core.replay.batch import (
+    BatchEngine,
+    ChannelStatsReducer,
+    FrameReducer,
+    SessionReducer,
+)
+from core.replay.catalog import SessionCatalog
+from core.replay.query import (
+    QueryError,
+    build_query_index,
+    compile_filter,
+    load_or_build_query_index,
+)
+from core.replay.harness import FastForwardHarness, run_facade
+from core.replay.loadgen import LoadProfile, SyntheticSession, run_bridge_load, scale_message
 
 
 class TestRawMessage:
@@ -235,3 +265,1090 @@ class TestEnums:
         assert CollectInterval.HIGH.value == "HIGH"
         assert CollectInterval.LOW.value == "LOW"
         assert CollectInterval.ON_CHANGE.value == "ON_CHANGE"
+
+
+FIXTURE_DIR = Path(__file__).parent / "fixtures"
+FIXTURE_SESSION = "session_20260202_234038"
+
+
+def write_chunk(path: Path, frames, gz: bool = False):
+    """写入一个消息块（received_at 与帧号对应）"""
+    lines = [
+        RawMessage(msg_type="DATA", frame=f, room_index=1, received_at=float(f)).to_json_line()
+        for f in frames
+    ]
+    data = "".join(lines)
+    if gz:
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(data)
+    else:
+        path.write_text(data, encoding="utf-8")
+
+
+class TestStreamingReplay:
+    """流式回放测试"""
+
+    def test_message_files_deduplicated(self):
+        """测试重叠的匹配模式不会重复收录文件"""
+        files = find_message_files(FIXTURE_DIR / FIXTURE_SESSION)
+        assert len(files) == 12
+        assert len(set(files)) == 12
+
+    def test_eager_load_no_duplicates(self):
+        """测试全量加载不再重复加载消息"""
+        replayer = DataReplayer(ReplayerConfig(recordings_dir=str(FIXTURE_DIR)))
+        session = replayer.load_session(FIXTURE_SESSION)
+        assert session.total_messages == 4989
+
+    def test_streaming_matches_eager(self):
+        """测试流式模式与全量模式输出顺序一致"""
+        eager = DataReplayer(ReplayerConfig(recordings_dir=str(FIXTURE_DIR)))
+        eager.load_session(FIXTURE_SESSION)
+        streaming = DataReplayer(
+            ReplayerConfig(recordings_dir=str(FIXTURE_DIR), streaming=True)
+        )
+        session = streaming.load_session(FIXTURE_SESSION)
+        assert session.messages == []
+
+        eager_frames = [m.frame for m in eager.iter_messages(speed=-1)]
+        stream_frames = [m.frame for m in streaming.iter_messages(speed=-1)]
+        assert stream_frames == eager_frames
+
+    def test_merge_out_of_order_chunks(self, tmp_path):
+        """测试块内乱序与块间交错时的归并顺序"""
+        write_chunk(tmp_path / "messages_1.jsonl", [3, 1, 2, 5])
+        write_chunk(tmp_path / "messages_2.jsonl.gz", [5, 7, 6], gz=True)
+        write_chunk(tmp_path / "messages_3.jsonl", [])
+        write_chunk(tmp_path / "messages_4.jsonl", [8, 9])
+
+        frames = [m.frame for m in merge_chunks(find_message_files(tmp_path))]
+        assert frames == [1, 2, 3, 5, 5, 6, 7, 8, 9]
+
+        frames = [m.frame for m in merge_chunks(find_message_files(tmp_path), min_frame=6)]
+        assert frames == [6, 7, 8, 9]
+
+    def test_merge_backwards_chunk_opens_rest(self, tmp_path, caplog):
+        """测试块的最小帧小于已输出帧时，其余块全部激活，之后的输出保持有序"""
+        for i, frames in enumerate([[10, 11, 12], [20, 21], [11, 30], [40], [25]], 1):
+            write_chunk(tmp_path / f"messages_{i}.jsonl", frames)
+
+        with caplog.at_level("WARNING", logger="core.replay.stream"):
+            frames = [m.frame for m in merge_chunks(find_message_files(tmp_path))]
+        # 已输出的 10-12 不会重排；第 3 块之后全部数据源一起归并
+        assert frames == [10, 11, 12, 11, 20, 21, 25, 30, 40]
+        assert "小于已输出的帧" in caplog.text
+
+    def test_streaming_frames_and_seek(self):
+        """测试流式模式下的按帧迭代与跳转"""
+        replayer = DataReplayer(
+            ReplayerConfig(recordings_dir=str(FIXTURE_DIR), streaming=True)
+        )
+        replayer.load_session(FIXTURE_SESSION)
+        assert replayer.seek_to_frame(5000) is True
+
+        frames = [fd.frame for fd in replayer.iter_frames(speed=-1)]
+        assert frames[0] == 5000
+        assert frames == sorted(frames)
+
+        frame = replayer.get_frame(1184)
+        assert frame is not None and frame.frame == 1184
+
+
+def record_frames(tmpdir: str, frames, rooms=None, **config_kwargs) -> Path:
+    """录制一个会话，每帧一条消息，返回会话目录"""
+    config = RecorderConfig(
+        output_dir=tmpdir, auto_save_interval=1000, **config_kwargs
+    )
+    recorder = DataRecorder(config)
+    recorder.start_session("indexed")
+    for i, frame in enumerate(frames):
+        room = rooms[i] if rooms else 1
+        recorder.record_message(
+            RawMessage(
+                msg_type="DATA",
+                frame=frame,
+                room_index=room,
+                received_at=float(frame),
+                payload={"PLAYER_POSITION": {"frame": frame}},
+            )
+        )
+    recorder.stop_session()
+    return Path(tmpdir) / "indexed"
+
+
+class TestSessionIndex:
+    """帧偏移索引测试"""
+
+    def test_recorder_writes_index(self, tmp_path):
+        """测试录制时写入索引，gzip 块可独立解压"""
+        frames = list(range(1, 301))
+        rooms = [1] * 100 + [2] * 100 + [1] * 100
+        session_dir = record_frames(
+            str(tmp_path), frames, rooms, buffer_size=120, index_block_size=32
+        )
+
+        index = SessionIndex.load(session_dir)
+        assert index is not None
+        assert index.total_messages == 300
+        assert len(index.blocks) > 3
+        assert [(r.frame, r.room_index) for r in index.rooms] == [
+            (1, 1),
+            (101, 2),
+            (201, 1),
+        ]
+        assert index.find_room_frame(1, occurrence=1) == 201
+
+        # 拼接的 gzip member 仍然可以整体读取
+        files = find_message_files(session_dir)
+        total = sum(len(gzip.open(f, "rt").read().splitlines()) for f in files)
+        assert total == 300
+
+    def test_seek_reads_only_needed_blocks(self, tmp_path, monkeypatch):
+        """测试 seek 只读取目标帧所在及之后的块"""
+        session_dir = record_frames(
+            str(tmp_path), list(range(1, 501)), buffer_size=250, index_block_size=50
+        )
+        replayer = DataReplayer(
+            ReplayerConfig(recordings_dir=str(tmp_path), streaming=True)
+        )
+        session = replayer.load_session("indexed")
+        assert session.index is not None
+
+        reads = []
+        original = SessionIndex.read_block
+        monkeypatch.setattr(
+            SessionIndex,
+            "read_block",
+            lambda self, block: reads.append(block.first_frame) or original(self, block),
+        )
+
+        replayer.seek_to_frame(420)
+        first = next(replayer.iter_messages(speed=-1))
+        assert first.frame == 420
+        assert min(reads) == 401
+
+        frame = replayer.get_frame(77)
+        assert frame is not None and frame.messages[0].payload["PLAYER_POSITION"]["frame"] == 77
+
+    def test_seek_to_room(self, tmp_path):
+        """测试按房间跳转"""
+        rooms = [3] * 50 + [4] * 50
+        record_frames(str(tmp_path), list(range(1, 101)), rooms, buffer_size=30)
+        replayer = DataReplayer(
+            ReplayerConfig(recordings_dir=str(tmp_path), streaming=True)
+        )
+        replayer.load_session("indexed")
+        assert replayer.seek_to_room(4) is True
+        assert next(replayer.iter_messages(speed=-1)).room_index == 4
+        assert replayer.seek_to_room(9) is False
+
+    def test_build_index_for_legacy_session(self, tmp_path):
+        """测试为旧会话构建索引（每个块文件一个块）"""
+        session_dir = tmp_path / FIXTURE_SESSION
+        shutil.copytree(FIXTURE_DIR / FIXTURE_SESSION, session_dir)
+
+        index = build_index(session_dir)
+        assert len(index.blocks) == 12
+        assert index.total_messages == 4989
+        assert (session_dir / "index.bin").exists()
+
+        loaded = SessionIndex.load(session_dir)
+        assert [b.first_frame for b in loaded.blocks] == [
+            b.first_frame for b in index.blocks
+        ]
+        frames = [m.frame for m in loaded.iter_messages(5000)]
+        assert frames[0] == 5000
+        assert len(frames) == 5672 - 5000 + 1
+
+
+class TestKeyframes:
+    """累积状态关键帧测试"""
+
+    @staticmethod
+    def fold_state(messages, frame):
+        state = {}
+        for msg in sorted(messages, key=lambda m: (m.frame, m.received_at)):
+            if msg.frame > frame:
+                break
+            if msg.payload:
+                state.update(msg.payload)
+        return state
+
+    def test_state_matches_full_fold(self, tmp_path):
+        """测试关键帧 + 增量与从头累积结果一致"""
+        session_dir = tmp_path / FIXTURE_SESSION
+        shutil.copytree(FIXTURE_DIR / FIXTURE_SESSION, session_dir)
+        replayer = DataReplayer(
+            ReplayerConfig(recordings_dir=str(tmp_path), keyframe_interval=200)
+        )
+        session = replayer.load_session(FIXTURE_SESSION)
+
+        for frame in (0, 684, 1000, 2500, 5672, 9999):
+            assert replayer.get_state_at_frame(frame) == self.fold_state(
+                session.messages, frame
+            )
+        assert (session_dir / "keyframes.jsonl.gz").exists()
+        assert session.keyframes.count > 20
+
+    def test_cache_reused_and_streaming(self, tmp_path, monkeypatch):
+        """测试磁盘缓存复用，流式模式结果一致"""
+        session_dir = record_frames(
+            str(tmp_path), list(range(1, 401)), buffer_size=100
+        )
+        eager = DataReplayer(
+            ReplayerConfig(recordings_dir=str(tmp_path), keyframe_interval=50)
+        )
+        eager.load_session("indexed")
+        expected = eager.get_state_at_frame(333)
+        assert expected == {"PLAYER_POSITION": {"frame": 333}}
+
+        def fail(*args, **kwargs):
+            raise AssertionError("keyframes should be loaded from cache")
+
+        monkeypatch.setattr(KeyframeStore, "build", fail)
+        streaming = DataReplayer(
+            ReplayerConfig(
+                recordings_dir=str(tmp_path), streaming=True, keyframe_interval=50
+            )
+        )
+        streaming.load_session("indexed")
+        assert streaming.get_state_at_frame(333) == expected
+
+    def test_at_most_interval_deltas(self):
+        """测试增量不超过一个关键帧间隔"""
+        messages = [
+            RawMessage(msg_type="DATA", frame=f, room_index=1, payload={"A": f})
+            for f in range(1, 1001)
+        ]
+        store = KeyframeStore.build(messages, interval=100)
+        gaps = [b - a for a, b in zip(store.frames, store.frames[1:])]
+        assert max(gaps) <= 100
+        pos = store.find(555)
+        assert store.states[pos] == {"A": store.frames[pos]}
+        assert 555 - store.frames[pos] < 100
+
+
+class TestAsyncWriter:
+    """后台写入线程测试"""
+
+    def test_record_does_not_write_on_caller_thread(self, tmp_path, monkeypatch):
+        """测试缓冲区满时录制线程只交换缓冲区"""
+        recorder = DataRecorder(
+            RecorderConfig(output_dir=str(tmp_path), buffer_size=10, auto_save_interval=1000)
+        )
+        writer_threads = []
+        original = recorder._write_batch
+
+        def tracking_write(session, prefix, messages):
+            writer_threads.append(threading.current_thread().name)
+            original(session, prefix, messages)
+
+        recorder._writer._write_fn = tracking_write
+        recorder.start_session("async")
+        for frame in range(1, 101):
+            recorder.record_message(
+                RawMessage(msg_type="DATA", frame=frame, room_index=1)
+            )
+        recorder.stop_session()
+
+        assert writer_threads
+        assert all(name == "RecorderWriter" for name in writer_threads)
+        replayer = DataReplayer(ReplayerConfig(recordings_dir=str(tmp_path)))
+        assert replayer.load_session("async").total_messages == 100
+
+    def test_full_queue_drops_instead_of_blocking(self, tmp_path):
+        """测试写入队列满时丢弃批次并计数"""
+        release = threading.Event()
+        recorder = DataRecorder(
+            RecorderConfig(
+                output_dir=str(tmp_path),
+                buffer_size=5,
+                auto_save_interval=1000,
+                max_pending_batches=2,
+            )
+        )
+        original = recorder._write_batch
+
+        def slow_write(session, prefix, messages):
+            release.wait(5.0)
+            original(session, prefix, messages)
+
+        recorder._writer._write_fn = slow_write
+        recorder.start_session("dropping")
+
+        start = time.perf_counter()
+        for frame in range(1, 51):
+            recorder.record_message(
+                RawMessage(msg_type="DATA", frame=frame, room_index=1)
+            )
+        assert time.perf_counter() - start < 1.0
+
+        stats = recorder.get_stats()["writer"]
+        assert stats["batches_dropped"] > 0
+        assert stats["queue_depth"] <= 2
+
+        release.set()
+        recorder.stop_session()
+        stats = recorder._writer.get_stats()
+        assert stats["messages_written"] + stats["messages_dropped"] == 50
+        assert stats["max_write_ms"] > 0
+
+    def test_stop_timeout_keeps_thread(self):
+        """测试停止超时时保留写入线程句柄"""
+        release = threading.Event()
+        written = []
+
+        def slow_write(session, prefix, messages):
+            release.wait(5.0)
+            written.append(len(messages))
+
+        writer = AsyncBatchWriter(slow_write)
+        writer.start()
+        writer.submit((None, "messages", [RawMessage(msg_type="DATA", frame=1)]))
+
+        assert writer.stop(timeout=0.05) is False
+        assert writer._thread is not None and writer._thread.is_alive()
+
+        release.set()
+        assert writer.stop(timeout=5.0) is True
+        assert writer._thread is None
+        assert written == [1]
+
+    def test_stop_timeout_finalizes_after_last_batch(self, tmp_path):
+        """测试停止超时后遗留批次仍写入本会话索引，收尾在最后一个批次之后执行"""
+        release = threading.Event()
+        recorder = DataRecorder(
+            RecorderConfig(
+                output_dir=str(tmp_path),
+                buffer_size=10,
+                auto_save_interval=1000,
+                index_block_size=4,
+            )
+        )
+        original = recorder._write_batch
+
+        def slow_write(session, prefix, messages):
+            if session.session_id == "slow" and prefix == "messages":
+                release.wait(5.0)
+            original(session, prefix, messages)
+
+        writer = recorder._writer
+        writer._write_fn = slow_write
+        stop = writer.stop
+        writer.stop = lambda timeout=10.0: stop(0.05)
+
+        def record(first, last):
+            for frame in range(first, last + 1):
+                recorder.record_message(RawMessage(
+                    msg_type="DATA", frame=frame, room_index=1,
+                    payload={"PLAYER_POSITION": {}},
+                ))
+
+        recorder.start_session("slow")
+        record(1, 30)
+        recorder.stop_session()
+        slow_dir = tmp_path / "slow"
+        assert not (slow_dir / "metadata.json").exists()
+
+        # 新会话在锁外等待遗留线程，期间录制线程不被阻塞
+        starter = threading.Thread(target=recorder.start_session, args=("next",))
+        starter.start()
+        time.sleep(0.05)
+        assert recorder.record_message(RawMessage(msg_type="DATA", frame=1)) is False
+        release.set()
+        starter.join(5.0)
+        record(100, 105)
+        writer.stop = stop
+        recorder.stop_session()
+
+        index = SessionIndex.load(slow_dir)
+        assert [m.frame for m in index.iter_messages(1)] == list(range(1, 31))
+        next_index = SessionIndex.load(tmp_path / "next")
+        assert [m.frame for m in next_index.iter_messages(0)] == list(range(100, 106))
+
+        query_index = load_or_build_query_index(slow_dir)
+        assert query_index.is_complete()
+        assert query_index.count("frame > 0") == 30
+
+        metadata = json.loads((slow_dir / "metadata.json").read_text("utf-8"))
+        assert metadata["total_messages"] == 30
+        summary = json.loads((slow_dir / "summary.json").read_text("utf-8"))
+        assert summary["bytes"] > 0
+        row = SessionCatalog.for_directory(tmp_path).get("slow")
+        assert row["status"] == "complete" and row["size_bytes"] > 0
+
+    def test_sync_mode(self, tmp_path):
+        """测试关闭异步写入时直接写盘"""
+        recorder = DataRecorder(
+            RecorderConfig(
+                output_dir=str(tmp_path),
+                buffer_size=10,
+                auto_save_interval=1000,
+                async_write=False,
+            )
+        )
+        recorder.start_session("sync")
+        for frame in range(1, 11):
+            recorder.record_message(
+                RawMessage(msg_type="DATA", frame=frame, room_index=1)
+            )
+        assert len(find_message_files(tmp_path / "sync")) == 1
+        recorder.stop_session()
+
+
+class TestRawRecording:
+    """原始透传录制测试"""
+
+    @staticmethod
+    def wire_line(frame: int, room: int = 1, **extra) -> bytes:
+        data = {
+            "version": "2.1",
+            "type": "DATA",
+            "frame": frame,
+            "room_index": room,
+            "payload": {"PLAYER_POSITION": {"frame": frame}},
+        }
+        data.update(extra)
+        return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+    def record_raw(self, tmpdir, lines, **config_kwargs) -> Path:
+        recorder = DataRecorder(
+            RecorderConfig(output_dir=tmpdir, auto_save_interval=1000, **config_kwargs)
+        )
+        recorder.start_session("raw")
+        for i, line in enumerate(lines):
+            assert recorder.record_raw_line(line, received_at=1000.0 + i)
+        recorder.stop_session()
+        return Path(tmpdir) / "raw"
+
+    def test_bytes_stored_verbatim(self, tmp_path):
+        """测试原始字节原样写入，附带接收时间"""
+        lines = [self.wire_line(f) for f in range(1, 21)]
+        session_dir = self.record_raw(str(tmp_path), lines, buffer_size=8)
+
+        files = find_message_files(session_dir)
+        assert files and all(p.name.startswith("raw_") for p in files)
+        stored = b"".join(gzip.decompress(p.read_bytes()) for p in files)
+        assert stored.splitlines() == [
+            b"%.6f\t%s" % (1000.0 + i, line) for i, line in enumerate(lines)
+        ]
+
+        metadata = json.loads((session_dir / "metadata.json").read_text("utf-8"))
+        assert metadata["total_messages"] == 20
+
+    def test_replay_validates_and_skips_bad_lines(self, tmp_path):
+        """测试回放时才校验，损坏或无效的行被跳过"""
+        lines = [self.wire_line(f, room=1 if f <= 30 else 2) for f in range(1, 61)]
+        lines.insert(10, b'{"frame": 11, "type": "DATA"')  # 截断的 JSON
+        lines.insert(20, b"[1, 2, 3]")  # 不是对象
+        lines.insert(30, self.wire_line(31, seq=-1))  # 校验失败
+        session_dir = self.record_raw(
+            str(tmp_path), lines, buffer_size=16, index_block_size=8
+        )
+
+        eager = DataReplayer(ReplayerConfig(recordings_dir=str(tmp_path)))
+        session = eager.load_session("raw")
+        assert [m.frame for m in session.messages] == list(range(1, 61))
+        assert session.messages[0].received_at == 1000.0
+
+        streaming = DataReplayer(
+            ReplayerConfig(recordings_dir=str(tmp_path), streaming=True)
+        )
+        streaming.load_session("raw")
+        frames = [m.frame for m in streaming.iter_messages(speed=-1)]
+        assert frames == list(range(1, 61))
+
+        index = SessionIndex.load(session_dir)
+        assert index.find_room_frame(2) == 31
+        assert [m.frame for m in index.iter_messages(50)] == list(range(50, 61))
+
+
+class TestChunkCodec:
+    """块压缩后端测试"""
+
+    def test_gzip_frames_and_metadata(self, tmp_path):
+        """测试分帧 gzip 与 metadata.json 中的格式描述"""
+        codec = create_codec("gzip")
+        data = codec.compress(b"a\n") + codec.compress(b"b\n")
+        assert codec.decompress(data) == b"a\nb\n"
+
+        session_dir = record_frames(
+            str(tmp_path), list(range(1, 101)), buffer_size=50, index_block_size=16
+        )
+        metadata = json.loads((session_dir / "metadata.json").read_text("utf-8"))
+        assert metadata["compression"] == {"codec": "gzip", "level": 6, "block_size": 16}
+
+    def test_unknown_codec(self):
+        """测试未知后端名称"""
+        with pytest.raises(ValueError):
+            create_codec("lz4")
+
+    def test_zstd_dictionary_roundtrip(self, tmp_path):
+        """测试训练字典后用 zstd 录制并回放"""
+        pytest.importorskip("zstandard")
+        dictionary = train_dictionary([FIXTURE_DIR / FIXTURE_SESSION], dict_size=16384)
+        dict_path = tmp_path / "test.zdict"
+        dict_path.write_bytes(dictionary)
+
+        frames = list(range(1, 301))
+        rooms = [1] * 150 + [2] * 150
+        session_dir = record_frames(
+            str(tmp_path),
+            frames,
+            rooms,
+            buffer_size=100,
+            compression="zstd",
+            dictionary_path=str(dict_path),
+        )
+
+        files = find_message_files(session_dir)
+        assert files and all(p.name.endswith(".jsonl.zst") for p in files)
+        assert (session_dir / "dictionary.zdict").read_bytes() == dictionary
+        metadata = json.loads((session_dir / "metadata.json").read_text("utf-8"))
+        assert metadata["compression"]["codec"] == "zstd"
+        assert metadata["compression"]["dict_id"] > 0
+
+        replayer = DataReplayer(ReplayerConfig(recordings_dir=str(tmp_path)))
+        session = replayer.load_session("indexed")
+        assert [m.frame for m in session.messages] == frames
+
+        index = SessionIndex.load(session_dir)
+        assert index.find_room_frame(2) == 151
+        assert [m.frame for m in index.iter_messages(290)] == list(range(290, 301))
+
+    def test_decoder_cache_bounded(self, tmp_path, monkeypatch):
+        """测试 zstd 解码器缓存按 LRU 淘汰"""
+        pytest.importorskip("zstandard")
+        from core.replay import codec as codec_module
+
+        monkeypatch.setattr(codec_module, "DECODER_CACHE_SIZE", 2)
+        monkeypatch.setattr(codec_module, "_decoder_cache", codec_module.OrderedDict())
+        for i in range(4):
+            session_dir = tmp_path / f"s{i}"
+            session_dir.mkdir()
+            (session_dir / "dictionary.zdict").write_bytes(b"")
+            codec_for_path(session_dir / "messages_0001.jsonl.zst")
+        cached = [Path(path).parent.name for path, _ in codec_module._decoder_cache]
+        assert cached == ["s2", "s3"]
+
+    def test_dictionary_beats_gzip_on_small_frames(self):
+        """测试字典压缩小帧时比 gzip 更小"""
+        pytest.importorskip("zstandard")
+        files = find_message_files(FIXTURE_DIR / FIXTURE_SESSION)
+        lines = codec_for_path(files[0]).decompress(files[0].read_bytes()).splitlines(
+            keepends=True
+        )
+        dictionary = train_dictionary([FIXTURE_DIR / FIXTURE_SESSION], dict_size=16384)
+
+        zstd_codec = create_codec("zstd", dictionary=dictionary)
+        gzip_codec = create_codec("gzip")
+        blocks = [b"".join(lines[i : i + 8]) for i in range(0, len(lines), 8)]
+        zstd_size = sum(len(zstd_codec.compress(b)) for b in blocks)
+        gzip_size = sum(len(gzip_codec.compress(b)) for b in blocks)
+        assert zstd_size < gzip_size
+        assert zstd_codec.decompress(zstd_codec.compress(blocks[0])) == blocks[0]
+
+
+class TestColumnarExport:
+    """列式导出测试"""
+
+    def test_npz_export_matches_messages(self, tmp_path):
+        """测试 npz 导出的行数与逐条解析结果一致"""
+        pytest.importorskip("numpy")
+        session_dir = FIXTURE_DIR / FIXTURE_SESSION
+        manifest = export_columnar(
+            session_dir, tmp_path / "columnar", fmt="npz", part_rows=1000
+        )
+        assert manifest["last_frame"] == 5672
+        assert len(manifest["tables"]["player"]["parts"]) > 1
+
+        enemies = {}
+        players = 0
+        for msg in merge_chunks(find_message_files(session_dir)):
+            payload = msg.payload or {}
+            if payload.get("ENEMIES"):
+                enemies[msg.frame] = enemies.get(msg.frame, 0) + len(payload["ENEMIES"])
+            players += len(payload.get("PLAYER_POSITION") or [])
+
+        cs = ColumnarSession(tmp_path / "columnar")
+        assert cs.num_rows("player") == players
+        frames, counts = cs.enemy_counts()
+        assert dict(zip(frames.tolist(), counts.tolist())) == enemies
+
+        frame, x, y = cs.player_trajectory()
+        assert len(frame) == players
+        assert (frame[1:] >= frame[:-1]).all()
+        assert cs.table("rooms", ["room_idx"])["room_idx"][0] == 84
+
+    def test_incremental_append(self, tmp_path):
+        """测试再次导出只追加新帧"""
+        pytest.importorskip("numpy")
+        session_dir = record_frames(str(tmp_path), list(range(1, 101)))
+        first = export_columnar(session_dir, fmt="npz")
+        assert first["tables"]["player"]["rows"] == 0  # 测试负载不是玩家列表
+        assert first["last_frame"] == 100
+
+        recorder = DataRecorder(
+            RecorderConfig(output_dir=str(tmp_path), auto_save_interval=1000)
+        )
+        recorder.start_session("indexed")
+        for frame in range(101, 151):
+            recorder.record_message(
+                RawMessage(
+                    msg_type="DATA",
+                    frame=frame,
+                    room_index=2,
+                    payload={"ENEMIES": [{"id": 1, "hp": 3.0}]},
+                )
+            )
+        recorder.stop_session()
+
+        second = export_columnar(session_dir, fmt="npz")
+        assert second["last_frame"] == 150
+        cs = ColumnarSession(session_dir)
+        assert cs.column("enemies", "frame").tolist() == list(range(101, 151))
+        assert set(cs.column("enemies", "room_index").tolist()) == {2}
+
+        with pytest.raises(ValueError):
+            export_columnar(session_dir, fmt="parquet" if ARROW_AVAILABLE else "bogus")
+
+    def test_parquet_export(self, tmp_path):
+        """测试 Parquet 导出（需要 pyarrow）"""
+        pytest.importorskip("pyarrow")
+        export_columnar(FIXTURE_DIR / FIXTURE_SESSION, tmp_path, fmt="parquet")
+        cs = ColumnarSession(tmp_path)
+        assert cs.format == "parquet"
+        assert cs.num_rows("rooms") == len(cs.column("rooms", "frame"))
+
+
+class MessageCountReducer(SessionReducer):
+    """测试用会话级归约器：统计每个会话的消息数"""
+
+    def initial(self):
+        return {}
+
+    def map_session(self, session_dir):
+        return {session_dir.name: sum(1 for _ in merge_chunks(find_message_files(session_dir)))}
+
+    def merge(self, a, b):
+        return {**a, **b}
+
+
+class FailingReducer(FrameReducer):
+    """测试用归约器：遇到指定帧时抛出异常"""
+
+    def initial(self):
+        return 0
+
+    def add(self, acc, frame, messages, session):
+        if frame == 150:
+            raise RuntimeError("boom")
+        return acc + 1
+
+    def merge(self, a, b):
+        return a + b
+
+
+class TestBatchEngine:
+    """多会话批处理测试"""
+
+    @staticmethod
+    def make_sessions(tmp_path):
+        shutil.copytree(FIXTURE_DIR / FIXTURE_SESSION, tmp_path / FIXTURE_SESSION)
+        # 每帧 3 条消息，块大小 4，帧会跨越块边界
+        frames = [f for f in range(1, 201) for _ in range(3)]
+        record_frames(str(tmp_path), frames, buffer_size=60, index_block_size=4)
+        return str(tmp_path / "*")
+
+    def test_parallel_matches_serial(self, tmp_path):
+        """测试进程池结果与串行一致，且每帧只统计一次"""
+        pattern = self.make_sessions(tmp_path)
+        serial = BatchEngine(workers=1, shard_messages=100).run(
+            pattern, ChannelStatsReducer()
+        )
+        parallel = BatchEngine(workers=2, shard_messages=100).run(
+            pattern, ChannelStatsReducer()
+        )
+
+        assert serial.sessions == 2
+        assert parallel.shards > 2
+        assert parallel.value == serial.value
+        assert parallel.value["sessions"] == {FIXTURE_SESSION: 4989, "indexed": 200}
+        assert parallel.value["messages"] == 4989 + 600
+        assert parallel.frames == 4989 + 200
+        assert not parallel.errors
+
+    def test_session_reducer(self, tmp_path):
+        """测试会话级归约器每个会话一个分片"""
+        pattern = self.make_sessions(tmp_path)
+        result = BatchEngine(workers=2).run(pattern, MessageCountReducer())
+        assert result.shards == 2
+        assert result.value == {FIXTURE_SESSION: 4989, "indexed": 600}
+
+    def test_errors_are_collected(self, tmp_path):
+        """测试失败的分片被记录，其余分片照常合并"""
+        pattern = self.make_sessions(tmp_path)
+        seen = []
+        result = BatchEngine(workers=1, shard_messages=100).run(
+            pattern, FailingReducer(), on_result=seen.append
+        )
+        assert len(result.errors) == 1
+        assert "boom" in result.errors[0][1]
+        assert len(seen) == result.shards
+        assert 0 < result.value < 4989 + 200
+
+
+class TestSessionCatalog:
+    """会话目录数据库测试"""
+
+    def test_recorder_updates_catalog(self, tmp_path):
+        """测试录制器在会话开始/结束时更新目录"""
+        frames = list(range(1, 301))
+        rooms = [3] * 100 + [0] * 100 + [3] * 100
+        record_frames(str(tmp_path), frames, rooms, buffer_size=50)
+
+        catalog = SessionCatalog.for_directory(tmp_path)
+        row = catalog.get("indexed")
+        assert row["status"] == "complete"
+        assert (row["first_frame"], row["last_frame"]) == (1, 300)
+        assert row["total_messages"] == 300
+        assert catalog.get_rooms("indexed") == {3: (1, 2), 0: (101, 1)}
+        assert catalog.get_channels("indexed") == {"PLAYER_POSITION": 300}
+        assert catalog.sessions_with_room(0) == ["indexed"]
+        assert catalog.sessions_with_channel("ENEMIES") == []
+
+        manager = SessionManager(str(tmp_path))
+        assert manager.catalog is not None
+        sessions = manager.list_sessions()
+        assert [s.session_id for s in sessions] == ["indexed"]
+        assert sessions[0].size_bytes == row["size_bytes"] > 0
+        assert manager.get_stats()["total_frames"] == 300
+
+    def test_reconcile_external_sessions(self, tmp_path, monkeypatch):
+        """测试外部拷贝/删除的会话通过对账同步"""
+        record_frames(str(tmp_path), list(range(1, 11)))
+        shutil.copytree(FIXTURE_DIR / FIXTURE_SESSION, tmp_path / FIXTURE_SESSION)
+
+        manager = SessionManager(str(tmp_path))
+        ids = {s.session_id for s in manager.list_sessions()}
+        assert ids == {"indexed", FIXTURE_SESSION}
+        assert manager.catalog.get(FIXTURE_SESSION)["has_stats"] == 0
+
+        result = manager.reconcile()
+        assert result == {"added": 0, "updated": 1, "removed": 0}
+        channels = manager.catalog.get_channels(FIXTURE_SESSION)
+        assert channels["PLAYER_POSITION"] == 4989
+        assert FIXTURE_SESSION in manager.catalog.sessions_with_room(84)
+
+        # 未变化的会话不再扫描目录
+        def fail(*args, **kwargs):
+            raise AssertionError("unchanged sessions should not be rescanned")
+
+        monkeypatch.setattr("core.replay.catalog.dir_size", fail)
+        assert len(manager.list_sessions(sort_by="frames")) == 2
+        monkeypatch.undo()
+
+        shutil.rmtree(tmp_path / FIXTURE_SESSION)
+        assert [s.session_id for s in manager.list_sessions()] == ["indexed"]
+        assert manager.delete_session("indexed")
+        assert manager.catalog.session_ids() == []
+
+    def test_reconcile_stale_recording(self, tmp_path):
+        """测试录制器崩溃遗留的 recording 会话在超时后被补全并标记为中断"""
+        record_frames(str(tmp_path), list(range(1, 11)))
+        catalog = SessionCatalog.for_directory(tmp_path)
+        row = catalog.get("indexed")
+        catalog.upsert(
+            {"session_id": "indexed", "path": row["path"], "start_time": row["start_time"]},
+            status="recording",
+        )
+
+        # 仍在写入的会话不动
+        assert catalog.reconcile(tmp_path)["updated"] == 0
+        assert catalog.get("indexed")["status"] == "recording"
+
+        assert catalog.reconcile(tmp_path, stale_after=0.0)["updated"] == 1
+        row = catalog.get("indexed")
+        assert row["status"] == "interrupted"
+        assert row["has_stats"] == 1
+        assert (row["first_frame"], row["last_frame"]) == (1, 10)
+
+        # 已补全的中断会话按修改时间跳过
+        assert catalog.reconcile(tmp_path)["updated"] == 0
+
+    def test_no_catalog_without_opt_in(self, tmp_path):
+        """测试没有目录数据库时保持原有的目录扫描行为"""
+        (tmp_path / "session_a").mkdir()
+        manager = SessionManager(str(tmp_path))
+        assert manager.catalog is None
+        assert [s.session_id for s in manager.list_sessions()] == ["session_a"]
+        assert not (tmp_path / "catalog.sqlite").exists()
+
+
+class TestFrameQuery:
+    """帧级查询测试"""
+
+    @staticmethod
+    def record_fight(tmpdir: str) -> Path:
+        """录制: 房间 1 (帧 1-50) 敌人逐渐增多，房间 2 (帧 51-80) 为 Boss 房"""
+        recorder = DataRecorder(
+            RecorderConfig(output_dir=tmpdir, auto_save_interval=1000, buffer_size=16)
+        )
+        recorder.start_session("fight")
+        for frame in range(1, 81):
+            room = 1 if frame <= 50 else 2
+            payload = {"ENEMIES": [{"id": i} for i in range(frame // 5)]}
+            if frame in (1, 51):
+                payload["ROOM_INFO"] = {"room_type": 1 if room == 1 else 5, "has_boss": room == 2}
+            if frame % 10 == 0:
+                payload["PLAYER_HEALTH"] = {"red_hearts": max(0, 6 - frame // 10), "soul_hearts": 1}
+            recorder.record_message(
+                RawMessage(msg_type="DATA", frame=frame, room_index=room, payload=payload)
+            )
+            if frame == 45:
+                recorder.record_message(
+                    RawMessage(msg_type="EVENT", frame=frame, event_type="PLAYER_DAMAGE")
+                )
+        recorder.stop_session()
+        return Path(tmpdir) / "fight"
+
+    def test_recorder_writes_query_index(self, tmp_path):
+        """测试录制时写入查询索引并按区间返回结果"""
+        session_dir = self.record_fight(str(tmp_path))
+        index = load_or_build_query_index(session_dir)
+        assert index.is_complete()
+
+        ranges = index.query("enemy_count > 8 and player_health < 2")
+        # 帧 50 起红心 1 + 魂心 0.5 = 1.5，敌人数 frame // 5 > 8 即 frame >= 45
+        assert [(r.start, r.end, r.frames) for r in ranges] == [(50, 80, 31)]
+
+        entries = index.query("room_entry and has_boss")
+        assert [(r.start, r.end) for r in entries] == [(51, 51)]
+        assert index.count("room_type == 5") == 30
+        assert index.frames('event == "PLAYER_DAMAGE"') == [45]
+        assert index.count("not (room_index == 1 or room_index = 2)") == 0
+
+    def test_replayer_reads_only_matching_ranges(self, tmp_path):
+        """测试回放器只迭代匹配区间的帧（旧会话首次查询时构建索引）"""
+        shutil.copytree(FIXTURE_DIR / FIXTURE_SESSION, tmp_path / FIXTURE_SESSION)
+        replayer = DataReplayer(
+            ReplayerConfig(recordings_dir=str(tmp_path), streaming=True)
+        )
+        replayer.load_session(FIXTURE_SESSION)
+
+        expected = [
+            f.frame
+            for f in replayer.iter_frames(speed=-1)
+            if len(f.get_payload("ENEMIES") or ()) >= 3
+        ]
+        assert expected
+        assert (tmp_path / FIXTURE_SESSION / "query.sqlite").exists() is False
+
+        ranges = replayer.query("enemy_count >= 3")
+        assert (tmp_path / FIXTURE_SESSION / "query.sqlite").exists()
+        frames = [f.frame for f in replayer.iter_query_frames("enemy_count >= 3")]
+        assert frames == expected
+        assert sum(r.frames for r in ranges) == len(expected)
+
+    def test_batched_events_indexed(self, tmp_path):
+        """测试批量 EVENT 消息中的每个事件都进入查询索引"""
+        recorder = DataRecorder(RecorderConfig(output_dir=str(tmp_path), auto_save_interval=1000))
+        recorder.start_session("batch")
+        for frame in range(1, 11):
+            recorder.record_message(RawMessage(msg_type="DATA", frame=frame, room_index=1, payload={}))
+            if frame == 5:
+                recorder.record_message(RawMessage.from_dict({
+                    "type": "EVENT", "frame": 5,
+                    "events": [
+                        {"event": "PLAYER_DAMAGE", "data": {}, "frame": 4},
+                        {"event": "ROOM_CLEAR", "data": {}, "frame": 5},
+                    ],
+                }))
+        recorder.stop_session()
+
+        index = load_or_build_query_index(tmp_path / "batch")
+        assert index.frames('event == "PLAYER_DAMAGE"') == [4]
+        assert index.frames('event == "ROOM_CLEAR"') == [5]
+
+    def test_frame_counter_reset_starts_segment(self, tmp_path):
+        """测试帧计数器重置（模组重载）后的帧记入新分段，重建索引结果一致"""
+        recorder = DataRecorder(
+            RecorderConfig(output_dir=str(tmp_path), auto_save_interval=1000, buffer_size=16)
+        )
+        recorder.start_session("reload")
+        for frame in range(1, 101):
+            recorder.record_message(RawMessage(
+                msg_type="DATA", frame=frame, room_index=1, prev_frame=frame - 1, payload={}
+            ))
+            if frame == 90:
+                recorder.record_message(
+                    RawMessage(msg_type="EVENT", frame=frame, event_type="PLAYER_DAMAGE")
+                )
+        # 迟到的消息（小幅回退）忽略，不开始新分段
+        recorder.record_message(
+            RawMessage(msg_type="DATA", frame=98, room_index=1, payload={"ENEMIES": [{}] * 9})
+        )
+        for frame in range(1, 51):
+            recorder.record_message(RawMessage(
+                msg_type="DATA", frame=frame, room_index=3, prev_frame=frame - 1,
+                payload={"ENEMIES": [{"id": i} for i in range(10)]},
+            ))
+            if frame == 20:
+                recorder.record_message(
+                    RawMessage(msg_type="EVENT", frame=frame, event_type="PLAYER_DAMAGE")
+                )
+        recorder.stop_session()
+
+        session_dir = tmp_path / "reload"
+        for index in (load_or_build_query_index(session_dir), build_query_index(session_dir)):
+            assert index.is_complete()
+            assert index.count("room_index == 1") == 100
+            assert index.count("room_index == 3") == 50
+            ranges = index.query("enemy_count >= 9")
+            assert [(r.start, r.end, r.frames, r.segment) for r in ranges] == [(1, 50, 50, 1)]
+            assert index.frames('event == "PLAYER_DAMAGE"') == [90, 20]
+            assert index.frames("room_entry") == []
+
+    def test_old_query_index_rebuilt(self, tmp_path):
+        """测试旧版本查询索引（按帧号为主键）被丢弃并重建"""
+        session_dir = self.record_fight(str(tmp_path))
+        path = session_dir / "query.sqlite"
+        path.unlink()
+        conn = sqlite3.connect(str(path))
+        conn.executescript(
+            "CREATE TABLE frames (frame INTEGER PRIMARY KEY, seq INTEGER NOT NULL);"
+            "CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);"
+            "INSERT INTO meta VALUES ('complete', '1'), ('version', '1');"
+        )
+        conn.close()
+
+        index = load_or_build_query_index(session_dir)
+        assert index.is_complete()
+        assert index.count("room_type == 5") == 30
+
+    def test_compile_filter(self):
+        """测试表达式编译为参数化 SQL，拒绝未知字段"""
+        where, params = compile_filter("enemy_count > 8 && !is_clear")
+        assert "enemy_count > ?" in where and params == [8]
+        _, params = compile_filter("event == PLAYER_DEATH or player_health <= 0.5")
+        assert params == ["PLAYER_DEATH", 0.5]
+
+        for bad in ("", "enemy_count >", "health < 2", "frame; DROP TABLE frames", "(room_entry"):
+            with pytest.raises(QueryError):
+                compile_filter(bad)
+
+
+class TestFastForwardHarness:
+    """虚拟时钟快进回放测试"""
+
+    def test_virtual_clock_without_sleep(self, tmp_path):
+        """测试快进不等待，消费方看到由帧号推导的确定时间"""
+        session_dir = record_frames(str(tmp_path), list(range(100, 400)))
+        replayer = DataReplayer(ReplayerConfig(recordings_dir=str(tmp_path), speed=1.0))
+        replayer.load_session(session_dir.name)
+
+        seen = []
+        start = time.perf_counter()
+        report = FastForwardHarness(replayer).run(seen.append)
+        assert time.perf_counter() - start < 5  # 实时回放需要 10 秒
+        assert (report.messages, report.frames, report.errors) == (300, 300, 0)
+        assert len(report.frame_latencies_ms) == 300
+        assert report.virtual_elapsed == pytest.approx(10.0)
+
+        assert seen[0]["received_at"] == 0.0
+        assert seen[30]["received_at"] == pytest.approx(1.0)
+        assert [m["game_time"] for m in seen[:3]] == [0, 33, 67]
+        # 回放器缓存的消息保持录制值
+        assert next(replayer.iter_messages(speed=0)).received_at == 100.0
+
+    def test_consumer_errors_and_facade(self, tmp_path):
+        """测试消费方异常计入报告，facade 可直接作为消费方"""
+        replayer = DataReplayer(ReplayerConfig(recordings_dir=str(FIXTURE_DIR)))
+        replayer.load_session(FIXTURE_SESSION)
+
+        def flaky(msg):
+            if msg["frame"] % 2:
+                raise ValueError("boom")
+
+        report = FastForwardHarness(replayer).run(flaky, max_frames=50)
+        assert report.frames == 50 and 0 < report.errors < 50
+
+        report = run_facade(replayer, max_frames=200)
+        assert report.frames == 200 and report.errors == 0
+        assert report.to_dict()["frame_latency_ms"]["p99"] >= 0
+
+    @pytest.mark.parametrize("speed", [0, 1000.0])
+    def test_simulator_line_rate(self, tmp_path, speed):
+        """测试 LuaSimulator 线速/按节奏发送所有消息并统计字节数"""
+        session_dir = record_frames(str(tmp_path), list(range(1, 501)))
+        replayer = DataReplayer(ReplayerConfig(recordings_dir=str(tmp_path)))
+        replayer.load_session(session_dir.name)
+
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+        received = bytearray()
+
+        def serve():
+            conn, _ = server.accept()
+            with conn:
+                while True:
+                    data = conn.recv(65536)
+                    if not data:
+                        break
+                    received.extend(data)
+
+        thread = threading.Thread(target=serve, daemon=True)
+        thread.start()
+        simulator = LuaSimulator(port=server.getsockname()[1])
+        stats = simulator.replay_session(replayer, speed=speed, batch_size=64)
+        thread.join(timeout=5)
+        server.close()
+
+        assert stats["messages"] == 500
+        assert stats["bytes"] == len(received)
+        lines = bytes(received).splitlines()
+        assert [json.loads(line)["frame"] for line in lines] == list(range(1, 501))
+
+
+class TestLoadGenerator:
+    """合成负载生成测试"""
+
+    def test_synthetic_session(self):
+        """测试合成流量遵循采集间隔与投射物爆发"""
+        profile = LoadProfile(
+            frames=60, enemies=5, projectiles=2, burst_every=30, burst_size=50, room_every=40
+        )
+        messages = list(SyntheticSession(profile).iter_messages())
+        assert len(messages) == 60
+        assert [m.seq for m in messages] == list(range(60))
+        assert all(len(m.payload["ENEMIES"]) == 5 for m in messages)
+
+        health = [m.frame for m in messages if "PLAYER_HEALTH" in m.payload]
+        assert health == [1, 16, 31, 41, 46]  # 第 41 帧切换房间，发送全部通道
+        assert messages[40].room_index == 2
+        assert messages[0].channel_meta["PLAYER_HEALTH"].interval == "LOW"
+
+        bursts = [len(m.payload["PROJECTILES"]["enemy_projectiles"]) for m in messages]
+        assert bursts[29:39] == [50] * 10 and bursts[39] == 2  # 帧 30-39
+        # 相同种子生成相同的流量
+        again = list(SyntheticSession(profile).iter_messages())
+        assert again[10].payload == messages[10].payload
+
+    def test_scale_message(self):
+        """测试放大敌人和投射物，不修改原消息"""
+        msg = next(SyntheticSession(LoadProfile(enemies=3, projectiles=2)).iter_messages())
+        scaled = scale_message(msg, enemy_factor=10, projectile_factor=3)
+        enemies = scaled.payload["ENEMIES"]
+        assert len(enemies) == 30 and len({e["id"] for e in enemies}) == 30
+        assert len(scaled.payload["PROJECTILES"]["enemy_projectiles"]) == 6
+        assert len(msg.payload["ENEMIES"]) == 3
+
+    def test_bridge_load(self):
+        """测试多客户端对进程内 IsaacBridge 的吞吐量与延迟"""
+        report = run_bridge_load(LoadProfile(frames=300, enemies=20), clients=2)
+        assert report.sent == 600
+        assert report.received == 600 and report.drop_rate == 0
+        assert report.out_of_order == 0 and not report.errors
+        assert len(report.latencies_ms) == 600
+        assert report.to_dict()["throughput"] > 0
@@ -238,6 +238,70 @@ class TestTimingMonitor:
         assert "issue_rate" in stats
 
 
+    def test_issue_storage_bounded(self):
+        """测试问题存储有界，统计使用累计计数"""
+        monitor = TimingMonitor(max_recent_issues=10)
+        for i in range(1, 101):
+            # 每条消息都跳帧 10 帧 -> FRAME_JUMP
+            monitor.check_message(
+                MessageTimingInfo(seq=i, frame=i * 10, game_time=i, prev_frame=i * 10 - 10)
+            )
+
+        assert len(monitor.issues) == 10
+        assert monitor.issues.total_count == 99
+        stats = monitor.get_stats()
+        assert stats["frame_gaps"] == 99
+        assert stats["recent_by_type"] == {"frame_jump": 99}
+        assert stats["issue_rate"] == pytest.approx(0.99)
+
+
+class TestIssueWindow:
+    """有界问题存储测试"""
+
+    def test_ring_and_time_buckets(self):
+        """测试环形缓冲与按时间分桶的窗口计数"""
+        from core.protocol.issues import IssueWindow
+
+        now = [1000.0]
+        window = IssueWindow(capacity=5, window=60.0, bucket_seconds=10.0, clock=lambda: now[0])
+        for i in range(20):
+            window.add(i, severity="warning" if i % 2 else "error", channel="ENEMIES")
+        now[0] = 1035.0
+        for i in range(20, 23):
+            window.add(i, severity="info", channel="*")
+
+        assert list(window) == [18, 19, 20, 21, 22]
+        assert window.recent(since=1030.0) == [20, 21, 22]
+        assert window.recent(limit=2) == [21, 22]
+        assert window.count() == 23
+        assert window.counts("severity") == {"error": 10, "warning": 10, "info": 3}
+
+        now[0] = 1075.0  # 第一个桶过期
+        assert window.count() == 3
+        assert window.counts("channel") == {"*": 3}
+        assert window.lifetime_counts("channel") == {"ENEMIES": 20, "*": 3}
+        assert window.total_count == 23
+
+    def test_quality_monitor_uses_window(self):
+        """测试 DataQualityMonitor 的统计来自窗口计数"""
+        from services.monitor import DataQualityMonitor
+
+        monitor = DataQualityMonitor(max_recent_issues=8)
+        for i in range(1, 51):
+            msg = {"seq": i, "frame": i * 10, "game_time": i}
+            monitor.process_message(msg, {}, i * 10)
+
+        stats = monitor.get_stats()
+        assert stats.total_messages == 50
+        assert stats.total_issues == 49
+        assert stats.by_source == {"timing": 49}
+        assert len(monitor.issues) == 8
+        assert len(monitor.get_recent_issues(limit=5)) == 5
+        summary = monitor.get_issue_summary()
+        assert summary["by_severity"]["warning"] == 49
+        assert summary["top_issues"][0] == ("TIMING_frame_jump", 49)
+
+
 # ==================== Timing Aware State Manager Tests ====================
 
 class TestTimingAwareStateManager:
@@ -409,6 +473,46 @@ class TestTimingAwareStateManager:
         assert data["frame"] == 115  # 应该找到 frame=115
 
 
+# ==================== Import Layering Tests ====================
+
+class TestImportLayering:
+    """测试分层导入"""
+
+    def test_protocol_import_is_lightweight(self):
+        """测试导入协议层不会连带加载指标端点和控制套接字"""
+        import subprocess
+
+        code = (
+            "import sys, core.protocol.timing; "
+            "print(any(m in sys.modules for m in "
+            "('core.telemetry.metrics', 'core.telemetry.control', 'core.telemetry.watchdog')))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=str(Path(__file__).parent.parent),
+            capture_output=True,
+            text=True,
+        )
+        assert result.stdout.strip() == "False", result.stderr
+
+    def test_data_layer_import_skips_telemetry(self):
+        """测试导入状态管理与校验模块不会加载遥测模块（内存计量按需导入）"""
+        import subprocess
+
+        code = (
+            "import sys, models.state, services.entity_state, "
+            "core.validation.known_issues, core.replay.recorder; "
+            "print(any(m.startswith('core.telemetry') for m in sys.modules))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=str(Path(__file__).parent.parent),
+            capture_output=True,
+            text=True,
+        )
+        assert result.stdout.strip() == "False", result.stderr
+
+
 # ==================== Run Tests ====================
 
 if __name__ == "__main__":
@@ -211,6 +211,16 @@ class TestDynamicAnomalyDetector:
         
         # 应该限制在 history_size
         assert len(anomaly_detector.history["test"]) == 50
+
+    def test_set_history_size(self, anomaly_detector):
+        """测试调整样本深度并按通道计量"""
+        for i in range(50):
+            anomaly_detector.add_sample("test", i)
+
+        usage = anomaly_detector.memory_usage()
+        anomaly_detector.set_history_size(20)
+        assert anomaly_detector.history["test"] == list(range(30, 50))
+        assert anomaly_detector.memory_usage()["test"] < usage["test"]
     
     def test_no_anomaly_for_normal_data(self, anomaly_detector):
         """测试正常数据无异常"""